@@ -4,10 +4,9 @@ AI Service Module - Xử lý tìm kiếm thông minh và Chat AI
 Tích hợp hỗ trợ model mới nhất từ OpenAI, Local AI, etc.
 """
 
-import re
 import os
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Any
+from typing import List, Dict, Iterator, Optional, Tuple, Any
 
 
 # Import models - sẽ được import khi cần để tránh circular import
@@ -20,16 +19,26 @@ def get_document_model():
 class AIService:
     """Dịch vụ AI cho tìm kiếm thông minh và Chat"""
 
+    # Điểm của kết quả khớp chính xác số hiệu (cao hơn mọi điểm toàn văn)
+    EXACT_MATCH_SCORE = 1000
+
     # ============ SEARCH DOCUMENTS ============
 
     @staticmethod
-    def search_documents(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_documents(query: str, limit: int = 10, document_filter=None) -> List[Dict[str, Any]]:
         """
         Tìm kiếm thông minh văn bản - Phiên bản cơ bản
 
+        Truy vấn có dạng số hiệu (HĐLĐ-2024-0001) được tra chính xác qua index
+        trước; chỉ khi không có văn bản nào khớp mới tìm toàn văn. Truy vấn có
+        cấu trúc (sender:"..." "cụm từ" -từ after:2024-01-01) chạy theo kế
+        hoạch của query_service trên chỉ mục từ.
+
         Args:
             query: Từ khóa tìm kiếm
             limit: Số kết quả tối đa
+            document_filter: SELECT document pk giới hạn tập tìm kiếm
+                (analysis_service.analysis_filter)
 
         Returns:
             Danh sách tài liệu khớp với điểm số
@@ -39,11 +48,29 @@ class AIService:
 
         try:
             from models import Document
+            from lookup_service import looks_like_document_number, find_by_document_number
+            from query_service import compile_query, is_structured
+
+            if is_structured(query):
+                results, _ = compile_query(query, document_filter).execute(limit)
+                return results
+
+            # Truy vấn là số hiệu: tra index document_number_key, chỉ quét khi không có kết quả
+            if looks_like_document_number(query):
+                exact = find_by_document_number(query, document_filter)
+                if exact:
+                    return [
+                        {'document': doc, 'score': AIService.EXACT_MATCH_SCORE, 'matches': []}
+                        for doc in exact[:limit]
+                    ]
 
             query_lower = query.lower()
             keywords = query_lower.split()
 
-            documents = Document.query.all()
+            documents = Document.query
+            if document_filter is not None:
+                documents = documents.filter(Document.pk.in_(document_filter))
+            documents = documents.all()
             results = []
 
             for doc in documents:
@@ -65,12 +92,13 @@ class AIService:
                             snippet = doc.content[max(0, idx - 50):min(len(doc.content), idx + 100)]
                             matches.append({
                                 'snippet': snippet.strip(),
-                                'chunk_index': 0
+                                'chunk_index': 0,
+                                'position': idx
                             })
 
                 # Tìm kiếm trong metadata
-                if doc.metadata:
-                    if any(kw in str(doc.metadata).lower() for kw in keywords):
+                if doc.json_data:
+                    if any(kw in str(doc.json_data).lower() for kw in keywords):
                         score += 20
 
                 # Tìm kiếm trong số công văn
@@ -85,6 +113,7 @@ class AIService:
                     })
 
             results = sorted(results, key=lambda x: x['score'], reverse=True)[:limit]
+            AIService._add_page_numbers(results)
             return results
 
         except Exception as e:
@@ -112,7 +141,10 @@ class AIService:
             query_lower = query.lower()
             keywords = query_lower.split()
 
-            documents = Document.query.all()
+            from sqlalchemy.orm import selectinload
+
+            # Nạp attachments bằng một truy vấn IN thay vì lazy load từng văn bản
+            documents = Document.query.options(selectinload(Document.attachments)).all()
             results = []
 
             for doc in documents:
@@ -156,8 +188,8 @@ class AIService:
 
                 # 3. Tìm kiếm trong file đính kèm
                 for att in doc.attachments:
-                    if att.metadata and att.metadata.get('content'):
-                        att_content = att.metadata['content'].lower()
+                    if att.json_data and att.json_data.get('content'):
+                        att_content = att.json_data['content'].lower()
                         for kw in keywords:
                             if kw in att_content:
                                 score += 30  # Điểm cho attachment
@@ -169,8 +201,8 @@ class AIService:
                                 })
 
                 # 4. Tìm kiếm trong metadata
-                if doc.metadata:
-                    metadata_str = str(doc.metadata).lower()
+                if doc.json_data:
+                    metadata_str = str(doc.json_data).lower()
                     for kw in keywords:
                         if kw in metadata_str:
                             score += 15
@@ -201,26 +233,66 @@ class AIService:
 
             # Sắp xếp theo điểm số
             results = sorted(results, key=lambda x: x['score'], reverse=True)[:limit]
+            AIService._add_page_numbers(results)
             return results
 
         except Exception as e:
             print(f"[ERROR] Enhanced search error: {str(e)}")
             return []
 
+    @staticmethod
+    def _add_page_numbers(results: List[Dict[str, Any]]) -> None:
+        """Gắn số trang cho các đoạn khớp trong nội dung (chỉ cho kết quả cuối)"""
+        from page_store import page_store
+
+        for result in results:
+            content_matches = [m for m in result['matches'] if 'position' in m]
+            if not content_matches:
+                continue
+            pages = page_store.pages_of(result['document'].id, [m['position'] for m in content_matches])
+            for match, page in zip(content_matches, pages):
+                match['page'] = page
+
     # ============ PROCESS CHAT MESSAGE ============
 
     @staticmethod
-    def process_chat_message(message: str) -> Tuple[str, List[Any]]:
+    def process_chat_message(message: str, session_id: Optional[str] = None,
+                             previous_results: Optional[List[str]] = None) -> Tuple[str, List[Any], Dict[str, Any]]:
         """
         Xử lý tin nhắn chat từ người dùng
 
         Args:
             message: Tin nhắn từ người dùng
+            session_id: Session chat; khi có, câu tiếp nối như "cái thứ hai"
+                được giải theo kết quả lượt trước và lượt này được ghi nhớ
+            previous_results: id văn bản của lượt trước do client gửi lên;
+                khi có, được dùng thay cho bộ nhớ hội thoại của tiến trình
 
         Returns:
-            Tuple[response, related_documents]
+            Tuple[response, related_documents, extra] - extra gồm 'rag'
+            (sources, timings, backend...) khi câu hỏi được trả lời từ nội
+            dung văn bản, 'reference' khi tin nhắn tham chiếu kết quả trước
         """
+        response, related_docs, extra = AIService._respond(message, session_id, previous_results)
+        if session_id is not None:
+            AIService._remember(session_id, message, response, related_docs)
+        return response, related_docs, extra
+
+    @staticmethod
+    def _remember(session_id: str, message: str, response: str, related_docs: List[Any]) -> None:
+        from chat_memory import conversation_store
+
+        conversation_store.append(session_id, message, response, [d.id for d in related_docs])
+
+    @staticmethod
+    def _respond(message: str, session_id: Optional[str],
+                 previous_results: Optional[List[str]] = None) -> Tuple[str, List[Any], Dict[str, Any]]:
         try:
+            # Tham chiếu tới kết quả lượt trước: không cần tìm kiếm lại
+            reference = AIService._resolve_reference(message, session_id, previous_results)
+            if reference is not None:
+                return AIService._describe_reference(reference)
+
             message_lower = message.lower()
 
             # Nhận diện ý định người dùng
@@ -240,29 +312,27 @@ class AIService:
                         response += f"(Số: {doc.document_number})"
                     response += "\n"
 
-                return response, [r['document'] for r in results]
+                return response, [r['document'] for r in results], {}
 
             elif intent == 'statistics':
-                from models import Document
+                from stats_service import document_statistics
 
-                total_docs = Document.query.count()
-                today = datetime.utcnow().date()
-                today_docs = Document.query.filter(
-                    Document.created_at >= datetime(today.year, today.month, today.day)
-                ).count()
+                # Một truy vấn GROUP BY cho mọi loại văn bản, ghi nhớ ngắn hạn
+                stats = document_statistics()
 
                 response = f"📊 Thống kê hệ thống:\n"
-                response += f"• Tổng số văn bản: {total_docs}\n"
-                response += f"• Văn bản hôm nay: {today_docs}\n"
-                response += f"• Công văn: {Document.query.filter_by(document_type='Công văn').count()}\n"
-                response += f"• Quyết định: {Document.query.filter_by(document_type='Quyết định').count()}"
+                response += f"• Tổng số văn bản: {stats['total_documents']}\n"
+                response += f"• Văn bản hôm nay: {stats['today_documents']}"
+                for document_type, count in stats['document_types'].items():
+                    response += f"\n• {document_type}: {count}"
 
-                return response, []
+                return response, [], {}
 
             elif intent == 'list':
-                from models import Document
+                from stats_service import recent_documents
 
-                docs = Document.query.order_by(Document.created_at.desc()).limit(5).all()
+                # Chỉ đọc các cột cần hiển thị
+                docs = recent_documents(limit=5)
 
                 response = "📋 Các văn bản gần đây:\n\n"
                 for i, doc in enumerate(docs, 1):
@@ -273,7 +343,7 @@ class AIService:
                         response += f"   Ngày: {doc.date_received.strftime('%d/%m/%Y')}\n"
                     response += "\n"
 
-                return response, docs
+                return response, docs, {}
 
             elif intent == 'help':
                 response = """💡 Tôi có thể giúp bạn:
@@ -285,50 +355,151 @@ class AIService:
 • "Số lượng" - Đếm số văn bản
 
 Bạn cũng có thể đặt bất kỳ câu hỏi nào về các văn bản!"""
-                return response, []
+                return response, [], {}
 
             else:
-                # Trả lời chung chung
-                response = f"Xin lỗi, tôi không hiểu rõ: '{message}'\n\n"
-                response += "Vui lòng thử:\n"
-                response += "• 'Tìm công văn về...' - để tìm kiếm\n"
-                response += "• 'Thống kê' - để xem thống kê\n"
-                response += "• 'Danh sách' - để xem các văn bản gần đây"
+                from rag_service import rag_pipeline
+
+                # Câu hỏi tự do: trả lời từ đoạn trích của các văn bản liên quan
+                answer = rag_pipeline.answer(message)
+                if answer['sources']:
+                    extra = {key: answer[key] for key in ('sources', 'backend', 'cached', 'fallback', 'timings')}
+                    return answer['answer'], answer['documents'], {'rag': extra}
+
+                # Không có văn bản liên quan: trả lời chung chung
+                return AIService._not_understood(message), [], {}
+
+        except Exception as e:
+            print(f"[ERROR] Chat processing error: {str(e)}")
+            return f"Đã xảy ra lỗi: {str(e)}", [], {}
+
+    @staticmethod
+    def _describe_reference(reference: Dict[str, Any]) -> Tuple[str, List[Any], Dict[str, Any]]:
+        """Thông tin văn bản được tham chiếu theo thứ tự ("cái thứ hai"...)"""
+        from models import Document
+
+        position = reference['position']
+        doc = Document.query.filter_by(id=reference['document_id']).first()
+        if doc is None:
+            return f"Văn bản thứ {position} không còn trong hệ thống.", [], {'reference': reference}
+
+        response = f"📄 Văn bản thứ {position}: {doc.title}\n"
+        if doc.document_number:
+            response += f"• Số: {doc.document_number}\n"
+        if doc.document_type:
+            response += f"• Loại: {doc.document_type}\n"
+        if doc.sender:
+            response += f"• Từ: {doc.sender}\n"
+        if doc.date_issued:
+            response += f"• Ngày ban hành: {doc.date_issued.strftime('%d/%m/%Y')}\n"
+        if doc.content:
+            snippet = doc.content[:300].strip()
+            response += f"\n{snippet}{'...' if len(doc.content) > 300 else ''}"
+
+        return response, [doc], {'reference': reference}
+
+    @staticmethod
+    def _not_understood(message: str) -> str:
+        response = f"Xin lỗi, tôi không hiểu rõ: '{message}'\n\n"
+        response += "Vui lòng thử:\n"
+        response += "• 'Tìm công văn về...' - để tìm kiếm\n"
+        response += "• 'Thống kê' - để xem thống kê\n"
+        response += "• 'Danh sách' - để xem các văn bản gần đây"
+        return response
+
+    @staticmethod
+    def stream_chat_message(message: str, session_id: Optional[str] = None,
+                            previous_results: Optional[List[str]] = None) -> Iterator[Tuple[str, Any]]:
+        """
+        Xử lý tin nhắn chat theo từng phần (cho /api/chat/stream)
+
+        Câu hỏi tự do đi qua rag_pipeline.stream(): văn bản liên quan có ngay
+        sau bước truy xuất, câu trả lời tới dần theo backend. Các intent khác
+        và tham chiếu tới kết quả trước tính xong một lần như
+        process_chat_message().
+
+        Yields:
+            ('results', related_documents) trước, sau đó ('delta', text) lặp
+            lại, cuối cùng ('done', extra)
+        """
+        if not AIService.is_generative(message, session_id, previous_results):
+            response, related_docs, extra = AIService.process_chat_message(message, session_id, previous_results)
+            yield 'results', related_docs
+            yield 'delta', response
+            yield 'done', extra
+            return
 
-                return response, []
+        from rag_service import rag_pipeline
 
+        try:
+            for event, payload in rag_pipeline.stream(message):
+                chat_events = AIService.rag_chat_events(message, session_id, event, payload)
+                yield from chat_events
+                if chat_events[-1][0] == 'done':
+                    return
         except Exception as e:
             print(f"[ERROR] Chat processing error: {str(e)}")
-            return f"Đã xảy ra lỗi: {str(e)}", []
+            yield 'delta', f"Đã xảy ra lỗi: {str(e)}"
+            yield 'done', {}
+
+    @staticmethod
+    def is_generative(message: str, session_id: Optional[str] = None,
+                      previous_results: Optional[List[str]] = None) -> bool:
+        """Câu hỏi tự do (không phải intent khác hay tham chiếu kết quả trước): trả lời qua RAG"""
+        return (AIService._detect_intent(message.lower()) == 'general'
+                and AIService._resolve_reference(message, session_id, previous_results) is None)
+
+    @staticmethod
+    def rag_chat_events(message: str, session_id: Optional[str], event: str, payload: Any) -> List[Tuple[str, Any]]:
+        """
+        Các sự kiện chat ứng với một sự kiện của rag_pipeline.stream() / astream()
+
+        Returns:
+            Danh sách (event, payload) như stream_chat_message(); kết thúc
+            bằng 'done' thì không cần đọc tiếp stream của RAG
+        """
+        if event == 'retrieved':
+            if not payload['sources']:
+                response = AIService._not_understood(message)
+                if session_id is not None:
+                    AIService._remember(session_id, message, response, [])
+                return [('results', []), ('delta', response), ('done', {})]
+            return [('results', payload['documents'])]
+        if event == 'delta':
+            return [('delta', payload)]
+        if session_id is not None:
+            AIService._remember(session_id, message, payload['answer'], payload['documents'])
+        extra = {key: payload[key] for key in ('sources', 'backend', 'cached', 'fallback', 'incomplete', 'timings')}
+        done = {'rag': extra}
+        if payload['incomplete']:
+            done['incomplete'] = True  # Câu trả lời bị cắt giữa chừng
+        return [('done', done)]
+
+    @staticmethod
+    def _resolve_reference(message: str, session_id: Optional[str],
+                           previous_results: Optional[List[str]]) -> Optional[Dict[str, Any]]:
+        if session_id is None and previous_results is None:
+            return None
+        from chat_memory import conversation_store
+
+        return conversation_store.resolve_reference(session_id, message, previous_results)
 
     # ============ INTENT DETECTION ============
 
     @staticmethod
     def _detect_intent(message: str) -> str:
         """
-        Nhận diện ý định từ tin nhắn
+        Nhận diện ý định từ tin nhắn (xem intent_service.IntentClassifier)
 
         Args:
-            message: Tin nhắn (đã chuyển thành lowercase)
+            message: Tin nhắn
 
         Returns:
             Intent type (search, statistics, list, help, general)
         """
-        search_keywords = ['tìm', 'tìm kiếm', 'search', 'liên quan']
-        stats_keywords = ['thống kê', 'statistics', 'số lượng', 'tổng', 'bao nhiêu']
-        list_keywords = ['danh sách', 'list', 'xem', 'gần đây', 'mới nhất']
-        help_keywords = ['giúp', 'help', 'làm gì', 'có thể gì', 'hỏi']
-
-        if any(kw in message for kw in search_keywords):
-            return 'search'
-        elif any(kw in message for kw in stats_keywords):
-            return 'statistics'
-        elif any(kw in message for kw in list_keywords):
-            return 'list'
-        elif any(kw in message for kw in help_keywords):
-            return 'help'
-
-        return 'general'
+        from intent_service import intent_classifier
+
+        return intent_classifier.predict(message)[0]
 
     # ============ KEYWORD EXTRACTION ============
 
@@ -343,12 +514,9 @@ Bạn cũng có thể đặt bất kỳ câu hỏi nào về các văn bản!"""
         Returns:
             Chuỗi từ khóa
         """
-        stopwords = ['tìm', 'tìm kiếm', 'search', 'công', 'văn', 'về', 'liên quan', 'có', 'là']
+        from intent_service import extract_keywords
 
-        words = message.lower().split()
-        keywords = [w for w in words if w not in stopwords and len(w) > 2]
-
-        return ' '.join(keywords) if keywords else message
+        return extract_keywords(message)
 
     # ============ DOCUMENT ANALYSIS ============
 
@@ -363,68 +531,28 @@ Bạn cũng có thể đặt bất kỳ câu hỏi nào về các văn bản!"""
         Returns:
             Dict với sentiment, score và indicators
         """
-        if not content:
-            return {'sentiment': 'neutral', 'score': 0}
-
-        positive_words = ['quan trọng', 'khẩn', 'cần thiết', 'ưu tiên', 'thành công', 'hoàn thành']
-        negative_words = ['hủy', 'từ chối', 'tạm dừng', 'lỗi', 'vấn đề']
-
-        content_lower = content.lower()
-        positive_count = sum(1 for word in positive_words if word in content_lower)
-        negative_count = sum(1 for word in negative_words if word in content_lower)
-
-        if positive_count > negative_count:
-            sentiment = 'positive'
-            score = min(positive_count / 10, 1.0)
-        elif negative_count > positive_count:
-            sentiment = 'negative'
-            score = -min(negative_count / 10, 1.0)
-        else:
-            sentiment = 'neutral'
-            score = 0
-
-        return {
-            'sentiment': sentiment,
-            'score': score,
-            'positive_indicators': positive_count,
-            'negative_indicators': negative_count
-        }
+        from analysis_service import analyze_sentiment
+        return analyze_sentiment(content)
 
     # ============ ENTITY EXTRACTION ============
 
     @staticmethod
     def extract_entities(text: str) -> Dict[str, Any]:
         """
-        Trích xuất các thực thể từ văn bản (người, tổ chức, ngày tháng)
+        Trích xuất các thực thể từ văn bản (ngày tháng, số hiệu văn bản, tổ chức)
+
+        Kết quả cho toàn bộ kho được tính sẵn bởi analysis_service.analyze_corpus.
 
         Args:
             text: Văn bản input
 
         Returns:
-            Dict chứa dates, organizations, numbers
+            Dict chứa dates, document_numbers, organizations, numbers
         """
-        entities = {
-            'dates': [],
-            'organizations': [],
-            'numbers': []
-        }
-
-        try:
-            # Tìm ngày tháng
-            date_pattern = r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}'
-            entities['dates'] = re.findall(date_pattern, text)
-
-            # Tìm số
-            number_pattern = r'\d+(?:\.\d+)?'
-            entities['numbers'] = re.findall(number_pattern, text)
-
-            # Tìm tổ chức
-            org_pattern = r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b'
-            entities['organizations'] = list(set(re.findall(org_pattern, text)))[:10]
-
-        except Exception as e:
-            print(f"[ERROR] Entity extraction error: {str(e)}")
+        from analysis_service import extract_entities, extract_numbers
 
+        entities = extract_entities(text)
+        entities['numbers'] = extract_numbers(text)
         return entities
 
     # ============ DOCUMENT SUMMARIZATION ============
@@ -432,7 +560,9 @@ Bạn cũng có thể đặt bất kỳ câu hỏi nào về các văn bản!"""
     @staticmethod
     def generate_summary(text: str, max_length: int = 200) -> str:
         """
-        Tạo tóm tắt từ văn bản
+        Tạo tóm tắt trích xuất từ văn bản (câu gần trọng tâm TF-IDF)
+
+        Văn bản trong kho đã có tóm tắt lưu sẵn (summary_service.stored_summary).
 
         Args:
             text: Văn bản input
@@ -441,21 +571,8 @@ Bạn cũng có thể đặt bất kỳ câu hỏi nào về các văn bản!"""
         Returns:
             Tóm tắt văn bản
         """
-        if not text or len(text) < max_length:
-            return text
-
-        sentences = text.split('.')
-        summary_sentences = []
-        total_length = 0
-
-        for sentence in sentences:
-            if total_length < max_length:
-                summary_sentences.append(sentence.strip())
-                total_length += len(sentence)
-            else:
-                break
-
-        return '. '.join(summary_sentences) + '...'
+        from summary_service import summarize
+        return summarize(text, max_length)
 
 
 # Export AIService
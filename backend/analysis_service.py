@@ -0,0 +1,417 @@
+#!/usr/bin/env python3
+"""
+Analysis Service Module - Phân tích văn bản theo lô (thực thể, cảm xúc)
+Trích xuất ngày tháng, số hiệu văn bản (CV-2024-001, 123/QĐ-UBND), tên cơ
+quan/tổ chức và đánh giá tính chất của toàn bộ kho bằng một pool process.
+Kết quả lưu vào document_analysis / document_entities (có index) để lọc khi
+tìm kiếm; văn bản có hash nội dung không đổi được bỏ qua ở lần chạy sau.
+"""
+
+import hashlib
+import logging
+import multiprocessing
+import re
+from datetime import date, datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Đổi khi thay quy tắc trích xuất để lần chạy sau phân tích lại toàn bộ
+ANALYZER_VERSION = '1'
+MAX_ENTITIES_PER_KIND = 50
+ENTITY_KINDS = ('date', 'document_number', 'organization')
+SENTIMENTS = ('positive', 'negative', 'neutral')
+
+# ============ PATTERNS ============
+
+POSITIVE_WORDS = ['quan trọng', 'khẩn', 'cần thiết', 'ưu tiên', 'thành công', 'hoàn thành']
+NEGATIVE_WORDS = ['hủy', 'từ chối', 'tạm dừng', 'lỗi', 'vấn đề']
+
+_POSITIVE_RE = re.compile('|'.join(map(re.escape, POSITIVE_WORDS)))
+_NEGATIVE_RE = re.compile('|'.join(map(re.escape, NEGATIVE_WORDS)))
+
+# 15/03/2024, 15-3-24 và dạng "ngày 15 tháng 3 năm 2024"
+_DATE_RE = re.compile(r'\b(\d{1,2})[/-](\d{1,2})[/-](\d{2,4})\b')
+_LONG_DATE_RE = re.compile(r'\bngày\s+(\d{1,2})\s+tháng\s+(\d{1,2})\s+năm\s+(\d{4})\b', re.IGNORECASE)
+_NUMBER_RE = re.compile(r'\d+(?:\.\d+)?')
+
+# CV-2024-001, QĐ-2024-015 và 123/QĐ-UBND, 45/2024/NĐ-CP
+_DOC_NUMBER_RE = re.compile(
+    r'\b[A-ZĐ]{2,6}-\d{4}-\d{1,6}\b'
+    r'|\b\d{1,5}(?:/\d{4})?/[A-ZĐ]{1,8}(?:-[A-ZĐ]{1,10})*\b'
+)
+
+# Python re không có \p{Lu}: dựng lớp chữ hoa (gồm chữ Việt có dấu) một lần
+_UPPER = ''.join(ch for ch in map(chr, range(0x41, 0x1EFA)) if ch.isupper() and ch.isalpha())
+_CAP_WORD = f'[{_UPPER}][^\\W\\d_]*'
+_LOWER_WORD = '[^\\W\\d_A-Z]+'
+ORGANIZATION_PREFIXES = [
+    'Ủy ban nhân dân', 'Uỷ ban nhân dân', 'Hội đồng nhân dân', 'UBND', 'HĐND',
+    'Tổng công ty', 'Công ty', 'Tập đoàn', 'Ngân hàng', 'Tổng cục', 'Chi cục', 'Cục',
+    'Bộ', 'Sở', 'Phòng', 'Ban', 'Viện', 'Học viện', 'Đại học', 'Trường', 'Bệnh viện',
+    'Văn phòng', 'Trung tâm',
+]
+# Tiêu đề văn bản thường viết hoa toàn bộ ("ỦY BAN NHÂN DÂN TỈNH HÀ NAM");
+# bỏ "BAN" để không nhận "BAN HÀNH QUY CHẾ"
+_PREFIXES = ORGANIZATION_PREFIXES + [p.upper() for p in ORGANIZATION_PREFIXES if p not in ('Ban', 'UBND', 'HĐND')]
+_LEVELS = ['tỉnh', 'thành phố', 'huyện', 'quận', 'thị xã', 'xã', 'phường']
+# Từ thường không thuộc tên riêng ("Sở Tài chính đã...", "Công ty Minh Long để...")
+_FUNCTION_WORDS = [
+    'và', 'để', 'đã', 'đang', 'sẽ', 'với', 'về', 'của', 'có', 'là', 'được', 'bị', 'theo',
+    'tại', 'trong', 'cho', 'các', 'những', 'này', 'đó', 'không', 'gửi', 'ban', 'thực',
+]
+_PREFIX_ALT = '|'.join(map(re.escape, sorted(_PREFIXES, key=len, reverse=True)))
+_NAME_PART = rf'{_CAP_WORD}(?:[ \t]+(?!(?:{"|".join(_FUNCTION_WORDS)})\b){_LOWER_WORD})?'
+# Tên riêng sau tiền tố: từ viết hoa, mỗi từ có thể kèm một từ thường
+# ("Sở Tài chính", "Bộ Giáo dục và Đào tạo", "UBND tỉnh Hà Nam"); "và" chỉ
+# nối trong tên khi sau nó không phải tiền tố của tổ chức khác. Tên không
+# vắt qua dòng (tiêu đề cơ quan thường nằm riêng một dòng)
+_ORGANIZATION_RE = re.compile(
+    rf'\b(?:{_PREFIX_ALT})'
+    rf'(?:[ \t]+(?:{"|".join(_LEVELS + [w.upper() for w in _LEVELS])}))?'
+    rf'(?:[ \t]+{_NAME_PART}(?:[ \t]+và[ \t]+(?!(?:{_PREFIX_ALT})\b){_NAME_PART})?){{1,6}}'
+)
+_SPACE_RE = re.compile(r'\s+')
+
+
+# ============ EXTRACTION ============
+
+def content_hash(content: Optional[str], version: str = ANALYZER_VERSION) -> str:
+    """SHA-256 của nội dung kèm phiên bản bộ xử lý (đổi phiên bản = xử lý lại)"""
+    digest = hashlib.sha256(version.encode('ascii') + b'\0')
+    digest.update((content or '').encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _iso_date(day: str, month: str, year: str) -> Optional[str]:
+    year_num = int(year)
+    if year_num < 100:
+        year_num += 2000
+    try:
+        return date(year_num, int(month), int(day)).isoformat()
+    except ValueError:
+        return None
+
+
+def _entities(text: str) -> Dict[str, List[Tuple[str, str]]]:
+    """(giá trị, dạng chuẩn hoá) theo loại thực thể, không trùng, theo thứ tự xuất hiện"""
+    dates: Dict[str, str] = {}
+    for pattern in (_DATE_RE, _LONG_DATE_RE):
+        for match in pattern.finditer(text):
+            value = match.group(0)
+            if value not in dates:
+                dates[value] = _iso_date(*match.groups()) or value
+    numbers = {value: _SPACE_RE.sub('', value).upper() for value in _DOC_NUMBER_RE.findall(text)}
+    organizations = {}
+    for match in _ORGANIZATION_RE.finditer(text):
+        value = _SPACE_RE.sub(' ', match.group(0))
+        organizations.setdefault(value, value.lower())
+    return {
+        'date': list(dates.items())[:MAX_ENTITIES_PER_KIND],
+        'document_number': list(numbers.items())[:MAX_ENTITIES_PER_KIND],
+        'organization': list(organizations.items())[:MAX_ENTITIES_PER_KIND],
+    }
+
+
+def extract_entities(text: str) -> Dict[str, List[str]]:
+    """
+    Trích xuất thực thể từ văn bản
+
+    Args:
+        text: Văn bản input
+
+    Returns:
+        Dict dates, document_numbers, organizations (không trùng, theo thứ tự xuất hiện)
+    """
+    found = _entities(text or '')
+    return {
+        'dates': [value for value, _ in found['date']],
+        'document_numbers': [value for value, _ in found['document_number']],
+        'organizations': [value for value, _ in found['organization']],
+    }
+
+
+def extract_numbers(text: str) -> List[str]:
+    return _NUMBER_RE.findall(text or '')
+
+
+def analyze_sentiment(content: str) -> Dict[str, Any]:
+    """
+    Phân tích cảm xúc/tính chất của văn bản theo từ chỉ báo
+
+    Mỗi từ chỉ báo được tính một lần dù xuất hiện nhiều lần.
+
+    Returns:
+        Dict với sentiment, score và indicators
+    """
+    if not content:
+        return {'sentiment': 'neutral', 'score': 0}
+
+    content_lower = content.lower()
+    positive_count = len(set(_POSITIVE_RE.findall(content_lower)))
+    negative_count = len(set(_NEGATIVE_RE.findall(content_lower)))
+
+    if positive_count > negative_count:
+        sentiment = 'positive'
+        score = min(positive_count / 10, 1.0)
+    elif negative_count > positive_count:
+        sentiment = 'negative'
+        score = -min(negative_count / 10, 1.0)
+    else:
+        sentiment = 'neutral'
+        score = 0
+
+    return {
+        'sentiment': sentiment,
+        'score': score,
+        'positive_indicators': positive_count,
+        'negative_indicators': negative_count
+    }
+
+
+def normalize_entity(kind: str, value: str) -> str:
+    """
+    Dạng chuẩn hoá dùng để lọc: ngày ISO (YYYY-MM-DD, giá trị không phải
+    ngày đầy đủ như '2024-03' giữ nguyên), số hiệu viết hoa không khoảng
+    trắng, tên tổ chức chữ thường
+    """
+    value = value.strip()
+    if kind == 'date':
+        match = _DATE_RE.fullmatch(value) or _LONG_DATE_RE.fullmatch(value)
+        return (_iso_date(*match.groups()) if match else None) or value
+    if kind == 'document_number':
+        return _SPACE_RE.sub('', value).upper()
+    return _SPACE_RE.sub(' ', value).lower()
+
+
+def analyze_text(item: Tuple[int, str]) -> Tuple[int, Dict[str, Any]]:
+    """
+    Phân tích một văn bản (chạy trong process con của pool)
+
+    Args:
+        item: (document_pk, content)
+
+    Returns:
+        (document_pk, {sentiment..., entities: [(kind, value, normalized)]})
+    """
+    pk, content = item
+    result = analyze_sentiment(content)
+    result['entities'] = [
+        (kind, value[:255], normalized[:255])
+        for kind, values in _entities(content).items()
+        for value, normalized in values
+    ]
+    return pk, result
+
+
+# ============ CORPUS JOB ============
+
+def _store_results(results: List[Tuple[int, Dict[str, Any]]], hashes: Dict[int, str]) -> int:
+    """Thay kết quả cũ của các văn bản trong lô (trong transaction hiện tại)"""
+    from models import db, DocumentAnalysis, DocumentEntity
+
+    pks = [pk for pk, _ in results]
+    db.session.execute(db.delete(DocumentEntity).where(DocumentEntity.document_pk.in_(pks)))
+    db.session.execute(db.delete(DocumentAnalysis).where(DocumentAnalysis.document_pk.in_(pks)))
+
+    now = datetime.utcnow()
+    # Core INSERT (executemany): không qua lớp bulk ORM cho hàng trăm nghìn dòng thực thể
+    db.session.execute(DocumentAnalysis.__table__.insert(), [
+        {
+            'document_pk': pk,
+            'content_hash': hashes[pk],
+            'sentiment': result['sentiment'],
+            'sentiment_score': result['score'],
+            'positive_indicators': result.get('positive_indicators', 0),
+            'negative_indicators': result.get('negative_indicators', 0),
+            'entity_count': len(result['entities']),
+            'analyzed_at': now,
+        }
+        for pk, result in results
+    ])
+    entity_rows = [
+        {'document_pk': pk, 'kind': kind, 'value': value, 'normalized': normalized}
+        for pk, result in results
+        for kind, value, normalized in result['entities']
+    ]
+    if entity_rows:
+        db.session.execute(DocumentEntity.__table__.insert(), entity_rows)
+    return len(entity_rows)
+
+
+def process_corpus(model, version: str, func: Callable, store: Callable,
+                   workers: int = 1, batch_size: int = 500, force: bool = False,
+                   pks: Optional[List[int]] = None) -> Dict[str, int]:
+    """
+    Chạy một bộ xử lý theo văn bản trên kho, bỏ qua văn bản không đổi
+
+    Đọc theo keyset trên pk; hash nội dung được tính ở process chính và so
+    với model.content_hash đã lưu nên văn bản không đổi không bị gửi sang pool.
+
+    Args:
+        model: Bảng kết quả có cột document_pk, content_hash
+        version: Phiên bản bộ xử lý (một phần của hash)
+        func: Hàm top-level (pk, content) -> (pk, kết quả), chạy trong pool
+        store: Hàm ghi (results, hashes) -> số dòng phụ đã ghi, trong transaction của lô
+        workers: Số process (1 = chạy tuần tự trong process hiện tại)
+        batch_size: Số văn bản mỗi lô đọc/ghi (một transaction mỗi lô)
+        force: Xử lý lại cả văn bản không đổi
+        pks: Chỉ các văn bản này (luồng ingest) thay vì toàn kho
+
+    Returns:
+        Dict {processed, skipped, stored}
+    """
+    from models import db, Document
+
+    pool = None
+
+    def run(items):
+        nonlocal pool
+        if workers <= 1:
+            return map(func, items)
+        if pool is None:
+            # Chỉ tạo khi có văn bản cần xử lý; spawn để process con không
+            # thừa hưởng engine/thread nền của app
+            pool = multiprocessing.get_context('spawn').Pool(workers)
+        return pool.imap(func, items, chunksize=max(1, len(items) // (workers * 4)))
+
+    stmt = (
+        db.select(Document.pk, Document.content, model.content_hash)
+        .outerjoin(model, model.document_pk == Document.pk)
+        .order_by(Document.pk)
+        .limit(batch_size)
+    )
+    if pks is not None:
+        stmt = stmt.where(Document.pk.in_(pks))
+
+    stats = {'processed': 0, 'skipped': 0, 'stored': 0}
+    last_pk = 0
+    try:
+        while True:
+            rows = db.session.execute(stmt.where(Document.pk > last_pk)).all()
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+
+            hashes = {}
+            pending = []
+            for pk, content, stored_hash in rows:
+                digest = content_hash(content, version)
+                if not force and digest == stored_hash:
+                    stats['skipped'] += 1
+                    continue
+                hashes[pk] = digest
+                pending.append((pk, content or ''))
+            if not pending:
+                continue
+
+            results = list(run(pending))
+            stats['stored'] += store(results, hashes)
+            db.session.commit()
+            stats['processed'] += len(results)
+            logger.info(f"{model.__tablename__}: processed {stats['processed']} documents (up to pk {last_pk})")
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return stats
+
+
+def analyze_corpus(workers: int = 1, batch_size: int = 500, force: bool = False,
+                   pks: Optional[List[int]] = None) -> Dict[str, int]:
+    """
+    Phân tích thực thể/cảm xúc cho kho văn bản (xem process_corpus)
+
+    Returns:
+        Dict {analyzed, skipped, entities}
+    """
+    from models import DocumentAnalysis
+
+    stats = process_corpus(DocumentAnalysis, ANALYZER_VERSION, analyze_text, _store_results,
+                           workers=workers, batch_size=batch_size, force=force, pks=pks)
+    return {'analyzed': stats['processed'], 'skipped': stats['skipped'], 'entities': stats['stored']}
+
+
+# ============ SEARCH FILTERS ============
+
+class AnalysisFilterError(ValueError):
+    """Bộ lọc phân tích không hợp lệ"""
+
+
+def _prefix_range(column, prefix: str):
+    from models import db
+
+    # Thay cho LIKE 'x%' (SQLite chỉ dùng index cho LIKE trên cột NOCASE)
+    return db.and_(column >= prefix, column < prefix + '\uffff')
+
+
+def analysis_filter(filters: Optional[Dict[str, Any]]):
+    """
+    Câu SELECT document_pk thoả các bộ lọc phân tích (dùng với Document.pk.in_())
+
+    Args:
+        filters: Dict có thể gồm sentiment ('positive' | 'negative' |
+            'neutral') và các loại thực thể date / document_number /
+            organization. Thực thể so khớp tiền tố trên dạng chuẩn hoá:
+            date '2024-03' là mọi ngày trong tháng 3/2024.
+
+    Returns:
+        Select, hoặc None nếu không có bộ lọc nào
+
+    Raises:
+        AnalysisFilterError: Giá trị lọc không hợp lệ
+    """
+    from models import db, DocumentAnalysis, DocumentEntity
+
+    if not filters:
+        return None
+    if not isinstance(filters, dict):
+        raise AnalysisFilterError('filters must be an object')
+    unknown = set(filters) - {'sentiment', *ENTITY_KINDS}
+    if unknown:
+        raise AnalysisFilterError(f"Unknown filters: {', '.join(sorted(unknown))}")
+
+    stmt = None
+    sentiment = filters.get('sentiment')
+    if sentiment:
+        if sentiment not in SENTIMENTS:
+            raise AnalysisFilterError(f"sentiment must be one of: {', '.join(SENTIMENTS)}")
+        stmt = db.select(DocumentAnalysis.document_pk).where(DocumentAnalysis.sentiment == sentiment)
+
+    for kind in ENTITY_KINDS:
+        value = filters.get(kind)
+        if not value:
+            continue
+        if not isinstance(value, str):
+            raise AnalysisFilterError(f'{kind} must be a string')
+        prefix = normalize_entity(kind, value)
+        entity = db.select(DocumentEntity.document_pk).where(
+            DocumentEntity.kind == kind,
+            _prefix_range(DocumentEntity.normalized, prefix)
+        )
+        stmt = entity if stmt is None else stmt.intersect(entity)
+
+    return stmt
+
+
+def analyses_for(pks: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Kết quả phân tích đã lưu của các văn bản (một truy vấn)"""
+    from models import db, DocumentAnalysis
+
+    if not pks:
+        return {}
+    rows = db.session.execute(
+        db.select(DocumentAnalysis).where(DocumentAnalysis.document_pk.in_(pks))
+    ).scalars()
+    return {row.document_pk: row.to_dict() for row in rows}
+
+
+# Export
+__all__ = [
+    'process_corpus', 'analyze_corpus', 'analyze_text', 'analyze_sentiment', 'extract_entities',
+    'analysis_filter', 'analyses_for', 'AnalysisFilterError', 'content_hash',
+]
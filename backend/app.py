@@ -29,6 +29,12 @@ app.config.from_object(ConfigClass)
 
 print(f"[+] Configuration loaded: {ConfigClass.__name__}")
 
+# ============ JSON PROVIDER ============
+
+from serializers import FastJSONProvider
+
+app.json = FastJSONProvider(app)
+
 # ============ INITIALIZE DATABASE ============
 
 from models import db
@@ -40,13 +46,61 @@ if not hasattr(app, 'extensions') or 'sqlalchemy' not in app.extensions:
 else:
     print("[+] Database already initialized")
 
+# ============ HTTP CACHE ============
+
+from cache import document_cache
+
+document_cache.max_entries = app.config['DOCUMENT_CACHE_SIZE']
+
+from stats_service import stats_memo
+
+stats_memo.ttl = app.config['STATS_CACHE_TTL']
+
+# ============ PAGE STORE ============
+
+from page_store import page_store
+
+page_store.init_app(app)
+
+# ============ CHAT (RAG, MEMORY) ============
+
+from rag_service import rag_pipeline
+
+rag_pipeline.init_app(app)
+
+from chat_memory import conversation_store
+
+conversation_store.init_app(app)
+
+# ============ DOCUMENT TYPE CLASSIFIER ============
+
+from classifier_service import document_classifier
+
+document_classifier.reload_interval = app.config['DOCUMENT_TYPE_RELOAD_INTERVAL']
+
+# ============ SEARCH SUGGESTIONS ============
+
+from suggest_service import suggest_index
+
+suggest_index.init_app(app)
+
+# ============ BACKGROUND TASKS ============
+
+from background import file_sweeper, chat_log_writer, ingest_worker, extract_pool
+
+file_sweeper.init_app(app)
+chat_log_writer.init_app(app)
+ingest_worker.init_app(app)
+extract_pool.init_app(app)
+
 # ============ SETUP CORS ============
 
 CORS(app, resources={
     r"/api/*": {
         "origins": app.config['CORS_ORIGINS'],
         "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"],
+        "allow_headers": app.config['CORS_ALLOW_HEADERS'],
+        "expose_headers": app.config['CORS_EXPOSE_HEADERS'],
     }
 })
 
@@ -74,8 +128,12 @@ except ImportError as e:
 
 # ============ CREATE TABLES ============
 
+from migrations import run_migrations
+
 with app.app_context():
     try:
+        for migration in run_migrations():
+            print(f"[+] Database migrated: {migration}")
         db.create_all()
         print("[+] Database tables created/verified")
     except Exception as e:
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+ASGI Application - Phục vụ bất đồng bộ cho các endpoint chờ I/O
+Tải file và chat stream chạy thẳng trên event loop: file được gửi theo khối
+bằng I/O bất đồng bộ (client tải chậm không giữ thread nào), chat chờ
+backend sinh câu trả lời qua httpx. Mọi route còn lại vẫn là Flask (chung
+models.py, cấu hình, cache, tác vụ nền) chạy trên thread pool qua a2wsgi;
+body request được nhận hết trên loop trước khi vào Flask nên upload chậm
+không chiếm thread, còn trích xuất PDF/Word chạy trên process pool.
+
+Chạy: python main.py --async
+      hoặc: cd backend && uvicorn asgi:application
+"""
+
+import logging
+import os
+import tempfile
+import time
+
+from a2wsgi import WSGIMiddleware
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from starlette.routing import Route, Router
+from werkzeug.http import parse_etags
+
+from app import app as flask_app
+from models import db, Document, Attachment
+from ai_service import AIService
+from rag_service import rag_pipeline
+from background import chat_log_writer, extract_pool
+from routes import chat_results, chat_previous_results, sse_event
+
+logger = logging.getLogger(__name__)
+
+REPLAY_CHUNK_SIZE = 256 * 1024  # Khối body chuyển cho Flask sau khi đã nhận hết
+
+# Trên thread, trích xuất PDF/Word giữ GIL và chặn cả event loop: mặc định tách process
+extract_pool.workers = flask_app.config['EXTRACT_WORKERS'] or flask_app.config['ASGI_EXTRACT_WORKERS']
+
+
+async def in_app_context(func, *args):
+    """Chạy hàm đồng bộ (truy vấn CSDL, tìm kiếm) trên thread pool, trong app context của Flask"""
+    def call():
+        with flask_app.app_context():
+            return func(*args)
+
+    return await run_in_threadpool(call)
+
+
+def _error(message, status_code):
+    return JSONResponse({'success': False, 'error': message}, status_code=status_code)
+
+
+def _secure(response):
+    """Header bảo mật như app.after_request"""
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
+    return response
+
+
+# ============ FLASK (WSGI) ============
+
+class BufferedWSGI:
+    """
+    Flask chạy qua a2wsgi, body request được nhận trước trên event loop
+
+    a2wsgi đọc body từ thread WSGI theo tốc độ của client: upload chậm giữ
+    thread suốt thời gian gửi. Ở đây body được đệm hết (bộ nhớ, quá
+    spool_bytes thì ra file tạm) rồi mới chuyển cho Flask; body vượt
+    max_body_bytes bị từ chối (413) mà không chiếm thread nào.
+    """
+
+    def __init__(self, wsgi_app, threads: int, spool_bytes: int, max_body_bytes: int):
+        self.app = WSGIMiddleware(wsgi_app, workers=threads)
+        self.spool_bytes = spool_bytes
+        self.max_body_bytes = max_body_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        body = tempfile.SpooledTemporaryFile(max_size=self.spool_bytes)
+        size = 0
+        try:
+            while True:
+                message = await receive()
+                if message['type'] == 'http.disconnect':
+                    return
+                chunk = message.get('body', b'')
+                size += len(chunk)
+                if size > self.max_body_bytes:
+                    await _error('Request entity too large', 413)(scope, receive, send)
+                    return
+                body.write(chunk)
+                if not message.get('more_body', False):
+                    break
+            body.seek(0)
+
+            replayed = False
+
+            async def buffered_receive():
+                nonlocal replayed
+                if replayed:
+                    return await receive()  # Chờ client ngắt kết nối
+                chunk = body.read(REPLAY_CHUNK_SIZE)
+                replayed = body.tell() >= size
+                return {'type': 'http.request', 'body': chunk, 'more_body': not replayed}
+
+            await self.app(scope, buffered_receive, send)
+        finally:
+            body.close()
+
+
+flask = BufferedWSGI(
+    flask_app,
+    threads=flask_app.config['ASGI_WSGI_THREADS'],
+    spool_bytes=flask_app.config['ASGI_BODY_SPOOL_BYTES'],
+    max_body_bytes=flask_app.config['MAX_CONTENT_LENGTH'],
+)
+
+
+# ============ DOWNLOADS ============
+
+def _stored_file(model, name_column, item_id):
+    return db.session.execute(
+        db.select(model.file_path, name_column.label('name'), model.file_hash).where(model.id == item_id)
+    ).first()
+
+
+async def _send_stored_file(request: Request, row, fallback_name: str):
+    """
+    Như downloads.send_stored_file: Range/206, ETag (SHA-256 nội dung nếu
+    có)/If-None-Match, cache dài hạn cho URL ?v=<file_hash>; file được đọc
+    theo khối trên thread của anyio, không giữ thread trong lúc gửi
+    """
+    try:
+        stat_result = await run_in_threadpool(os.stat, row.file_path)
+    except FileNotFoundError:
+        return _error('File not found', 404)
+
+    file_hash = row.file_hash
+    if file_hash and request.query_params.get('v') == file_hash:
+        cache_control = f"public, max-age={flask_app.config['DOWNLOAD_IMMUTABLE_MAX_AGE']}, immutable"
+    else:
+        cache_control = 'no-cache'
+    headers = {'Cache-Control': cache_control, 'Accept-Ranges': 'bytes'}
+    if file_hash:
+        headers['ETag'] = f'"{file_hash}"'
+
+    response = FileResponse(row.file_path, headers=headers, filename=row.name or fallback_name,
+                            stat_result=stat_result)
+    etag = response.headers['etag']
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and parse_etags(if_none_match).contains(etag.strip('"')):
+        return Response(status_code=304, headers={'ETag': etag, 'Cache-Control': cache_control})
+    return response
+
+
+async def download_document(request: Request):
+    """Tải văn bản gốc (hỗ trợ Range, ETag/If-None-Match)"""
+    try:
+        row = await in_app_context(_stored_file, Document, Document.file_name, request.path_params['doc_id'])
+        if not row or not row.file_path:
+            return _secure(_error('Document not found', 404))
+        return _secure(await _send_stored_file(request, row, 'document'))
+
+    except Exception as e:
+        logger.error(f"Download error: {str(e)}")
+        return _secure(_error(str(e), 500))
+
+
+async def download_attachment(request: Request):
+    """Tải file đính kèm (hỗ trợ Range, ETag/If-None-Match)"""
+    try:
+        row = await in_app_context(_stored_file, Attachment, Attachment.filename, request.path_params['att_id'])
+        if not row or not row.file_path:
+            return _secure(_error('Attachment not found', 404))
+        return _secure(await _send_stored_file(request, row, 'attachment'))
+
+    except Exception as e:
+        logger.error(f"Attachment download error: {str(e)}")
+        return _secure(_error(str(e), 500))
+
+
+# ============ CHAT ============
+
+async def _chat_events(message, session_id, previous_results):
+    """AIService.stream_chat_message() cho event loop: chờ backend sinh bằng I/O bất đồng bộ"""
+    if not await in_app_context(AIService.is_generative, message, session_id, previous_results):
+        response, related_docs, extra = await in_app_context(
+            AIService.process_chat_message, message, session_id, previous_results)
+        yield 'results', related_docs
+        yield 'delta', response
+        yield 'done', extra
+        return
+
+    try:
+        async for event, payload in rag_pipeline.astream(message, in_app_context):
+            if event == 'delta':
+                chat_events = [('delta', payload)]
+            else:
+                # Ghi nhớ hội thoại có thể đọc CSDL
+                chat_events = await in_app_context(AIService.rag_chat_events, message, session_id, event, payload)
+            for item in chat_events:
+                yield item
+            if chat_events[-1][0] == 'done':
+                return
+    except Exception as e:
+        logger.error(f"Chat processing error: {str(e)}")
+        yield 'delta', f"Đã xảy ra lỗi: {str(e)}"
+        yield 'done', {}
+
+
+async def chat_stream(request: Request):
+    """
+    Chat với AI dạng Server-Sent Events (cùng sự kiện với routes.chat_stream)
+
+    Trong lúc model sinh câu trả lời, kết nối chỉ giữ một coroutine.
+    """
+    data = None
+    if request.method == 'POST':
+        try:
+            data = await request.json()
+        except ValueError:
+            pass
+    if not isinstance(data, dict) or not data:
+        data = request.query_params
+    message = data.get('message', '')
+    session_id = data.get('session_id', 'default')
+    previous_results = chat_previous_results(data)
+
+    if not message:
+        return _secure(_error('No message provided', 400))
+
+    started = time.perf_counter()
+
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    async def events():
+        first_byte_ms = None
+        parts = []
+        related_ids = None
+        try:
+            async for event, payload in _chat_events(message, data.get('session_id'), previous_results):
+                if event == 'results':
+                    related_ids = [d.id for d in payload] or None
+                    chunk = sse_event('results', {'results': chat_results(payload)})
+                elif event == 'delta':
+                    parts.append(payload)
+                    chunk = sse_event('delta', {'text': payload})
+                else:
+                    done = {'success': True, 'first_byte_ms': first_byte_ms, 'total_ms': elapsed_ms(), **payload}
+                    logger.info(f"Chat stream: first byte {first_byte_ms} ms, total {done['total_ms']} ms")
+                    chunk = sse_event('done', done)
+                if first_byte_ms is None:
+                    first_byte_ms = elapsed_ms()
+                yield chunk
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            yield sse_event('error', {'success': False, 'error': str(e)})
+        finally:
+            if parts:
+                chat_log_writer.schedule(
+                    session_id=session_id,
+                    user_message=message,
+                    ai_response=''.join(parts),
+                    related_documents=related_ids
+                )
+
+    return _secure(StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    ))
+
+
+# ============ APPLICATION ============
+
+# Flask-CORS chỉ áp dụng cho route Flask: route bất đồng bộ dùng cùng cấu hình
+_cors = [Middleware(
+    CORSMiddleware,
+    allow_origins=flask_app.config['CORS_ORIGINS'],
+    allow_methods=['GET', 'POST', 'OPTIONS'],
+    allow_headers=flask_app.config['CORS_ALLOW_HEADERS'],
+    expose_headers=flask_app.config['CORS_EXPOSE_HEADERS'],
+)]
+
+routes = [
+    Route('/api/chat/stream', chat_stream, methods=['GET', 'POST', 'OPTIONS'], middleware=_cors),
+]
+if not flask_app.config.get('DOWNLOAD_OFFLOAD'):
+    # Khi offload (X-Sendfile / X-Accel-Redirect), web server phía trước gửi file: giữ route Flask
+    routes += [
+        Route('/api/download/bundle', flask, methods=['GET', 'POST', 'OPTIONS']),
+        Route('/api/download/attachment/{att_id}', download_attachment, methods=['GET', 'OPTIONS'], middleware=_cors),
+        Route('/api/download/{doc_id}', download_document, methods=['GET', 'OPTIONS'], middleware=_cors),
+    ]
+
+application = Router(routes=routes, redirect_slashes=False, default=flask)
+
+
+# Export
+__all__ = ['application', 'in_app_context', 'BufferedWSGI']
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Background Module - Các tác vụ nền chạy ngoài request
+FileSweeper: xoá file vật lý của văn bản đã xoá khỏi CSDL, để request
+trả về ngay mà không chờ I/O của hệ thống file.
+ChatLogWriter: ghi ChatMessage theo lô ngoài request (write-behind).
+IngestWorker: tóm tắt và phân tích văn bản vừa tải lên ngoài request.
+ExtractPool: trích xuất nội dung file tải lên trong process riêng.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class FileSweeper:
+    """
+    Hàng đợi xoá file chạy trên một daemon thread
+
+    Chỉ xoá file nằm trong các thư mục được phép (UPLOAD_FOLDER,
+    PAGE_STORE_FOLDER) để tránh
+    xoá nhầm đường dẫn lạ trong dữ liệu cũ. Khi tiến trình dừng, các file
+    còn trong hàng đợi được xoá nốt (atexit).
+    """
+
+    def __init__(self):
+        self._queue: 'queue.Queue[Optional[str]]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.roots: Tuple[str, ...] = ()
+        self.deleted = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        """Gắn các thư mục được phép xoá từ cấu hình app"""
+        folders = (app.config['UPLOAD_FOLDER'], app.config.get('PAGE_STORE_FOLDER'))
+        self.roots = tuple(os.path.realpath(folder) for folder in folders if folder)
+        atexit.register(self.drain)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='file-sweeper', daemon=True)
+                self._thread.start()
+
+    def schedule(self, paths: Iterable[Optional[str]]) -> int:
+        """
+        Đưa các file vào hàng đợi xoá
+
+        Returns:
+            Số file đã đưa vào hàng đợi
+        """
+        count = 0
+        for path in paths:
+            if path:
+                self._queue.put(path)
+                count += 1
+        if count:
+            self._ensure_started()
+        return count
+
+    def _is_allowed(self, path: str) -> bool:
+        real = os.path.realpath(path)
+        return any(
+            os.path.commonpath([real, root]) == root and real != root
+            for root in self.roots
+        )
+
+    def _delete(self, path: str) -> None:
+        if not self._is_allowed(path):
+            logger.warning(f"Sweeper skipped path outside allowed folders: {path}")
+            return
+        try:
+            os.remove(path)
+            self.deleted += 1
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.failed += 1
+            logger.error(f"Sweeper cannot delete {path}: {str(e)}")
+
+    def _run(self):
+        while True:
+            path = self._queue.get()
+            try:
+                if path is not None:
+                    self._delete(path)
+            finally:
+                self._queue.task_done()
+
+    def drain(self):
+        """Xoá ngay mọi file còn trong hàng đợi (gọi khi shutdown)"""
+        while True:
+            try:
+                path = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                if path is not None:
+                    self._delete(path)
+            finally:
+                self._queue.task_done()
+
+    def join(self):
+        """Chờ hàng đợi rỗng"""
+        self._queue.join()
+
+
+file_sweeper = FileSweeper()
+
+
+class ChatLogWriter:
+    """
+    Ghi ChatMessage theo lô (write-behind) trên một daemon thread
+
+    Tin nhắn được gom lại và ghi bằng một INSERT nhiều dòng + một commit khi
+    đủ batch_size dòng hoặc sau interval giây kể từ dòng đầu của lô, thay vì
+    mỗi request một commit (một lần fsync của SQLite). Hàng đợi có giới hạn
+    max_pending: khi đầy, request chờ tới khi thread ghi kịp, nên khi tiến
+    trình bị kill mất tối đa max_pending + batch_size tin nhắn. Khi dừng bình
+    thường, mọi tin nhắn còn lại được ghi nốt (atexit).
+    """
+
+    def __init__(self, batch_size: int = 100, interval: float = 1.0, max_pending: int = 1000):
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue: 'queue.Queue[Any]' = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.app = None
+        self.written = 0
+        self.failed = 0
+        self.batches = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config['CHAT_WRITE_BATCH_SIZE']
+        self.interval = app.config['CHAT_WRITE_INTERVAL']
+        self._queue = queue.Queue(maxsize=app.config['CHAT_WRITE_MAX_PENDING'])
+        atexit.register(self.drain)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='chat-log-writer', daemon=True)
+                self._thread.start()
+
+    def schedule(self, **fields: Any) -> str:
+        """
+        Đưa một tin nhắn (các cột của ChatMessage) vào hàng đợi ghi
+
+        id và created_at được gán ngay (thứ tự lịch sử theo thời điểm
+        request, không theo thời điểm ghi).
+
+        Returns:
+            id của ChatMessage
+        """
+        fields.setdefault('id', str(uuid.uuid4()))
+        fields.setdefault('created_at', datetime.utcnow())
+        self._ensure_started()
+        self._queue.put(fields)
+        return fields['id']
+
+    def _write(self, rows: List[Dict[str, Any]]) -> None:
+        from models import db, ChatMessage
+
+        with self.app.app_context():
+            try:
+                db.session.execute(db.insert(ChatMessage), rows)
+                db.session.commit()
+                self.written += len(rows)
+                self.batches += 1
+            except Exception as e:
+                db.session.rollback()
+                self.failed += len(rows)
+                logger.error(f"Chat log writer cannot save {len(rows)} messages: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def _run(self):
+        batch: List[Dict[str, Any]] = []
+        deadline = 0.0
+        while True:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None  # Hết interval
+
+            if isinstance(item, threading.Event):
+                # flush(): ghi lô hiện tại rồi báo cho bên chờ
+                if batch:
+                    self._flush_batch(batch)
+                    batch = []
+                item.set()
+                self._queue.task_done()
+                continue
+
+            if item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.interval
+                batch.append(item)
+            if batch and (item is None or len(batch) >= self.batch_size):
+                self._flush_batch(batch)
+                batch = []
+
+    def _flush_batch(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self._write(batch)
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    def flush(self, timeout: Optional[float] = 10) -> bool:
+        """
+        Ghi ngay mọi tin nhắn đã đưa vào trước lời gọi này
+
+        Returns:
+            False nếu hết timeout mà chưa ghi xong
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self.drain()
+            return True
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def drain(self):
+        """Ghi mọi tin nhắn còn lại (gọi khi shutdown)"""
+        if self._thread is not None and self._thread.is_alive():
+            self.flush()
+            return
+        while True:
+            rows = []
+            while len(rows) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if isinstance(item, threading.Event):
+                    item.set()
+                    self._queue.task_done()
+                else:
+                    rows.append(item)
+            if not rows:
+                return
+            self._flush_batch(rows)
+
+    def join(self):
+        """Chờ hàng đợi rỗng (kể cả lô đang gom)"""
+        self._queue.join()
+
+
+chat_log_writer = ChatLogWriter()
+
+
+class IngestWorker:
+    """
+    Xử lý văn bản mới tải lên trên một daemon thread
+
+    Upload chỉ đưa pk văn bản vào hàng đợi; thread nền tóm tắt
+    (summary_service) và phân tích thực thể/cảm xúc (analysis_service) theo
+    lô các văn bản đang chờ. Văn bản còn trong hàng đợi khi tiến trình dừng
+    không bị mất kết quả: lần chạy manage.py summarize / analyze sau sẽ xử lý
+    (văn bản đã xử lý được bỏ qua theo hash nội dung).
+    """
+
+    def __init__(self, batch_size: int = 50):
+        self.batch_size = batch_size
+        self._queue: 'queue.Queue[int]' = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.app = None
+        self.summary_max_chars = 300
+        self.processed = 0
+        self.failed = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.summary_max_chars = app.config['SUMMARY_MAX_CHARS']
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='ingest-worker', daemon=True)
+                self._thread.start()
+
+    def schedule(self, document_pks: Iterable[int]) -> int:
+        """
+        Đưa văn bản (Document.pk) vào hàng đợi xử lý
+
+        Returns:
+            Số văn bản đã đưa vào hàng đợi
+        """
+        count = 0
+        for pk in document_pks:
+            self._queue.put(pk)
+            count += 1
+        if count:
+            self._ensure_started()
+        return count
+
+    def _process(self, pks: List[int]) -> None:
+        from models import db
+        from analysis_service import analyze_corpus
+        from summary_service import summarize_corpus
+
+        with self.app.app_context():
+            try:
+                summarize_corpus(pks=pks, batch_size=len(pks), max_length=self.summary_max_chars)
+                analyze_corpus(pks=pks, batch_size=len(pks))
+                self.processed += len(pks)
+            except Exception as e:
+                self.failed += len(pks)
+                logger.error(f"Ingest worker cannot process {len(pks)} documents: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def _run(self):
+        while True:
+            pks = [self._queue.get()]
+            # Gom các văn bản đang chờ (upload hàng loạt) vào cùng một lô
+            while len(pks) < self.batch_size:
+                try:
+                    pks.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(pks)
+            finally:
+                for _ in pks:
+                    self._queue.task_done()
+
+    def join(self):
+        """Chờ hàng đợi rỗng"""
+        self._queue.join()
+
+
+ingest_worker = IngestWorker()
+
+
+class ExtractPool:
+    """
+    Process pool cho bước trích xuất nội dung khi tải lên
+
+    PyPDF2/python-docx là Python thuần: trích xuất trên thread của request
+    giữ GIL và làm chậm mọi request khác của worker (với ASGI là cả event
+    loop). workers > 0 thì chạy trên process riêng (spawn, tạo khi cần),
+    request chỉ chờ kết quả; workers = 0 chạy ngay trên thread hiện tại.
+    """
+
+    def __init__(self, workers: int = 0):
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.workers = app.config['EXTRACT_WORKERS']
+        atexit.register(self.shutdown)
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn để process con không thừa hưởng engine/thread nền của app
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+            return self._executor
+
+    def run(self, func, *args):
+        """Gọi func(*args) (hàm cấp module, tham số pickle được) trên pool và chờ kết quả"""
+        if self.workers <= 0:
+            return func(*args)
+        try:
+            return self._pool().submit(func, *args).result()
+        except BrokenProcessPool:
+            # Process con bị kill (hết bộ nhớ...): tạo lại pool ở lần sau, lần này chạy tại chỗ
+            logger.warning(f"Extract pool broken, running {func.__name__} inline")
+            self.shutdown()
+            return func(*args)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+extract_pool = ExtractPool()
+
+
+# Export
+__all__ = ['FileSweeper', 'file_sweeper', 'ChatLogWriter', 'chat_log_writer', 'IngestWorker', 'ingest_worker',
+           'ExtractPool', 'extract_pool']
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Batch Service Module - Thao tác hàng loạt trên văn bản
+Mỗi thao tác chạy trong một transaction bằng câu lệnh SQL hàng loạt
+(UPDATE/DELETE ... WHERE IN, executemany theo khoá chính) thay vì nạp ORM từng dòng.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from models import (
+    db, Document, Attachment, DocumentAnalysis, DocumentEntity, DocumentSummary,
+    DocumentSignature, DocumentBand, DocumentTermIndex, DocumentPosting,
+    DocumentTermVector,
+)
+from serializers import IN_CHUNK_SIZE
+from background import file_sweeper
+from page_store import page_store
+from classifier_service import MAX_CONTENT_CHARS, normalize_label, correct_document_types
+from lookup_service import document_number_key
+from suggest_service import suggest_index
+
+
+# Các trường được phép cập nhật hàng loạt
+UPDATABLE_FIELDS = {
+    'title': str,
+    'document_type': str,
+    'document_number': str,
+    'sender': str,
+    'receiver': str,
+    'date_received': datetime,
+    'date_issued': datetime,
+}
+
+
+class BatchValidationError(ValueError):
+    """Dữ liệu yêu cầu batch không hợp lệ"""
+
+
+def _chunks(items: List[Any], size: int = IN_CHUNK_SIZE) -> Iterable[List[Any]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _clean_tags(tags: Optional[Iterable[Any]]) -> List[str]:
+    if tags is None:
+        return []
+    if isinstance(tags, str):
+        tags = tags.split(',')
+    return [str(t).strip() for t in tags if str(t).strip()]
+
+
+class BatchService:
+    """Dịch vụ thao tác hàng loạt"""
+
+    # ============ HELPERS ============
+
+    @staticmethod
+    def normalize_ids(ids: Any, max_ids: int) -> List[str]:
+        """
+        Kiểm tra và loại trùng danh sách id công khai (UUID)
+
+        Raises:
+            BatchValidationError: Nếu ids rỗng, sai kiểu hoặc vượt max_ids
+        """
+        if not isinstance(ids, list) or not ids:
+            raise BatchValidationError('ids must be a non-empty list')
+        unique_ids = list(dict.fromkeys(str(i) for i in ids))
+        if len(unique_ids) > max_ids:
+            raise BatchValidationError(f'Too many ids (max {max_ids})')
+        return unique_ids
+
+    # ============ BATCH UPDATE ============
+
+    @staticmethod
+    def parse_updates(updates: Any) -> Dict[str, Any]:
+        """
+        Kiểm tra các trường cần cập nhật
+
+        Raises:
+            BatchValidationError: Nếu có trường không hợp lệ
+        """
+        if not isinstance(updates, dict) or not updates:
+            raise BatchValidationError('updates must be a non-empty object')
+
+        values = {}
+        for field, value in updates.items():
+            kind = UPDATABLE_FIELDS.get(field)
+            if kind is None:
+                raise BatchValidationError(f'Field not updatable: {field}')
+            if value is None or value == '':
+                if field == 'title':
+                    raise BatchValidationError('title cannot be empty')
+                values[field] = None
+            elif kind is datetime:
+                try:
+                    values[field] = datetime.fromisoformat(str(value))
+                except ValueError:
+                    raise BatchValidationError(f'Invalid date for {field}: {value}')
+            elif field == 'document_type':
+                values[field] = normalize_label(value)
+            else:
+                values[field] = str(value)
+        if 'document_type' in values:
+            # Nhãn người dùng xác nhận: không còn là nhãn dự đoán
+            values['document_type_confidence'] = None
+        if 'document_number' in values:
+            # UPDATE hàng loạt không qua sự kiện ORM đồng bộ khoá tra cứu
+            values['document_number_key'] = document_number_key(values['document_number'])
+        return values
+
+    @staticmethod
+    def update_documents(ids: List[str], values: Dict[str, Any]) -> int:
+        """
+        Cập nhật cùng một bộ giá trị cho nhiều văn bản (một transaction)
+
+        Returns:
+            Số văn bản đã cập nhật
+        """
+        values = dict(values, updated_at=datetime.utcnow())
+        relabel = 'document_type' in values
+        # Nhãn cũ để classifier bỏ mẫu sai và học nhãn mới: nhãn người dùng nhập
+        # đã được học (bỏ rồi học lại), nhãn dự đoán / chưa có nhãn thì chỉ học
+        confirmed, predicted = [], []
+        updated = 0
+        try:
+            for chunk in _chunks(ids):
+                if relabel:
+                    rows = db.session.execute(
+                        db.select(Document.document_type, Document.document_type_confidence, Document.title,
+                                  db.func.substr(Document.content, 1, MAX_CONTENT_CHARS))
+                        .where(Document.id.in_(chunk))
+                    ).all()
+                    for old, confidence, title, content in rows:
+                        if old is not None and confidence is None:
+                            confirmed.append((old, title, content))
+                        else:
+                            predicted.append((title, content))
+                result = db.session.execute(
+                    db.update(Document)
+                    .where(Document.id.in_(chunk))
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                updated += result.rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if relabel:
+            correct_document_types(confirmed, predicted, values['document_type'])
+        if values.keys() & {'title', 'document_number', 'sender'}:
+            suggest_index.schedule_rebuild()
+        return updated
+
+    # ============ BATCH RE-TAG ============
+
+    @staticmethod
+    def retag_documents(ids: List[str], add: Any = None, remove: Any = None,
+                        replace: Any = None) -> int:
+        """
+        Gắn lại tags (json_data['tags']) cho nhiều văn bản
+
+        Args:
+            ids: Danh sách id văn bản
+            add: Tags cần thêm
+            remove: Tags cần bỏ
+            replace: Nếu có, thay toàn bộ tags bằng danh sách này (trước add/remove)
+
+        Returns:
+            Số văn bản đã cập nhật
+        """
+        add_tags = _clean_tags(add)
+        remove_tags = set(_clean_tags(remove))
+        replace_tags = _clean_tags(replace) if replace is not None else None
+        if replace_tags is None and not add_tags and not remove_tags:
+            raise BatchValidationError('Nothing to change: provide add, remove or tags')
+
+        now = datetime.utcnow()
+        updated = 0
+        try:
+            for chunk in _chunks(ids):
+                rows = db.session.execute(
+                    db.select(Document.pk, Document.json_data).where(Document.id.in_(chunk))
+                ).all()
+
+                params = []
+                for pk, json_data in rows:
+                    data = dict(json_data or {})
+                    tags = list(replace_tags) if replace_tags is not None else _clean_tags(data.get('tags'))
+                    tags = [t for t in dict.fromkeys(tags + add_tags) if t not in remove_tags]
+                    data['tags'] = tags
+                    params.append({'pk': pk, 'json_data': data, 'updated_at': now})
+
+                if params:
+                    # Bulk UPDATE theo khoá chính (executemany)
+                    db.session.execute(db.update(Document), params)
+                    updated += len(params)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return updated
+
+    # ============ BATCH DELETE ============
+
+    @staticmethod
+    def _unreferenced_paths(paths: List[Optional[str]]) -> List[str]:
+        """Bỏ các file vẫn còn được văn bản/attachment khác tham chiếu"""
+        unique_paths = list(dict.fromkeys(p for p in paths if p))
+        still_used = set()
+        for chunk in _chunks(unique_paths):
+            still_used.update(db.session.execute(
+                db.select(Document.file_path).where(Document.file_path.in_(chunk))
+            ).scalars())
+            still_used.update(db.session.execute(
+                db.select(Attachment.file_path).where(Attachment.file_path.in_(chunk))
+            ).scalars())
+        return [p for p in unique_paths if p not in still_used]
+
+    @staticmethod
+    def delete_documents(ids: List[str]) -> Dict[str, int]:
+        """
+        Xoá nhiều văn bản cùng attachments (một transaction)
+
+        File vật lý (và file page store) được chuyển cho FileSweeper xoá ở nền
+        sau khi commit.
+
+        Returns:
+            Dict số văn bản, attachments đã xoá và số file chờ xoá
+        """
+        file_paths: List[str] = []
+        page_paths: List[Optional[str]] = []
+        deleted_docs = 0
+        deleted_atts = 0
+
+        try:
+            for chunk in _chunks(ids):
+                doc_rows = db.session.execute(
+                    db.select(Document.pk, Document.id, Document.file_path).where(Document.id.in_(chunk))
+                ).all()
+                if not doc_rows:
+                    continue
+                pks = [pk for pk, _, _ in doc_rows]
+                file_paths.extend(path for _, _, path in doc_rows)
+                page_paths.extend(page_store.path(doc_id) for _, doc_id, _ in doc_rows)
+                file_paths.extend(db.session.execute(
+                    db.select(Attachment.file_path).where(Attachment.document_pk.in_(pks))
+                ).scalars())
+
+                for model in (DocumentEntity, DocumentAnalysis, DocumentSummary, DocumentBand, DocumentSignature,
+                              DocumentPosting, DocumentTermIndex, DocumentTermVector):
+                    db.session.execute(
+                        db.delete(model)
+                        .where(model.document_pk.in_(pks))
+                        .execution_options(synchronize_session=False)
+                    )
+                deleted_atts += db.session.execute(
+                    db.delete(Attachment)
+                    .where(Attachment.document_pk.in_(pks))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                deleted_docs += db.session.execute(
+                    db.delete(Document)
+                    .where(Document.pk.in_(pks))
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+            file_paths = BatchService._unreferenced_paths(file_paths)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        # Chỉ xoá file sau khi commit thành công
+        scheduled = file_sweeper.schedule(file_paths)
+        file_sweeper.schedule(page_paths)
+        suggest_index.schedule_rebuild()
+        return {
+            'deleted': deleted_docs,
+            'deleted_attachments': deleted_atts,
+            'files_scheduled': scheduled,
+        }
+
+
+# Export
+__all__ = ['BatchService', 'BatchValidationError', 'UPDATABLE_FIELDS']
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Cache Module - ETag, bộ đếm phiên bản collection và LRU trong tiến trình
+Vô hiệu hoá tự động qua event của SQLAlchemy Session khi có ghi vào
+documents/attachments (kể cả UPDATE/DELETE hàng loạt).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Hashable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ chạy một tiến trình (dev/uvicorn), khoá luồng là đủ
+    fcntl = None
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from models import Document, Attachment
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi cấu trúc payload JSON thay đổi để ETag cũ không còn khớp
+SCHEMA_VERSION = 5
+
+_MISSING = object()
+
+
+# ============ LRU CACHE ============
+
+class LRUCache:
+    """LRU cache đơn giản, an toàn luồng"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+# ============ COLLECTION VERSION ============
+
+class CollectionVersion:
+    """
+    Bộ đếm phiên bản của toàn bộ kho văn bản
+
+    Lưu trong một file nhỏ (CACHE_VERSION_FILE) để mọi worker cùng thấy; đọc
+    chỉ cần os.stat() khi file không đổi. Nếu không cấu hình file thì chỉ giữ
+    trong bộ nhớ tiến trình.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+        self._stamp = None
+
+    @staticmethod
+    def _path() -> Optional[str]:
+        if has_app_context():
+            return current_app.config.get('CACHE_VERSION_FILE')
+        return None
+
+    def get(self) -> int:
+        path = self._path()
+        if not path:
+            return self._value
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return 0
+        # os.replace() tạo inode mới nên mỗi lần bump đều đổi stamp
+        stamp = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if stamp != self._stamp:
+            with open(path, 'r') as f:
+                self._value = int(f.read().strip() or 0)
+            self._stamp = stamp
+        return self._value
+
+    def bump(self) -> int:
+        """
+        Tăng phiên bản; đọc-tăng-ghi giữ flock trên file khoá cạnh file phiên
+        bản để hai worker commit cùng lúc không cùng ghi N+1
+        """
+        with self._lock:
+            path = self._path()
+            if not path:
+                self._value += 1
+                return self._value
+
+            # Khoá file riêng: os.replace() thay inode của file phiên bản
+            with open(f'{path}.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    with open(path, 'r') as f:
+                        value = int(f.read().strip() or 0) + 1
+                except FileNotFoundError:
+                    value = 1
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                with open(tmp_path, 'w') as f:
+                    f.write(str(value))
+                os.replace(tmp_path, path)
+            self._value = value
+            self._stamp = None
+            return value
+
+
+collection_version = CollectionVersion()
+
+
+# ============ TTL MEMO ============
+
+class TTLMemo:
+    """
+    Ghi nhớ kết quả tính toán (ví dụ truy vấn thống kê) trong ttl giây
+
+    Kết quả cũng hết hạn ngay khi phiên bản collection đổi (có ghi vào kho),
+    nên TTL chỉ giới hạn độ trễ với thay đổi không đi qua Session.
+    """
+
+    def __init__(self, ttl: float = 30):
+        self.ttl = ttl
+        self._data = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        version = collection_version.get()
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] == version and entry[1] > now:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._data[key] = (version, now + self.ttl, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+# Body JSON đã mã hoá của từng văn bản: doc_id -> (etag, {biến thể: bytes})
+document_cache = LRUCache()
+
+
+# ============ ETAGS ============
+
+def document_etag(doc_id: str, updated_at: Optional[datetime], summary_hash: Optional[str] = None) -> str:
+    """ETag mạnh của một văn bản: schema + id + updated_at (+ hash của tóm tắt nếu đã có)"""
+    stamp = updated_at.strftime('%Y%m%d%H%M%S%f') if updated_at else '0'
+    if summary_hash:
+        stamp = f'{stamp}-{summary_hash[:12]}'
+    return f'd{SCHEMA_VERSION}-{doc_id}-{stamp}'
+
+
+def collection_etag(scope: str, args: str = '') -> str:
+    """ETag của một endpoint collection theo phiên bản kho + query string"""
+    digest = hashlib.blake2b(f'{scope}?{args}'.encode('utf-8'), digest_size=6).hexdigest()
+    return f'c{SCHEMA_VERSION}-{collection_version.get()}-{digest}'
+
+
+# ============ INVALIDATION ============
+
+_TRACKED_MODELS = (Document, Attachment)
+_TRACKED_TABLES = {model.__tablename__ for model in _TRACKED_MODELS}
+
+
+def _mark_dirty(session: Session, doc_id: Optional[str] = None) -> None:
+    session.info['cache_dirty'] = True
+    if doc_id is None:
+        session.info['cache_dirty_all'] = True
+    else:
+        session.info.setdefault('cache_dirty_docs', set()).add(doc_id)
+
+
+@event.listens_for(Session, 'after_flush')
+def _after_flush(session, flush_context):
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Document):
+            _mark_dirty(session, obj.id)
+        elif isinstance(obj, Attachment):
+            # Không lazy load trong lúc flush; thiếu document thì xoá toàn bộ cache
+            document = obj.__dict__.get('document')
+            _mark_dirty(session, document.id if document is not None else None)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _do_orm_execute(orm_execute_state):
+    # UPDATE/DELETE/INSERT hàng loạt không đi qua flush
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and table.name in _TRACKED_TABLES:
+        _mark_dirty(orm_execute_state.session)
+
+
+@event.listens_for(Session, 'after_commit')
+def _after_commit(session):
+    if not session.info.pop('cache_dirty', False):
+        return
+    doc_ids = session.info.pop('cache_dirty_docs', set())
+    if session.info.pop('cache_dirty_all', False):
+        document_cache.clear()
+    else:
+        for doc_id in doc_ids:
+            document_cache.pop(doc_id)
+    try:
+        collection_version.bump()
+    except OSError as e:
+        logger.error(f"Cannot bump collection version: {str(e)}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _after_rollback(session):
+    for key in ('cache_dirty', 'cache_dirty_docs', 'cache_dirty_all'):
+        session.info.pop(key, None)
+
+
+# Export
+__all__ = [
+    'SCHEMA_VERSION',
+    'LRUCache',
+    'CollectionVersion',
+    'collection_version',
+    'TTLMemo',
+    'document_cache',
+    'document_etag',
+    'collection_etag',
+]
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Chat Memory Module - Bộ nhớ hội thoại theo session
+Giữ các lượt chat gần nhất của mỗi session trong bộ nhớ (tối đa
+CHAT_MAX_HISTORY lượt, tối đa CHAT_MAX_SESSIONS session theo LRU). Session
+chưa có trong bộ nhớ được nạp lại từ bảng chat_messages ở lần dùng đầu.
+Câu hỏi tiếp nối dạng "cái thứ hai", "văn bản cuối cùng" được giải theo danh
+sách kết quả của lượt trước, không cần tìm kiếm lại.
+
+Bộ nhớ thuộc từng tiến trình và chat_messages chỉ được ghi sau (write-behind),
+nên với nhiều worker gunicorn các lượt của một session không thấy nhau: client
+gửi kèm previous_results (id kết quả lượt trước, frontend luôn gửi) để tham
+chiếu đúng ở mọi worker; không có previous_results thì chỉ đúng khi chạy một
+worker hoặc load balancer giữ session (sticky).
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional
+
+# Số thứ tự bằng chữ (sau "thứ"/"số")
+ORDINAL_WORDS = {
+    'nhất': 1, 'hai': 2, 'nhì': 2, 'ba': 3, 'tư': 4, 'bốn': 4, 'năm': 5,
+    'sáu': 6, 'bảy': 7, 'tám': 8, 'chín': 9, 'mười': 10,
+}
+# Vị trí không cần "thứ": "cái đầu tiên", "văn bản cuối cùng" (-1: cuối)
+POSITION_WORDS = {'đầu tiên': 1, 'đầu': 1, 'cuối cùng': -1, 'cuối': -1}
+
+# Chỉ nhận khi có danh từ chỉ kết quả đứng trước để không nhầm "họp vào thứ
+# năm" hay "công văn số 12/QĐ" với tham chiếu tới danh sách
+_REFERENCE_RE = re.compile(
+    r'\b(?:cái|văn bản|công văn|kết quả|tài liệu|mục|quyết định|hợp đồng)\s+'
+    r'(?:(?:thứ|số)\s+(\d+|' + '|'.join(ORDINAL_WORDS) + r')'
+    r'|(' + '|'.join(sorted(POSITION_WORDS, key=len, reverse=True)) + r'))(?![\w/])'
+)
+
+
+def resolve_ordinal(message: str, count: int) -> Optional[int]:
+    """
+    Vị trí (từ 0) mà tin nhắn tham chiếu tới trong danh sách count kết quả
+
+    Returns:
+        Chỉ số trong danh sách, None nếu không có tham chiếu hợp lệ
+    """
+    match = _REFERENCE_RE.search(message.lower())
+    if not match:
+        return None
+    ordinal, word = match.groups()
+    if word:
+        position = POSITION_WORDS[word]
+        if position < 0:
+            position = count
+    elif ordinal.isdigit():
+        position = int(ordinal)
+    else:
+        position = ORDINAL_WORDS[ordinal]
+    return position - 1 if 1 <= position <= count else None
+
+
+class ConversationStore:
+    """
+    Các lượt chat gần đây theo session, LRU giữa các session
+
+    Mỗi lượt là dict: user_message, ai_response, results (id văn bản theo
+    thứ tự hiển thị). Session không dùng quá max_idle giây được nạp lại từ
+    CSDL: manage.py prune-chat chạy ở tiến trình khác, không xoá được bộ nhớ
+    của server, nhưng chỉ xoá session đã không hoạt động lâu hơn thế.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_history: int = 100, max_idle: Optional[float] = None):
+        self.max_sessions = max_sessions
+        self.max_history = max_history
+        self.max_idle = max_idle
+        self._sessions: 'OrderedDict[str, Deque[Dict[str, Any]]]' = OrderedDict()
+        self._used: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        """Đọc CHAT_MAX_SESSIONS / CHAT_MAX_HISTORY / CHAT_RETENTION_DAYS từ cấu hình app"""
+        self.max_sessions = app.config['CHAT_MAX_SESSIONS']
+        self.max_history = app.config['CHAT_MAX_HISTORY']
+        self.max_idle = app.config['CHAT_RETENTION_DAYS'] * 24 * 3600
+        self.clear()
+
+    def _load(self, session_id: str) -> Deque[Dict[str, Any]]:
+        """Nạp max_history lượt gần nhất từ chat_messages (index session_id, created_at)"""
+        from models import db, ChatMessage
+
+        rows = db.session.execute(
+            db.select(ChatMessage.user_message, ChatMessage.ai_response, ChatMessage.related_documents)
+            .where(ChatMessage.session_id == session_id)
+            .order_by(ChatMessage.created_at.desc(), ChatMessage.pk.desc())
+            .limit(self.max_history)
+        ).all()
+        return deque(
+            ({'user_message': row.user_message, 'ai_response': row.ai_response,
+              'results': row.related_documents or []} for row in reversed(rows)),
+            maxlen=self.max_history
+        )
+
+    def _touch(self, session_id: str, turns: Deque[Dict[str, Any]]) -> None:
+        self._sessions[session_id] = turns
+        self._sessions.move_to_end(session_id)
+        self._used[session_id] = time.monotonic()
+        while len(self._sessions) > self.max_sessions:
+            evicted, _ = self._sessions.popitem(last=False)
+            self._used.pop(evicted, None)
+
+    def _expired(self, session_id: str) -> bool:
+        return self.max_idle is not None and time.monotonic() - self._used.get(session_id, 0) > self.max_idle
+
+    def history(self, session_id: str) -> List[Dict[str, Any]]:
+        """
+        Các lượt chat của session (cũ -> mới)
+
+        Nạp từ CSDL nếu session chưa có trong bộ nhớ (cần app context).
+        """
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            if turns is not None and not self._expired(session_id):
+                self.hits += 1
+                self._touch(session_id, turns)
+                return list(turns)
+            self._sessions.pop(session_id, None)
+
+        # Đọc CSDL ngoài lock; nếu thread khác đã nạp trước thì dùng bản đó
+        loaded = self._load(session_id)
+        with self._lock:
+            self.misses += 1
+            turns = self._sessions.get(session_id)
+            if turns is None:
+                turns = loaded
+            self._touch(session_id, turns)
+            return list(turns)
+
+    def append(self, session_id: str, user_message: str, ai_response: str, results: List[str]) -> None:
+        """Thêm một lượt chat (lượt cũ nhất bị bỏ khi quá max_history)"""
+        self.history(session_id)
+        with self._lock:
+            turns = self._sessions.get(session_id)
+            if turns is None:
+                turns = deque(maxlen=self.max_history)
+            turns.append({'user_message': user_message, 'ai_response': ai_response, 'results': list(results)})
+            self._touch(session_id, turns)
+
+    def last_results(self, session_id: str) -> List[str]:
+        """
+        Danh sách id văn bản của lượt gần nhất có kết quả
+
+        Bỏ qua các lượt chính là tham chiếu ("cái thứ hai" rồi "còn cái thứ
+        ba?" vẫn tính theo cùng một danh sách).
+        """
+        for turn in reversed(self.history(session_id)):
+            if turn['results'] and not _REFERENCE_RE.search(turn['user_message'].lower()):
+                return turn['results']
+        return []
+
+    def resolve_reference(self, session_id: Optional[str], message: str,
+                          results: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Giải tham chiếu thứ tự ("cái thứ hai"...) theo kết quả lượt trước
+
+        Args:
+            session_id: Session chat
+            message: Tin nhắn
+            results: Danh sách id kết quả lượt trước do client gửi; None thì
+                lấy từ bộ nhớ hội thoại của session
+
+        Returns:
+            Dict {position (từ 1), document_id} hoặc None
+        """
+        if not _REFERENCE_RE.search(message.lower()):
+            return None
+        if results is None:
+            results = self.last_results(session_id) if session_id is not None else []
+        index = resolve_ordinal(message, len(results))
+        if index is None:
+            return None
+        return {'position': index + 1, 'document_id': results[index]}
+
+    def forget(self, session_ids: Iterable[str]) -> None:
+        """Bỏ các session khỏi bộ nhớ của tiến trình này (sau khi xoá lịch sử trong CSDL)"""
+        with self._lock:
+            for session_id in session_ids:
+                self._sessions.pop(session_id, None)
+                self._used.pop(session_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._used.clear()
+
+
+conversation_store = ConversationStore()
+
+
+# Export
+__all__ = ['ConversationStore', 'conversation_store', 'resolve_ordinal']
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Chat Service Module - Đọc và dọn lịch sử chat
+Lịch sử một session được phân trang keyset trên index (session_id,
+created_at): mỗi trang là một range scan bắt đầu từ con trỏ của trang trước,
+không dùng OFFSET. Session không hoạt động quá hạn lưu trữ được xoá theo lô.
+"""
+
+import base64
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from models import db, ChatMessage
+
+PRUNE_BATCH_SIZE = 500  # Số session xoá mỗi transaction
+
+
+class CursorError(ValueError):
+    """Con trỏ phân trang không hợp lệ"""
+
+
+def encode_cursor(created_at: datetime, pk: int) -> str:
+    raw = f'{created_at.isoformat()}|{pk}'.encode('ascii')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('ascii')
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise CursorError(f'Invalid cursor: {cursor}') from e
+
+
+def chat_history(session_id: str, limit: int = 50,
+                 before: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Tin nhắn của một session, mới nhất trước
+
+    Args:
+        session_id: Session chat
+        limit: Số tin nhắn mỗi trang
+        before: Con trỏ next_cursor của trang trước (None = trang đầu)
+
+    Returns:
+        Tuple[danh sách tin nhắn, con trỏ trang sau hoặc None nếu hết]
+
+    Raises:
+        CursorError: Con trỏ không hợp lệ
+    """
+    stmt = (
+        db.select(ChatMessage)
+        .where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.pk.desc())
+        .limit(limit + 1)
+    )
+    if before:
+        created_at, pk = decode_cursor(before)
+        # pk (rowid) nằm sẵn cuối mọi index của SQLite nên điều kiện này
+        # vẫn là range scan trên (session_id, created_at)
+        stmt = stmt.where(db.tuple_(ChatMessage.created_at, ChatMessage.pk) < (created_at, pk))
+
+    messages = db.session.execute(stmt).scalars().all()
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        next_cursor = encode_cursor(messages[-1].created_at, messages[-1].pk)
+    return [message.to_dict() for message in messages], next_cursor
+
+
+def prune_chat_history(older_than_days: int, batch_size: int = PRUNE_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Xoá các session không có tin nhắn mới trong older_than_days ngày
+
+    Mỗi lô chọn batch_size session hết hạn (GROUP BY trên index) và xoá mọi
+    tin nhắn của chúng bằng một DELETE ... WHERE session_id IN (...).
+
+    Returns:
+        Dict {sessions, messages} đã xoá
+    """
+    from chat_memory import conversation_store
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    expired = (
+        db.select(ChatMessage.session_id)
+        .group_by(ChatMessage.session_id)
+        .having(db.func.max(ChatMessage.created_at) < cutoff)
+        .limit(batch_size)
+    )
+
+    sessions = messages = 0
+    while True:
+        session_ids = db.session.execute(expired).scalars().all()
+        if not session_ids:
+            break
+        result = db.session.execute(
+            db.delete(ChatMessage).where(ChatMessage.session_id.in_(session_ids)),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        # Chỉ có tác dụng khi chạy trong tiến trình server; worker khác tự nạp
+        # lại session sau CHAT_RETENTION_DAYS không hoạt động (ConversationStore.max_idle)
+        conversation_store.forget(session_ids)
+        sessions += len(session_ids)
+        messages += result.rowcount
+
+    return {'sessions': sessions, 'messages': messages}
+
+
+# Export
+__all__ = ['chat_history', 'prune_chat_history', 'CursorError']
@@ -0,0 +1,452 @@
+#!/usr/bin/env python3
+"""
+Classifier Service Module - Tự động phân loại document_type
+Naive Bayes đa thức trên đặc trưng băm (hashing trick): từ và cặp từ của
+tiêu đề và phần đầu nội dung được băm vào HASH_BUCKETS ngăn nên không cần
+từ điển cố định và có thể học tăng dần (partial_fit) khi người dùng gán lại
+nhãn. Mô hình được huấn luyện từ các văn bản có nhãn do người dùng nhập
+(document_type_confidence rỗng); nhãn do mô hình dự đoán không dùng để huấn
+luyện lại. Nhãn người dùng sửa ở worker khác được học lại từ database khi
+phiên bản kho (cache.collection_version) đổi.
+"""
+
+import logging
+import math
+import re
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_BUCKETS = 1 << 18
+# Loại văn bản nằm ở tiêu đề và phần đầu (QUYẾT ĐỊNH, TỜ TRÌNH, V/v ...)
+MAX_CONTENT_CHARS = 1000
+DEFAULT_MIN_CONFIDENCE = 0.6
+# Mô hình chỉ biết một nhãn luôn cho xác suất 1.0: chưa dự đoán khi có ít
+# hơn MIN_LABELS nhãn đủ MIN_SAMPLES_PER_LABEL mẫu
+MIN_LABELS = 2
+MIN_SAMPLES_PER_LABEL = 3
+DEFAULT_RELOAD_INTERVAL = 60.0
+
+# Loại văn bản của form upload: nhập khác hoa thường/khoảng trắng được đưa về cách viết này
+KNOWN_TYPES = ('Công văn', 'Quyết định', 'Hợp đồng', 'Báo cáo', 'Khác')
+_KNOWN_TYPES = {label.casefold(): label for label in KNOWN_TYPES}
+
+_WORD_RE = re.compile(r'\w+')
+_SPACE_RE = re.compile(r'\s+')
+
+# Một mẫu huấn luyện: (nhãn, tiêu đề, nội dung)
+Sample = Tuple[str, Optional[str], Optional[str]]
+
+
+def normalize_label(label: Optional[str]) -> Optional[str]:
+    """
+    Chuẩn hoá nhãn nhập tay: gộp khoảng trắng, khớp không phân biệt hoa
+    thường với loại đã biết ('QUYẾT  ĐỊNH' -> 'Quyết định'); nhãn khác giữ
+    nguyên cách viết ('Quyết định UBND', 'Công văn - TTCP')
+    """
+    if label is None:
+        return None
+    label = _SPACE_RE.sub(' ', str(label)).strip()
+    if not label:
+        return None
+    folded = label.casefold()
+    return _KNOWN_TYPES.get(folded) or document_classifier.canonical(folded) or label
+
+
+def features(title: Optional[str], content: Optional[str]) -> List[int]:
+    """
+    Đặc trưng băm (có lặp - tần suất) của một văn bản
+
+    Từ của tiêu đề được băm riêng ('t:' + từ) vì mang nhiều thông tin hơn
+    cùng từ đó trong nội dung.
+    """
+    mask = HASH_BUCKETS - 1
+    crc32 = zlib.crc32
+    result = []
+    for prefix, text in (('t:', title), ('', (content or '')[:MAX_CONTENT_CHARS])):
+        words = _WORD_RE.findall((text or '').lower())
+        result.extend(crc32(f'{prefix}{w}'.encode('utf-8')) & mask for w in words)
+        result.extend(crc32(f'{prefix}{a} {b}'.encode('utf-8')) & mask for a, b in zip(words, words[1:]))
+    return result
+
+
+class DocumentTypeClassifier:
+    """
+    Naive Bayes đa thức trên đặc trưng băm, học tăng dần
+
+    Lưu số đếm thô (số văn bản và tổng tần suất đặc trưng theo từng nhãn) nên
+    partial_fit chỉ cộng thêm số đếm; log-xác suất của một đặc trưng được
+    tính lại khi đặc trưng đó thay đổi. Mỗi process giữ một bản mô hình riêng,
+    huấn luyện từ database lần đầu dùng và lại ở thread nền khi kho đổi
+    (tối đa một lần mỗi reload_interval giây, xem ensure_trained).
+    """
+
+    def __init__(self, alpha: float = 0.1, reload_interval: float = DEFAULT_RELOAD_INTERVAL,
+                 min_samples_per_label: int = MIN_SAMPLES_PER_LABEL):
+        self.alpha = alpha
+        self.reload_interval = reload_interval
+        self.min_samples_per_label = min_samples_per_label
+        self.labels: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._folded: Dict[str, str] = {}  # casefold -> nhãn
+        self._doc_counts: List[int] = []
+        self._totals: List[int] = []
+        self._feature_counts: Dict[int, List[int]] = {}
+        self._log_rows: Dict[int, Tuple[float, ...]] = {}
+        self._offsets: Tuple[float, ...] = ()
+        self._priors: Tuple[float, ...] = ()
+        self._lock = threading.RLock()
+        self.trained = False
+        self.loaded = False  # Đã huấn luyện từ database trong process này
+        self.version: Optional[int] = None  # collection_version lúc huấn luyện từ database
+        self.reloaded_at = 0.0
+        self._reloading = False
+
+    @property
+    def sample_count(self) -> int:
+        return sum(self._doc_counts)
+
+    def label_counts(self) -> Dict[str, int]:
+        """Số mẫu đã học của từng nhãn"""
+        with self._lock:
+            return dict(zip(self.labels, self._doc_counts))
+
+    @property
+    def ready(self) -> bool:
+        """Đủ nhãn và đủ mẫu mỗi nhãn để xác suất có ý nghĩa"""
+        return sum(1 for count in self._doc_counts if count >= self.min_samples_per_label) >= MIN_LABELS
+
+    # ============ TRAINING ============
+
+    def _label_index(self, label: str) -> int:
+        i = self._index.get(label)
+        if i is None:
+            i = self._index[label] = len(self.labels)
+            self.labels.append(label)
+            self._folded.setdefault(label.casefold(), label)
+            self._doc_counts.append(0)
+            self._totals.append(0)
+            for counts in self._feature_counts.values():
+                counts.append(0)
+            self._log_rows.clear()
+        return i
+
+    def partial_fit(self, samples: Iterable[Sample], weight: int = 1) -> 'DocumentTypeClassifier':
+        """
+        Cập nhật mô hình với các mẫu mới
+
+        Args:
+            samples: Các bộ (nhãn, tiêu đề, nội dung); nhãn được chuẩn hoá
+            weight: 1 để học, -1 để bỏ một mẫu đã học (nhãn sai bị sửa)
+        """
+        with self._lock:
+            touched = set()
+            for label, title, content in samples:
+                label = normalize_label(label)
+                if label is None:
+                    continue
+                i = self._label_index(self._folded.get(label.casefold(), label))
+                self._doc_counts[i] = max(self._doc_counts[i] + weight, 0)
+                feats = features(title, content)
+                for feature in feats:
+                    counts = self._feature_counts.get(feature)
+                    if counts is None:
+                        counts = self._feature_counts[feature] = [0] * len(self.labels)
+                    counts[i] = max(counts[i] + weight, 0)
+                self._totals[i] = max(self._totals[i] + weight * len(feats), 0)
+                touched.update(feats)
+
+            for feature in touched:
+                self._log_rows.pop(feature, None)
+            self._refresh()
+        return self
+
+    def fit(self, samples: Iterable[Sample]) -> 'DocumentTypeClassifier':
+        """Huấn luyện lại từ đầu"""
+        with self._lock:
+            self.labels, self._index, self._folded = [], {}, {}
+            self._doc_counts, self._totals = [], []
+            self._feature_counts, self._log_rows = {}, {}
+            self.partial_fit(samples)
+        return self
+
+    def replace(self, other: 'DocumentTypeClassifier', version: Optional[int]) -> None:
+        """Thay mô hình bằng other (huấn luyện lại ở thread nền) giữ nguyên object dùng chung"""
+        with self._lock:
+            for name in ('labels', '_index', '_folded', '_doc_counts', '_totals', '_feature_counts',
+                         '_log_rows', '_offsets', '_priors', 'trained'):
+                setattr(self, name, getattr(other, name))
+            self.version = version
+
+    def canonical(self, folded_label: str) -> Optional[str]:
+        """Nhãn đã học có cùng casefold (None nếu chưa gặp)"""
+        return self._folded.get(folded_label)
+
+    def _refresh(self) -> None:
+        total_docs = self.sample_count
+        # Nhãn không còn mẫu nào (đã bỏ hết) không bao giờ được chọn
+        self._priors = tuple(math.log(count / total_docs) if count else -math.inf
+                             for count in self._doc_counts)
+        self._offsets = tuple(math.log(total + self.alpha * HASH_BUCKETS) for total in self._totals)
+        self.trained = total_docs > 0
+
+    def _log_row(self, feature: int) -> Optional[Tuple[float, ...]]:
+        row = self._log_rows.get(feature)
+        if row is None:
+            counts = self._feature_counts.get(feature)
+            if counts is None:
+                return None
+            row = self._log_rows[feature] = tuple(math.log(count + self.alpha) for count in counts)
+        return row
+
+    # ============ PREDICTION ============
+
+    def scores(self, title: Optional[str], content: Optional[str]) -> Dict[str, float]:
+        """
+        Xác suất của từng nhãn
+
+        Đặc trưng chưa gặp có cùng log(alpha) ở mọi nhãn nên chỉ cần cộng
+        các đặc trưng đã biết; phần mẫu số phụ thuộc tổng số đặc trưng.
+
+        Returns:
+            Dict nhãn -> xác suất; rỗng nếu chưa huấn luyện hoặc văn bản
+            không có đặc trưng nào đã biết
+        """
+        feats = features(title, content)
+        with self._lock:
+            if not self.trained:
+                return {}
+            rows = [row for row in map(self._log_row, feats) if row is not None]
+            if not rows:
+                return {}
+            n = len(feats)
+            log_scores = [
+                prior + sum(column) - n * offset
+                for prior, column, offset in zip(self._priors, zip(*rows), self._offsets)
+            ]
+            labels = list(self.labels)
+
+        top = max(log_scores)
+        exps = [math.exp(s - top) for s in log_scores]
+        total = sum(exps)
+        return {label: e / total for label, e in zip(labels, exps)}
+
+    def predict(self, title: Optional[str], content: Optional[str]) -> Tuple[Optional[str], float]:
+        """
+        Nhãn có xác suất cao nhất
+
+        Returns:
+            Tuple[nhãn, độ tin cậy 0..1] - (None, 0.0) nếu không dự đoán được
+            hoặc mô hình chưa sẵn sàng (ready)
+        """
+        if not self.ready:
+            return None, 0.0
+        scores = self.scores(title, content)
+        if not scores:
+            return None, 0.0
+        label = max(scores, key=scores.get)
+        return label, scores[label]
+
+
+document_classifier = DocumentTypeClassifier()
+
+
+# ============ DATABASE ============
+
+def _labeled_samples(batch_size: int = 1000) -> Iterable[Sample]:
+    """Văn bản có nhãn do người dùng nhập (keyset theo pk, chỉ đọc phần đầu nội dung)"""
+    from models import db, Document
+
+    last_pk = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Document.pk, Document.document_type, Document.title,
+                      db.func.substr(Document.content, 1, MAX_CONTENT_CHARS))
+            .where(Document.pk > last_pk, Document.document_type.isnot(None),
+                   Document.document_type_confidence.is_(None))
+            .order_by(Document.pk)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        for pk, label, title, content in rows:
+            yield label, title, content
+        last_pk = rows[-1][0]
+
+
+def ensure_trained(classifier: DocumentTypeClassifier = document_classifier) -> DocumentTypeClassifier:
+    """
+    Huấn luyện từ database lần đầu dùng trong process (cần app context)
+
+    Khi phiên bản kho đã đổi (có thể worker khác vừa sửa nhãn), mô hình được
+    huấn luyện lại ở thread nền; trong lúc đó vẫn dùng mô hình hiện tại.
+    """
+    from cache import collection_version
+
+    if not classifier.loaded:
+        with classifier._lock:
+            if not classifier.loaded:
+                version = collection_version.get()
+                classifier.fit(_labeled_samples())
+                classifier.version = version
+                classifier.reloaded_at = time.monotonic()
+                classifier.loaded = True
+                logger.info(f"Document type classifier trained on {classifier.sample_count} documents, "
+                            f"{len(classifier.labels)} types")
+    elif classifier.version != collection_version.get():
+        _schedule_reload(classifier)
+    return classifier
+
+
+def _schedule_reload(classifier: DocumentTypeClassifier) -> None:
+    from flask import current_app
+
+    now = time.monotonic()
+    with classifier._lock:
+        if classifier._reloading or now - classifier.reloaded_at < classifier.reload_interval:
+            return
+        classifier._reloading = True
+        classifier.reloaded_at = now
+    threading.Thread(target=_reload, args=(current_app._get_current_object(), classifier),
+                     name='document-type-reload', daemon=True).start()
+
+
+def _reload(app, classifier: DocumentTypeClassifier) -> None:
+    """Huấn luyện mô hình mới từ database rồi thay vào (thread nền)"""
+    from models import db
+    from cache import collection_version
+
+    with app.app_context():
+        try:
+            # Phiên bản đọc trước khi quét: ghi trong lúc quét sẽ làm huấn luyện lại lần sau
+            version = collection_version.get()
+            fresh = DocumentTypeClassifier(classifier.alpha).fit(_labeled_samples())
+            classifier.replace(fresh, version)
+            logger.info(f"Document type classifier reloaded: {fresh.sample_count} documents")
+        except Exception as e:
+            logger.error(f"Document type classifier reload failed: {str(e)}")
+        finally:
+            db.session.remove()
+            classifier._reloading = False
+
+
+def predict_document_type(title: Optional[str], content: Optional[str],
+                          min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> Tuple[Optional[str], Optional[float]]:
+    """
+    Dự đoán document_type cho văn bản mới (luồng upload)
+
+    Returns:
+        Tuple[nhãn, độ tin cậy] - (None, None) nếu độ tin cậy dưới min_confidence
+        hoặc mô hình chưa đủ nhãn / mẫu
+    """
+    label, confidence = ensure_trained().predict(title, content)
+    if label is None or confidence < min_confidence:
+        return None, None
+    return label, confidence
+
+
+def learn_document_type(label: Optional[str], title: Optional[str], content: Optional[str]) -> None:
+    """Học thêm một nhãn do người dùng nhập (sau khi commit)"""
+    # Chưa nạp thì nhãn này sẽ được đọc từ database khi huấn luyện
+    if label is not None and document_classifier.loaded:
+        document_classifier.partial_fit([(label, title, content)])
+
+
+def correct_document_types(confirmed: Iterable[Sample], predicted: Iterable[Tuple[Optional[str], Optional[str]]],
+                           label: Optional[str]) -> None:
+    """
+    Cập nhật mô hình khi người dùng sửa nhãn
+
+    Args:
+        confirmed: Các bộ (nhãn cũ, tiêu đề, nội dung) của văn bản có nhãn do
+            người dùng nhập - mô hình đã học nên bỏ mẫu cũ rồi học nhãn mới
+        predicted: Các bộ (tiêu đề, nội dung) của văn bản chưa có nhãn hoặc
+            nhãn do mô hình dự đoán - chưa từng được học, chỉ học nhãn mới
+        label: Nhãn mới (None = xoá nhãn)
+    """
+    classifier = document_classifier
+    if not classifier.loaded:
+        return
+    confirmed = list(confirmed)
+    classifier.partial_fit(confirmed, weight=-1)
+    if label is not None:
+        classifier.partial_fit([(label, title, content) for _, title, content in confirmed])
+        classifier.partial_fit([(label, title, content) for title, content in predicted])
+
+
+def classify_corpus(batch_size: int = 500, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+                    force: bool = False) -> Dict[str, int]:
+    """
+    Gán document_type cho kho văn bản
+
+    Văn bản chưa có nhãn được dự đoán (bỏ qua nếu độ tin cậy thấp hoặc mô
+    hình chưa đủ nhãn / mẫu); nhãn người dùng nhập được chuẩn hoá cách viết.
+    force: dự đoán lại cả văn bản đã được mô hình gán nhãn trước đó.
+
+    Returns:
+        Dict {classified, normalized, uncertain}
+    """
+    from models import db, Document
+
+    classifier = ensure_trained()
+    stats = {'classified': 0, 'normalized': 0, 'uncertain': 0}
+    last_pk = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Document.pk, Document.document_type, Document.document_type_confidence,
+                      Document.title, db.func.substr(Document.content, 1, MAX_CONTENT_CHARS))
+            .where(Document.pk > last_pk)
+            .order_by(Document.pk)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_pk = rows[-1][0]
+
+        now = datetime.utcnow()
+        params = []
+        for pk, label, confidence, title, content in rows:
+            if label is not None and confidence is None:
+                normalized = normalize_label(label)
+                if normalized != label:
+                    params.append({'pk': pk, 'document_type': normalized, 'updated_at': now})
+                    stats['normalized'] += 1
+                continue
+            if label is not None and not force:
+                continue
+            predicted, score = classifier.predict(title, content)
+            if predicted is None or score < min_confidence:
+                stats['uncertain'] += 1
+                continue
+            if predicted != label:
+                params.append({'pk': pk, 'document_type': predicted,
+                               'document_type_confidence': round(score, 4), 'updated_at': now})
+                stats['classified'] += 1
+
+        if params:
+            # executemany theo khoá chính; các dòng chỉ chuẩn hoá nhãn không đổi confidence
+            for keys in ({'pk', 'document_type', 'updated_at'},
+                         {'pk', 'document_type', 'document_type_confidence', 'updated_at'}):
+                group = [p for p in params if set(p) == keys]
+                if group:
+                    db.session.execute(db.update(Document), group)
+            db.session.commit()
+    return stats
+
+
+# Export
+__all__ = [
+    'DocumentTypeClassifier',
+    'document_classifier',
+    'normalize_label',
+    'KNOWN_TYPES',
+    'ensure_trained',
+    'predict_document_type',
+    'learn_document_type',
+    'correct_document_types',
+    'classify_corpus',
+]
@@ -4,13 +4,14 @@ Configuration Module - Cấu hình cho Flask Application
 Fix: Trả về class thay vì instance để tương thích với Flask
 """
 
+import json
 import os
 from datetime import timedelta
 from pathlib import Path
 
 # Get base directory
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
-UPLOAD_FOLDER = os.path.join(BASE_DIR, '..', 'uploads')
+UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', os.path.join(BASE_DIR, '..', 'uploads'))
 DATABASE_FOLDER = os.path.join(BASE_DIR, 'database')
 
 # Create directories if they don't exist
@@ -18,11 +19,32 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 os.makedirs(DATABASE_FOLDER, exist_ok=True)
 
 
+def _load_json_config():
+    """Đọc config.json ở thư mục gốc dự án (rỗng nếu không có/hỏng)"""
+    try:
+        with open(os.path.join(BASE_DIR, '..', 'config.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _json_secret(value):
+    """Giá trị dạng "${OPENAI_API_KEY}" trong config.json lấy từ biến môi trường (None nếu chưa đặt)"""
+    value = os.path.expandvars(value or '')
+    return None if not value or '$' in value else value
+
+
+_JSON_CONFIG = _load_json_config()
+AI_CHAT_SETTINGS = _JSON_CONFIG.get('ai', {}).get('chat', {})
+AI_MODEL_SETTINGS = _JSON_CONFIG.get('ai', {}).get('models', {})
+SERVER_SETTINGS = _JSON_CONFIG.get('server', {}).get('backend', {})  # gunicorn.conf.py
+
+
 class Config:
     """Base Configuration - Cấu hình cơ bản"""
 
     # ============ DATABASE ============
-    SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE_FOLDER}/documents.db'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', f'sqlite:///{DATABASE_FOLDER}/documents.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_size': 10,
@@ -51,10 +73,85 @@ class Config:
         'http://127.0.0.1:5500',
         'http://127.0.0.1:3000',
     ]
+    CORS_ALLOW_HEADERS = ['Content-Type', 'If-None-Match', 'Range', 'If-Range']
+    CORS_EXPOSE_HEADERS = ['ETag', 'Content-Range', 'Accept-Ranges', 'Content-Length']
 
     # ============ APPLICATION ============
     JSON_SORT_KEYS = False
     JSONIFY_PRETTYPRINT_REGULAR = True
+    PAGINATION_SIZE = 20
+    MAX_PAGE_SIZE = 100
+
+    # ============ HTTP CACHE ============
+    CACHE_VERSION_FILE = os.path.join(DATABASE_FOLDER, '.collection_version')
+    DOCUMENT_CACHE_SIZE = 256  # Số văn bản giữ body JSON trong LRU
+    STATS_CACHE_TTL = 30  # Giây ghi nhớ kết quả thống kê (chat, /statistics)
+
+    # ============ BATCH OPERATIONS ============
+    BATCH_MAX_IDS = 50000  # Số id tối đa trong một yêu cầu batch
+
+    # ============ EXPORT ============
+    EXPORT_BATCH_SIZE = 1000  # Số dòng đọc từ cursor mỗi lô
+
+    # ============ PAGE STORE ============
+    PAGE_STORE_FOLDER = os.path.join(DATABASE_FOLDER, 'pages')  # Text theo trang (<doc_id>.pages)
+    PAGES_MAX_PER_REQUEST = 50
+
+    # ============ DOWNLOADS ============
+    # None: Python/gunicorn gửi file; 'x-sendfile' (Apache/lighttpd) hoặc
+    # 'x-accel' (nginx, location internal trỏ tới UPLOAD_FOLDER)
+    DOWNLOAD_OFFLOAD = os.environ.get('DOWNLOAD_OFFLOAD') or None
+    X_ACCEL_PREFIX = '/protected-uploads/'
+    DOWNLOAD_IMMUTABLE_MAX_AGE = 365 * 24 * 3600  # URL có ?v=<file_hash>
+    BUNDLE_MAX_DOCUMENTS = 200  # Số văn bản tối đa trong một bundle ZIP
+
+    # ============ AI / RAG ============
+    # 'extractive': trả lời offline từ đoạn trích; 'openai': API tương thích
+    # OpenAI (đặt OPENAI_API_BASE để dùng vLLM/llama.cpp/Ollama cục bộ).
+    # Mặc định lấy từ ai.models trong config.json, biến môi trường ghi đè.
+    AI_API_BASE = os.environ.get('OPENAI_API_BASE') or AI_MODEL_SETTINGS.get('api_base', 'https://api.openai.com/v1')
+    AI_API_KEY = os.environ.get('OPENAI_API_KEY') or _json_secret(AI_MODEL_SETTINGS.get('api_key'))
+    # provider "openai" chỉ dùng khi có API key, nếu không trả lời extractive
+    AI_BACKEND = os.environ.get('AI_BACKEND') or (
+        'openai' if AI_MODEL_SETTINGS.get('provider', 'openai') == 'openai' and AI_API_KEY else 'extractive')
+    AI_MODEL = os.environ.get('AI_MODEL') or AI_MODEL_SETTINGS.get('model_name', 'gpt-3.5-turbo')
+    AI_TEMPERATURE = float(os.environ.get('AI_TEMPERATURE') or AI_MODEL_SETTINGS.get('temperature', 0.7))
+    AI_MAX_TOKENS = int(os.environ.get('AI_MAX_TOKENS') or AI_MODEL_SETTINGS.get('max_tokens', 1000))
+    AI_TIMEOUT = AI_CHAT_SETTINGS.get('response_timeout', 15)  # Giây chờ backend trước khi quay về extractive
+    RAG_TOP_K = 5  # Số văn bản lấy đoạn trích
+    RAG_PASSAGE_CHARS = 600
+    RAG_CONTEXT_TOKENS = 1500  # Ngân sách token cho phần đoạn trích
+    RAG_CACHE_SIZE = 256  # Số context/câu trả lời giữ trong LRU
+    RAG_WORKERS = 4  # Thread sinh câu trả lời đồng thời
+
+    # ============ CHAT MEMORY ============
+    CHAT_MAX_HISTORY = AI_CHAT_SETTINGS.get('max_history', 100)  # Số lượt hội thoại giữ mỗi session
+    CHAT_MAX_SESSIONS = 1000  # Số session giữ trong bộ nhớ (LRU)
+    CHAT_WRITE_BATCH_SIZE = 100  # Số ChatMessage ghi mỗi lô
+    CHAT_WRITE_INTERVAL = 1.0  # Giây tối đa một tin nhắn chờ trong lô
+    CHAT_WRITE_MAX_PENDING = 1000  # Giới hạn hàng đợi ghi (số tin nhắn có thể mất khi bị kill)
+    CHAT_HISTORY_PAGE_SIZE = 50
+    CHAT_RETENTION_DAYS = 90  # Session không hoạt động lâu hơn bị xoá (manage.py prune-chat)
+
+    # ============ DOCUMENT ANALYSIS ============
+    ANALYSIS_WORKERS = os.cpu_count() or 1  # Process song song (manage.py analyze / summarize)
+    ANALYSIS_BATCH_SIZE = 500  # Số văn bản đọc/ghi mỗi lô
+    SUMMARY_MAX_CHARS = 300  # Độ dài tối đa của tóm tắt trích xuất
+    DOCUMENT_TYPE_MIN_CONFIDENCE = 0.6  # Dưới ngưỡng: để trống document_type thay vì đoán
+    DOCUMENT_TYPE_RELOAD_INTERVAL = 60  # Giây tối thiểu giữa hai lần học lại nhãn sửa ở worker khác
+
+    # ============ SEARCH SUGGESTIONS ============
+    SUGGEST_MAX_ENTRIES = 1_000_000  # Giới hạn bộ nhớ chỉ mục gợi ý (giữ mục tần suất cao)
+    SUGGEST_DELTA_MAX = 5000  # Số mục mới trước khi gộp vào chỉ mục chính ở thread nền
+
+    # ============ ASYNC SERVING (asgi.py) ============
+    # Trích xuất PDF/Word khi tải lên trong process riêng (0: ngay trên thread
+    # của request); asgi.py dùng ASGI_EXTRACT_WORKERS nếu để 0
+    EXTRACT_WORKERS = int(os.environ.get('EXTRACT_WORKERS', 0))
+    ASGI_EXTRACT_WORKERS = 2
+    ASGI_WSGI_THREADS = 16  # Thread chạy các route Flask còn lại dưới ASGI
+    ASGI_BODY_SPOOL_BYTES = 1024 * 1024  # Body request lớn hơn được đệm ra file tạm trước khi vào Flask
+    AI_MAX_CONNECTIONS = 100  # Kết nối đồng thời tới backend 'openai' khi stream bất đồng bộ
 
 
 class DevelopmentConfig(Config):
@@ -70,6 +167,7 @@ class ProductionConfig(Config):
     TESTING = False
     SESSION_COOKIE_SECURE = True  # Require HTTPS
     SQLALCHEMY_ECHO = False
+    JSONIFY_PRETTYPRINT_REGULAR = False  # JSON gọn, không thụt lề
 
 
 class TestingConfig(Config):
@@ -78,6 +176,7 @@ class TestingConfig(Config):
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
     WTF_CSRF_ENABLED = False
+    CACHE_VERSION_FILE = None  # Chỉ giữ phiên bản trong bộ nhớ
 
 
 # Configuration dictionary
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Dedup Service Module - Phát hiện văn bản gần trùng (MinHash + LSH)
+Cùng một quyết định thường đến dưới dạng bản scan, DOCX và bản chuyển tiếp.
+Mỗi văn bản có chữ ký MinHash (NUM_PERM giá trị 32-bit, lưu dạng BLOB) trên
+các shingle từ của nội dung; chữ ký được chia thành LSH_BANDS dải, mỗi dải
+băm thành một bucket có index nên tìm văn bản gần trùng chỉ đọc các văn bản
+chung bucket thay vì so với cả kho.
+"""
+
+import hashlib
+import re
+import zlib
+from array import array
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from analysis_service import content_hash, process_corpus
+
+# Đổi khi thay cách tính chữ ký để lần chạy sau tính lại toàn bộ
+SIGNATURE_VERSION = 'minhash-1'
+SHINGLE_SIZE = 5  # Số từ mỗi shingle
+NUM_PERM = 128  # Số phần tử (ngăn) của chữ ký
+LSH_BANDS = 16  # 16 dải x 8 hàng: cặp có Jaccard ~0.7 trở lên gần như chắc chắn chung một bucket
+LSH_ROWS = NUM_PERM // LSH_BANDS
+DUPLICATE_THRESHOLD = 0.8  # Jaccard ước lượng để coi là bản trùng
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+# Hệ số cố định: chữ ký phải giống nhau giữa các process và các lần chạy
+_HASH_A, _HASH_B = 0x5851F42D4C957F2D % _MERSENNE_PRIME, 0x14057B7EF767814F % _MERSENNE_PRIME
+_WORD_RE = re.compile(r'\w+')
+
+
+# ============ SIGNATURES ============
+
+def shingles(text: Optional[str]) -> Set[int]:
+    """Tập hash (CRC32) của các cụm SHINGLE_SIZE từ liên tiếp"""
+    words = _WORD_RE.findall((text or '').lower())
+    if len(words) < SHINGLE_SIZE:
+        return {zlib.crc32(' '.join(words).encode('utf-8'))} if words else set()
+    return {
+        zlib.crc32(' '.join(words[i:i + SHINGLE_SIZE]).encode('utf-8'))
+        for i in range(len(words) - SHINGLE_SIZE + 1)
+    }
+
+
+def minhash(text: Optional[str]) -> Optional[array]:
+    """
+    Chữ ký MinHash của văn bản (one permutation hashing)
+
+    Mỗi shingle được băm một lần rồi chia vào NUM_PERM ngăn, mỗi ngăn giữ giá
+    trị nhỏ nhất - O(số shingle) thay vì O(số shingle x NUM_PERM) của MinHash
+    nhiều hoán vị. Ngăn rỗng (văn bản ngắn) lấy giá trị của ngăn kế tiếp
+    bên phải (densification) để hai văn bản giống nhau vẫn trùng vị trí.
+
+    Returns:
+        array('I') NUM_PERM phần tử, None nếu văn bản không có từ nào
+    """
+    values = shingles(text)
+    if not values:
+        return None
+    prime, a, b = _MERSENNE_PRIME, _HASH_A, _HASH_B
+    bins = [None] * NUM_PERM
+    for x in values:
+        h = (a * x + b) % prime
+        i = h % NUM_PERM
+        value = (h // NUM_PERM) & _MAX_HASH
+        current = bins[i]
+        if current is None or value < current:
+            bins[i] = value
+
+    # Duyệt ngược vòng: ngăn rỗng nhận giá trị của ngăn có giá trị gần nhất bên phải
+    if None in bins:
+        last = next(value for value in bins if value is not None)
+        for i in range(NUM_PERM - 1, -1, -1):
+            if bins[i] is None:
+                bins[i] = last
+            else:
+                last = bins[i]
+    return array('I', bins)
+
+
+def band_keys(signature: array) -> List[int]:
+    """Khoá bucket (int64 có dấu cho SQLite) của từng dải, gồm cả số thứ tự dải"""
+    raw = signature.tobytes()
+    width = LSH_ROWS * signature.itemsize
+    return [
+        int.from_bytes(
+            hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8,
+                            salt=band.to_bytes(2, 'big')).digest(),
+            'big', signed=True
+        )
+        for band in range(LSH_BANDS)
+    ]
+
+
+def similarity(sig_a: array, sig_b: array) -> float:
+    """Jaccard ước lượng: tỉ lệ vị trí trùng giữa hai chữ ký"""
+    return sum(1 for x, y in zip(sig_a, sig_b) if x == y) / NUM_PERM
+
+
+def _from_bytes(raw: bytes) -> Optional[array]:
+    if not raw:
+        return None
+    signature = array('I')
+    signature.frombytes(raw)
+    return signature
+
+
+def signature_item(item: Tuple[int, str]) -> Tuple[int, Optional[bytes]]:
+    """Chữ ký của một văn bản (chạy trong process con của pool)"""
+    pk, content = item
+    signature = minhash(content)
+    return pk, signature.tobytes() if signature is not None else None
+
+
+# ============ STORAGE ============
+
+def signature_hash(content: Optional[str]) -> str:
+    return content_hash(content, SIGNATURE_VERSION)
+
+
+def store_signatures(results: List[Tuple[int, Optional[bytes]]], hashes: Dict[int, str]) -> int:
+    """
+    Thay chữ ký và bucket LSH của các văn bản (trong transaction hiện tại)
+
+    Văn bản không có nội dung vẫn có dòng chữ ký rỗng (đánh dấu đã xử lý)
+    nhưng không có bucket.
+
+    Returns:
+        Số bucket đã ghi
+    """
+    from models import db, DocumentSignature, DocumentBand
+
+    pks = [pk for pk, _ in results]
+    db.session.execute(db.delete(DocumentBand).where(DocumentBand.document_pk.in_(pks)))
+    db.session.execute(db.delete(DocumentSignature).where(DocumentSignature.document_pk.in_(pks)))
+
+    db.session.execute(DocumentSignature.__table__.insert(), [
+        {'document_pk': pk, 'content_hash': hashes[pk], 'signature': raw or b''}
+        for pk, raw in results
+    ])
+    band_rows = [
+        {'bucket': key, 'document_pk': pk}
+        for pk, raw in results if raw
+        for key in band_keys(_from_bytes(raw))
+    ]
+    if band_rows:
+        db.session.execute(DocumentBand.__table__.insert(), band_rows)
+    return len(band_rows)
+
+
+def index_document(document_pk: int, content: Optional[str]) -> Optional[array]:
+    """Tính và lưu chữ ký của một văn bản (luồng upload, trong transaction hiện tại)"""
+    signature = minhash(content)
+    store_signatures([(document_pk, signature.tobytes() if signature is not None else None)],
+                     {document_pk: signature_hash(content)})
+    return signature
+
+
+def build_signatures(workers: int = 1, batch_size: int = 500, force: bool = False) -> Dict[str, int]:
+    """
+    Tính chữ ký cho văn bản chưa có (hoặc nội dung đã đổi)
+
+    Returns:
+        Dict {indexed, skipped, buckets}
+    """
+    from models import DocumentSignature
+
+    stats = process_corpus(DocumentSignature, SIGNATURE_VERSION, signature_item, store_signatures,
+                           workers=workers, batch_size=batch_size, force=force)
+    return {'indexed': stats['processed'], 'skipped': stats['skipped'], 'buckets': stats['stored']}
+
+
+# ============ QUERIES ============
+
+def _signatures(pks: Iterable[int]) -> Dict[int, array]:
+    from models import db, DocumentSignature
+
+    rows = db.session.execute(
+        db.select(DocumentSignature.document_pk, DocumentSignature.signature)
+        .where(DocumentSignature.document_pk.in_(list(pks)))
+    )
+    signatures = {}
+    for pk, raw in rows:
+        signature = _from_bytes(raw)
+        if signature is not None:
+            signatures[pk] = signature
+    return signatures
+
+
+def find_similar(signature: Optional[array], exclude_pk: Optional[int] = None,
+                 threshold: float = DUPLICATE_THRESHOLD, limit: int = 10) -> List[Tuple[int, float]]:
+    """
+    Văn bản gần trùng với một chữ ký
+
+    Chỉ xét các văn bản chung ít nhất một bucket LSH (truy vấn index), rồi
+    xác nhận bằng Jaccard ước lượng trên chữ ký đầy đủ.
+
+    Returns:
+        Danh sách (document_pk, similarity) giảm dần theo similarity
+    """
+    from models import db, DocumentBand
+
+    if signature is None:
+        return []
+    candidates = set(db.session.execute(
+        db.select(DocumentBand.document_pk).where(DocumentBand.bucket.in_(band_keys(signature)))
+    ).scalars())
+    candidates.discard(exclude_pk)
+
+    scored = [(pk, similarity(signature, other)) for pk, other in _signatures(candidates).items()]
+    scored = [(pk, score) for pk, score in scored if score >= threshold]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return scored[:limit]
+
+
+def similar_documents(document_pk: int, threshold: float = DUPLICATE_THRESHOLD,
+                      limit: int = 10) -> Optional[List[Tuple[int, float]]]:
+    """
+    Văn bản gần trùng với một văn bản đã có chữ ký
+
+    Returns:
+        Danh sách (document_pk, similarity), None nếu văn bản chưa có chữ ký
+    """
+    signature = _signatures([document_pk]).get(document_pk)
+    if signature is None:
+        return None
+    return find_similar(signature, exclude_pk=document_pk, threshold=threshold, limit=limit)
+
+
+def duplicate_groups(pks: List[int], threshold: float = DUPLICATE_THRESHOLD) -> Dict[int, int]:
+    """
+    Gom các văn bản gần trùng trong một tập nhỏ (kết quả tìm kiếm)
+
+    Cặp ứng viên là các văn bản chung bucket; nhóm được hợp bắc cầu
+    (union-find) nên A~B, B~C cho cùng một nhóm.
+
+    Returns:
+        Dict document_pk -> pk đại diện của nhóm (phần tử đứng trước nhất trong pks)
+    """
+    from models import db, DocumentBand
+
+    order = {pk: i for i, pk in enumerate(pks)}
+    parent = {pk: pk for pk in pks}
+
+    def find(pk):
+        while parent[pk] != pk:
+            parent[pk] = parent[parent[pk]]
+            pk = parent[pk]
+        return pk
+
+    buckets: Dict[int, List[int]] = {}
+    for bucket, pk in db.session.execute(
+        db.select(DocumentBand.bucket, DocumentBand.document_pk).where(DocumentBand.document_pk.in_(pks))
+    ):
+        buckets.setdefault(bucket, []).append(pk)
+
+    pairs = {(a, b) for members in buckets.values() for a in members for b in members if order[a] < order[b]}
+    if pairs:
+        signatures = _signatures({pk for pair in pairs for pk in pair})
+        for a, b in pairs:
+            if find(a) == find(b) or a not in signatures or b not in signatures:
+                continue
+            if similarity(signatures[a], signatures[b]) >= threshold:
+                root_a, root_b = find(a), find(b)
+                if order[root_a] < order[root_b]:
+                    parent[root_b] = root_a
+                else:
+                    parent[root_a] = root_b
+
+    return {pk: find(pk) for pk in pks}
+
+
+# Export
+__all__ = [
+    'minhash', 'similarity', 'index_document', 'build_signatures',
+    'find_similar', 'similar_documents', 'duplicate_groups', 'DUPLICATE_THRESHOLD',
+]
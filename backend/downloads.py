@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Downloads Module - Gửi file văn bản/đính kèm cho client
+Hỗ trợ ETag/If-None-Match, Range/206, cache dài hạn cho URL theo nội dung
+(?v=<sha256>), offload qua X-Sendfile / X-Accel-Redirect và os.sendfile
+(zero-copy) khi chạy dưới gunicorn. Bundle ZIP được sinh dạng stream,
+không dùng file tạm.
+"""
+
+import hashlib
+import logging
+import os
+import re
+import zipfile
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from flask import current_app, request
+from werkzeug.utils import send_file
+
+from models import db, Document, Attachment
+from serializers import IN_CHUNK_SIZE
+from export_service import ChunkSink
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+BUNDLE_CHUNK_SIZE = 256 * 1024
+
+# Định dạng đã nén sẵn: lưu nguyên (ZIP_STORED), nén lại chỉ tốn CPU
+STORED_EXTENSIONS = {
+    'pdf', 'docx', 'xlsx', 'pptx', 'odt', 'zip', 'rar', '7z', 'gz',
+    'jpg', 'jpeg', 'png', 'gif', 'webp', 'mp3', 'mp4',
+}
+
+
+def file_sha256(path: str) -> str:
+    """SHA-256 của file (đọc theo khối, không nạp cả file vào bộ nhớ)"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _accel_uri(path: str) -> Optional[str]:
+    """Đường dẫn nội bộ nginx cho X-Accel-Redirect (None nếu file nằm ngoài UPLOAD_FOLDER)"""
+    root = os.path.realpath(current_app.config['UPLOAD_FOLDER'])
+    real = os.path.realpath(path)
+    if os.path.commonpath([real, root]) != root:
+        return None
+    relative = os.path.relpath(real, root).replace(os.sep, '/')
+    return current_app.config['X_ACCEL_PREFIX'].rstrip('/') + '/' + relative
+
+
+def _sends_by_content_length() -> bool:
+    """gunicorn gửi wsgi.file_wrapper bằng sendfile() từ vị trí hiện tại, đúng Content-Length byte"""
+    return request.environ.get('SERVER_SOFTWARE', '').startswith('gunicorn')
+
+
+def _zero_copy_range(rv, path: str):
+    """
+    Thay _RangeWrapper (copy qua Python) bằng wsgi.file_wrapper đã seek tới
+    đầu đoạn, để gunicorn gửi phần Range bằng os.sendfile
+    """
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    if rv.status_code != 206 or file_wrapper is None or not _sends_by_content_length():
+        return rv
+
+    start = rv.content_range.start
+    rv.response.close()
+    f = open(path, 'rb')
+    f.seek(start)
+    rv.response = file_wrapper(f)
+    return rv
+
+
+def send_stored_file(path: str, download_name: str, file_hash: Optional[str] = None):
+    """
+    Gửi file đã lưu trong UPLOAD_FOLDER
+
+    Args:
+        path: Đường dẫn file trên đĩa
+        download_name: Tên file khi tải về
+        file_hash: SHA-256 nội dung (nếu có) - dùng làm ETag mạnh và cho
+            phép cache dài hạn khi URL có ?v=<file_hash>
+
+    Returns:
+        Response (200, 206 hoặc 304)
+
+    Raises:
+        RequestedRangeNotSatisfiable: Range không hợp lệ (416)
+    """
+    config = current_app.config
+    offload = config.get('DOWNLOAD_OFFLOAD')
+    accel_uri = _accel_uri(path) if offload == 'x-accel' else None
+    use_offload = offload == 'x-sendfile' or accel_uri is not None
+
+    # URL có phiên bản theo nội dung -> file không bao giờ đổi
+    immutable = bool(file_hash) and request.args.get('v') == file_hash
+    max_age = config['DOWNLOAD_IMMUTABLE_MAX_AGE'] if immutable else None
+
+    environ = request.environ
+    if use_offload:
+        # Web server phía trước tự xử lý Range khi offload
+        environ = {k: v for k, v in environ.items() if k not in ('HTTP_RANGE', 'HTTP_IF_RANGE')}
+
+    rv = send_file(
+        path,
+        environ,
+        as_attachment=True,
+        download_name=download_name,
+        conditional=True,
+        etag=file_hash or True,
+        max_age=max_age,
+        use_x_sendfile=use_offload,
+        response_class=current_app.response_class,
+        _root_path=current_app.root_path,
+    )
+
+    if immutable:
+        rv.cache_control.immutable = True
+
+    if accel_uri is not None and 'X-Sendfile' in rv.headers:
+        del rv.headers['X-Sendfile']
+        rv.headers['X-Accel-Redirect'] = accel_uri
+
+    if not use_offload:
+        # Báo cho trình xem PDF biết có thể tải từng đoạn
+        rv.accept_ranges = 'bytes'
+        rv = _zero_copy_range(rv, path)
+
+    return rv
+
+
+# ============ ZIP BUNDLE ============
+
+def _safe_name(name: Optional[str], fallback: str) -> str:
+    """Tên file/thư mục an toàn trong ZIP (giữ tiếng Việt, bỏ ký tự đường dẫn)"""
+    cleaned = re.sub(r'[\\/:*?"<>|\x00-\x1f]+', '_', name or '').strip(' .')
+    return cleaned[:120] or fallback
+
+
+def _unique_name(arcname: str, used: Set[str]) -> str:
+    if arcname not in used:
+        used.add(arcname)
+        return arcname
+    stem, ext = os.path.splitext(arcname)
+    counter = 2
+    while f'{stem} ({counter}){ext}' in used:
+        counter += 1
+    arcname = f'{stem} ({counter}){ext}'
+    used.add(arcname)
+    return arcname
+
+
+def bundle_entries(doc_ids: List[str], folders: bool = False) -> Tuple[List[Tuple[str, str]], int]:
+    """
+    Danh sách file cần đóng gói cho các văn bản (file gốc + attachments)
+
+    Args:
+        doc_ids: Danh sách id văn bản (giữ thứ tự)
+        folders: Mỗi văn bản một thư mục riêng (bundle nhiều văn bản)
+
+    Returns:
+        Tuple[danh sách (đường dẫn trên đĩa, tên trong ZIP), số văn bản tìm thấy]
+    """
+    docs = {}
+    for start in range(0, len(doc_ids), IN_CHUNK_SIZE):
+        chunk = doc_ids[start:start + IN_CHUNK_SIZE]
+        for row in db.session.execute(
+            db.select(Document.pk, Document.id, Document.title, Document.document_number,
+                      Document.file_path, Document.file_name)
+            .where(Document.id.in_(chunk))
+        ):
+            docs[row.id] = row
+
+    attachments: Dict[int, List[Tuple[str, str]]] = {row.pk: [] for row in docs.values()}
+    pks = list(attachments)
+    for start in range(0, len(pks), IN_CHUNK_SIZE):
+        for document_pk, filename, file_path in db.session.execute(
+            db.select(Attachment.document_pk, Attachment.filename, Attachment.file_path)
+            .where(Attachment.document_pk.in_(pks[start:start + IN_CHUNK_SIZE]))
+            .order_by(Attachment.pk)
+        ):
+            attachments[document_pk].append((file_path, filename))
+
+    entries = []
+    used: Set[str] = set()
+    for doc_id in doc_ids:
+        doc = docs.get(doc_id)
+        if doc is None:
+            continue
+        prefix = ''
+        if folders:
+            label = doc.document_number or doc.title
+            prefix = _unique_name(f'{_safe_name(label, doc.id)}_{doc.id[:8]}', used) + '/'
+
+        files = [(doc.file_path, _safe_name(doc.file_name, 'document'))]
+        files += [(path, 'attachments/' + _safe_name(name, 'attachment')) for path, name in attachments[doc.pk]]
+        for path, name in files:
+            if not path or not os.path.isfile(path):
+                if path:
+                    logger.warning(f"Bundle skipped missing file: {path}")
+                continue
+            entries.append((path, _unique_name(prefix + name, used)))
+
+    return entries, len(docs)
+
+
+def iter_zip_bundle(entries: List[Tuple[str, str]]) -> Iterator[bytes]:
+    """
+    Sinh file ZIP theo từng khối bytes
+
+    Ghi vào luồng không seek được nên zipfile dùng data descriptor (CRC và
+    kích thước ghi sau dữ liệu); mỗi file được đọc theo khối BUNDLE_CHUNK_SIZE,
+    bộ nhớ không phụ thuộc kích thước bundle. File đã nén sẵn (PDF, DOCX...)
+    dùng ZIP_STORED, còn lại ZIP_DEFLATED.
+
+    Args:
+        entries: Danh sách (đường dẫn trên đĩa, tên trong ZIP)
+    """
+    sink = ChunkSink()
+    with zipfile.ZipFile(sink, 'w') as zf:
+        for path, arcname in entries:
+            try:
+                # file_size có sẵn nên zipfile tự bật ZIP64 cho file lớn
+                zinfo = zipfile.ZipInfo.from_file(path, arcname, strict_timestamps=False)
+                src = open(path, 'rb')
+            except OSError as e:
+                logger.warning(f"Bundle cannot read {path}: {str(e)}")
+                continue
+
+            ext = arcname.rsplit('.', 1)[-1].lower() if '.' in arcname else ''
+            zinfo.compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+
+            with src, zf.open(zinfo, 'w') as dst:
+                for chunk in iter(lambda: src.read(BUNDLE_CHUNK_SIZE), b''):
+                    dst.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+    yield sink.take()
+
+
+# Export
+__all__ = ['file_sha256', 'send_stored_file', 'bundle_entries', 'iter_zip_bundle', 'STORED_EXTENSIONS']
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Export Service Module - Xuất kho văn bản ra CSV, JSONL, Parquet
+Đọc bằng cursor phía server theo lô cố định (yield_per) và ghi từng lô ra
+luồng đầu ra (nén gzip ngay khi ghi), nên bộ nhớ không phụ thuộc số văn bản.
+"""
+
+import csv
+import gzip
+import io
+from typing import Any, Dict, Iterator, List, Optional
+
+from models import db, Document
+from serializers import encode_json, load_attachments
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow là tuỳ chọn, chỉ cần cho Parquet
+    pa = None
+    pq = None
+
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'jsonl': ('application/x-ndjson', 'jsonl'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+DEFAULT_BATCH_SIZE = 1000
+
+EXPORT_COLUMNS = (
+    Document.pk,
+    Document.id,
+    Document.title,
+    Document.document_type,
+    Document.document_number,
+    Document.sender,
+    Document.receiver,
+    Document.date_received,
+    Document.date_issued,
+    Document.file_name,
+    Document.file_size,
+    Document.file_type,
+    Document.json_data,
+    Document.created_at,
+    Document.updated_at,
+)
+
+BASE_FIELDS = [
+    'id', 'title', 'document_type', 'document_number', 'sender', 'receiver',
+    'date_received', 'date_issued', 'file_name', 'file_size', 'file_type',
+    'tags', 'priority', 'created_at', 'updated_at',
+]
+
+
+class ExportError(ValueError):
+    """Tham số export không hợp lệ hoặc thiếu thư viện"""
+
+
+def export_fields(include_content: bool = False, include_attachments: bool = False) -> List[str]:
+    """Danh sách cột theo thứ tự xuất"""
+    fields = list(BASE_FIELDS)
+    if include_content:
+        fields.append('content')
+    if include_attachments:
+        fields.append('attachments')
+    return fields
+
+
+# ============ READING ============
+
+def iter_record_batches(batch_size: int = DEFAULT_BATCH_SIZE, include_content: bool = False,
+                        include_attachments: bool = False) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Đọc văn bản theo lô từ cursor phía server
+
+    Args:
+        batch_size: Số dòng mỗi lô
+        include_content: Kèm nội dung đầy đủ
+        include_attachments: Kèm danh sách file đính kèm (một truy vấn IN mỗi lô)
+
+    Yields:
+        Danh sách record dict (tối đa batch_size)
+    """
+    columns = EXPORT_COLUMNS + ((Document.content,) if include_content else ())
+    result = db.session.execute(
+        db.select(*columns)
+        .order_by(Document.pk)
+        .execution_options(yield_per=batch_size)
+    )
+
+    for rows in result.partitions():
+        attachments = load_attachments([row.pk for row in rows]) if include_attachments else {}
+        batch = []
+        for row in rows:
+            meta = row.json_data or {}
+            record = {
+                'id': row.id,
+                'title': row.title,
+                'document_type': row.document_type,
+                'document_number': row.document_number,
+                'sender': row.sender,
+                'receiver': row.receiver,
+                'date_received': row.date_received,
+                'date_issued': row.date_issued,
+                'file_name': row.file_name,
+                'file_size': row.file_size,
+                'file_type': row.file_type,
+                'tags': list(meta.get('tags') or []),
+                'priority': meta.get('priority'),
+                'created_at': row.created_at,
+                'updated_at': row.updated_at,
+            }
+            if include_content:
+                record['content'] = row.content
+            if include_attachments:
+                record['attachments'] = [
+                    {'id': a['id'], 'filename': a['filename'], 'file_size': a['file_size']}
+                    for a in attachments[row.pk]
+                ]
+            batch.append(record)
+        yield batch
+
+
+# ============ OUTPUT BUFFER ============
+
+class ChunkSink(io.RawIOBase):
+    """File-like chỉ ghi, không seek được; generator lấy dữ liệu đã ghi ra sau mỗi lô"""
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._buffer.extend(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+# ============ WRITERS ============
+
+def _csv_value(value: Any) -> Any:
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def _csv_rows(batch: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    for record in batch:
+        row = {key: _csv_value(value) for key, value in record.items()}
+        row['tags'] = '; '.join(record['tags'])
+        if 'attachments' in record:
+            row['attachments'] = '; '.join(a['filename'] for a in record['attachments'])
+        yield row
+
+
+def _stream_text(batches, fields, fmt, sink, out) -> Iterator[bytes]:
+    if fmt == 'csv':
+        text = io.TextIOWrapper(out, encoding='utf-8', newline='', write_through=True)
+        text.write('\ufeff')  # BOM để Excel đọc đúng tiếng Việt
+        writer = csv.DictWriter(text, fieldnames=fields)
+        writer.writeheader()
+        for batch in batches:
+            writer.writerows(_csv_rows(batch))
+            yield sink.take()
+        text.flush()
+        text.detach()
+    else:
+        for batch in batches:
+            out.write(b''.join(encode_json(record) + b'\n' for record in batch))
+            yield sink.take()
+
+
+def _parquet_schema(fields: List[str]):
+    types = {
+        'file_size': pa.int64(),
+        'date_received': pa.timestamp('us'),
+        'date_issued': pa.timestamp('us'),
+        'created_at': pa.timestamp('us'),
+        'updated_at': pa.timestamp('us'),
+        'tags': pa.list_(pa.string()),
+        'attachments': pa.list_(pa.struct([
+            ('id', pa.string()), ('filename', pa.string()), ('file_size', pa.int64()),
+        ])),
+    }
+    return pa.schema([(name, types.get(name, pa.string())) for name in fields])
+
+
+def _stream_parquet(batches, fields, sink, compression) -> Iterator[bytes]:
+    schema = _parquet_schema(fields)
+    writer = pq.ParquetWriter(sink, schema, compression=compression)
+    try:
+        for batch in batches:
+            # Mỗi lô là một row group
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+def stream_export(fmt: str, include_content: bool = False, include_attachments: bool = False,
+                  compress: bool = True, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Tạo generator sinh dữ liệu export theo từng khối bytes
+
+    CSV/JSONL được bọc gzip khi compress=True. Parquet nén từng cột bên trong
+    file bằng codec gzip (file .parquet vẫn đọc trực tiếp được).
+
+    Raises:
+        ExportError: Định dạng không hỗ trợ hoặc thiếu pyarrow (kiểm tra ngay,
+            trước khi bắt đầu stream)
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f'Unsupported format: {fmt}')
+    if fmt == 'parquet' and pa is None:
+        raise ExportError('Parquet export requires pyarrow (pip install pyarrow)')
+    if batch_size < 1:
+        raise ExportError('batch_size must be positive')
+
+    fields = export_fields(include_content, include_attachments)
+    batches = iter_record_batches(batch_size, include_content, include_attachments)
+    return _generate(fmt, fields, batches, compress)
+
+
+def _generate(fmt, fields, batches, compress) -> Iterator[bytes]:
+    sink = ChunkSink()
+
+    if fmt == 'parquet':
+        yield from _stream_parquet(batches, fields, sink, 'gzip' if compress else 'snappy')
+        return
+
+    out = gzip.GzipFile(fileobj=sink, mode='wb') if compress else sink
+    yield from _stream_text(batches, fields, fmt, sink, out)
+    if compress:
+        out.close()
+    yield sink.take()
+
+
+def export_filename(fmt: str, compress: bool = True, stamp: Optional[str] = None) -> str:
+    """Tên file export, ví dụ documents_20240101_120000.csv.gz"""
+    name = f"documents_{stamp}" if stamp else 'documents'
+    name = f'{name}.{EXPORT_FORMATS[fmt][1]}'
+    if compress and fmt != 'parquet':
+        name += '.gz'
+    return name
+
+
+# Export
+__all__ = [
+    'EXPORT_FORMATS',
+    'ExportError',
+    'ChunkSink',
+    'export_fields',
+    'iter_record_batches',
+    'stream_export',
+    'export_filename',
+]
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Gunicorn Configuration - Chạy backend ở chế độ production
+Đọc mục server.backend của config.json; workers/threads để "auto" (hoặc
+không khai báo) thì suy ra từ số CPU. mode "async" (hoặc BACKEND_MODE=async)
+chạy asgi:application trên worker uvicorn thay cho app:app trên gthread.
+App được nạp một lần trong master (preload) rồi fork, các worker dùng chung bộ nhớ copy-on-write; worker được
+thay dần sau max_requests request (có jitter để không khởi động lại cùng
+lúc) và dừng êm trong graceful_timeout giây.
+
+Chạy: python main.py --production | --async
+      hoặc: cd backend && gunicorn -c gunicorn.conf.py
+"""
+
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from config import SERVER_SETTINGS
+
+os.environ.setdefault('FLASK_ENV', 'production')
+
+MAX_AUTO_WORKERS = 12  # Mỗi worker giữ cache/chỉ mục gợi ý riêng: giới hạn bộ nhớ khi máy nhiều CPU
+
+
+def _setting(name, default):
+    value = SERVER_SETTINGS.get(name)
+    return default if value in (None, 'auto') else value
+
+
+def _cpu_count():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+_cpus = _cpu_count()
+
+ASYNC_MODE = (os.environ.get('BACKEND_MODE') or SERVER_SETTINGS.get('mode')) == 'async'
+
+bind = f"{SERVER_SETTINGS.get('host', '0.0.0.0')}:{SERVER_SETTINGS.get('port', 5000)}"
+if ASYNC_MODE:
+    wsgi_app = 'asgi:application'
+    # Một event loop mỗi CPU; kết nối chờ I/O chỉ giữ một coroutine
+    workers = int(_setting('workers', min(_cpus, MAX_AUTO_WORKERS)))
+    threads = 1
+    worker_class = 'uvicorn_worker.UvicornWorker'
+else:
+    wsgi_app = 'app:app'
+    # Khuyến nghị của gunicorn: 2 x CPU + 1
+    workers = int(_setting('workers', min(2 * _cpus + 1, MAX_AUTO_WORKERS)))
+    # Máy ít CPU (ít worker) cần nhiều thread hơn cho request chờ I/O (SSE chat, gọi LLM, tải file)
+    threads = int(_setting('threads', 4 if _cpus <= 2 else 2))
+    worker_class = 'gthread' if threads > 1 else 'sync'
+
+preload_app = bool(_setting('preload', True))
+max_requests = int(_setting('max_requests', 1000))
+max_requests_jitter = int(_setting('max_requests_jitter', max_requests // 10))
+timeout = int(_setting('timeout', 30))
+graceful_timeout = int(_setting('graceful_timeout', 30))
+keepalive = int(_setting('keepalive', 5))
+
+accesslog = SERVER_SETTINGS.get('access_log')  # None: tắt, '-': stdout
+errorlog = SERVER_SETTINGS.get('error_log', '-')
+loglevel = SERVER_SETTINGS.get('log_level', 'info')
+proc_name = 'quan-ly-cong-van'
+
+
+# ============ HOOKS ============
+
+def post_fork(server, worker):
+    """Bỏ các kết nối CSDL master đã mở khi preload (migrations) - không dùng chung giữa process"""
+    from app import app
+    from models import db
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def when_ready(server):
+    cfg = server.cfg
+    server.log.info(f'{cfg.workers} {cfg.worker_class_str} workers x {cfg.threads} threads '
+                    f'(preload={cfg.preload_app}, max_requests={cfg.max_requests}±{cfg.max_requests_jitter})')
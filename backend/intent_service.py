@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Intent Service Module - Nhận diện ý định tin nhắn chat
+Naive Bayes đa thức trên các từ và từ đầu/cuối câu, huấn luyện từ tập câu
+mẫu có gán nhãn (data/intent_corpus.tsv). Sau khi huấn luyện, mỗi đặc trưng
+được biên dịch thành một bộ log-xác suất theo từng intent nên phân loại một
+tin nhắn chỉ là một lần tách từ bằng regex và vài phép cộng.
+"""
+
+import math
+import os
+import re
+from operator import add
+from typing import Dict, Iterable, List, Optional, Tuple
+
+CORPUS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'intent_corpus.tsv')
+
+INTENTS = ('search', 'statistics', 'list', 'help', 'general')
+FALLBACK_INTENT = 'general'
+
+# Từ không mang nội dung tìm kiếm (bỏ khi trích xuất từ khoá)
+KEYWORD_STOPWORDS = frozenset({'tìm', 'kiếm', 'search', 'công', 'văn', 'về', 'liên', 'quan', 'có', 'là'})
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    """Tách từ (chữ thường, bỏ dấu câu)"""
+    return _WORD_RE.findall(text.lower())
+
+
+def extract_keywords(message: str) -> str:
+    """
+    Trích xuất từ khoá tìm kiếm từ tin nhắn
+
+    Returns:
+        Các từ khoá nối bằng dấu cách (chính tin nhắn nếu không còn từ nào)
+    """
+    keywords = [w for w in tokenize(message) if len(w) > 2 and w not in KEYWORD_STOPWORDS]
+    return ' '.join(keywords) if keywords else message
+
+
+def _features(tokens: List[str]) -> List[str]:
+    # Từ đầu câu (tìm, xem, liệt kê...) và cuối câu (gì, nào, không...)
+    # phân biệt câu lệnh với câu hỏi tốt hơn bigram trên tập mẫu nhỏ
+    if not tokens:
+        return tokens
+    return tokens + [f'^{tokens[0]}', f'{tokens[-1]}$']
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Tuple[str, str]]:
+    """Đọc file câu mẫu: mỗi dòng 'nhãn<TAB>câu', bỏ dòng trống và dòng '#'"""
+    samples = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            label, text = line.split('\t', 1)
+            samples.append((label, text))
+    return samples
+
+
+class IntentClassifier:
+    """
+    Naive Bayes đa thức (từ + từ đầu/cuối câu) cho intent của tin nhắn chat
+
+    Đặc trưng chưa gặp khi huấn luyện bị bỏ qua; tin nhắn không có đặc trưng
+    nào đã biết, hoặc độ tin cậy thấp hơn min_confidence, được xếp vào
+    FALLBACK_INTENT.
+    """
+
+    def __init__(self, alpha: float = 0.5, min_confidence: float = 0.4):
+        self.alpha = alpha
+        self.min_confidence = min_confidence
+        self.labels: Tuple[str, ...] = ()
+        self._priors: Tuple[float, ...] = ()
+        self._weights: Dict[str, Tuple[float, ...]] = {}
+
+    def fit(self, samples: Iterable[Tuple[str, str]]) -> 'IntentClassifier':
+        """Huấn luyện từ các cặp (nhãn, câu)"""
+        samples = list(samples)
+        self.labels = tuple(sorted({label for label, _ in samples}, key=lambda l: (l not in INTENTS, l)))
+        index = {label: i for i, label in enumerate(self.labels)}
+
+        doc_counts = [0] * len(self.labels)
+        feature_counts: Dict[str, List[int]] = {}
+        for label, text in samples:
+            i = index[label]
+            doc_counts[i] += 1
+            for feature in _features(tokenize(text)):
+                feature_counts.setdefault(feature, [0] * len(self.labels))[i] += 1
+
+        totals = [sum(counts[i] for counts in feature_counts.values()) for i in range(len(self.labels))]
+        denominators = [total + self.alpha * len(feature_counts) for total in totals]
+
+        self._priors = tuple(math.log(count / len(samples)) for count in doc_counts)
+        self._weights = {
+            feature: tuple(math.log((count + self.alpha) / denominator)
+                           for count, denominator in zip(counts, denominators))
+            for feature, counts in feature_counts.items()
+        }
+        return self
+
+    @classmethod
+    def from_corpus(cls, path: str = CORPUS_PATH, **kwargs) -> 'IntentClassifier':
+        return cls(**kwargs).fit(load_corpus(path))
+
+    def _log_scores(self, message: str) -> Optional[Tuple[float, ...]]:
+        weights = self._weights
+        scores = None
+        for feature in _features(tokenize(message)):
+            row = weights.get(feature)
+            if row is not None:
+                scores = row if scores is None else tuple(map(add, scores, row))
+        if scores is None:
+            return None
+        return tuple(map(add, scores, self._priors))
+
+    def scores(self, message: str) -> Dict[str, float]:
+        """
+        Xác suất của từng intent
+
+        Returns:
+            Dict intent -> xác suất (tổng bằng 1); rỗng nếu tin nhắn không có
+            đặc trưng nào đã biết
+        """
+        log_scores = self._log_scores(message)
+        if log_scores is None:
+            return {}
+        top = max(log_scores)
+        exps = [math.exp(s - top) for s in log_scores]
+        total = sum(exps)
+        return {label: e / total for label, e in zip(self.labels, exps)}
+
+    def predict(self, message: str) -> Tuple[str, float]:
+        """
+        Intent của tin nhắn
+
+        Returns:
+            Tuple[intent, độ tin cậy 0..1] - (FALLBACK_INTENT, 0.0) nếu không
+            có đặc trưng nào đã biết
+        """
+        scores = self.scores(message)
+        if not scores:
+            return FALLBACK_INTENT, 0.0
+        intent = max(scores, key=scores.get)
+        confidence = scores[intent]
+        if confidence < self.min_confidence:
+            return FALLBACK_INTENT, confidence
+        return intent, confidence
+
+
+intent_classifier = IntentClassifier.from_corpus()
+
+
+# Export
+__all__ = [
+    'IntentClassifier',
+    'intent_classifier',
+    'INTENTS',
+    'load_corpus',
+    'tokenize',
+    'extract_keywords',
+]
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Lookup Service Module - Tra cứu chính xác theo số hiệu văn bản
+Người dùng thường dán nguyên số hiệu (HĐLĐ-2024-0001, 15/2024/QĐ-UBND) vào ô
+tìm kiếm. Số hiệu được chuẩn hoá (bỏ dấu, chữ hoa, bỏ '-', '/', '.', khoảng
+trắng) vào cột document_number_key có index nên truy vấn có dạng số hiệu là
+một lần tra index thay vì quét và chấm điểm cả kho.
+"""
+
+import re
+import unicodedata
+from typing import List, Optional
+
+from sqlalchemy import event
+
+from models import Document
+
+# Một cụm không khoảng trắng có chữ số và dấu phân cách hoặc chữ cái
+_IDENTIFIER_RE = re.compile(r'^(?=[^\s]*\d)(?=[^\s]*[-/.]|[^\s]*[^\W\d_])[^\s]{3,100}$')
+_SEPARATOR_RE = re.compile(r'[\W_]+')
+
+# Khoá của số hiệu không có ký tự nào để so khớp ('', '---'): đã xét, không
+# tra cứu được; khác NULL (chưa điền khoá) để migration không chạy lại
+NO_KEY = ''
+
+
+def normalize_document_number(value: Optional[str]) -> Optional[str]:
+    """
+    Khoá so khớp của số hiệu: không phân biệt hoa thường, dấu, '-', '/'
+
+    'HĐLĐ-2024-0001', 'hdld/2024/0001' và 'HĐLĐ 2024 0001' cho cùng khoá
+    'HDLD20240001'.
+    """
+    if not value:
+        return None
+    decomposed = unicodedata.normalize('NFD', value.replace('đ', 'd').replace('Đ', 'D'))
+    ascii_value = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    key = _SEPARATOR_RE.sub('', ascii_value).upper()
+    return key or None
+
+
+def document_number_key(value: Optional[str]) -> Optional[str]:
+    """Giá trị cột document_number_key: NULL khi không có số hiệu, NO_KEY khi số hiệu không có khoá"""
+    if value is None:
+        return None
+    key = normalize_document_number(value)
+    return NO_KEY if key is None else key
+
+
+def looks_like_document_number(query: Optional[str]) -> bool:
+    """Truy vấn có dạng số hiệu (một cụm có chữ số và dấu phân cách / chữ cái)"""
+    return bool(query) and bool(_IDENTIFIER_RE.match(query.strip()))
+
+
+def find_by_document_number(query: str, document_filter=None) -> List[Document]:
+    """
+    Văn bản có số hiệu trùng (sau chuẩn hoá) với truy vấn
+
+    Nhiều văn bản có thể cùng số hiệu (bản scan, bản DOCX, bản chuyển tiếp
+    của cùng một quyết định) nên trả về danh sách, mới nhất trước.
+
+    Args:
+        query: Số hiệu người dùng nhập
+        document_filter: SELECT document pk giới hạn tập tìm kiếm
+    """
+    from models import db
+
+    key = normalize_document_number(query)
+    if key is None:
+        return []
+    stmt = db.select(Document).where(Document.document_number_key == key)
+    if document_filter is not None:
+        stmt = stmt.where(Document.pk.in_(document_filter))
+    return db.session.execute(stmt.order_by(Document.created_at.desc())).scalars().all()
+
+
+# ============ SYNC ============
+
+@event.listens_for(Document, 'before_insert')
+@event.listens_for(Document, 'before_update')
+def _sync_document_number_key(mapper, connection, target):
+    # UPDATE hàng loạt (batch_service, metadata_service) tự đặt document_number_key
+    target.document_number_key = document_number_key(target.document_number)
+
+
+# Export
+__all__ = [
+    'NO_KEY',
+    'normalize_document_number',
+    'document_number_key',
+    'looks_like_document_number',
+    'find_by_document_number',
+]
@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+╔════════════════════════════════════════════════════════════════╗
+║          MANAGEMENT CLI - CÔNG CỤ QUẢN TRỊ HỆ THỐNG            ║
+║     Chạy các tác vụ dài (export, ...) ngoài HTTP server        ║
+╚════════════════════════════════════════════════════════════════╝
+
+Ví dụ:
+    python manage.py export --format csv --output documents.csv.gz
+    python manage.py export --format parquet --content --attachments -o documents.parquet
+    python manage.py backfill-hashes
+    python manage.py build-pages --rebuild
+    python manage.py prune-chat --days 90
+    python manage.py analyze --workers 4
+    python manage.py summarize --workers 4
+    python manage.py build-signatures
+    python manage.py build-postings --workers 4
+    python manage.py build-vectors --force
+    python manage.py classify --min-confidence 0.7
+    python manage.py extract-metadata
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+
+# ============ COMMANDS ============
+
+def cmd_export(args):
+    """Xuất kho văn bản ra file (hoặc stdout với -o -)"""
+    from export_service import ExportError, stream_export
+
+    try:
+        chunks = stream_export(
+            args.format,
+            include_content=args.content,
+            include_attachments=args.attachments,
+            compress=not args.no_gzip,
+            batch_size=args.batch_size
+        )
+    except ExportError as e:
+        print(f"[!] {e}", file=sys.stderr)
+        return 1
+
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    total = 0
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+            total += len(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    print(f"[+] Exported {total / 1024:.1f} KB -> {args.output}", file=sys.stderr)
+    return 0
+
+
+def cmd_backfill_hashes(args):
+    """Tính file_hash (SHA-256) cho văn bản/attachment tải lên trước khi có cột này"""
+    import os
+
+    from downloads import file_sha256
+    from models import db, Document, Attachment
+
+    total = 0
+    for model in (Document, Attachment):
+        last_pk = 0
+        while True:
+            # Keyset theo pk: file không còn trên đĩa không bị đọc lại
+            rows = db.session.execute(
+                db.select(model.pk, model.file_path)
+                .where(model.pk > last_pk, model.file_hash.is_(None), model.file_path.isnot(None))
+                .order_by(model.pk)
+                .limit(args.batch_size)
+            ).all()
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+            params = [
+                {'pk': pk, 'file_hash': file_sha256(path)}
+                for pk, path in rows if os.path.exists(path)
+            ]
+            if params:
+                db.session.execute(db.update(model), params)
+                db.session.commit()
+                total += len(params)
+
+    print(f"[+] Hashed {total} files", file=sys.stderr)
+    return 0
+
+
+def cmd_build_pages(args):
+    """Dựng page store cho văn bản chưa có (hoặc tất cả với --rebuild)"""
+    import os
+
+    from models import db, Document
+    from page_store import page_store, PAGE_SEPARATOR
+    from routes import extract_file_pages
+
+    built = 0
+    last_pk = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Document.pk, Document.id, Document.file_path, Document.file_name, Document.content)
+            .where(Document.pk > last_pk)
+            .order_by(Document.pk)
+            .limit(args.batch_size)
+        ).all()
+        if not rows:
+            break
+        last_pk = rows[-1].pk
+
+        for row in rows:
+            if not args.rebuild and page_store.page_count(row.id) is not None:
+                continue
+            pages = []
+            if row.file_path and os.path.exists(row.file_path):
+                pages, _ = extract_file_pages(row.file_path, row.file_name or row.file_path)
+            if not pages and row.content:
+                pages = [row.content]
+
+            # Vị trí ký tự trong content phải khớp bảng offset của page store
+            content = PAGE_SEPARATOR.join(pages)
+            if pages and content != row.content:
+                db.session.execute(db.update(Document), [{'pk': row.pk, 'content': content}])
+            page_store.write(row.id, pages)
+            built += 1
+        db.session.commit()
+
+    print(f"[+] Built page store for {built} documents", file=sys.stderr)
+    return 0
+
+
+def cmd_prune_chat(args):
+    """Xoá lịch sử chat của các session không hoạt động quá --days ngày"""
+    from flask import current_app
+
+    from chat_service import prune_chat_history
+
+    days = args.days if args.days is not None else current_app.config['CHAT_RETENTION_DAYS']
+    result = prune_chat_history(days, batch_size=args.batch_size)
+    print(f"[+] Pruned {result['messages']} messages from {result['sessions']} sessions "
+          f"inactive for {days} days", file=sys.stderr)
+    return 0
+
+
+def cmd_analyze(args):
+    """Trích xuất thực thể và phân tích cảm xúc cho toàn kho (bỏ qua văn bản không đổi)"""
+    from flask import current_app
+
+    from analysis_service import analyze_corpus
+
+    workers = args.workers or current_app.config['ANALYSIS_WORKERS']
+    batch_size = args.batch_size or current_app.config['ANALYSIS_BATCH_SIZE']
+    result = analyze_corpus(workers=workers, batch_size=batch_size, force=args.force)
+    print(f"[+] Analyzed {result['analyzed']} documents ({result['entities']} entities), "
+          f"skipped {result['skipped']} unchanged", file=sys.stderr)
+    return 0
+
+
+def cmd_summarize(args):
+    """Tóm tắt trích xuất cho văn bản chưa có tóm tắt (hoặc nội dung đã đổi)"""
+    import time
+
+    from flask import current_app
+
+    from summary_service import summarize_corpus
+
+    workers = args.workers or current_app.config['ANALYSIS_WORKERS']
+    batch_size = args.batch_size or current_app.config['ANALYSIS_BATCH_SIZE']
+    start = time.perf_counter()
+    result = summarize_corpus(workers=workers, batch_size=batch_size, force=args.force,
+                              max_length=current_app.config['SUMMARY_MAX_CHARS'])
+    secs = time.perf_counter() - start
+    print(f"[+] Summarized {result['summarized']} documents in {secs:.1f}s "
+          f"({result['summarized'] / secs if secs else 0:,.0f} docs/s, {workers} workers), "
+          f"skipped {result['skipped']} unchanged", file=sys.stderr)
+    return 0
+
+
+def cmd_build_signatures(args):
+    """Tính chữ ký MinHash + bucket LSH cho văn bản chưa có (phát hiện bản gần trùng)"""
+    import time
+
+    from flask import current_app
+
+    from dedup_service import build_signatures
+
+    workers = args.workers or current_app.config['ANALYSIS_WORKERS']
+    batch_size = args.batch_size or current_app.config['ANALYSIS_BATCH_SIZE']
+    start = time.perf_counter()
+    result = build_signatures(workers=workers, batch_size=batch_size, force=args.force)
+    secs = time.perf_counter() - start
+    print(f"[+] Signed {result['indexed']} documents ({result['buckets']} LSH buckets) in {secs:.1f}s, "
+          f"skipped {result['skipped']} unchanged", file=sys.stderr)
+    return 0
+
+
+def cmd_build_postings(args):
+    """Dựng posting list (từ, vị trí) cho truy vấn có cấu trúc"""
+    import time
+
+    from flask import current_app
+
+    from query_service import build_postings
+
+    workers = args.workers or current_app.config['ANALYSIS_WORKERS']
+    batch_size = args.batch_size or current_app.config['ANALYSIS_BATCH_SIZE']
+    start = time.perf_counter()
+    result = build_postings(workers=workers, batch_size=batch_size, force=args.force)
+    secs = time.perf_counter() - start
+    print(f"[+] Indexed {result['indexed']} documents ({result['postings']} postings) in {secs:.1f}s, "
+          f"skipped {result['skipped']} unchanged", file=sys.stderr)
+    return 0
+
+
+def cmd_build_vectors(args):
+    """Tính vector từ (top-N tf-idf) cho gợi ý văn bản liên quan"""
+    import time
+
+    from related_service import build_term_vectors
+
+    start = time.perf_counter()
+    result = build_term_vectors(batch_size=args.batch_size, force=args.force)
+    secs = time.perf_counter() - start
+    print(f"[+] Computed term vectors for {result['computed']} documents ({result['terms']} terms) "
+          f"in {secs:.1f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_classify(args):
+    """Gán document_type cho văn bản chưa có nhãn bằng mô hình học từ nhãn đã có"""
+    import time
+
+    from flask import current_app
+
+    from classifier_service import classify_corpus, document_classifier
+
+    min_confidence = args.min_confidence
+    if min_confidence is None:
+        min_confidence = current_app.config['DOCUMENT_TYPE_MIN_CONFIDENCE']
+    start = time.perf_counter()
+    result = classify_corpus(batch_size=args.batch_size, min_confidence=min_confidence, force=args.force)
+    secs = time.perf_counter() - start
+    print(f"[+] Trained on {document_classifier.sample_count} labeled documents "
+          f"({len(document_classifier.labels)} types)", file=sys.stderr)
+    print(f"[+] Classified {result['classified']}, normalized {result['normalized']} labels, "
+          f"left {result['uncertain']} below confidence {min_confidence} in {secs:.1f}s", file=sys.stderr)
+    return 0
+
+
+def cmd_extract_metadata(args):
+    """Điền số hiệu, ngày ban hành, nơi gửi/nhận còn trống từ thể thức văn bản"""
+    import time
+
+    from metadata_service import extract_corpus, METADATA_FIELDS
+
+    start = time.perf_counter()
+    result = extract_corpus(batch_size=args.batch_size)
+    secs = time.perf_counter() - start
+    filled = ', '.join(f'{field} {result[field]}' for field in METADATA_FIELDS)
+    print(f"[+] Scanned {result['scanned']} documents with missing fields, updated {result['updated']} "
+          f"({filled}) in {secs:.1f}s", file=sys.stderr)
+    return 0
+
+
+# ============ MAIN ============
+
+def build_parser():
+    parser = argparse.ArgumentParser(description='Công cụ quản trị hệ thống quản lý công văn')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    export = sub.add_parser('export', help='Xuất kho văn bản (CSV, JSONL, Parquet)')
+    export.add_argument('--format', '-f', choices=['csv', 'jsonl', 'parquet'], default='csv')
+    export.add_argument('--output', '-o', required=True, help="Đường dẫn file, '-' cho stdout")
+    export.add_argument('--content', action='store_true', help='Kèm nội dung đầy đủ')
+    export.add_argument('--attachments', action='store_true', help='Kèm danh sách file đính kèm')
+    export.add_argument('--no-gzip', action='store_true', help='Không nén (CSV/JSONL) / dùng snappy (Parquet)')
+    export.add_argument('--batch-size', type=int, default=1000)
+    export.set_defaults(func=cmd_export)
+
+    backfill = sub.add_parser('backfill-hashes', help='Tính file_hash cho file đã tải lên trước đây')
+    backfill.add_argument('--batch-size', type=int, default=500)
+    backfill.set_defaults(func=cmd_backfill_hashes)
+
+    pages = sub.add_parser('build-pages', help='Dựng page store (text theo trang) cho văn bản')
+    pages.add_argument('--rebuild', action='store_true', help='Dựng lại cả văn bản đã có')
+    pages.add_argument('--batch-size', type=int, default=200)
+    pages.set_defaults(func=cmd_build_pages)
+
+    prune = sub.add_parser('prune-chat', help='Xoá lịch sử chat của session cũ')
+    prune.add_argument('--days', type=int, help='Số ngày không hoạt động (mặc định CHAT_RETENTION_DAYS)')
+    prune.add_argument('--batch-size', type=int, default=500, help='Số session xoá mỗi transaction')
+    prune.set_defaults(func=cmd_prune_chat)
+
+    analyze = sub.add_parser('analyze', help='Phân tích thực thể/cảm xúc cho toàn kho văn bản')
+    analyze.add_argument('--workers', type=int, help='Số process (mặc định ANALYSIS_WORKERS)')
+    analyze.add_argument('--batch-size', type=int, help='Số văn bản mỗi lô (mặc định ANALYSIS_BATCH_SIZE)')
+    analyze.add_argument('--force', action='store_true', help='Phân tích lại cả văn bản không đổi')
+    analyze.set_defaults(func=cmd_analyze)
+
+    summarize = sub.add_parser('summarize', help='Tóm tắt trích xuất cho toàn kho văn bản')
+    summarize.add_argument('--workers', type=int, help='Số process (mặc định ANALYSIS_WORKERS)')
+    summarize.add_argument('--batch-size', type=int, help='Số văn bản mỗi lô (mặc định ANALYSIS_BATCH_SIZE)')
+    summarize.add_argument('--force', action='store_true', help='Tóm tắt lại cả văn bản không đổi')
+    summarize.set_defaults(func=cmd_summarize)
+
+    signatures = sub.add_parser('build-signatures', help='Tính chữ ký MinHash/LSH để phát hiện văn bản gần trùng')
+    signatures.add_argument('--workers', type=int, help='Số process (mặc định ANALYSIS_WORKERS)')
+    signatures.add_argument('--batch-size', type=int, help='Số văn bản mỗi lô (mặc định ANALYSIS_BATCH_SIZE)')
+    signatures.add_argument('--force', action='store_true', help='Tính lại cả văn bản không đổi')
+    signatures.set_defaults(func=cmd_build_signatures)
+
+    postings = sub.add_parser('build-postings', help='Dựng chỉ mục từ (posting list) cho truy vấn có cấu trúc')
+    postings.add_argument('--workers', type=int, help='Số process (mặc định ANALYSIS_WORKERS)')
+    postings.add_argument('--batch-size', type=int, help='Số văn bản mỗi lô (mặc định ANALYSIS_BATCH_SIZE)')
+    postings.add_argument('--force', action='store_true', help='Dựng lại cả văn bản không đổi')
+    postings.set_defaults(func=cmd_build_postings)
+
+    vectors = sub.add_parser('build-vectors', help='Tính vector từ cho văn bản liên quan (sau build-postings)')
+    vectors.add_argument('--batch-size', type=int, default=500)
+    vectors.add_argument('--force', action='store_true', help='Tính lại cả văn bản đã có vector (cập nhật idf)')
+    vectors.set_defaults(func=cmd_build_vectors)
+
+    classify = sub.add_parser('classify', help='Tự động gán document_type cho văn bản chưa phân loại')
+    classify.add_argument('--min-confidence', type=float,
+                          help='Ngưỡng độ tin cậy (mặc định DOCUMENT_TYPE_MIN_CONFIDENCE)')
+    classify.add_argument('--batch-size', type=int, default=500)
+    classify.add_argument('--force', action='store_true', help='Dự đoán lại cả nhãn do mô hình gán trước đó')
+    classify.set_defaults(func=cmd_classify)
+
+    metadata = sub.add_parser('extract-metadata', help='Trích số hiệu, ngày ban hành, nơi gửi/nhận từ nội dung')
+    metadata.add_argument('--batch-size', type=int, default=500)
+    metadata.set_defaults(func=cmd_extract_metadata)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    # Import app sau khi parse để --help không phải khởi tạo CSDL
+    from app import app
+
+    with app.app_context():
+        return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Metadata Service Module - Trích xuất thể thức văn bản hành chính
+Số hiệu ("Số: 123/QĐ-UBND"), ngày ban hành ("..., ngày 5 tháng 3 năm 2024"),
+cơ quan ban hành (dòng viết hoa đầu văn bản) và nơi nhận ("Kính gửi: ...")
+nằm ở phần đầu văn bản theo thể thức của Nghị định 30/2020/NĐ-CP. Các regex
+được biên dịch sẵn và chỉ chạy trên HEADER_CHARS ký tự đầu; kết quả điền vào
+các cột có index của documents khi người dùng để trống.
+"""
+
+import re
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+# Phần đầu văn bản chứa toàn bộ thể thức cần trích xuất
+HEADER_CHARS = 2000
+MAX_HEADER_LINES = 4  # Số dòng tối đa của tên cơ quan ban hành
+MAX_FIELD_CHARS = 255  # Độ dài cột sender/receiver
+
+METADATA_FIELDS = ('document_number', 'date_issued', 'sender', 'receiver')
+
+# "Số: 123/QĐ-UBND", "Số 45/2024/NĐ-CP" đầu dòng, "Số: HĐLĐ-2024-0001", "Số: 01-CV" -
+# số hiệu có chữ số và ít nhất một dấu '/' hoặc '-'; "Quyết định số 12/..." giữa
+# câu là văn bản được viện dẫn, không phải số hiệu
+_NUMBER_RE = re.compile(r'(?:^[ \t]*Số\s*:?|\bSố\s*:)\s*((?=[\w./-]*\d)[\w.]+(?:[/-][\w.]+)+)', re.MULTILINE)
+_LONG_DATE_RE = re.compile(r'ngày\s+(\d{1,2})\s+tháng\s+(\d{1,2})\s+năm\s+(\d{4})', re.IGNORECASE)
+_SHORT_DATE_RE = re.compile(r'ngày\s+(\d{1,2})/(\d{1,2})/(\d{4})', re.IGNORECASE)
+_RECIPIENT_RE = re.compile(r'^\s*Kính\s+gửi\s*:?[ \t]*(.*)$', re.MULTILINE | re.IGNORECASE)
+_LIST_ITEM_RE = re.compile(r'^\s*[-+•]\s*(.+)$')
+# Quốc hiệu nằm cùng dòng với tên cơ quan khi trích text từ bảng 2 cột
+_NATIONAL_RE = re.compile(r'CỘNG\s+HOÀ|CỘNG\s+HÒA|Độc\s+lập', re.IGNORECASE)
+_HEADER_END_RE = re.compile(r'^\s*(?:Số\b|Kính\s+gửi|V/v)', re.IGNORECASE)
+_SPACE_RE = re.compile(r'\s+')
+
+
+def _clean(value: str) -> Optional[str]:
+    value = _SPACE_RE.sub(' ', value).strip(' .;,')
+    return value[:MAX_FIELD_CHARS] if value else None
+
+
+def _date(day: str, month: str, year: str) -> Optional[datetime]:
+    try:
+        return datetime(int(year), int(month), int(day))
+    except ValueError:
+        return None
+
+
+def _issuer(lines) -> Optional[str]:
+    """Tên cơ quan ban hành: các dòng viết hoa trước "Số:" / "Kính gửi" (bỏ quốc hiệu)"""
+    parts = []
+    for line in lines:
+        if _HEADER_END_RE.match(line):
+            break
+        match = _NATIONAL_RE.search(line)
+        left = line[:match.start()] if match else line
+        left = left.strip()
+        if not left:
+            if parts and not match:
+                break
+            continue
+        if not left.isupper():
+            break
+        parts.append(left)
+        if len(parts) >= MAX_HEADER_LINES:
+            break
+    return _clean(' '.join(parts)) if parts else None
+
+
+def _recipient(header: str) -> Optional[str]:
+    """Nơi nhận sau "Kính gửi:" - cùng dòng hoặc danh sách gạch đầu dòng bên dưới"""
+    match = _RECIPIENT_RE.search(header)
+    if match is None:
+        return None
+    if match.group(1).strip():
+        return _clean(match.group(1))
+    items = []
+    for line in header[match.end():].lstrip('\r\n').splitlines():
+        item = _LIST_ITEM_RE.match(line)
+        if item is None:
+            break
+        items.append(item.group(1).strip(' .;,'))
+    return _clean('; '.join(items)) if items else None
+
+
+def extract_metadata(text: Optional[str]) -> Dict[str, Any]:
+    """
+    Trích xuất thể thức từ phần đầu văn bản
+
+    Args:
+        text: Nội dung văn bản (chỉ HEADER_CHARS ký tự đầu được đọc)
+
+    Returns:
+        Dict chỉ gồm các trường tìm thấy: document_number, date_issued
+        (datetime), sender, receiver
+    """
+    header = (text or '')[:HEADER_CHARS]
+    if not header:
+        return {}
+
+    metadata: Dict[str, Any] = {}
+    match = _NUMBER_RE.search(header)
+    if match:
+        metadata['document_number'] = match.group(1).rstrip('.')
+    match = _LONG_DATE_RE.search(header) or _SHORT_DATE_RE.search(header)
+    if match:
+        issued = _date(*match.groups())
+        if issued is not None:
+            metadata['date_issued'] = issued
+    sender = _issuer(header.splitlines()[:MAX_HEADER_LINES * 3])
+    if sender:
+        metadata['sender'] = sender
+    receiver = _recipient(header)
+    if receiver:
+        metadata['receiver'] = receiver
+    return metadata
+
+
+def fill_missing(values: Dict[str, Any], text: Optional[str]) -> Dict[str, Any]:
+    """
+    Điền các trường thể thức còn trống (None / '') bằng giá trị trích xuất
+
+    Returns:
+        Dict các trường đã được điền
+    """
+    missing = [field for field in METADATA_FIELDS if not values.get(field)]
+    if not missing:
+        return {}
+    extracted = extract_metadata(text)
+    filled = {field: extracted[field] for field in missing if field in extracted}
+    values.update(filled)
+    return filled
+
+
+def extract_corpus(batch_size: int = 500) -> Dict[str, int]:
+    """
+    Điền thể thức cho các văn bản cũ còn thiếu trường (không ghi đè giá trị có sẵn)
+
+    Chỉ đọc các văn bản thiếu ít nhất một trường, và chỉ HEADER_CHARS ký tự đầu.
+
+    Returns:
+        Dict {scanned, updated} và số giá trị đã điền của từng trường
+    """
+    from models import db, Document
+    from lookup_service import document_number_key
+
+    stats = {'scanned': 0, 'updated': 0, **{field: 0 for field in METADATA_FIELDS}}
+    columns = [getattr(Document, field) for field in METADATA_FIELDS]
+    last_pk = 0
+    while True:
+        rows = db.session.execute(
+            db.select(Document.pk, *columns, db.func.substr(Document.content, 1, HEADER_CHARS).label('header'))
+            .where(Document.pk > last_pk, db.or_(*(column.is_(None) for column in columns)))
+            .order_by(Document.pk)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_pk = rows[-1].pk
+        stats['scanned'] += len(rows)
+
+        now = datetime.utcnow()
+        groups: Dict[tuple, list] = {}
+        for row in rows:
+            filled = fill_missing({field: getattr(row, field) for field in METADATA_FIELDS}, row.header)
+            if not filled:
+                continue
+            for field in filled:
+                stats[field] += 1
+            if 'document_number' in filled:
+                filled['document_number_key'] = document_number_key(filled['document_number'])
+            # executemany cần cùng tập cột trong một lệnh
+            groups.setdefault(tuple(sorted(filled)), []).append(dict(filled, pk=row.pk, updated_at=now))
+
+        if groups:
+            for params in groups.values():
+                db.session.execute(db.update(Document), params)
+                stats['updated'] += len(params)
+            db.session.commit()
+    return stats
+
+
+# Export
+__all__ = ['extract_metadata', 'fill_missing', 'extract_corpus', 'METADATA_FIELDS']
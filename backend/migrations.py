@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Migrations Module - Nâng cấp cấu trúc CSDL SQLite đã có
+db.create_all() chỉ tạo bảng mới, không sửa bảng cũ, nên các thay đổi
+schema cho CSDL hiện hữu được thực hiện ở đây (idempotent, chạy khi khởi động).
+"""
+
+import logging
+
+from sqlalchemy import inspect, text
+
+from models import (
+    db, Document, Attachment, ChatMessage, DocumentAnalysis, DocumentEntity, DocumentSummary,
+    DocumentSignature, DocumentBand, DocumentTermIndex, DocumentPosting,
+    DocumentTermVector,
+)
+from lookup_service import document_number_key
+
+logger = logging.getLogger(__name__)
+
+# Bảng được kiểm tra cột/index mới (bảng chưa có do db.create_all() tạo)
+MODEL_TABLES = (
+    Document.__table__, Attachment.__table__, ChatMessage.__table__,
+    DocumentAnalysis.__table__, DocumentEntity.__table__, DocumentSummary.__table__,
+    DocumentSignature.__table__, DocumentBand.__table__,
+    DocumentTermIndex.__table__, DocumentPosting.__table__, DocumentTermVector.__table__,
+)
+
+
+def _columns(conn, table_name):
+    """Danh sách tên cột hiện có của một bảng"""
+    return [col['name'] for col in inspect(conn).get_columns(table_name)]
+
+
+def _has_table(conn, table_name):
+    return inspect(conn).has_table(table_name)
+
+
+# ============ INTEGER SURROGATE KEYS ============
+
+def needs_integer_keys(conn):
+    """Bảng documents cũ dùng UUID text làm khoá chính (chưa có cột pk)"""
+    return _has_table(conn, 'documents') and 'pk' not in _columns(conn, 'documents')
+
+
+def migrate_integer_keys(conn):
+    """
+    Chuyển khoá chính sang INTEGER (rowid), giữ UUID làm định danh công khai
+
+    SQLite không đổi được khoá chính bằng ALTER TABLE nên mỗi bảng được dựng
+    lại: đổi tên bảng cũ, tạo bảng mới theo model, chép dữ liệu rồi xoá bảng cũ.
+    attachments.document_id (UUID) được thay bằng attachments.document_pk.
+
+    Args:
+        conn: Connection đang mở trong một transaction
+    """
+    tables = [Document.__table__, Attachment.__table__, ChatMessage.__table__]
+    existing = [t for t in tables if _has_table(conn, t.name)]
+
+    for table in existing:
+        conn.execute(text(f'ALTER TABLE {table.name} RENAME TO _legacy_{table.name}'))
+    # Index cũ vẫn gắn với bảng đã đổi tên, xoá để tránh trùng tên
+    for table in existing:
+        for index in inspect(conn).get_indexes(f'_legacy_{table.name}'):
+            conn.execute(text(f'DROP INDEX IF EXISTS {index["name"]}'))
+
+    db.metadata.create_all(conn, tables=tables)
+
+    for table in existing:
+        legacy = f'_legacy_{table.name}'
+        old_columns = set(_columns(conn, legacy))
+        shared = [c.name for c in table.columns if c.name in old_columns]
+
+        if table is Attachment.__table__:
+            select_cols = ', '.join(f'a.{c}' for c in shared)
+            conn.execute(text(
+                f'INSERT INTO attachments ({", ".join(shared)}, document_pk) '
+                f'SELECT {select_cols}, d.pk FROM {legacy} a '
+                f'JOIN documents d ON d.id = a.document_id '
+                f'ORDER BY a.created_at'
+            ))
+        else:
+            conn.execute(text(
+                f'INSERT INTO {table.name} ({", ".join(shared)}) '
+                f'SELECT {", ".join(shared)} FROM {legacy} ORDER BY created_at'
+            ))
+
+    for table in reversed(existing):
+        conn.execute(text(f'DROP TABLE _legacy_{table.name}'))
+
+
+# ============ NEW NULLABLE COLUMNS ============
+
+def _missing_columns(conn):
+    """Các cột nullable có trong model nhưng chưa có trong bảng"""
+    missing = []
+    for table in MODEL_TABLES:
+        if not _has_table(conn, table.name):
+            continue
+        existing = set(_columns(conn, table.name))
+        missing.extend(
+            (table, column) for column in table.columns
+            if column.name not in existing and column.nullable
+        )
+    return missing
+
+
+def needs_new_columns(conn):
+    return bool(_missing_columns(conn))
+
+
+def migrate_new_columns(conn):
+    """Thêm các cột nullable mới (ví dụ file_hash) bằng ALTER TABLE ADD COLUMN"""
+    for table, column in _missing_columns(conn):
+        column_type = column.type.compile(dialect=conn.dialect)
+        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+
+
+# ============ INDEXES ============
+
+def _missing_indexes(conn):
+    """Index khai báo trong model nhưng chưa có trong CSDL"""
+    missing = []
+    for table in MODEL_TABLES:
+        if not _has_table(conn, table.name):
+            continue
+        existing = {index['name'] for index in inspect(conn).get_indexes(table.name)}
+        missing.extend(index for index in table.indexes if index.name not in existing)
+    return missing
+
+
+def needs_indexes(conn):
+    return bool(_missing_indexes(conn))
+
+
+def create_indexes(conn):
+    """Tạo các index mới (create_all không thêm index cho bảng đã có)"""
+    for index in _missing_indexes(conn):
+        index.create(conn, checkfirst=True)
+
+
+# ============ DOCUMENT NUMBER KEYS ============
+
+def needs_document_number_keys(conn):
+    if not _has_table(conn, 'documents') or 'document_number_key' not in _columns(conn, 'documents'):
+        return False
+    return conn.execute(text(
+        'SELECT 1 FROM documents WHERE document_number IS NOT NULL AND document_number_key IS NULL LIMIT 1'
+    )).first() is not None
+
+
+def migrate_document_number_keys(conn):
+    """
+    Điền số hiệu chuẩn hoá cho văn bản có trước cột document_number_key
+
+    Số hiệu không có khoá ('' của dữ liệu cũ, chỉ gồm dấu phân cách) giữ
+    nguyên, khoá là NO_KEY để lần khởi động sau không migrate lại.
+    """
+    rows = conn.execute(text(
+        'SELECT pk, document_number FROM documents '
+        'WHERE document_number IS NOT NULL AND document_number_key IS NULL'
+    )).all()
+    if rows:
+        conn.execute(text('UPDATE documents SET document_number_key = :key WHERE pk = :pk'),
+                     [{'pk': pk, 'key': document_number_key(number)} for pk, number in rows])
+
+
+# ============ RUNNER ============
+
+MIGRATIONS = [
+    ('integer_surrogate_keys', needs_integer_keys, migrate_integer_keys),
+    ('new_nullable_columns', needs_new_columns, migrate_new_columns),
+    ('model_indexes', needs_indexes, create_indexes),
+    ('document_number_keys', needs_document_number_keys, migrate_document_number_keys),
+]
+
+
+def run_migrations(engine=None):
+    """
+    Chạy các migration còn thiếu (mỗi migration trong một transaction)
+
+    Args:
+        engine: SQLAlchemy engine (mặc định db.engine của app hiện tại)
+
+    Returns:
+        Danh sách tên migration đã chạy
+    """
+    engine = engine or db.engine
+    applied = []
+
+    for name, is_needed, migrate in MIGRATIONS:
+        with engine.begin() as conn:
+            if not is_needed(conn):
+                continue
+            logger.info(f"Running migration: {name}")
+            migrate(conn)
+            applied.append(name)
+
+    return applied
+
+
+# Export
+__all__ = ['run_migrations', 'MIGRATIONS']
@@ -8,30 +8,43 @@ db = SQLAlchemy()
 class Document(db.Model):
     """Model cho các tài liệu/công văn"""
     __tablename__ = 'documents'
-
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    __table_args__ = (
+        # Index phủ cho truy vấn thống kê gộp (GROUP BY document_type) - không đọc bảng
+        db.Index('ix_documents_type_created_size', 'document_type', 'created_at', 'file_size'),
+    )
+
+    # Khoá nội bộ (rowid) cho join/index; UUID là định danh công khai của API
+    pk = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
     title = db.Column(db.String(255), nullable=False)
     content = db.Column(db.Text, nullable=True)
 
     # Thông tin công văn
     document_type = db.Column(db.String(100), nullable=True)
-    document_number = db.Column(db.String(100), nullable=True)
-    sender = db.Column(db.String(255), nullable=True)
-    receiver = db.Column(db.String(255), nullable=True)
+    # Có giá trị: document_type do classifier_service dự đoán (không dùng để huấn luyện)
+    document_type_confidence = db.Column(db.Float, nullable=True)
+    # Thể thức: người dùng nhập hoặc metadata_service trích xuất lúc ingest (có index)
+    document_number = db.Column(db.String(100), nullable=True, index=True)
+    # Số hiệu chuẩn hoá cho tra cứu chính xác (lookup_service.document_number_key; '' khi không có khoá)
+    document_number_key = db.Column(db.String(100), nullable=True, index=True)
+    sender = db.Column(db.String(255), nullable=True, index=True)
+    receiver = db.Column(db.String(255), nullable=True, index=True)
     date_received = db.Column(db.DateTime, nullable=True)
-    date_issued = db.Column(db.DateTime, nullable=True)
+    date_issued = db.Column(db.DateTime, nullable=True, index=True)
 
     # File
     file_path = db.Column(db.String(500), nullable=True)
     file_name = db.Column(db.String(255), nullable=True)
     file_size = db.Column(db.Integer, nullable=True)
     file_type = db.Column(db.String(50), nullable=True)
+    file_hash = db.Column(db.String(64), nullable=True)  # SHA-256 nội dung file (ETag / ?v=)
 
     # Metadata
     json_data = db.Column(db.JSON, nullable=True)
     # Tracking
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    # MAX(updated_at) qua index: suggest_service phát hiện văn bản bị sửa ở worker khác
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     # Quan hệ
     attachments = db.relationship('Attachment', backref='document', lazy=True, cascade='all, delete-orphan')
@@ -42,6 +55,7 @@ class Document(db.Model):
             'title': self.title,
             'content': self.content[:200] + '...' if self.content and len(self.content) > 200 else self.content,
             'document_type': self.document_type,
+            'document_type_confidence': self.document_type_confidence,
             'document_number': self.document_number,
             'sender': self.sender,
             'receiver': self.receiver,
@@ -49,7 +63,8 @@ class Document(db.Model):
             'date_issued': self.date_issued.isoformat() if self.date_issued else None,
             'file_name': self.file_name,
             'file_size': self.file_size,
-            'metadata': self.metadata,
+            'file_hash': self.file_hash,
+            'metadata': self.json_data,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat(),
             'attachments': [a.to_dict() for a in self.attachments]
@@ -60,13 +75,15 @@ class Attachment(db.Model):
     """Model cho các file đính kèm"""
     __tablename__ = 'attachments'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    document_id = db.Column(db.String(36), db.ForeignKey('documents.id'), nullable=False)
+    pk = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), nullable=False, index=True)
 
     filename = db.Column(db.String(255), nullable=False)
     file_path = db.Column(db.String(500), nullable=False)
     file_size = db.Column(db.Integer, nullable=True)
     file_type = db.Column(db.String(50), nullable=True)
+    file_hash = db.Column(db.String(64), nullable=True)
     json_data = db.Column(db.JSON, nullable=True)  # Lưu nội dung extracted + thông tin khác
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -77,34 +94,122 @@ class Attachment(db.Model):
             'filename': self.filename,
             'file_size': self.file_size,
             'file_type': self.file_type,
-            'metadata': self.metadata,
+            'file_hash': self.file_hash,
             'created_at': self.created_at.isoformat()
-        }.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+        }
 
-    document_id = db.Column(db.String(36), db.ForeignKey('documents.id'), nullable=False)
 
-    filename = db.Column(db.String(255), nullable=False)
-    file_path = db.Column(db.String(500), nullable=False)
-    file_size = db.Column(db.Integer, nullable=True)
-    file_type = db.Column(db.String(50), nullable=True)
+class DocumentAnalysis(db.Model):
+    """Kết quả phân tích (cảm xúc, thực thể) của một văn bản - analysis_service"""
+    __tablename__ = 'document_analysis'
 
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True)
+    # Hash của nội dung + phiên bản bộ phân tích: bằng nhau thì không phân tích lại
+    content_hash = db.Column(db.String(64), nullable=False)
+    sentiment = db.Column(db.String(10), nullable=False, index=True)
+    sentiment_score = db.Column(db.Float, nullable=False, default=0)
+    positive_indicators = db.Column(db.Integer, nullable=False, default=0)
+    negative_indicators = db.Column(db.Integer, nullable=False, default=0)
+    entity_count = db.Column(db.Integer, nullable=False, default=0)
+
+    analyzed_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
         return {
-            'id': self.id,
-            'filename': self.filename,
-            'file_size': self.file_size,
-            'file_type': self.file_type,
-            'created_at': self.created_at.isoformat()
+            'sentiment': self.sentiment,
+            'score': self.sentiment_score,
+            'positive_indicators': self.positive_indicators,
+            'negative_indicators': self.negative_indicators,
+            'entity_count': self.entity_count,
+            'analyzed_at': self.analyzed_at.isoformat() if self.analyzed_at else None
         }
 
 
+class DocumentEntity(db.Model):
+    """Thực thể trích xuất từ văn bản (ngày, số công văn, tổ chức)"""
+    __tablename__ = 'document_entities'
+
+    pk = db.Column(db.Integer, primary_key=True)
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # date | document_number | organization
+    value = db.Column(db.String(255), nullable=False)
+    # Dạng chuẩn hoá để lọc: chữ thường, ngày ISO, số hiệu bỏ khoảng trắng
+    normalized = db.Column(db.String(255), nullable=False)
+
+    # Lọc tìm kiếm "văn bản nhắc tới X" là range scan trên index này
+    __table_args__ = (
+        db.Index('ix_document_entities_kind_normalized', 'kind', 'normalized', 'document_pk'),
+    )
+
+    def to_dict(self):
+        return {'kind': self.kind, 'value': self.value}
+
+
+class DocumentSummary(db.Model):
+    """Tóm tắt trích xuất của một văn bản - summary_service"""
+    __tablename__ = 'document_summaries'
+
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True)
+    # Hash của nội dung + phiên bản/độ dài tóm tắt: bằng nhau thì không tóm tắt lại
+    content_hash = db.Column(db.String(64), nullable=False)
+    summary = db.Column(db.Text, nullable=False)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class DocumentSignature(db.Model):
+    """Chữ ký MinHash của một văn bản (array 32-bit dạng bytes) - dedup_service"""
+    __tablename__ = 'document_signatures'
+
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    signature = db.Column(db.LargeBinary, nullable=False)  # Rỗng: văn bản không có nội dung
+
+
+class DocumentBand(db.Model):
+    """Bucket LSH của từng dải chữ ký: văn bản chung bucket là ứng viên gần trùng"""
+    __tablename__ = 'document_lsh_bands'
+
+    # Khoá chính (bucket, document_pk) là index cho truy vấn bucket IN (...)
+    bucket = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True, index=True)
+
+
+class DocumentTermIndex(db.Model):
+    """Trạng thái chỉ mục từ của một văn bản (hash nội dung, số từ) - query_service"""
+    __tablename__ = 'document_term_index'
+
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    length = db.Column(db.Integer, nullable=False, default=0)  # Số từ của nội dung
+
+
+class DocumentPosting(db.Model):
+    """Posting list: văn bản chứa từ, số lần xuất hiện và vị trí (array 32-bit dạng bytes)"""
+    __tablename__ = 'document_postings'
+
+    # Khoá chính (term, document_pk) là index cho đọc posting list của một từ
+    term = db.Column(db.String(64), primary_key=True)
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True, index=True)
+    frequency = db.Column(db.Integer, nullable=False)
+    positions = db.Column(db.LargeBinary, nullable=False)
+
+
+class DocumentTermVector(db.Model):
+    """Vector từ thưa (top-N từ theo tf-idf, chuẩn hoá độ dài 1) - related_service"""
+    __tablename__ = 'document_term_vectors'
+
+    document_pk = db.Column(db.Integer, db.ForeignKey('documents.pk'), primary_key=True)
+    terms = db.Column(db.JSON, nullable=False)  # {từ: trọng số}
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
 class ChatMessage(db.Model):
     """Model cho lịch sử chat"""
     __tablename__ = 'chat_messages'
 
-    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    pk = db.Column(db.Integer, primary_key=True)
+    id = db.Column(db.String(36), unique=True, nullable=False, default=lambda: str(uuid.uuid4()))
     session_id = db.Column(db.String(36), nullable=False)
     user_message = db.Column(db.Text, nullable=False)
     ai_response = db.Column(db.Text, nullable=False)
@@ -112,6 +217,11 @@ class ChatMessage(db.Model):
 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Lịch sử theo session (nạp lại bộ nhớ hội thoại) đọc theo index này
+    __table_args__ = (
+        db.Index('ix_chat_messages_session_created', 'session_id', 'created_at'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
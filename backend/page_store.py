@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Page Store Module - Lưu nội dung văn bản theo trang
+Mỗi văn bản là một file blob (PAGE_STORE_FOLDER/<doc_id>.pages) gồm bảng
+offset và text UTF-8 của từng trang. Đọc bằng mmap nên lấy một đoạn trang
+không phải nạp toàn bộ nội dung.
+
+Cấu trúc file:
+    MAGIC (4 byte) | số trang n (uint32)
+    n+1 offset byte của từng trang trong vùng dữ liệu (uint64)
+    n+1 vị trí ký tự bắt đầu của từng trang trong Document.content (uint64)
+    dữ liệu UTF-8 của các trang nối liền nhau
+"""
+
+import mmap
+import os
+import struct
+from bisect import bisect_right
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+MAGIC = b'PGS1'
+HEADER = struct.Struct('<4sI')
+OFFSET_SIZE = struct.calcsize('<Q')
+
+# Document.content = PAGE_SEPARATOR.join(pages)
+PAGE_SEPARATOR = '\n'
+
+
+class PageStore:
+    """Kho text theo trang, một file blob cho mỗi văn bản"""
+
+    def __init__(self, root: Optional[str] = None):
+        self.root = root
+
+    def init_app(self, app):
+        """Gắn thư mục lưu từ cấu hình app (PAGE_STORE_FOLDER)"""
+        self.root = app.config.get('PAGE_STORE_FOLDER')
+        if self.root:
+            os.makedirs(self.root, exist_ok=True)
+
+    def path(self, doc_id: str) -> Optional[str]:
+        """Đường dẫn file blob của văn bản (None nếu chưa cấu hình)"""
+        if not self.root:
+            return None
+        return os.path.join(self.root, f'{doc_id}.pages')
+
+    # ============ WRITE ============
+
+    def write(self, doc_id: str, pages: List[str]) -> Optional[str]:
+        """
+        Ghi (hoặc ghi đè) các trang của một văn bản
+
+        Ghi ra file tạm rồi os.replace() nên người đọc đang mmap file cũ
+        không bị ảnh hưởng.
+
+        Returns:
+            Đường dẫn file blob, None nếu chưa cấu hình kho
+        """
+        path = self.path(doc_id)
+        if path is None:
+            return None
+
+        encoded = [page.encode('utf-8') for page in pages]
+        byte_offsets = [0]
+        char_starts = [0]
+        for page, data in zip(pages, encoded):
+            byte_offsets.append(byte_offsets[-1] + len(data))
+            char_starts.append(char_starts[-1] + len(page) + len(PAGE_SEPARATOR))
+        if pages:
+            # Trang cuối không có separator phía sau
+            char_starts[-1] -= len(PAGE_SEPARATOR)
+
+        count = len(pages)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, count))
+            f.write(struct.pack(f'<{count + 1}Q', *byte_offsets))
+            f.write(struct.pack(f'<{count + 1}Q', *char_starts))
+            for data in encoded:
+                f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def delete(self, doc_id: str) -> None:
+        path = self.path(doc_id)
+        if path is not None:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # ============ READ ============
+
+    @contextmanager
+    def _open(self, doc_id: str) -> Iterator[Optional[Tuple[mmap.mmap, int]]]:
+        """mmap file blob; trả về (mmap, số trang) hoặc None nếu không có"""
+        path = self.path(doc_id)
+        if path is None:
+            yield None
+            return
+        try:
+            f = open(path, 'rb')
+        except FileNotFoundError:
+            yield None
+            return
+        with f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, count = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f'Invalid page store file: {path}')
+            yield mm, count
+
+    @staticmethod
+    def _data_start(count: int) -> int:
+        return HEADER.size + 2 * (count + 1) * OFFSET_SIZE
+
+    def page_count(self, doc_id: str) -> Optional[int]:
+        """Số trang (None nếu văn bản chưa có trong kho)"""
+        with self._open(doc_id) as opened:
+            return None if opened is None else opened[1]
+
+    def read_pages(self, doc_id: str, first: int, last: int) -> Optional[List[str]]:
+        """
+        Đọc các trang first..last (đánh số từ 1, gồm cả last)
+
+        Chỉ giải mã đúng vùng byte của các trang được yêu cầu.
+
+        Returns:
+            Danh sách text từng trang (bị cắt theo số trang thực tế),
+            None nếu văn bản chưa có trong kho
+        """
+        with self._open(doc_id) as opened:
+            if opened is None:
+                return None
+            mm, count = opened
+            first = max(first, 1)
+            last = min(last, count)
+            if first > last:
+                return []
+            # Chỉ đọc phần bảng offset của các trang cần lấy
+            offsets = struct.unpack_from(f'<{last - first + 2}Q', mm, HEADER.size + (first - 1) * OFFSET_SIZE)
+            data_start = self._data_start(count)
+            return [
+                mm[data_start + offsets[i]:data_start + offsets[i + 1]].decode('utf-8')
+                for i in range(len(offsets) - 1)
+            ]
+
+    def pages_of(self, doc_id: str, char_indexes: List[int]) -> List[Optional[int]]:
+        """
+        Số trang (từ 1) chứa từng vị trí ký tự của Document.content
+
+        Chỉ đọc bảng offset ký tự (mở file một lần cho cả danh sách).
+
+        Returns:
+            Danh sách số trang tương ứng; None nếu văn bản chưa có trong kho
+            hoặc vị trí nằm ngoài nội dung
+        """
+        with self._open(doc_id) as opened:
+            if opened is None or opened[1] == 0:
+                return [None] * len(char_indexes)
+            mm, count = opened
+            char_starts = struct.unpack_from(f'<{count + 1}Q', mm, HEADER.size + (count + 1) * OFFSET_SIZE)
+            return [
+                bisect_right(char_starts, index, 0, count) if 0 <= index < char_starts[-1] else None
+                for index in char_indexes
+            ]
+
+    def page_of(self, doc_id: str, char_index: int) -> Optional[int]:
+        """Số trang (từ 1) chứa vị trí ký tự char_index của Document.content"""
+        return self.pages_of(doc_id, [char_index])[0]
+
+
+page_store = PageStore()
+
+
+# Export
+__all__ = ['PageStore', 'page_store', 'PAGE_SEPARATOR']
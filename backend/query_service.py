@@ -0,0 +1,541 @@
+#!/usr/bin/env python3
+"""
+Query Service Module - Truy vấn có cấu trúc trên chỉ mục từ (posting list)
+Truy vấn như  sender:"Ban Nhân Sự" type:"Quyết định" nghỉ hè -2023 after:2024-01-01
+được phân tích thành các mệnh đề và biên dịch thành kế hoạch thực thi, bước
+chọn lọc nhất trước: bộ lọc SQL trên cột có index và posting list của các từ
+xếp theo số văn bản ước lượng (bộ lọc SQL đếm bằng COUNT có LIMIT), kiểm tra
+cụm từ "..." bằng vị trí từ, rồi loại các văn bản khớp mệnh đề phủ định.
+Mỗi văn bản lưu posting (từ, số lần, vị trí) trong document_postings nên
+không phải đọc nội dung cả kho; explain trả về kế hoạch kèm số ứng viên và
+thời gian từng bước.
+"""
+
+import re
+import time
+import unicodedata
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from analysis_service import content_hash, process_corpus
+from serializers import IN_CHUNK_SIZE
+
+# Đổi khi thay cách tách từ để lần chạy sau dựng lại toàn bộ chỉ mục
+INDEX_VERSION = 'postings-1'
+MAX_TERM_LENGTH = 64  # Độ dài cột term; từ dài hơn (chuỗi mã, base64) không được index
+TERM_SCORE = 10  # Điểm mỗi lần xuất hiện của từ (như tìm kiếm toàn văn)
+PHRASE_SCORE = 20  # Điểm thêm mỗi lần xuất hiện của cả cụm từ
+SNIPPET_BEFORE = 50
+SNIPPET_AFTER = 100
+
+# Trường -> cột Document; after/before so với ngày ban hành
+TEXT_FIELDS = ('sender', 'receiver', 'title')
+FIELDS = TEXT_FIELDS + ('type', 'number', 'after', 'before')
+
+_WORD_RE = re.compile(r'\w+')
+# [-][trường:]("cụm từ" | từ); dấu " không đóng lấy đến hết truy vấn
+_CLAUSE_RE = re.compile(r'(-?)(?:([A-Za-z]+):)?(?:"([^"]*)"?|(\S+))')
+_DATE_RE = re.compile(r'^(\d{4})(?:-(\d{1,2})(?:-(\d{1,2}))?)?$')
+
+
+class QuerySyntaxError(ValueError):
+    """Truy vấn có cấu trúc không hợp lệ"""
+
+
+# ============ TOKENIZER ============
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Các từ (chữ thường, Unicode NFC) theo thứ tự xuất hiện - dùng chung cho index và truy vấn"""
+    if not text:
+        return []
+    return _WORD_RE.findall(unicodedata.normalize('NFC', text).lower())
+
+
+def postings(content: Optional[str]) -> Tuple[int, Dict[str, array]]:
+    """
+    Posting của một văn bản
+
+    Returns:
+        (số từ, dict từ -> array('I') vị trí từ trong nội dung)
+    """
+    words = tokenize(content)
+    terms: Dict[str, array] = {}
+    for position, word in enumerate(words):
+        if len(word) > MAX_TERM_LENGTH:
+            continue
+        positions = terms.get(word)
+        if positions is None:
+            positions = terms[word] = array('I')
+        positions.append(position)
+    return len(words), terms
+
+
+def posting_item(item: Tuple[int, str]) -> Tuple[int, Tuple[int, List[Tuple[str, int, bytes]]]]:
+    """Posting của một văn bản dạng ghi được (chạy trong process con của pool)"""
+    pk, content = item
+    length, terms = postings(content)
+    return pk, (length, [(term, len(positions), positions.tobytes()) for term, positions in terms.items()])
+
+
+# ============ STORAGE ============
+
+def store_postings(results: List[Tuple[int, Tuple[int, List[Tuple[str, int, bytes]]]]],
+                   hashes: Dict[int, str]) -> int:
+    """
+    Thay posting của các văn bản (trong transaction hiện tại)
+
+    Returns:
+        Số posting đã ghi
+    """
+    from models import db, DocumentTermIndex, DocumentPosting
+
+    pks = [pk for pk, _ in results]
+    db.session.execute(db.delete(DocumentPosting).where(DocumentPosting.document_pk.in_(pks)))
+    db.session.execute(db.delete(DocumentTermIndex).where(DocumentTermIndex.document_pk.in_(pks)))
+
+    db.session.execute(DocumentTermIndex.__table__.insert(), [
+        {'document_pk': pk, 'content_hash': hashes[pk], 'length': length}
+        for pk, (length, _) in results
+    ])
+    rows = [
+        {'term': term, 'document_pk': pk, 'frequency': frequency, 'positions': raw}
+        for pk, (_, terms) in results
+        for term, frequency, raw in terms
+    ]
+    if rows:
+        db.session.execute(DocumentPosting.__table__.insert(), rows)
+    return len(rows)
+
+
+def index_document(document_pk: int, content: Optional[str]) -> int:
+    """Ghi posting của một văn bản (luồng upload, trong transaction hiện tại)"""
+    return store_postings([posting_item((document_pk, content or ''))],
+                          {document_pk: content_hash(content, INDEX_VERSION)})
+
+
+def build_postings(workers: int = 1, batch_size: int = 500, force: bool = False) -> Dict[str, int]:
+    """
+    Dựng posting cho văn bản chưa có (hoặc nội dung đã đổi)
+
+    Returns:
+        Dict {indexed, skipped, postings}
+    """
+    from models import DocumentTermIndex
+
+    stats = process_corpus(DocumentTermIndex, INDEX_VERSION, posting_item, store_postings,
+                           workers=workers, batch_size=batch_size, force=force)
+    return {'indexed': stats['processed'], 'skipped': stats['skipped'], 'postings': stats['stored']}
+
+
+# ============ PARSER ============
+
+def parse_query(query: str) -> List[Dict[str, Any]]:
+    """
+    Tách truy vấn thành các mệnh đề
+
+    Tiền tố không phải tên trường ("Số:15") được giữ nguyên là từ khoá. Từ
+    khoá tách ra nhiều từ ("15/2024", "nghỉ hè" trong ngoặc kép) là cụm từ.
+
+    Returns:
+        Danh sách {field (None = nội dung), value, negated, words}
+    """
+    clauses = []
+    for match in _CLAUSE_RE.finditer(query or ''):
+        negated, field, quoted, bare = match.groups()
+        field = field.lower() if field else None
+        if field not in FIELDS:
+            # Không phải trường: cả cụm (kể cả "xxx:") là từ khoá
+            field = None
+            value = quoted if quoted is not None else match.group(0)[len(negated):]
+        else:
+            value = quoted if quoted is not None else bare
+        if value is None:
+            continue
+        value = value.strip()
+        words = tokenize(value) if field is None else []
+        if not value or (field is None and not words):
+            continue
+        clauses.append({'field': field, 'value': value, 'negated': bool(negated),
+                        'quoted': quoted is not None, 'words': words})
+    return clauses
+
+
+def is_structured(query: Optional[str]) -> bool:
+    """Truy vấn dùng cú pháp có cấu trúc (trường, cụm từ trong ngoặc kép hoặc phủ định)"""
+    if not query:
+        return False
+    return any(clause['field'] or clause['negated'] or clause['quoted'] for clause in parse_query(query))
+
+
+def _parse_date(field: str, value: str) -> datetime:
+    match = _DATE_RE.match(value)
+    if match is None:
+        raise QuerySyntaxError(f'{field}: expects a date YYYY-MM-DD, YYYY-MM or YYYY, got {value!r}')
+    year, month, day = match.groups()
+    try:
+        return datetime(int(year), int(month or 1), int(day or 1))
+    except ValueError:
+        raise QuerySyntaxError(f'{field}: invalid date {value!r}')
+
+
+def _condition(clause: Dict[str, Any]):
+    """Điều kiện SQL của một mệnh đề trường"""
+    from models import Document
+    from classifier_service import normalize_label
+    from lookup_service import normalize_document_number
+
+    field, value = clause['field'], clause['value']
+    if field in TEXT_FIELDS:
+        column = getattr(Document, field)
+        condition = column.icontains(value, autoescape=True)
+    elif field == 'type':
+        column = Document.document_type
+        condition = column == normalize_label(value)
+    elif field == 'number':
+        key = normalize_document_number(value)
+        if key is None:
+            # Không có khoá: so với NULL sẽ trả về mọi văn bản chưa có số hiệu
+            raise QuerySyntaxError(f'number: expects a document number, got {value!r}')
+        column = Document.document_number_key
+        condition = column == key
+    elif field == 'after':
+        column = Document.date_issued
+        condition = column >= _parse_date(field, value)
+    else:
+        column = Document.date_issued
+        condition = column < _parse_date(field, value)
+
+    if clause['negated']:
+        # Văn bản không có giá trị (NULL) cũng thoả "không phải X"
+        return column.is_(None) | ~condition
+    return condition
+
+
+def _describe(clause: Dict[str, Any]) -> str:
+    value = f'"{clause["value"]}"' if clause['quoted'] or ' ' in clause['value'] else clause['value']
+    text = f'{clause["field"]}:{value}' if clause['field'] else value
+    return '-' + text if clause['negated'] else text
+
+
+# ============ PLAN ============
+
+def document_frequencies(terms: Set[str]) -> Dict[str, int]:
+    """Số văn bản chứa từng từ (đếm trên khoá chính, không đọc vị trí)"""
+    from models import db, DocumentPosting
+
+    if not terms:
+        return {}
+    rows = db.session.execute(
+        db.select(DocumentPosting.term, db.func.count())
+        .where(DocumentPosting.term.in_(list(terms)))
+        .group_by(DocumentPosting.term)
+    )
+    frequencies = dict.fromkeys(terms, 0)
+    for term, count in rows:
+        frequencies[term] = count
+    return frequencies
+
+
+def _fetch_postings(term: str, candidates: Optional[Set[int]], frequency: int,
+                    positions: bool) -> Dict[int, Any]:
+    """
+    Posting của một từ, giới hạn trong tập ứng viên
+
+    Tập ứng viên nhỏ hơn posting list thì tra (term, document_pk IN ...) theo
+    khoá chính; ngược lại đọc cả posting list rồi lọc.
+
+    Returns:
+        Dict document_pk -> frequency, hoặc -> array vị trí nếu positions
+    """
+    from models import db, DocumentPosting
+
+    value_column = DocumentPosting.positions if positions else DocumentPosting.frequency
+    stmt = db.select(DocumentPosting.document_pk, value_column).where(DocumentPosting.term == term)
+
+    if candidates is not None and len(candidates) < frequency:
+        pks = list(candidates)
+        rows = []
+        for start in range(0, len(pks), IN_CHUNK_SIZE):
+            rows.extend(db.session.execute(
+                stmt.where(DocumentPosting.document_pk.in_(pks[start:start + IN_CHUNK_SIZE]))
+            ).all())
+    else:
+        rows = db.session.execute(stmt).all()
+        if candidates is not None:
+            rows = [row for row in rows if row[0] in candidates]
+
+    if not positions:
+        return dict(rows)
+    result = {}
+    for pk, raw in rows:
+        values = array('I')
+        values.frombytes(raw)
+        result[pk] = values
+    return result
+
+
+def _phrase_count(words: List[str], positions: Dict[str, array]) -> int:
+    """Số lần cụm từ xuất hiện: vị trí p của từ đầu có từ thứ i ở p + i"""
+    starts = set(positions[words[0]])
+    for offset, word in enumerate(words[1:], 1):
+        if not starts:
+            break
+        starts &= {p - offset for p in positions[word]}
+    return len(starts)
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _public(stage: Dict[str, Any]) -> Dict[str, Any]:
+    # 'words' / 'positions' chỉ dùng khi thực thi
+    return {key: value for key, value in stage.items() if key not in ('words', 'positions')}
+
+
+class QueryPlan:
+    """
+    Kế hoạch thực thi của một truy vấn có cấu trúc
+
+    Các bước theo thứ tự thực thi, mỗi bước chỉ làm việc trên tập ứng viên
+    còn lại của bước trước:
+        sql: mọi mệnh đề trường (kể cả phủ định) và bộ lọc phân tích trong một
+            SELECT; xếp cùng các bước term theo số văn bản ước lượng
+        term: giao posting list, từ có ít văn bản nhất trước
+        phrase: kiểm tra vị trí liên tiếp của các từ trong cụm
+        exclude: bỏ văn bản chứa từ / cụm từ bị phủ định
+    """
+
+    def __init__(self, query: str, document_filter=None):
+        self.query = query
+        self.clauses = parse_query(query)
+        self.document_filter = document_filter
+
+        self.filters = [clause for clause in self.clauses if clause['field']]
+        text = [clause for clause in self.clauses if not clause['field']]
+        self.phrases = [clause['words'] for clause in text if not clause['negated'] and len(clause['words']) > 1]
+        self.excluded = [clause['words'] for clause in text if clause['negated']]
+        self.required = list(dict.fromkeys(word for clause in text if not clause['negated']
+                                           for word in clause['words']))
+        self.conditions = [_condition(clause) for clause in self.filters]
+
+        excluded_words = {word for words in self.excluded for word in words}
+        self.frequencies = document_frequencies(set(self.required) | excluded_words)
+        # Từ hiếm trước: tập ứng viên thu nhỏ nhanh nhất, bước sau đọc ít posting nhất
+        self.required.sort(key=lambda word: self.frequencies[word])
+        self.excluded.sort(key=lambda words: min(self.frequencies[word] for word in words))
+        self.stages = self._stages()
+
+    def _stages(self) -> List[Dict[str, Any]]:
+        stages = []
+        phrase_words = {word for words in self.phrases for word in words}
+        for word in self.required:
+            stages.append({'stage': 'term', 'detail': word, 'estimate': self.frequencies[word],
+                           'words': [word], 'positions': word in phrase_words})
+        if self.conditions or self.document_filter is not None:
+            detail = ' '.join(_describe(clause) for clause in self.filters)
+            if self.document_filter is not None:
+                detail = (detail + ' + analysis filters').strip(' +')
+            sql = {'stage': 'sql', 'detail': detail, 'estimate': None}
+            if stages:
+                # Bước chọn lọc nhất trước: after:2000-01-01 <từ hiếm> đọc posting
+                # list của từ hiếm rồi mới lọc SQL trên vài ứng viên còn lại
+                sql['estimate'] = self._sql_estimate(max(stage['estimate'] for stage in stages) + 1)
+                stages = sorted([sql] + stages, key=lambda stage: stage['estimate'])
+            else:
+                stages.append(sql)
+        for words in self.phrases:
+            stages.append({'stage': 'phrase', 'detail': '"' + ' '.join(words) + '"',
+                           'estimate': min(self.frequencies[word] for word in words), 'words': words})
+        for words in self.excluded:
+            detail = '"' + ' '.join(words) + '"' if len(words) > 1 else words[0]
+            stages.append({'stage': 'exclude', 'detail': detail,
+                           'estimate': min(self.frequencies[word] for word in words), 'words': words})
+        return stages
+
+    def _sql_statement(self):
+        from models import db, Document
+
+        stmt = db.select(Document.pk).where(*self.conditions)
+        if self.document_filter is not None:
+            stmt = stmt.where(Document.pk.in_(self.document_filter))
+        return stmt
+
+    def _sql_estimate(self, limit: int) -> int:
+        """Số văn bản thoả bước sql, đếm tối đa limit (đủ để xếp với các bước term)"""
+        from models import db
+
+        bounded = self._sql_statement().limit(limit).subquery()
+        return db.session.execute(db.select(db.func.count()).select_from(bounded)).scalar()
+
+    def _universe(self) -> Set[int]:
+        from models import db, Document
+
+        return set(db.session.execute(db.select(Document.pk)).scalars())
+
+    def _run_stage(self, stage: Dict[str, Any], candidates: Optional[Set[int]], scores: Dict[int, int],
+                   positions: Dict[str, Dict[int, array]]) -> Set[int]:
+        from models import db, Document
+
+        kind = stage['stage']
+        if kind == 'sql':
+            stmt = self._sql_statement()
+            if candidates is None:
+                return set(db.session.execute(stmt).scalars())
+            pks = list(candidates)
+            kept = set()
+            for start in range(0, len(pks), IN_CHUNK_SIZE):
+                kept.update(db.session.execute(
+                    stmt.where(Document.pk.in_(pks[start:start + IN_CHUNK_SIZE]))
+                ).scalars())
+            return kept
+
+        words = stage.get('words')
+        if kind == 'term':
+            word = words[0]
+            found = _fetch_postings(word, candidates, stage['estimate'], stage['positions'])
+            if stage['positions']:
+                positions[word] = found
+            for pk, value in found.items():
+                scores[pk] = scores.get(pk, 0) + TERM_SCORE * (len(value) if stage['positions'] else value)
+            return set(found) if candidates is None else candidates & found.keys()
+
+        if kind == 'phrase':
+            kept = set()
+            for pk in candidates:
+                count = _phrase_count(words, {word: positions[word][pk] for word in words})
+                if count:
+                    kept.add(pk)
+                    scores[pk] += PHRASE_SCORE * count
+            return kept
+
+        # exclude
+        if candidates is None:
+            candidates = self._universe()
+        if stage['estimate'] == 0 or not candidates:
+            return candidates
+        if len(words) == 1:
+            return candidates - _fetch_postings(words[0], candidates, stage['estimate'], False).keys()
+        found = {word: _fetch_postings(word, candidates, self.frequencies[word], True) for word in words}
+        matched = {
+            pk for pk in set.intersection(*(set(values) for values in found.values()))
+            if _phrase_count(words, {word: found[word][pk] for word in words})
+        }
+        return candidates - matched
+
+    def execute(self, limit: int = 10) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Thực thi kế hoạch
+
+        Returns:
+            (kết quả như AIService.search_documents, explain: các bước với
+            số ứng viên còn lại và thời gian)
+        """
+        from models import Document
+        from ai_service import AIService
+
+        started = time.perf_counter()
+        candidates: Optional[Set[int]] = None
+        scores: Dict[int, int] = {}
+        positions: Dict[str, Dict[int, array]] = {}
+        stages = []
+        for stage in self.stages:
+            if candidates is not None and not candidates:
+                stages.append(dict(stage, rows=0, ms=0.0, skipped=True))
+                continue
+            start = time.perf_counter()
+            candidates = self._run_stage(stage, candidates, scores, positions)
+            stages.append(dict(stage, rows=len(candidates), ms=_ms(time.perf_counter() - start)))
+        stages = [_public(stage) for stage in stages]
+
+        start = time.perf_counter()
+        if candidates is None:
+            candidates = self._universe()
+        # Chỉ có bộ lọc trường (không từ khoá): văn bản mới nhất trước
+        ranked = sorted(candidates, key=lambda pk: (scores.get(pk, 0), pk), reverse=True)[:limit]
+        documents = {doc.pk: doc for doc in Document.query.filter(Document.pk.in_(ranked))} if ranked else {}
+        results = [self._result(documents[pk], scores.get(pk, 0)) for pk in ranked if pk in documents]
+        AIService._add_page_numbers(results)
+        stages.append({'stage': 'rank', 'detail': f'top {limit}', 'estimate': None, 'rows': len(results),
+                       'ms': _ms(time.perf_counter() - start)})
+
+        return results, {
+            'structured': True,
+            'clauses': [_describe(clause) for clause in self.clauses],
+            'stages': stages,
+            'total_ms': _ms(time.perf_counter() - started),
+        }
+
+    def _result(self, doc, score: int) -> Dict[str, Any]:
+        """Kết quả kèm đoạn trích quanh lần xuất hiện đầu tiên của mỗi từ / cụm từ"""
+        matches = []
+        content = doc.content or ''
+        content_lower = content.lower()
+        single = [word for word in self.required if not any(word in words for words in self.phrases)]
+        for needle in [' '.join(words) for words in self.phrases] + single:
+            idx = content_lower.find(needle)
+            if idx == -1:
+                continue
+            snippet = content[max(0, idx - SNIPPET_BEFORE):idx + len(needle) + SNIPPET_AFTER]
+            matches.append({'snippet': snippet.strip(), 'chunk_index': 0, 'keyword': needle, 'position': idx})
+        return {'document': doc, 'score': score, 'matches': matches}
+
+    def explain(self) -> Dict[str, Any]:
+        """Kế hoạch chưa thực thi (ước lượng số văn bản của từng bước)"""
+        return {
+            'structured': True,
+            'clauses': [_describe(clause) for clause in self.clauses],
+            'stages': [_public(stage) for stage in self.stages],
+        }
+
+
+def compile_query(query: str, document_filter=None) -> QueryPlan:
+    """
+    Biên dịch truy vấn có cấu trúc thành kế hoạch thực thi
+
+    Raises:
+        QuerySyntaxError: Giá trị trường không hợp lệ (ngày sai định dạng, số hiệu
+            không có ký tự nào để so khớp)
+    """
+    return QueryPlan(query, document_filter)
+
+
+def search(query: str, limit: int = 10, document_filter=None) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Tìm kiếm với explain: truy vấn có cấu trúc chạy theo kế hoạch, truy vấn
+    thường dùng AIService.search_documents (tra số hiệu / tìm toàn văn)
+
+    Truy vấn thường vẫn quét toàn bảng: tìm toàn văn khớp chuỗi con và bất
+    kỳ từ khoá nào (HOẶC), kế hoạch giao posting list khớp đủ mọi từ (VÀ).
+
+    Returns:
+        (kết quả, explain)
+    """
+    from ai_service import AIService
+
+    if is_structured(query):
+        start = time.perf_counter()
+        plan = compile_query(query, document_filter)
+        compile_ms = _ms(time.perf_counter() - start)
+        results, explain = plan.execute(limit)
+        explain['compile_ms'] = compile_ms
+        return results, explain
+
+    start = time.perf_counter()
+    results = AIService.search_documents(query, limit=limit, document_filter=document_filter)
+    elapsed = _ms(time.perf_counter() - start)
+    return results, {
+        'structured': False,
+        'clauses': [query],
+        'stages': [{'stage': 'scan', 'detail': 'document number lookup / full-text scan', 'estimate': None,
+                    'rows': len(results), 'ms': elapsed}],
+        'total_ms': elapsed,
+    }
+
+
+# Export
+__all__ = [
+    'tokenize', 'parse_query', 'is_structured', 'compile_query', 'search', 'QueryPlan',
+    'QuerySyntaxError', 'index_document', 'build_postings', 'document_frequencies',
+]
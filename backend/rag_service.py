@@ -0,0 +1,644 @@
+#!/usr/bin/env python3
+"""
+RAG Service Module - Trả lời câu hỏi dựa trên văn bản trong kho
+Truy xuất đoạn trích bằng tìm kiếm hiện có, đóng gói theo ngân sách token
+rồi gọi backend sinh câu trả lời có thể thay thế:
+    - 'extractive': chạy offline, ghép câu từ đoạn trích (không cần model)
+    - 'openai': API tương thích OpenAI (OpenAI, vLLM, llama.cpp server,
+      Ollama hoặc mock server cục bộ - benchmarks/mock_llm_server.py)
+Context và câu trả lời được cache theo tập đoạn trích; bước sinh chạy trên
+thread pool (có timeout, lỗi thì quay về extractive) và trả về thời gian
+từng bước. stream() trả từng phần câu trả lời ngay khi backend sinh ra;
+astream() như stream() nhưng chờ backend bằng I/O bất đồng bộ (asgi.py).
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# Ước lượng token không cần tokenizer: tiếng Việt có dấu qua BPE thường
+# 2-3 ký tự/token, chọn 3 để không vượt ngân sách quá nhiều
+CHARS_PER_TOKEN = 3
+PASSAGE_HEADER_TOKENS = 12
+MAX_PASSAGES_PER_DOCUMENT = 3
+
+NO_ANSWER = 'Không tìm thấy thông tin liên quan trong các văn bản hiện có.'
+
+SYSTEM_PROMPT = (
+    'Bạn là trợ lý của hệ thống quản lý công văn. Chỉ trả lời dựa trên các đoạn '
+    'trích được cung cấp, trích dẫn nguồn bằng [số]. Nếu đoạn trích không có '
+    'thông tin, hãy nói rõ là không tìm thấy. Trả lời bằng tiếng Việt, ngắn gọn.'
+)
+
+# Từ để hỏi / hư từ không mang nội dung tìm kiếm
+QUESTION_STOPWORDS = {
+    'tìm', 'kiếm', 'search', 'về', 'liên', 'quan', 'có', 'là', 'gì', 'nào', 'không',
+    'bao', 'nhiêu', 'như', 'thế', 'ai', 'đâu', 'khi', 'nào', 'sao', 'tại', 'vì',
+    'của', 'cho', 'và', 'với', 'các', 'những', 'một', 'được', 'bị', 'thì', 'mà',
+    'này', 'đó', 'hãy', 'giúp', 'tôi', 'bạn', 'xin', 'cho', 'biết', 'ạ', 'vậy',
+}
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+_SENTENCE_RE = re.compile(r'(?<=[.!?;\n])\s+')
+
+
+# ============ HELPERS ============
+
+def question_keywords(question: str) -> List[str]:
+    """Từ khoá của câu hỏi (bỏ từ để hỏi, giữ thứ tự, không trùng)"""
+    words = [w for w in _WORD_RE.findall(question.lower()) if w not in QUESTION_STOPWORDS]
+    return list(dict.fromkeys(words))
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _digest(*parts: Any) -> str:
+    return hashlib.blake2b(repr(parts).encode('utf-8'), digest_size=12).hexdigest()
+
+
+# ============ RETRIEVAL & PACKING ============
+
+def retrieve_passages(question: str, top_k: int = 5,
+                      passage_chars: int = 600) -> Tuple[List[Dict[str, Any]], List[Any]]:
+    """
+    Lấy các đoạn trích quanh vị trí khớp của top_k văn bản tìm được
+
+    Args:
+        question: Câu hỏi
+        top_k: Số văn bản tối đa
+        passage_chars: Độ dài mỗi đoạn trích (các đoạn chồng nhau được gộp)
+
+    Returns:
+        Tuple[danh sách đoạn trích theo thứ tự điểm, danh sách Document]
+    """
+    from ai_service import AIService
+
+    keywords = question_keywords(question)
+    if not keywords:
+        return [], []
+
+    results = AIService.search_documents_enhanced(' '.join(keywords), limit=top_k)
+    passages = []
+    half = passage_chars // 2
+
+    for result in results:
+        doc = result['document']
+        content = doc.content or ''
+        hits = sorted(
+            (m['position'], m.get('page')) for m in result['matches'] if 'position' in m
+        )
+
+        spans: List[List[Any]] = []
+        for position, page in hits:
+            start = max(0, position - half)
+            end = min(len(content), start + passage_chars)
+            if spans and start <= spans[-1][1] and end - spans[-1][0] <= 2 * passage_chars:
+                spans[-1][1] = max(spans[-1][1], end)
+            else:
+                spans.append([start, end, page])
+        if not spans and content:
+            # Chỉ khớp tiêu đề/số hiệu: lấy phần đầu văn bản
+            spans.append([0, min(len(content), passage_chars), 1])
+
+        version = doc.updated_at.isoformat() if doc.updated_at else ''
+        for start, end, page in spans[:MAX_PASSAGES_PER_DOCUMENT]:
+            passages.append({
+                'doc_id': doc.id,
+                'title': doc.title,
+                'document_number': doc.document_number,
+                'page': page,
+                'start': start,
+                'end': end,
+                'text': content[start:end].strip(),
+                'version': version,
+            })
+
+    return passages, [r['document'] for r in results]
+
+
+def pack_context(passages: List[Dict[str, Any]], budget: int) -> List[Dict[str, Any]]:
+    """
+    Chọn đoạn trích theo thứ tự cho tới khi hết ngân sách token
+
+    Đoạn cuối bị cắt bớt nếu phần còn lại vẫn đủ dài (>= 50 token).
+    """
+    packed = []
+    used = 0
+    for passage in passages:
+        cost = estimate_tokens(passage['text']) + PASSAGE_HEADER_TOKENS
+        if used + cost > budget:
+            remaining = budget - used - PASSAGE_HEADER_TOKENS
+            if remaining >= 50:
+                packed.append(dict(passage, text=passage['text'][:remaining * CHARS_PER_TOKEN]))
+            break
+        packed.append(passage)
+        used += cost
+    return packed
+
+
+def render_context(passages: List[Dict[str, Any]]) -> str:
+    """Đoạn trích đánh số [1], [2]... kèm tiêu đề, số hiệu, trang"""
+    blocks = []
+    for i, passage in enumerate(passages, 1):
+        label = passage['title'] or passage['doc_id']
+        details = []
+        if passage['document_number']:
+            details.append(f"Số: {passage['document_number']}")
+        if passage['page']:
+            details.append(f"trang {passage['page']}")
+        if details:
+            label += f" ({', '.join(details)})"
+        blocks.append(f'[{i}] {label}\n{passage["text"]}')
+    return '\n\n'.join(blocks)
+
+
+def build_messages(question: str, context: str) -> List[Dict[str, str]]:
+    # Context đặt trước câu hỏi: cùng tập đoạn trích -> cùng tiền tố prompt,
+    # server có prompt caching (OpenAI, vLLM) dùng lại được
+    return [
+        {'role': 'system', 'content': SYSTEM_PROMPT},
+        {'role': 'user', 'content': f'Đoạn trích:\n{context}\n\nCâu hỏi: {question}'},
+    ]
+
+
+# ============ GENERATION BACKENDS ============
+
+class GenerationBackend:
+    """Giao diện backend sinh câu trả lời"""
+
+    name = 'base'
+
+    @property
+    def cache_id(self) -> str:
+        """Định danh dùng trong khoá cache câu trả lời"""
+        return self.name
+
+    def generate(self, messages: List[Dict[str, str]], question: str,
+                 passages: List[Dict[str, Any]], max_tokens: int, temperature: float) -> str:
+        raise NotImplementedError
+
+    def stream(self, messages: List[Dict[str, str]], question: str,
+               passages: List[Dict[str, Any]], max_tokens: int, temperature: float) -> Iterator[str]:
+        """Sinh câu trả lời theo từng phần (mặc định: một phần duy nhất)"""
+        yield self.generate(messages, question, passages, max_tokens, temperature)
+
+    async def astream(self, messages: List[Dict[str, str]], question: str,
+                      passages: List[Dict[str, Any]], max_tokens: int, temperature: float) -> AsyncIterator[str]:
+        """Như stream() cho event loop (mặc định: generate() trên thread pool của loop)"""
+        loop = asyncio.get_running_loop()
+        yield await loop.run_in_executor(
+            None, self.generate, messages, question, passages, max_tokens, temperature
+        )
+
+
+class ExtractiveBackend(GenerationBackend):
+    """Backend offline: chọn các câu trong đoạn trích trùng nhiều từ khoá nhất"""
+
+    name = 'extractive'
+    max_sentences = 3
+
+    def generate(self, messages, question, passages, max_tokens, temperature):
+        keywords = set(question_keywords(question))
+        scored = []
+        for index, passage in enumerate(passages, 1):
+            for sentence in _SENTENCE_RE.split(passage['text']):
+                sentence = sentence.strip()
+                overlap = len(keywords.intersection(_WORD_RE.findall(sentence.lower())))
+                if overlap:
+                    scored.append((overlap, -index, sentence, index))
+
+        if not scored:
+            return NO_ANSWER
+
+        best = sorted(scored, reverse=True)[:self.max_sentences]
+        best.sort(key=lambda item: item[3])
+        lines = [f'• {sentence} [{index}]' for _, _, sentence, index in best]
+        return 'Theo các văn bản liên quan:\n' + '\n'.join(lines)
+
+    def stream(self, messages, question, passages, max_tokens, temperature):
+        # Từng dòng một để giao diện hiển thị dần
+        for line in self.generate(messages, question, passages, max_tokens, temperature).splitlines(True):
+            yield line
+
+    async def astream(self, messages, question, passages, max_tokens, temperature):
+        # Chỉ ghép câu từ đoạn trích, không chờ I/O: chạy thẳng trên loop
+        for line in self.stream(messages, question, passages, max_tokens, temperature):
+            yield line
+
+
+class OpenAICompatibleBackend(GenerationBackend):
+    """Gọi POST {base_url}/chat/completions (API tương thích OpenAI)"""
+
+    name = 'openai'
+
+    def __init__(self, base_url: str, api_key: Optional[str], model: str,
+                 timeout: float = 15, pool_size: int = 4, max_connections: int = 100):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.timeout = timeout
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self._async_client = None
+        self._async_loop = None
+        self.session = requests.Session()
+        # Giữ kết nối keep-alive cho các lần gọi đồng thời
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        if api_key:
+            self.session.headers['Authorization'] = f'Bearer {api_key}'
+
+    @property
+    def cache_id(self) -> str:
+        return f'{self.name}:{self.model}@{self.base_url}'
+
+    def _payload(self, messages, max_tokens, temperature, stream=False):
+        return {
+            'model': self.model,
+            'messages': messages,
+            'max_tokens': max_tokens,
+            'temperature': temperature,
+            'stream': stream,
+        }
+
+    def generate(self, messages, question, passages, max_tokens, temperature):
+        response = self.session.post(
+            f'{self.base_url}/chat/completions',
+            json=self._payload(messages, max_tokens, temperature),
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        return response.json()['choices'][0]['message']['content'].strip()
+
+    def stream(self, messages, question, passages, max_tokens, temperature):
+        # Server trả SSE: các dòng "data: {chunk}" rồi "data: [DONE]"
+        with self.session.post(
+            f'{self.base_url}/chat/completions',
+            json=self._payload(messages, max_tokens, temperature, stream=True),
+            timeout=self.timeout,
+            stream=True
+        ) as response:
+            response.raise_for_status()
+            # chunk_size=None: nhận từng chunk ngay khi tới, không chờ đủ bộ đệm
+            for line in response.iter_lines(chunk_size=None):
+                if not line.startswith(b'data:'):
+                    continue
+                data = line[5:].strip()
+                if data == b'[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+    def _client(self):
+        """httpx.AsyncClient của event loop hiện tại (mỗi worker ASGI một loop)"""
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            headers = {'Authorization': f'Bearer {self.api_key}'} if self.api_key else None
+            self._async_client = httpx.AsyncClient(
+                headers=headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections)
+            )
+            self._async_loop = loop
+        return self._async_client
+
+    async def astream(self, messages, question, passages, max_tokens, temperature):
+        async with self._client().stream(
+            'POST',
+            f'{self.base_url}/chat/completions',
+            json=self._payload(messages, max_tokens, temperature, stream=True)
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                if delta:
+                    yield delta
+
+
+def create_backend(config: Dict[str, Any]) -> GenerationBackend:
+    """Tạo backend theo AI_BACKEND trong cấu hình"""
+    name = config.get('AI_BACKEND', 'extractive')
+    if name == 'extractive':
+        return ExtractiveBackend()
+    if name == 'openai':
+        return OpenAICompatibleBackend(
+            config['AI_API_BASE'],
+            config.get('AI_API_KEY'),
+            config['AI_MODEL'],
+            timeout=config['AI_TIMEOUT'],
+            pool_size=config['RAG_WORKERS'],
+            max_connections=config['AI_MAX_CONNECTIONS']
+        )
+    raise ValueError(f'Unknown AI backend: {name}')
+
+
+# ============ PIPELINE ============
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 2)
+
+
+class RAGPipeline:
+    """
+    Truy xuất -> đóng gói context -> sinh câu trả lời
+
+    Truy xuất chạy trên thread của request (cần app context/Session); bước
+    sinh chạy trên thread pool nên answer_many() truy xuất câu hỏi kế tiếp
+    trong lúc backend đang sinh câu trả lời trước.
+    """
+
+    def __init__(self):
+        self.backend: GenerationBackend = ExtractiveBackend()
+        self.fallback: GenerationBackend = ExtractiveBackend()
+        self.context_cache = LRUCache(256)
+        self.answer_cache = LRUCache(256)
+        self.top_k = 5
+        self.passage_chars = 600
+        self.context_tokens = 1500
+        self.max_tokens = 1000
+        self.temperature = 0.7
+        self.timeout = 15
+        self.workers = 4
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def init_app(self, app):
+        """Đọc cấu hình AI_* / RAG_* và tạo backend"""
+        config = app.config
+        self.backend = create_backend(config)
+        self.context_cache.max_entries = config['RAG_CACHE_SIZE']
+        self.answer_cache.max_entries = config['RAG_CACHE_SIZE']
+        self.top_k = config['RAG_TOP_K']
+        self.passage_chars = config['RAG_PASSAGE_CHARS']
+        self.context_tokens = config['RAG_CONTEXT_TOKENS']
+        self.max_tokens = config['AI_MAX_TOKENS']
+        self.temperature = config['AI_TEMPERATURE']
+        self.timeout = config['AI_TIMEOUT']
+        self.workers = config['RAG_WORKERS']
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='rag')
+        return self._executor
+
+    # ---- stages ----
+
+    def _prepare(self, question: str) -> Dict[str, Any]:
+        """Truy xuất + đóng gói (dùng cache theo tập đoạn trích)"""
+        started = time.perf_counter()
+        passages, documents = retrieve_passages(question, self.top_k, self.passage_chars)
+        retrieved = time.perf_counter()
+
+        passage_key = _digest(*[(p['doc_id'], p['start'], p['end'], p['version']) for p in passages])
+        cached_context = self.context_cache.get(passage_key)
+        if cached_context is None:
+            packed = pack_context(passages, self.context_tokens)
+            cached_context = (packed, render_context(packed))
+            self.context_cache.set(passage_key, cached_context)
+        packed, context = cached_context
+
+        answer_key = _digest(self.backend.cache_id, ' '.join(question.lower().split()), passage_key)
+        return {
+            'question': question,
+            'passages': packed,
+            'documents': documents,
+            'messages': build_messages(question, context),
+            'answer_key': answer_key,
+            'cached_answer': self.answer_cache.get(answer_key),
+            'started': started,
+            'timings': {
+                'retrieve_ms': _ms(retrieved - started),
+                'pack_ms': _ms(time.perf_counter() - retrieved),
+            },
+        }
+
+    def _generate(self, state: Dict[str, Any]) -> Tuple[str, float]:
+        started = time.perf_counter()
+        answer = self.backend.generate(
+            state['messages'], state['question'], state['passages'], self.max_tokens, self.temperature
+        )
+        return answer, time.perf_counter() - started
+
+    def _submit(self, state: Dict[str, Any]) -> None:
+        if state['cached_answer'] is None and state['passages']:
+            state['future'] = self._pool().submit(self._generate, state)
+
+    def _finish(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Chờ bước sinh (có timeout), quay về extractive nếu lỗi"""
+        timings = state['timings']
+        fallback = False
+        answer = state['cached_answer']
+
+        if answer is None and not state['passages']:
+            answer = NO_ANSWER
+        elif answer is None:
+            wait_started = time.perf_counter()
+            try:
+                answer, generate_secs = state['future'].result(timeout=self.timeout)
+                timings['generate_ms'] = _ms(generate_secs)
+                self.answer_cache.set(state['answer_key'], answer)
+            except Exception as e:  # FutureTimeoutError hoặc lỗi của backend
+                logger.warning(f"RAG backend '{self.backend.name}' failed, using extractive: {str(e)}")
+                fallback = True
+                answer = self.fallback.generate(
+                    state['messages'], state['question'], state['passages'], self.max_tokens, self.temperature
+                )
+                timings['generate_ms'] = _ms(time.perf_counter() - wait_started)
+
+        return self._result(state, answer, fallback)
+
+    def _result(self, state: Dict[str, Any], answer: str, fallback: bool,
+                incomplete: bool = False) -> Dict[str, Any]:
+        state['timings']['total_ms'] = _ms(time.perf_counter() - state['started'])
+        return {
+            'answer': answer,
+            'sources': [
+                {
+                    'index': i,
+                    'id': p['doc_id'],
+                    'title': p['title'],
+                    'document_number': p['document_number'],
+                    'page': p['page'],
+                }
+                for i, p in enumerate(state['passages'], 1)
+            ],
+            'documents': state['documents'],
+            'backend': self.fallback.name if fallback else self.backend.name,
+            'cached': state['cached_answer'] is not None,
+            'fallback': fallback,
+            'incomplete': incomplete,
+            'timings': state['timings'],
+        }
+
+    # ---- public API ----
+
+    def answer(self, question: str) -> Dict[str, Any]:
+        """
+        Trả lời một câu hỏi
+
+        Returns:
+            Dict gồm answer, sources (đoạn trích đã dùng, đánh số như [n]),
+            documents (Document tìm được), backend, cached, fallback và
+            timings (retrieve_ms, pack_ms, generate_ms, total_ms)
+        """
+        state = self._prepare(question)
+        self._submit(state)
+        return self._finish(state)
+
+    def stream(self, question: str) -> Iterator[Tuple[str, Any]]:
+        """
+        Trả lời một câu hỏi theo từng phần
+
+        Yields:
+            ('retrieved', kết quả rỗng answer - sources/documents có ngay sau
+            bước truy xuất), ('delta', đoạn text) lặp lại, rồi ('done', kết
+            quả như answer(); timings có thêm first_token_ms, incomplete=True
+            nếu backend lỗi sau khi đã gửi một phần)
+        """
+        state = self._prepare(question)
+        yield 'retrieved', self._result(state, '', False)
+
+        answer = state['cached_answer']
+        fallback = False
+        incomplete = False
+        if answer is not None or not state['passages']:
+            answer = answer if answer is not None else NO_ANSWER
+            yield 'delta', answer
+        else:
+            timings = state['timings']
+            generate_started = time.perf_counter()
+            parts: List[str] = []
+            complete = False
+            try:
+                for chunk in self.backend.stream(
+                    state['messages'], state['question'], state['passages'], self.max_tokens, self.temperature
+                ):
+                    if not parts:
+                        timings['first_token_ms'] = _ms(time.perf_counter() - state['started'])
+                    parts.append(chunk)
+                    yield 'delta', chunk
+                complete = True
+            except Exception as e:
+                # Đã gửi một phần cho client thì giữ nguyên (không cache), đánh dấu incomplete
+                if parts:
+                    incomplete = self._stream_broken(parts, e)
+                else:
+                    fallback = True
+                    parts.append(self._stream_fallback(state, e))
+                    yield 'delta', parts[0]
+            answer = ''.join(parts)
+            timings['generate_ms'] = _ms(time.perf_counter() - generate_started)
+            if complete:
+                self.answer_cache.set(state['answer_key'], answer)
+
+        yield 'done', self._result(state, answer, fallback, incomplete)
+
+    async def astream(self, question: str,
+                      run_sync: Callable[..., Awaitable[Any]]) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Như stream() cho event loop (asgi.py)
+
+        Bước sinh chờ backend.astream() nên không giữ thread nào trong lúc
+        model trả lời.
+
+        Args:
+            question: Câu hỏi
+            run_sync: Coroutine function chạy hàm đồng bộ ngoài loop, trong
+                app context (truy xuất cần Session)
+        """
+        state = await run_sync(self._prepare, question)
+        yield 'retrieved', self._result(state, '', False)
+
+        answer = state['cached_answer']
+        fallback = False
+        incomplete = False
+        if answer is not None or not state['passages']:
+            answer = answer if answer is not None else NO_ANSWER
+            yield 'delta', answer
+        else:
+            timings = state['timings']
+            generate_started = time.perf_counter()
+            parts: List[str] = []
+            complete = False
+            try:
+                async for chunk in self.backend.astream(
+                    state['messages'], state['question'], state['passages'], self.max_tokens, self.temperature
+                ):
+                    if not parts:
+                        timings['first_token_ms'] = _ms(time.perf_counter() - state['started'])
+                    parts.append(chunk)
+                    yield 'delta', chunk
+                complete = True
+            except Exception as e:
+                if parts:
+                    incomplete = self._stream_broken(parts, e)
+                else:
+                    fallback = True
+                    parts.append(self._stream_fallback(state, e))
+                    yield 'delta', parts[0]
+            answer = ''.join(parts)
+            timings['generate_ms'] = _ms(time.perf_counter() - generate_started)
+            if complete:
+                self.answer_cache.set(state['answer_key'], answer)
+
+        yield 'done', self._result(state, answer, fallback, incomplete)
+
+    def _stream_fallback(self, state: Dict[str, Any], error: Exception) -> str:
+        """Câu trả lời extractive khi backend lỗi trước khi gửi được phần nào"""
+        logger.warning(f"RAG backend '{self.backend.name}' stream failed: {str(error)}")
+        return self.fallback.generate(
+            state['messages'], state['question'], state['passages'], self.max_tokens, self.temperature
+        )
+
+    def _stream_broken(self, parts: List[str], error: Exception) -> bool:
+        """Backend lỗi giữa chừng: câu trả lời đã gửi dở, không thể thay bằng extractive"""
+        logger.error(f"RAG backend '{self.backend.name}' stream failed after {len(parts)} chunks: {str(error)}")
+        return True
+
+    def answer_many(self, questions: List[str]) -> List[Dict[str, Any]]:
+        """Trả lời nhiều câu hỏi; truy xuất câu sau chồng lên bước sinh của câu trước"""
+        states = []
+        for question in questions:
+            state = self._prepare(question)
+            self._submit(state)
+            states.append(state)
+        return [self._finish(state) for state in states]
+
+
+rag_pipeline = RAGPipeline()
+
+
+# Export
+__all__ = [
+    'GenerationBackend',
+    'ExtractiveBackend',
+    'OpenAICompatibleBackend',
+    'RAGPipeline',
+    'rag_pipeline',
+    'create_backend',
+    'question_keywords',
+    'retrieve_passages',
+    'pack_context',
+]
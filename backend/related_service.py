@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Related Service Module - Gợi ý văn bản liên quan ("more like this")
+Mỗi văn bản có một vector từ thưa: VECTOR_TERMS từ có trọng số tf-idf cao
+nhất (tính từ posting list của query_service), lưu khi tải lên. Văn bản liên
+quan được chấm điểm chỉ trên posting list của các từ đó - một truy vấn
+theo index thay vì tìm kiếm với hàng trăm từ khoá - rồi xếp lại theo cosine
+giữa các vector đã lưu. Kết quả được cache cho đến khi phiên bản kho đổi.
+"""
+
+import heapq
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from cache import LRUCache, collection_version
+from query_service import document_frequencies
+from serializers import IN_CHUNK_SIZE
+
+VECTOR_TERMS = 32  # Số từ giữ lại trong vector của mỗi văn bản
+MIN_TERM_LENGTH = 2
+MIN_NUMBER_LENGTH = 4  # Số ngắn (ngày, tháng, số thứ tự) không mang nội dung; giữ năm, mã số
+RERANK_FACTOR = 5  # Số ứng viên (x limit) được xếp lại theo cosine
+# Từ có trong quá nửa kho là từ chung của văn bản hành chính ("về việc", "đơn vị"):
+# gần như không phân biệt văn bản mà posting list lại dài nhất
+MAX_DF_RATIO = 0.5
+MIN_CORPUS_SIZE = 20  # Kho nhỏ hơn: chưa đủ để coi từ nào là từ chung
+
+# (document_pk, limit) -> (phiên bản kho, [(document_pk, similarity)])
+related_cache = LRUCache(1024)
+
+
+# ============ TERM VECTORS ============
+
+def _useful(term: str) -> bool:
+    if len(term) < MIN_TERM_LENGTH:
+        return False
+    return not term.isdigit() or len(term) >= MIN_NUMBER_LENGTH
+
+
+def term_vector(frequencies: Dict[str, int], document_frequency: Dict[str, int],
+                corpus_size: int) -> Dict[str, float]:
+    """
+    Top VECTOR_TERMS từ theo tf-idf, chuẩn hoá độ dài 1
+
+    Args:
+        frequencies: Từ -> số lần xuất hiện trong văn bản
+        document_frequency: Từ -> số văn bản chứa từ
+        corpus_size: Số văn bản đã index
+    """
+    max_df = corpus_size * MAX_DF_RATIO if corpus_size >= MIN_CORPUS_SIZE else corpus_size
+    weights = {}
+    for term, tf in frequencies.items():
+        df = max(document_frequency.get(term, 1), 1)
+        if _useful(term) and df <= max_df:
+            weights[term] = (1 + math.log(tf)) * math.log((corpus_size + 1) / df)
+    top = heapq.nlargest(VECTOR_TERMS, weights.items(), key=lambda item: item[1])
+    norm = math.sqrt(sum(weight * weight for _, weight in top))
+    if not norm:
+        return {}
+    return {term: round(weight / norm, 6) for term, weight in top}
+
+
+def _corpus_size() -> int:
+    from models import db, DocumentTermIndex
+
+    return db.session.execute(db.select(db.func.count()).select_from(DocumentTermIndex)).scalar() or 0
+
+
+def _frequencies(pks: List[int]) -> Dict[int, Dict[str, int]]:
+    """Từ -> số lần xuất hiện của từng văn bản, đọc từ document_postings"""
+    from models import db, DocumentPosting
+
+    result: Dict[int, Dict[str, int]] = {pk: {} for pk in pks}
+    rows = db.session.execute(
+        db.select(DocumentPosting.document_pk, DocumentPosting.term, DocumentPosting.frequency)
+        .where(DocumentPosting.document_pk.in_(pks))
+    )
+    for pk, term, frequency in rows:
+        result[pk][term] = frequency
+    return result
+
+
+def _store(vectors: Dict[int, Dict[str, float]]) -> None:
+    from models import db, DocumentTermVector
+
+    pks = list(vectors)
+    db.session.execute(db.delete(DocumentTermVector).where(DocumentTermVector.document_pk.in_(pks)))
+    now = datetime.utcnow()
+    db.session.execute(DocumentTermVector.__table__.insert(), [
+        {'document_pk': pk, 'terms': terms, 'updated_at': now} for pk, terms in vectors.items()
+    ])
+
+
+def index_document(document_pk: int) -> Dict[str, float]:
+    """
+    Tính và lưu vector của một văn bản (luồng upload, trong transaction hiện tại)
+
+    Posting của văn bản phải đã được ghi (query_service.index_document).
+    """
+    frequencies = _frequencies([document_pk])[document_pk]
+    vector = term_vector(frequencies, document_frequencies(set(frequencies)), _corpus_size())
+    _store({document_pk: vector})
+    return vector
+
+
+def build_term_vectors(batch_size: int = 500, force: bool = False) -> Dict[str, int]:
+    """
+    Tính vector cho văn bản đã có posting nhưng chưa có vector
+
+    idf đổi dần khi kho lớn lên; force tính lại toàn bộ theo số văn bản chứa
+    từ hiện tại (đếm một lần cho cả kho).
+
+    Returns:
+        Dict {computed, terms}
+    """
+    from models import db, DocumentPosting, DocumentTermIndex, DocumentTermVector
+
+    corpus_size = _corpus_size()
+    document_frequency = dict(db.session.execute(
+        db.select(DocumentPosting.term, db.func.count()).group_by(DocumentPosting.term)
+    ).all())
+
+    stmt = db.select(DocumentTermIndex.document_pk).order_by(DocumentTermIndex.document_pk).limit(batch_size)
+    if not force:
+        stmt = stmt.outerjoin(DocumentTermVector, DocumentTermVector.document_pk == DocumentTermIndex.document_pk) \
+            .where(DocumentTermVector.document_pk.is_(None))
+
+    stats = {'computed': 0, 'terms': 0}
+    last_pk = 0
+    while True:
+        pks = db.session.execute(stmt.where(DocumentTermIndex.document_pk > last_pk)).scalars().all()
+        if not pks:
+            break
+        last_pk = pks[-1]
+        vectors = {
+            pk: term_vector(frequencies, document_frequency, corpus_size)
+            for pk, frequencies in _frequencies(pks).items()
+        }
+        _store(vectors)
+        db.session.commit()
+        stats['computed'] += len(vectors)
+        stats['terms'] += sum(len(vector) for vector in vectors.values())
+    return stats
+
+
+# ============ QUERIES ============
+
+def _vectors(pks: Iterable[int]) -> Dict[int, Dict[str, float]]:
+    from models import db, DocumentTermVector
+
+    pks = list(pks)
+    vectors = {}
+    for start in range(0, len(pks), IN_CHUNK_SIZE):
+        rows = db.session.execute(
+            db.select(DocumentTermVector.document_pk, DocumentTermVector.terms)
+            .where(DocumentTermVector.document_pk.in_(pks[start:start + IN_CHUNK_SIZE]))
+        )
+        vectors.update((pk, terms) for pk, terms in rows)
+    return vectors
+
+
+def related_documents(document_pk: int, limit: int = 10) -> Optional[List[Tuple[int, float]]]:
+    """
+    Văn bản liên quan đến một văn bản đã có vector
+
+    Ứng viên là các văn bản chứa ít nhất một từ của vector (chỉ đọc posting
+    list của VECTOR_TERMS từ), chấm điểm sơ bộ theo tf-idf; limit x
+    RERANK_FACTOR ứng viên đầu được xếp lại theo cosine giữa hai vector.
+
+    Returns:
+        Danh sách (document_pk, similarity) giảm dần, None nếu văn bản chưa có vector
+    """
+    from models import db, DocumentPosting
+
+    vector = _vectors([document_pk]).get(document_pk)
+    if vector is None:
+        return None
+    if not vector:
+        return []
+
+    postings: Dict[str, List[Tuple[int, int]]] = {term: [] for term in vector}
+    for term, pk, frequency in db.session.execute(
+        db.select(DocumentPosting.term, DocumentPosting.document_pk, DocumentPosting.frequency)
+        .where(DocumentPosting.term.in_(list(vector)))
+    ):
+        postings[term].append((pk, frequency))
+
+    corpus_size = _corpus_size()
+    scores: Dict[int, float] = {}
+    for term, rows in postings.items():
+        weight = vector[term] * math.log((corpus_size + 1) / max(len(rows), 1))
+        for pk, frequency in rows:
+            scores[pk] = scores.get(pk, 0.0) + weight * (1 + math.log(frequency))
+    scores.pop(document_pk, None)
+
+    pool = heapq.nlargest(limit * RERANK_FACTOR, scores, key=scores.get)
+    ranked = []
+    for pk, other in _vectors(pool).items():
+        similarity = sum(weight * other.get(term, 0.0) for term, weight in vector.items())
+        if similarity > 0:
+            ranked.append((pk, similarity))
+    ranked.sort(key=lambda item: (item[1], scores[item[0]]), reverse=True)
+    return ranked[:limit]
+
+
+def cached_related_documents(document_pk: int, limit: int = 10) -> Optional[List[Tuple[int, float]]]:
+    """related_documents có cache; mọi ghi vào kho (đổi phiên bản) làm kết quả cũ hết hạn"""
+    version = collection_version.get()
+    cached = related_cache.get((document_pk, limit))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    matches = related_documents(document_pk, limit)
+    if matches is not None:
+        related_cache.set((document_pk, limit), (version, matches))
+    return matches
+
+
+# Export
+__all__ = [
+    'term_vector', 'index_document', 'build_term_vectors', 'related_documents',
+    'cached_related_documents', 'related_cache', 'VECTOR_TERMS',
+]
@@ -4,15 +4,33 @@ Routes Module - API Endpoints
 Không init db ở đây, chỉ import và sử dụng
 """
 
-from flask import Blueprint, request, jsonify, send_file, current_app
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
-from models import db, Document, Attachment, ChatMessage
+from models import db, Document, Attachment, DocumentSummary
 from ai_service import AIService
+from serializers import list_documents, get_document_payload, encode_json
+from cache import collection_etag, document_etag, document_cache
+from batch_service import BatchService, BatchValidationError
+from export_service import EXPORT_FORMATS, ExportError, stream_export, export_filename
+from downloads import file_sha256, send_stored_file, bundle_entries, iter_zip_bundle
+from page_store import page_store, PAGE_SEPARATOR
+from stats_service import document_statistics
+from background import chat_log_writer, ingest_worker, extract_pool
+from chat_service import chat_history, CursorError
+from analysis_service import analysis_filter, analyses_for, AnalysisFilterError
+import dedup_service
+import query_service
+import related_service
+from classifier_service import normalize_label, predict_document_type, learn_document_type
+from metadata_service import fill_missing
+from suggest_service import suggest_index
 from datetime import datetime
 import os
 import PyPDF2
 from docx import Document as DocxDocument
 import shutil
+import time
 from pathlib import Path
 import logging
 
@@ -22,44 +40,91 @@ logger = logging.getLogger(__name__)
 # ✅ Tạo Blueprint - KHÔNG init db ở đây
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
+MAX_PREVIOUS_RESULTS = 20  # Số id kết quả lượt trước nhận từ client chat
+
 
 # ============ FILE EXTRACTION ============
 
-def extract_file_content(file_path, filename):
-    """Trích xuất nội dung từ file"""
+def _docx_pages(file_path):
+    """Tách đoạn văn Word thành trang theo ngắt trang (page break / lastRenderedPageBreak)"""
+    doc = DocxDocument(file_path)
+    pages = [[]]
+    for para in doc.paragraphs:
+        xml = para._p.xml
+        if pages[-1] and ('w:lastRenderedPageBreak' in xml or 'w:type="page"' in xml):
+            pages.append([])
+        if para.text.strip():
+            pages[-1].append(para.text)
+    return ['\n'.join(lines) for lines in pages]
+
+
+def extract_file_pages(file_path, filename):
+    """
+    Trích xuất nội dung từ file, giữ ranh giới trang
+
+    PDF: mỗi trang một phần tử (kể cả trang trống để giữ đúng số trang);
+    TXT: tách theo ký tự form feed; Word: theo ngắt trang.
+
+    Returns:
+        Tuple[danh sách text từng trang, content] với
+        content = PAGE_SEPARATOR.join(pages) hoặc thông báo khi không đọc được
+    """
     try:
         ext = filename.rsplit('.', 1)[1].lower() if '.' in filename else ''
 
         if ext == 'txt':
             with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+                pages = f.read().split('\f')
+            return pages, PAGE_SEPARATOR.join(pages)
 
         elif ext == 'pdf':
-            content = []
             with open(file_path, 'rb') as f:
                 reader = PyPDF2.PdfReader(f)
-                for page in reader.pages:
-                    text = page.extract_text()
-                    if text:
-                        content.append(text)
-            return '\n'.join(content) if content else '[PDF không có nội dung]'
+                pages = [page.extract_text() or '' for page in reader.pages]
+            if not any(pages):
+                return [], '[PDF không có nội dung]'
+            return pages, PAGE_SEPARATOR.join(pages)
 
         elif ext in ['doc', 'docx']:
             try:
-                doc = DocxDocument(file_path)
-                content = []
-                for para in doc.paragraphs:
-                    if para.text.strip():
-                        content.append(para.text)
-                return '\n'.join(content) if content else '[Document không có nội dung]'
+                pages = _docx_pages(file_path)
             except:
-                return '[Không thể đọc file Word]'
+                return [], '[Không thể đọc file Word]'
+            if not any(pages):
+                return [], '[Document không có nội dung]'
+            return pages, PAGE_SEPARATOR.join(pages)
 
-        return '[Loại file không được hỗ trợ]'
+        return [], '[Loại file không được hỗ trợ]'
 
     except Exception as e:
         logger.error(f"Error extracting content: {str(e)}")
-        return f'[Lỗi trích xuất: {str(e)}]'
+        return [], f'[Lỗi trích xuất: {str(e)}]'
+
+
+def extract_file_content(file_path, filename):
+    """Trích xuất nội dung từ file"""
+    return extract_file_pages(file_path, filename)[1]
+
+
+# ============ HTTP CACHE ============
+
+def _cache_headers(response, etag):
+    """Gắn ETag và buộc client xác thực lại (If-None-Match) mỗi lần dùng"""
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _not_modified(etag):
+    return _cache_headers(current_app.response_class(status=304), etag)
+
+
+def _arg_flag(name, default=False):
+    """Đọc tham số query dạng bật/tắt (1/0, true/false, yes/no)"""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
 
 
 # ============ API ENDPOINTS ============
@@ -69,7 +134,7 @@ def health_check():
     """Kiểm tra sức khỏe API"""
     try:
         # Test database connection
-        db.session.execute('SELECT 1')
+        db.session.execute(db.text('SELECT 1'))
 
         return jsonify({
             'success': True,
@@ -89,11 +154,30 @@ def health_check():
 def get_documents():
     """Lấy danh sách tất cả văn bản"""
     try:
-        docs = Document.query.order_by(Document.created_at.desc()).all()
-        return jsonify({
+        # ETag theo phiên bản kho: trả 304 mà không truy vấn bảng
+        etag = collection_etag('documents', request.query_string.decode('utf-8'))
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        page = request.args.get('page', type=int)
+        per_page = min(
+            request.args.get('per_page', default=current_app.config['PAGINATION_SIZE'], type=int),
+            current_app.config['MAX_PAGE_SIZE']
+        )
+
+        documents, total = list_documents(page=page, per_page=per_page)
+
+        payload = {
             'success': True,
-            'documents': [doc.to_dict() for doc in docs]
-        }), 200
+            'documents': documents
+        }
+        if page is not None:
+            payload['pagination'] = {
+                'page': max(page, 1),
+                'per_page': per_page,
+                'total': total
+            }
+        return _cache_headers(jsonify(payload), etag), 200
     except Exception as e:
         logger.error(f"Error getting documents: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -101,40 +185,262 @@ def get_documents():
 
 @api_bp.route('/documents/<doc_id>', methods=['GET'])
 def get_document(doc_id):
-    """Lấy chi tiết một văn bản"""
+    """
+    Lấy chi tiết một văn bản
+
+    ?content=0 chỉ trả đoạn trích nội dung (trình xem đọc theo trang qua
+    /documents/<id>/pages)
+    """
+    try:
+        # Tóm tắt được ghi nền sau upload nên là một phần của phiên bản
+        version = db.session.execute(
+            db.select(Document.updated_at, DocumentSummary.content_hash)
+            .outerjoin(DocumentSummary, DocumentSummary.document_pk == Document.pk)
+            .where(Document.id == doc_id)
+        ).first()
+        if version is None:
+            return jsonify({'success': False, 'error': 'Document not found'}), 404
+
+        full_content = _arg_flag('content', default=True)
+        variant = 'full' if full_content else 'meta'
+        base_etag = document_etag(doc_id, version.updated_at, version.content_hash)
+        etag = base_etag if full_content else f'{base_etag}-meta'
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        # Một entry LRU cho mỗi văn bản, chứa các biến thể cùng phiên bản
+        cached = document_cache.get(doc_id)
+        bodies = cached[1] if cached is not None and cached[0] == base_etag else {}
+        body = bodies.get(variant)
+        if body is None:
+            document = get_document_payload(doc_id, full_content=full_content)
+            if document is None:
+                return jsonify({'success': False, 'error': 'Document not found'}), 404
+            body = encode_json({'success': True, 'document': document})
+            document_cache.set(doc_id, (base_etag, dict(bodies, **{variant: body})))
+
+        response = current_app.response_class(body, mimetype='application/json')
+        return _cache_headers(response, etag), 200
+    except Exception as e:
+        logger.error(f"Error getting document: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/documents/<doc_id>/pages', methods=['GET'])
+def get_document_pages(doc_id):
+    """
+    Đọc nội dung văn bản theo trang: ?from=1&to=5 (đánh số từ 1, gồm cả to)
+
+    Chỉ đọc vùng trang được yêu cầu từ page store (mmap). Văn bản cũ chưa có
+    trong kho được trả về như một trang duy nhất.
+    """
+    try:
+        updated_at = db.session.execute(
+            db.select(Document.updated_at).where(Document.id == doc_id)
+        ).first()
+        if updated_at is None:
+            return jsonify({'success': False, 'error': 'Document not found'}), 404
+
+        max_pages = current_app.config['PAGES_MAX_PER_REQUEST']
+        first = request.args.get('from', default=1, type=int)
+        last = request.args.get('to', default=first + max_pages - 1, type=int)
+        if first < 1 or last < first:
+            return jsonify({'success': False, 'error': 'Invalid page range'}), 400
+        last = min(last, first + max_pages - 1)
+
+        etag = f'{document_etag(doc_id, updated_at[0])}-p{first}-{last}'
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
+
+        page_count = page_store.page_count(doc_id)
+        if page_count is None:
+            content = db.session.execute(
+                db.select(Document.content).where(Document.id == doc_id)
+            ).scalar()
+            page_count = 1
+            texts = [content or ''] if first == 1 else []
+        else:
+            texts = page_store.read_pages(doc_id, first, last)
+
+        response = jsonify({
+            'success': True,
+            'document_id': doc_id,
+            'page_count': page_count,
+            'from': first,
+            'to': first + len(texts) - 1,
+            'pages': [{'number': first + i, 'text': text} for i, text in enumerate(texts)]
+        })
+        return _cache_headers(response, etag), 200
+    except Exception as e:
+        logger.error(f"Error getting pages: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/documents/<doc_id>/similar', methods=['GET'])
+def get_similar_documents(doc_id):
+    """
+    Văn bản gần trùng: ?threshold=0.8 (Jaccard ước lượng) &limit=10
+
+    Tra index LSH (document_lsh_bands) theo chữ ký đã lưu, không so với cả kho.
+    """
     try:
-        doc = Document.query.get(doc_id)
-        if not doc:
+        pk = db.session.execute(db.select(Document.pk).where(Document.id == doc_id)).scalar()
+        if pk is None:
             return jsonify({'success': False, 'error': 'Document not found'}), 404
 
+        threshold = request.args.get('threshold', default=dedup_service.DUPLICATE_THRESHOLD, type=float)
+        limit = min(request.args.get('limit', default=10, type=int), current_app.config['MAX_PAGE_SIZE'])
+        if not 0 < threshold <= 1 or limit < 1:
+            return jsonify({'success': False, 'error': 'Invalid threshold or limit'}), 400
+
+        matches = dedup_service.similar_documents(pk, threshold=threshold, limit=limit)
+        if matches is None:
+            # Văn bản cũ chưa có chữ ký (chưa chạy manage.py build-signatures)
+            content = db.session.execute(db.select(Document.content).where(Document.id == doc_id)).scalar()
+            dedup_service.index_document(pk, content)
+            db.session.commit()
+            matches = dedup_service.similar_documents(pk, threshold=threshold, limit=limit) or []
+
         return jsonify({
             'success': True,
-            'document': {
-                'id': doc.id,
-                'title': doc.title,
-                'content': doc.content,
-                'document_type': doc.document_type,
-                'document_number': doc.document_number,
-                'sender': doc.sender,
-                'receiver': doc.receiver,
-                'date_received': doc.date_received.isoformat() if doc.date_received else None,
-                'date_issued': doc.date_issued.isoformat() if doc.date_issued else None,
-                'file_name': doc.file_name,
-                'file_size': doc.file_size,
-                'metadata': doc.metadata,
-                'created_at': doc.created_at.isoformat(),
-                'updated_at': doc.updated_at.isoformat(),
-                'attachments': [a.to_dict() for a in doc.attachments]
-            }
+            'document_id': doc_id,
+            'threshold': threshold,
+            'similar': _similar_payload(matches)
         }), 200
     except Exception as e:
-        logger.error(f"Error getting document: {str(e)}")
+        db.session.rollback()
+        logger.error(f"Error finding similar documents: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/documents/<doc_id>/related', methods=['GET'])
+def get_related_documents(doc_id):
+    """
+    Văn bản liên quan ("more like this"): ?limit=10
+
+    So vector từ (top-N từ tf-idf) đã lưu, chỉ đọc posting list của các từ đó;
+    kết quả được cache đến khi kho văn bản thay đổi.
+    """
+    try:
+        pk = db.session.execute(db.select(Document.pk).where(Document.id == doc_id)).scalar()
+        if pk is None:
+            return jsonify({'success': False, 'error': 'Document not found'}), 404
+
+        limit = min(request.args.get('limit', default=10, type=int), current_app.config['MAX_PAGE_SIZE'])
+        if limit < 1:
+            return jsonify({'success': False, 'error': 'Invalid limit'}), 400
+
+        matches = related_service.cached_related_documents(pk, limit=limit)
+        if matches is None:
+            # Văn bản cũ chưa có vector (chưa chạy manage.py build-postings / build-vectors)
+            content = db.session.execute(db.select(Document.content).where(Document.pk == pk)).scalar()
+            query_service.index_document(pk, content)
+            related_service.index_document(pk)
+            db.session.commit()
+            matches = related_service.cached_related_documents(pk, limit=limit) or []
+
+        return jsonify({
+            'success': True,
+            'document_id': doc_id,
+            'related': _similar_payload(matches)
+        }), 200
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error finding related documents: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# ============ BATCH OPERATIONS ============
+
+@api_bp.route('/documents/batch/update', methods=['POST'])
+def batch_update_documents():
+    """Cập nhật metadata cho nhiều văn bản"""
+    try:
+        data = request.get_json() or {}
+        ids = BatchService.normalize_ids(data.get('ids'), current_app.config['BATCH_MAX_IDS'])
+        values = BatchService.parse_updates(data.get('updates'))
+
+        updated = BatchService.update_documents(ids, values)
+
+        return jsonify({
+            'success': True,
+            'requested': len(ids),
+            'updated': updated
+        }), 200
+    except BatchValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Batch update error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/documents/batch/tags', methods=['POST'])
+def batch_retag_documents():
+    """Gắn lại tags cho nhiều văn bản"""
+    try:
+        data = request.get_json() or {}
+        ids = BatchService.normalize_ids(data.get('ids'), current_app.config['BATCH_MAX_IDS'])
+
+        updated = BatchService.retag_documents(
+            ids,
+            add=data.get('add'),
+            remove=data.get('remove'),
+            replace=data.get('tags')
+        )
+
+        return jsonify({
+            'success': True,
+            'requested': len(ids),
+            'updated': updated
+        }), 200
+    except BatchValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Batch retag error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/documents/batch/delete', methods=['POST'])
+def batch_delete_documents():
+    """Xoá nhiều văn bản (file vật lý được xoá ở nền)"""
+    try:
+        data = request.get_json() or {}
+        ids = BatchService.normalize_ids(data.get('ids'), current_app.config['BATCH_MAX_IDS'])
+
+        result = BatchService.delete_documents(ids)
+
+        return jsonify({
+            'success': True,
+            'requested': len(ids),
+            **result
+        }), 200
+    except BatchValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Batch delete error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _similar_payload(matches):
+    """[(document_pk, similarity)] -> [{id, title, document_number, document_type, similarity}]"""
+    if not matches:
+        return []
+    rows = db.session.execute(
+        db.select(Document.pk, Document.id, Document.title, Document.document_number, Document.document_type)
+        .where(Document.pk.in_([pk for pk, _ in matches]))
+    )
+    by_pk = {row.pk: row for row in rows}
+    return [
+        {'id': by_pk[pk].id, 'title': by_pk[pk].title, 'document_number': by_pk[pk].document_number,
+         'document_type': by_pk[pk].document_type, 'similarity': round(score, 3)}
+        for pk, score in matches if pk in by_pk
+    ]
+
+
 @api_bp.route('/upload', methods=['POST'])
 def upload_document():
     """Tải lên văn bản"""
+    doc = None
     try:
         if 'file' not in request.files:
             return jsonify({'success': False, 'error': 'No file provided'}), 400
@@ -156,21 +462,34 @@ def upload_document():
         file_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename_saved)
         file.save(file_path)
 
-        # Trích xuất nội dung
-        content = extract_file_content(file_path, file.filename)
+        # Trích xuất nội dung (giữ ranh giới trang), trên process pool nếu bật EXTRACT_WORKERS
+        pages, content = extract_pool.run(extract_file_pages, file_path, file.filename)
+
+        # Loại văn bản: nhãn người dùng nhập, nếu trống thì để mô hình dự đoán
+        title = request.form.get('title', file.filename)
+        document_type = normalize_label(request.form.get('document_type'))
+        type_confidence = None
+        if document_type is None:
+            document_type, type_confidence = predict_document_type(
+                title, content, current_app.config['DOCUMENT_TYPE_MIN_CONFIDENCE'])
+
+        # Số hiệu, ngày ban hành, nơi gửi/nhận: form trống thì lấy từ thể thức văn bản
+        metadata = {field: request.form.get(field) or None for field in ('document_number', 'sender', 'receiver')}
+        fill_missing(metadata, content)
 
         # Tạo document
         doc = Document(
-            title=request.form.get('title', file.filename),
+            title=title,
             content=content,
-            document_type=request.form.get('document_type'),
-            document_number=request.form.get('document_number'),
-            sender=request.form.get('sender'),
+            document_type=document_type,
+            document_type_confidence=type_confidence,
+            **metadata,
             file_path=file_path,
             file_name=file.filename,
             file_size=os.path.getsize(file_path),
             file_type=ext,
-            metadata={
+            file_hash=file_sha256(file_path),
+            json_data={
                 'tags': request.form.get('tags', '').split(',') if request.form.get('tags') else [],
                 'priority': request.form.get('priority', 'Normal')
             }
@@ -178,6 +497,14 @@ def upload_document():
 
         db.session.add(doc)
         db.session.flush()
+        page_store.write(doc.id, pages)
+
+        # Chữ ký MinHash + bucket LSH, báo ngay các bản gần trùng đã có trong kho
+        signature = dedup_service.index_document(doc.pk, content)
+        duplicates = dedup_service.find_similar(signature, exclude_pk=doc.pk)
+        # Posting list cho truy vấn có cấu trúc, vector từ cho văn bản liên quan
+        query_service.index_document(doc.pk, content)
+        related_service.index_document(doc.pk)
 
         # Xử lý attachments
         attachment_count = 0
@@ -191,32 +518,77 @@ def upload_document():
                     att_file.save(att_path)
 
                     attachment = Attachment(
-                        document_id=doc.id,
+                        document=doc,
                         filename=att_file.filename,
                         file_path=att_path,
                         file_size=os.path.getsize(att_path),
+                        file_hash=file_sha256(att_path),
                         file_type=att_file.filename.rsplit('.', 1)[1].lower() if '.' in att_file.filename else 'unknown'
                     )
                     db.session.add(attachment)
                     attachment_count += 1
 
         db.session.commit()
+        if type_confidence is None:
+            learn_document_type(document_type, title, content)
+        suggest_index.add_document(doc.title, doc.document_number, doc.sender, content, pk=doc.pk)
+        # Tóm tắt, phân tích thực thể chạy nền sau khi trả response
+        ingest_worker.schedule([doc.pk])
 
         return jsonify({
             'success': True,
             'message': f'Document uploaded successfully',
-            'document': doc.to_dict()
+            'document': doc.to_dict(),
+            'duplicates': _similar_payload(duplicates)
         }), 201
 
     except Exception as e:
         db.session.rollback()
+        if doc is not None and doc.id:
+            page_store.delete(doc.id)
         logger.error(f"Upload error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@api_bp.route('/suggest', methods=['GET'])
+def suggest():
+    """
+    Gợi ý khi gõ: ?q=quyet%20d&limit=10
+
+    Tiêu đề, số hiệu, nơi gửi và từ hay gặp bắt đầu bằng q (không phân biệt
+    dấu, hoa thường), xếp theo tần suất. Chỉ đọc chỉ mục trong bộ nhớ.
+    """
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', default=10, type=int)
+        return jsonify({
+            'success': True,
+            'query': query,
+            'suggestions': suggest_index.suggest(query, limit=limit)
+        }), 200
+    except Exception as e:
+        logger.error(f"Suggest error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @api_bp.route('/search', methods=['POST'])
 def search_documents():
-    """Tìm kiếm văn bản"""
+    """
+    Tìm kiếm văn bản
+
+    Body JSON: query và filters (tuỳ chọn) lọc theo kết quả phân tích:
+    {"sentiment": "negative", "organization": "Sở Tài chính",
+     "document_number": "QĐ-2024-015", "date": "2024-03"}
+
+    Các bản gần trùng (scan, DOCX, bản chuyển tiếp) được gộp vào kết quả
+    xếp hạng cao nhất, liệt kê trong "duplicates"; "collapse": false để tắt.
+
+    query hỗ trợ cú pháp có cấu trúc:
+        sender:"Ban Nhân Sự" type:"Quyết định" "nghỉ hè" -2023 after:2024-01-01
+    Trường: sender, receiver, title (chứa), type, number (bằng), after/before
+    (ngày ban hành); "-" phủ định. "explain": true trả về kế hoạch thực thi
+    và thời gian từng bước trong "plan".
+    """
     try:
         data = request.get_json()
         query = data.get('query', '')
@@ -224,7 +596,32 @@ def search_documents():
         if not query:
             return jsonify({'success': True, 'results': []}), 200
 
-        results = AIService.search_documents(query, limit=10)
+        try:
+            document_filter = analysis_filter(data.get('filters'))
+        except AnalysisFilterError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        limit = 10
+        collapse = data.get('collapse', True)
+        # Lấy dư kết quả để sau khi gộp bản trùng vẫn đủ limit
+        try:
+            results, plan = query_service.search(query, limit=limit * 3 if collapse else limit,
+                                                 document_filter=document_filter)
+        except query_service.QuerySyntaxError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        duplicates = {}
+        if collapse:
+            groups = dedup_service.duplicate_groups([result['document'].pk for result in results])
+            kept = []
+            for result in results:
+                doc = result['document']
+                representative = groups[doc.pk]
+                if representative == doc.pk:
+                    kept.append(result)
+                else:
+                    duplicates.setdefault(representative, []).append(doc.id)
+            results = kept[:limit]
+        analyses = analyses_for([result['document'].pk for result in results])
 
         formatted_results = []
         for result in results:
@@ -239,13 +636,18 @@ def search_documents():
                     'created_at': doc.created_at.isoformat()
                 },
                 'score': result['score'],
-                'matches': result['matches'][:3]
+                'matches': result['matches'][:3],
+                'analysis': analyses.get(doc.pk),
+                'duplicates': duplicates.get(doc.pk, [])
             })
 
-        return jsonify({
+        response = {
             'success': True,
             'results': formatted_results
-        }), 200
+        }
+        if data.get('explain'):
+            response['plan'] = plan
+        return jsonify(response), 200
 
     except Exception as e:
         logger.error(f"Search error: {str(e)}")
@@ -263,28 +665,25 @@ def chat():
         if not message:
             return jsonify({'success': False, 'error': 'No message provided'}), 400
 
-        response, related_docs = AIService.process_chat_message(message)
+        # Chỉ ghi nhớ hội thoại khi client gửi session_id riêng
+        response, related_docs, extra = AIService.process_chat_message(
+            message, data.get('session_id'), chat_previous_results(data)
+        )
 
-        # Lưu chat message
-        chat_msg = ChatMessage(
+        # Lưu chat message theo lô (write-behind), không commit trong request
+        message_id = chat_log_writer.schedule(
             session_id=session_id,
             user_message=message,
             ai_response=response,
             related_documents=[d.id for d in related_docs] if related_docs else None
         )
-        db.session.add(chat_msg)
-        db.session.commit()
 
         return jsonify({
             'success': True,
+            'message_id': message_id,
             'response': response,
-            'results': [
-                {
-                    'id': d.id,
-                    'title': d.title,
-                    'snippet': d.content[:150] + '...' if d.content and len(d.content) > 150 else d.content
-                } for d in related_docs[:5]
-            ]
+            'results': chat_results(related_docs),
+            **extra
         }), 200
 
     except Exception as e:
@@ -292,23 +691,153 @@ def chat():
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@api_bp.route('/chat/history', methods=['GET'])
+def get_chat_history():
+    """
+    Lịch sử chat của một session, mới nhất trước
+
+    ?session_id=&limit=&before=<next_cursor của trang trước>
+    """
+    try:
+        session_id = request.args.get('session_id')
+        if not session_id:
+            return jsonify({'success': False, 'error': 'No session_id provided'}), 400
+        limit = min(
+            request.args.get('limit', default=current_app.config['CHAT_HISTORY_PAGE_SIZE'], type=int),
+            current_app.config['MAX_PAGE_SIZE']
+        )
+
+        # Đọc cả các tin nhắn còn chờ trong hàng đợi ghi
+        chat_log_writer.flush()
+        messages, next_cursor = chat_history(session_id, limit=max(limit, 1), before=request.args.get('before'))
+
+        return jsonify({
+            'success': True,
+            'messages': messages,
+            'next_cursor': next_cursor
+        }), 200
+
+    except CursorError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Chat history error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+def chat_results(related_docs):
+    """Tối đa 5 văn bản liên quan kèm đoạn đầu nội dung (payload 'results' của chat)"""
+    return [
+        {
+            'id': d.id,
+            'title': d.title,
+            'snippet': d.content[:150] + '...' if d.content and len(d.content) > 150 else d.content
+        } for d in related_docs[:5]
+    ]
+
+
+def chat_previous_results(data):
+    """
+    previous_results của request chat: id văn bản lượt trước client đang hiển
+    thị (list JSON hoặc chuỗi phân tách bằng dấu phẩy), None nếu không gửi
+
+    Tham chiếu "cái thứ hai" được giải theo danh sách này ở bất kỳ worker nào,
+    không phụ thuộc bộ nhớ hội thoại của tiến trình.
+    """
+    results = data.get('previous_results')
+    if results is None:
+        return None
+    if isinstance(results, str):
+        results = results.split(',')
+    if not isinstance(results, list):
+        return None
+    return [str(r) for r in results[:MAX_PREVIOUS_RESULTS] if r]
+
+
+def sse_event(event, data):
+    """Một sự kiện Server-Sent Events (data là JSON một dòng)"""
+    return b'event: ' + event.encode('ascii') + b'\ndata: ' + encode_json(data) + b'\n\n'
+
+
+@api_bp.route('/chat/stream', methods=['GET', 'POST'])
+def chat_stream():
+    """
+    Chat với AI dạng Server-Sent Events
+
+    Sự kiện: results (văn bản liên quan, gửi ngay sau bước tìm kiếm), delta
+    (từng phần câu trả lời), done (first_byte_ms, total_ms, rag/reference)
+    hoặc error.
+    ChatMessage được ghi nền sau khi stream kết thúc.
+    """
+    data = request.get_json(silent=True) or request.args
+    message = data.get('message', '')
+    session_id = data.get('session_id', 'default')
+
+    if not message:
+        return jsonify({'success': False, 'error': 'No message provided'}), 400
+
+    started = time.perf_counter()
+
+    def elapsed_ms():
+        return round((time.perf_counter() - started) * 1000, 2)
+
+    def events():
+        first_byte_ms = None
+        parts = []
+        related_ids = None
+        try:
+            for event, payload in AIService.stream_chat_message(
+                    message, data.get('session_id'), chat_previous_results(data)):
+                if event == 'results':
+                    related_ids = [d.id for d in payload] or None
+                    chunk = sse_event('results', {'results': chat_results(payload)})
+                elif event == 'delta':
+                    parts.append(payload)
+                    chunk = sse_event('delta', {'text': payload})
+                else:
+                    done = {'success': True, 'first_byte_ms': first_byte_ms, 'total_ms': elapsed_ms(), **payload}
+                    logger.info(f"Chat stream: first byte {first_byte_ms} ms, total {done['total_ms']} ms")
+                    chunk = sse_event('done', done)
+                if first_byte_ms is None:
+                    first_byte_ms = elapsed_ms()
+                yield chunk
+        except Exception as e:
+            logger.error(f"Chat stream error: {str(e)}")
+            yield sse_event('error', {'success': False, 'error': str(e)})
+        finally:
+            # Ghi sau khi client đã nhận hết câu trả lời, ngoài request
+            if parts:
+                chat_log_writer.schedule(
+                    session_id=session_id,
+                    user_message=message,
+                    ai_response=''.join(parts),
+                    related_documents=related_ids
+                )
+
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 @api_bp.route('/download/<doc_id>', methods=['GET'])
 def download_document(doc_id):
-    """Tải văn bản gốc"""
+    """Tải văn bản gốc (hỗ trợ Range, ETag/If-None-Match)"""
     try:
-        doc = Document.query.get(doc_id)
+        doc = db.session.execute(
+            db.select(Document.file_path, Document.file_name, Document.file_hash)
+            .where(Document.id == doc_id)
+        ).first()
         if not doc or not doc.file_path:
             return jsonify({'success': False, 'error': 'Document not found'}), 404
 
         if not os.path.exists(doc.file_path):
             return jsonify({'success': False, 'error': 'File not found'}), 404
 
-        return send_file(
-            doc.file_path,
-            as_attachment=True,
-            download_name=doc.file_name or 'document'
-        ), 200
+        return send_stored_file(doc.file_path, doc.file_name or 'document', doc.file_hash)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Download error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -316,47 +845,128 @@ def download_document(doc_id):
 
 @api_bp.route('/download/attachment/<att_id>', methods=['GET'])
 def download_attachment(att_id):
-    """Tải file đính kèm"""
+    """Tải file đính kèm (hỗ trợ Range, ETag/If-None-Match)"""
     try:
-        att = Attachment.query.get(att_id)
+        att = db.session.execute(
+            db.select(Attachment.file_path, Attachment.filename, Attachment.file_hash)
+            .where(Attachment.id == att_id)
+        ).first()
         if not att or not att.file_path:
             return jsonify({'success': False, 'error': 'Attachment not found'}), 404
 
         if not os.path.exists(att.file_path):
             return jsonify({'success': False, 'error': 'File not found'}), 404
 
-        return send_file(
-            att.file_path,
-            as_attachment=True,
-            download_name=att.filename
-        ), 200
+        return send_stored_file(att.file_path, att.filename, att.file_hash)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Attachment download error: {str(e)}")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+def _zip_response(entries, filename):
+    """Response ZIP dạng stream (không Content-Length, không file tạm)"""
+    return Response(
+        iter_zip_bundle(entries),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename={filename}',
+            'X-Accel-Buffering': 'no',  # nginx chuyển tiếp ngay, không đệm ra đĩa
+        }
+    )
+
+
+@api_bp.route('/download/<doc_id>/bundle', methods=['GET'])
+def download_bundle(doc_id):
+    """Tải văn bản gốc kèm toàn bộ file đính kèm thành một file ZIP"""
+    try:
+        entries, found = bundle_entries([doc_id])
+        if not found:
+            return jsonify({'success': False, 'error': 'Document not found'}), 404
+        if not entries:
+            return jsonify({'success': False, 'error': 'File not found'}), 404
+
+        return _zip_response(entries, f'document_{doc_id}.zip')
+
+    except Exception as e:
+        logger.error(f"Bundle error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/download/bundle', methods=['GET', 'POST'])
+def download_bundle_many():
+    """
+    Tải nhiều văn bản (mỗi văn bản một thư mục) thành một file ZIP
+
+    GET ?ids=id1,id2 hoặc POST {"ids": [...]}
+    """
+    try:
+        if request.method == 'POST':
+            ids = (request.get_json(silent=True) or {}).get('ids')
+        else:
+            ids = [i for i in request.args.get('ids', '').split(',') if i.strip()]
+        ids = BatchService.normalize_ids(ids, current_app.config['BUNDLE_MAX_DOCUMENTS'])
+
+        entries, _ = bundle_entries(ids, folders=True)
+        if not entries:
+            return jsonify({'success': False, 'error': 'No files found'}), 404
+
+        stamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
+        return _zip_response(entries, f'documents_{stamp}.zip')
+
+    except BatchValidationError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Bundle error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/export', methods=['GET'])
+def export_documents():
+    """Xuất kho văn bản (CSV, JSONL, Parquet) dạng stream"""
+    try:
+        fmt = request.args.get('format', 'csv').lower()
+        compress = _arg_flag('gzip', default=True)
+
+        chunks = stream_export(
+            fmt,
+            include_content=_arg_flag('content'),
+            include_attachments=_arg_flag('attachments'),
+            compress=compress,
+            batch_size=request.args.get('batch_size', default=current_app.config['EXPORT_BATCH_SIZE'], type=int)
+        )
+
+        filename = export_filename(fmt, compress, datetime.utcnow().strftime('%Y%m%d_%H%M%S'))
+        mimetype = 'application/gzip' if compress and fmt != 'parquet' else EXPORT_FORMATS[fmt][0]
+
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+
+    except ExportError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Export error: {str(e)}")
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
 @api_bp.route('/statistics', methods=['GET'])
 def get_statistics():
     """Lấy thống kê hệ thống"""
     try:
-        total_docs = Document.query.count()
-        total_size = sum([d.file_size or 0 for d in Document.query.all()])
+        # today_documents đổi theo ngày (UTC như document_statistics) dù kho không đổi
+        etag = collection_etag('statistics', datetime.utcnow().date().isoformat())
+        if request.if_none_match.contains(etag):
+            return _not_modified(etag)
 
-        doc_types = {}
-        for doc in Document.query.all():
-            dtype = doc.document_type or 'Unknown'
-            doc_types[dtype] = doc_types.get(dtype, 0) + 1
-
-        return jsonify({
+        return _cache_headers(jsonify({
             'success': True,
-            'statistics': {
-                'total_documents': total_docs,
-                'total_file_size': total_size,
-                'total_file_size_mb': total_size / (1024 * 1024),
-                'document_types': doc_types
-            }
-        }), 200
+            'statistics': document_statistics()
+        }), etag), 200
 
     except Exception as e:
         logger.error(f"Statistics error: {str(e)}")
@@ -364,4 +974,4 @@ def get_statistics():
 
 
 # Export
-__all__ = ['api_bp']
\ No newline at end of file
+__all__ = ['api_bp', 'chat_results', 'chat_previous_results', 'sse_event']
\ No newline at end of file
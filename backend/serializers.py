@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Serializers Module - Chuyển dữ liệu văn bản thành JSON
+Đọc theo cột (row tuple) thay vì nạp ORM instance, nạp attachments bằng
+một truy vấn IN cho mỗi trang và mã hoá bằng orjson nếu có cài đặt.
+"""
+
+import json
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask.json.provider import DefaultJSONProvider
+
+from models import db, Document, Attachment
+from page_store import page_store
+from summary_service import stored_summary
+
+try:
+    import orjson
+except ImportError:  # orjson là tuỳ chọn, fallback về json chuẩn
+    orjson = None
+
+
+# Độ dài đoạn trích nội dung trong danh sách (giống Document.to_dict)
+PREVIEW_LENGTH = 200
+
+# Số id tối đa trong một mệnh đề IN (SQLite giới hạn số biến bind)
+IN_CHUNK_SIZE = 500
+
+# Các cột dùng cho danh sách - KHÔNG nạp toàn bộ content
+DOCUMENT_LIST_COLUMNS = (
+    Document.pk,
+    Document.id,
+    Document.title,
+    db.func.substr(Document.content, 1, PREVIEW_LENGTH + 1).label('content'),
+    Document.document_type,
+    Document.document_type_confidence,
+    Document.document_number,
+    Document.sender,
+    Document.receiver,
+    Document.date_received,
+    Document.date_issued,
+    Document.file_name,
+    Document.file_size,
+    Document.file_hash,
+    Document.json_data,
+    Document.created_at,
+    Document.updated_at,
+)
+
+DOCUMENT_DETAIL_COLUMNS = (Document.content.label('content'),) + tuple(
+    col for col in DOCUMENT_LIST_COLUMNS if getattr(col, 'key', None) != 'content'
+)
+
+ATTACHMENT_COLUMNS = (
+    Attachment.document_pk,
+    Attachment.id,
+    Attachment.filename,
+    Attachment.file_size,
+    Attachment.file_type,
+    Attachment.file_hash,
+    Attachment.created_at,
+)
+
+
+# ============ JSON ENCODING ============
+
+def _default(obj: Any) -> Any:
+    """Chuyển các kiểu không chuẩn JSON (dùng cho fallback json chuẩn)"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def encode_json(obj: Any, pretty: bool = False) -> bytes:
+    """
+    Mã hoá obj thành JSON bytes
+
+    Args:
+        obj: Dữ liệu cần mã hoá
+        pretty: Có thụt lề (chỉ nên bật khi phát triển)
+
+    Returns:
+        JSON dạng bytes (UTF-8)
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option)
+
+    if pretty:
+        return json.dumps(obj, default=_default, ensure_ascii=False, indent=2).encode('utf-8')
+    return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    JSON provider cho Flask dùng orjson
+
+    Pretty-print theo JSONIFY_PRETTYPRINT_REGULAR (tắt trong ProductionConfig).
+    """
+
+    sort_keys = False
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        # Tham số tuỳ biến (indent, separators...) chỉ json chuẩn hỗ trợ
+        if kwargs or orjson is None:
+            kwargs.setdefault('default', _default)
+            kwargs.setdefault('ensure_ascii', False)
+            return json.dumps(obj, **kwargs)
+        return encode_json(obj).decode('utf-8')
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self._app.config.get('JSONIFY_PRETTYPRINT_REGULAR', self._app.debug)
+        return self._app.response_class(encode_json(obj, pretty=pretty) + b'\n', mimetype=self.mimetype)
+
+
+# ============ ROW SERIALIZATION ============
+
+def _preview(content: Optional[str]) -> Optional[str]:
+    if content and len(content) > PREVIEW_LENGTH:
+        return content[:PREVIEW_LENGTH] + '...'
+    return content
+
+
+def _document_from_row(row, attachments: List[Dict[str, Any]], preview: bool = True) -> Dict[str, Any]:
+    """Dựng dict văn bản từ một row tuple (datetime để encoder xử lý)"""
+    return {
+        'id': row.id,
+        'title': row.title,
+        'content': _preview(row.content) if preview else row.content,
+        'document_type': row.document_type,
+        'document_type_confidence': row.document_type_confidence,
+        'document_number': row.document_number,
+        'sender': row.sender,
+        'receiver': row.receiver,
+        'date_received': row.date_received,
+        'date_issued': row.date_issued,
+        'file_name': row.file_name,
+        'file_size': row.file_size,
+        'file_hash': row.file_hash,
+        'metadata': row.json_data,
+        'created_at': row.created_at,
+        'updated_at': row.updated_at,
+        'attachments': attachments,
+    }
+
+
+def load_attachments(doc_pks: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Nạp attachments của nhiều văn bản bằng truy vấn IN (theo lô IN_CHUNK_SIZE)
+
+    Args:
+        doc_pks: Danh sách khoá nội bộ (Document.pk) của văn bản
+
+    Returns:
+        Dict document_pk -> danh sách attachment dict
+    """
+    grouped: Dict[int, List[Dict[str, Any]]] = {doc_pk: [] for doc_pk in doc_pks}
+
+    for start in range(0, len(doc_pks), IN_CHUNK_SIZE):
+        chunk = doc_pks[start:start + IN_CHUNK_SIZE]
+        rows = db.session.execute(
+            db.select(*ATTACHMENT_COLUMNS)
+            .where(Attachment.document_pk.in_(chunk))
+            .order_by(Attachment.pk)
+        )
+        for document_pk, att_id, filename, file_size, file_type, file_hash, created_at in rows:
+            grouped[document_pk].append({
+                'id': att_id,
+                'filename': filename,
+                'file_size': file_size,
+                'file_type': file_type,
+                'file_hash': file_hash,
+                'created_at': created_at,
+            })
+
+    return grouped
+
+
+def serialize_document_rows(rows: Iterable[Any]) -> List[Dict[str, Any]]:
+    """Dựng danh sách dict từ các row của DOCUMENT_LIST_COLUMNS"""
+    rows = list(rows)
+    attachments = load_attachments([row.pk for row in rows])
+    return [_document_from_row(row, attachments[row.pk]) for row in rows]
+
+
+def list_documents(page: Optional[int] = None, per_page: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Lấy danh sách văn bản (mới nhất trước) đã serialize
+
+    Args:
+        page: Trang (bắt đầu từ 1); None = lấy tất cả
+        per_page: Số văn bản mỗi trang
+
+    Returns:
+        Tuple[danh sách văn bản, tổng số văn bản]
+    """
+    stmt = db.select(*DOCUMENT_LIST_COLUMNS).order_by(Document.created_at.desc())
+
+    if page is not None:
+        page = max(page, 1)
+        total = db.session.execute(db.select(db.func.count(Document.pk))).scalar_one()
+        rows = db.session.execute(stmt.limit(per_page).offset((page - 1) * per_page)).all()
+        return serialize_document_rows(rows), total
+
+    rows = db.session.execute(stmt).all()
+    documents = []
+    for start in range(0, len(rows), IN_CHUNK_SIZE):
+        documents.extend(serialize_document_rows(rows[start:start + IN_CHUNK_SIZE]))
+    return documents, len(documents)
+
+
+def get_document_payload(doc_id: str, full_content: bool = True) -> Optional[Dict[str, Any]]:
+    """
+    Lấy chi tiết một văn bản đã serialize
+
+    Args:
+        doc_id: Id văn bản
+        full_content: Kèm nội dung đầy đủ; False chỉ lấy đoạn trích, nội dung
+            đọc theo trang qua /documents/<id>/pages
+
+    Returns:
+        Dict văn bản (kèm page_count, summary) hoặc None nếu không tồn tại
+    """
+    columns = DOCUMENT_DETAIL_COLUMNS if full_content else DOCUMENT_LIST_COLUMNS
+    row = db.session.execute(
+        db.select(*columns).where(Document.id == doc_id)
+    ).first()
+    if row is None:
+        return None
+    document = _document_from_row(row, load_attachments([row.pk])[row.pk], preview=not full_content)
+    document['page_count'] = page_store.page_count(doc_id)
+    # Tóm tắt tính sẵn ở luồng ingest / manage.py summarize (None nếu chưa có)
+    summary = stored_summary(row.pk)
+    document['summary'] = summary['summary'] if summary else None
+    return document
+
+
+# Export
+__all__ = [
+    'FastJSONProvider',
+    'encode_json',
+    'load_attachments',
+    'serialize_document_rows',
+    'list_documents',
+    'get_document_payload',
+]
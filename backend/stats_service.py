@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Stats Service Module - Số liệu tổng hợp về kho văn bản cho chat và /statistics
+Một truy vấn GROUP BY duy nhất (chạy trên index phủ, không đọc bảng) cho mọi
+loại văn bản, được ghi nhớ ngắn hạn (TTL) và hết hạn khi kho thay đổi.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, List
+
+from models import db, Document
+from cache import TTLMemo
+
+# Độ dài đoạn trích trong câu trả lời chat (routes.chat cắt ở 150 ký tự)
+SNIPPET_LENGTH = 150
+
+# Danh sách gần đây chỉ đọc các cột cần hiển thị, không nạp toàn bộ content
+RECENT_COLUMNS = (
+    Document.id,
+    Document.title,
+    Document.document_number,
+    Document.sender,
+    Document.date_received,
+    db.func.substr(Document.content, 1, SNIPPET_LENGTH + 1).label('content'),
+)
+
+stats_memo = TTLMemo(ttl=30)
+
+
+def _compute_statistics(today_start: datetime) -> Dict[str, Any]:
+    # Số văn bản hôm nay là scalar subquery không tương quan: SQLite tính một
+    # lần bằng range scan trên index created_at thay vì so sánh từng dòng
+    today_count = (
+        db.select(db.func.count())
+        .where(Document.created_at >= today_start)
+        .scalar_subquery()
+    )
+    rows = db.session.execute(
+        db.select(
+            Document.document_type,
+            db.func.count(),
+            db.func.coalesce(db.func.sum(Document.file_size), 0),
+            today_count,
+        ).group_by(Document.document_type)
+    ).all()
+
+    document_types: Dict[str, int] = {}
+    total = today = total_size = 0
+    for document_type, count, type_size, today in rows:
+        name = document_type or 'Unknown'
+        document_types[name] = document_types.get(name, 0) + count
+        total += count
+        total_size += type_size
+
+    return {
+        'total_documents': total,
+        'today_documents': today,
+        'total_file_size': total_size,
+        'total_file_size_mb': total_size / (1024 * 1024),
+        'document_types': dict(sorted(document_types.items(), key=lambda item: -item[1])),
+    }
+
+
+def document_statistics() -> Dict[str, Any]:
+    """
+    Thống kê kho văn bản: tổng số, số văn bản hôm nay, dung lượng, theo loại
+
+    Returns:
+        Dict số liệu (dùng chung giữa các lần gọi - không sửa trực tiếp)
+    """
+    today = datetime.utcnow().date()
+    today_start = datetime(today.year, today.month, today.day)
+    return stats_memo.get_or_compute(('documents', today), lambda: _compute_statistics(today_start))
+
+
+def recent_documents(limit: int = 5) -> List[Any]:
+    """
+    Các văn bản mới nhất (theo index created_at), chỉ các cột RECENT_COLUMNS
+
+    Returns:
+        Danh sách Row (truy cập thuộc tính như id, title, content...)
+    """
+    return db.session.execute(
+        db.select(*RECENT_COLUMNS).order_by(Document.created_at.desc()).limit(limit)
+    ).all()
+
+
+# Export
+__all__ = ['document_statistics', 'recent_documents', 'stats_memo']
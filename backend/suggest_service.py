@@ -0,0 +1,529 @@
+#!/usr/bin/env python3
+"""
+Suggest Service Module - Gợi ý khi gõ (typeahead) cho ô tìm kiếm
+Chỉ mục tiền tố trong bộ nhớ trên tiêu đề, số hiệu, nơi gửi và các từ hay
+gặp. Khoá được bỏ dấu và viết thường ("quyet dinh" khớp "Quyết định"), sắp
+xếp trong một chuỗi liền (không tạo một object str cho mỗi mục) để tìm
+khoảng tiền tố bằng bisect; top-k theo trọng số (tần suất) lấy bằng cây
+phân đoạn max nên không phụ thuộc số mục khớp tiền tố. Văn bản mới được thêm
+vào một bộ đệm nhỏ (delta) và gộp vào chỉ mục chính ở thread nền. Mỗi worker
+giữ chỉ mục riêng: khi phiên bản kho (cache.collection_version) đổi, văn bản
+do worker khác thêm được đọc vào delta, sửa/xoá thì dựng lại ở thread nền.
+"""
+
+import heapq
+import logging
+import re
+import threading
+import unicodedata
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 1_000_000
+DEFAULT_DELTA_MAX = 5000  # Số mục trong delta trước khi gộp vào chỉ mục chính
+TERM_CONTENT_CHARS = 500  # Từ hay gặp lấy từ tiêu đề và phần đầu nội dung
+MIN_TERM_LENGTH = 3
+MIN_TERM_DF = 2  # Từ chỉ gặp trong một văn bản không đáng gợi ý
+MAX_SUGGESTIONS = 20
+
+KINDS = ('title', 'document_number', 'sender', 'term')
+# Trọng số mỗi lần xuất hiện: tiêu đề/số hiệu cụ thể hơn một từ đơn
+KIND_WEIGHTS = {'title': 3, 'document_number': 3, 'sender': 1, 'term': 1}
+# Từ hiếm vẫn được lưu (trọng số đủ khi văn bản sau thêm vào) nhưng chỉ gợi ý
+# khi tổng trọng số chính + delta đạt ngưỡng
+MIN_TERM_WEIGHT = MIN_TERM_DF * KIND_WEIGHTS['term']
+_TERM_KIND = KINDS.index('term')
+
+_WORD_RE = re.compile(r'[^\W\d_]{%d,}' % MIN_TERM_LENGTH)
+_SPACE_RE = re.compile(r'\s+')
+_KEY_SEP = '\x00'
+_MAX_CHAR = '\U0010ffff'
+
+# Một mục: (khoá đã bỏ dấu, loại) -> [chuỗi hiển thị, trọng số]. Văn bản trùng
+# tiêu đề/số hiệu (bản sao) cộng dồn trọng số thay vì thành nhiều mục
+Identity = Tuple[str, str]
+
+
+def fold(text: Optional[str]) -> str:
+    """Khoá so khớp: bỏ dấu tiếng Việt, chữ thường, gộp khoảng trắng"""
+    if not text:
+        return ''
+    decomposed = unicodedata.normalize('NFD', text.replace('đ', 'd').replace('Đ', 'D'))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return _SPACE_RE.sub(' ', stripped).strip().lower()
+
+
+def document_entries(title: Optional[str], document_number: Optional[str], sender: Optional[str],
+                     content: Optional[str]) -> Dict[Identity, List[Any]]:
+    """Các mục gợi ý của một văn bản"""
+    entries: Dict[Identity, List[Any]] = {}
+
+    def add(kind, display):
+        display = _SPACE_RE.sub(' ', display or '').strip()
+        key = fold(display)
+        if not key:
+            return
+        entry = entries.setdefault((key, kind), [display, 0])
+        entry[1] += KIND_WEIGHTS[kind]
+
+    add('title', title)
+    add('document_number', document_number)
+    add('sender', sender)
+    text = f"{title or ''} {(content or '')[:TERM_CONTENT_CHARS]}"
+    # Mỗi từ tính một lần cho một văn bản (document frequency)
+    for word in {w.lower() for w in _WORD_RE.findall(text)}:
+        add('term', word)
+    return entries
+
+
+# ============ STATIC INDEX ============
+
+class _Keys:
+    """Dãy khoá (đã sắp xếp) đọc từ chuỗi liền, cho bisect"""
+
+    __slots__ = ('blob', 'offsets')
+
+    def __init__(self, blob: str, offsets: array):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        return self.blob[self.offsets[i]:self.offsets[i + 1] - 1]
+
+
+class PrefixIndex:
+    """
+    Chỉ mục tiền tố bất biến
+
+    Khoá và chuỗi hiển thị nằm trong hai chuỗi liền cùng mảng offset; trọng
+    số, loại và cây phân đoạn (chỉ số mục có trọng số lớn nhất của mỗi đoạn)
+    là array số nguyên - vài chục byte mỗi mục thay vì vài trăm byte nếu lưu
+    tuple Python.
+    """
+
+    def __init__(self, entries: Dict[Identity, List[Any]]):
+        items = sorted(entries.items())
+        self.size = len(items)
+
+        self._keys = _Keys(''.join(key + _KEY_SEP for (key, _), _ in items),
+                           self._offsets(len(key) + 1 for (key, _), _ in items))
+        self._displays = ''.join(display for _, (display, _) in items)
+        self._display_offsets = self._offsets(len(display) for _, (display, _) in items)
+        self._kinds = bytes(KINDS.index(kind) for (_, kind), _ in items)
+        # Phần tử cuối (trọng số 0) là lá đệm của cây phân đoạn
+        self._weights = array('I', [weight for _, (_, weight) in items] + [0])
+
+        leaves = 1
+        while leaves < max(self.size, 1):
+            leaves <<= 1
+        self._leaves = leaves
+        tree = array('I', [self.size]) * (2 * leaves)
+        tree[leaves:leaves + self.size] = array('I', range(self.size))
+        weights = self._weights
+        for i in range(leaves - 1, 0, -1):
+            left, right = tree[2 * i], tree[2 * i + 1]
+            tree[i] = left if weights[left] >= weights[right] else right
+        self._tree = tree
+
+    @staticmethod
+    def _offsets(lengths: Iterable[int]) -> array:
+        offsets = array('I', [0])
+        total = 0
+        for length in lengths:
+            total += length
+            offsets.append(total)
+        return offsets
+
+    def entry(self, i: int) -> Tuple[Identity, str, int]:
+        """(identity, chuỗi hiển thị, trọng số) của mục thứ i"""
+        display = self._displays[self._display_offsets[i]:self._display_offsets[i + 1]]
+        return (self._keys[i], KINDS[self._kinds[i]]), display, self._weights[i]
+
+    def entries(self) -> Iterable[Tuple[Identity, str, int]]:
+        for i in range(self.size):
+            yield self.entry(i)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        return bisect_left(self._keys, prefix), bisect_left(self._keys, prefix + _MAX_CHAR)
+
+    def _argmax(self, lo: int, hi: int) -> int:
+        """Chỉ số mục có trọng số lớn nhất trong [lo, hi) (O(log n))"""
+        tree, weights = self._tree, self._weights
+        best = self.size
+        lo += self._leaves
+        hi += self._leaves
+        while lo < hi:
+            if lo & 1:
+                candidate = tree[lo]
+                if weights[candidate] > weights[best] or best == self.size:
+                    best = candidate
+                lo += 1
+            if hi & 1:
+                hi -= 1
+                candidate = tree[hi]
+                if weights[candidate] > weights[best] or best == self.size:
+                    best = candidate
+            lo >>= 1
+            hi >>= 1
+        return best
+
+    def top(self, prefix: str, k: int, min_term_weight: int = 0) -> List[Tuple[Identity, str, int]]:
+        """
+        k mục có trọng số lớn nhất trong các khoá bắt đầu bằng prefix
+
+        Lấy mục lớn nhất của khoảng, tách khoảng làm hai quanh mục đó và lặp
+        lại với heap - O(k log n) bất kể bao nhiêu khoá khớp tiền tố. Từ
+        (kind 'term') có trọng số dưới min_term_weight bị bỏ qua.
+        """
+        lo, hi = self._range(prefix)
+        results = []
+        heap = []
+        if lo < hi:
+            best = self._argmax(lo, hi)
+            heap.append((-self._weights[best], best, lo, hi))
+        while heap and len(results) < k:
+            _, best, lo, hi = heapq.heappop(heap)
+            if self._kinds[best] != _TERM_KIND or self._weights[best] >= min_term_weight:
+                results.append(self.entry(best))
+            for start, end in ((lo, best), (best + 1, hi)):
+                if start < end:
+                    candidate = self._argmax(start, end)
+                    heapq.heappush(heap, (-self._weights[candidate], candidate, start, end))
+        return results
+
+    def weight(self, identity: Identity) -> int:
+        """Trọng số của một mục (0 nếu không có)"""
+        key, kind = identity
+        i = bisect_left(self._keys, key)
+        # Cùng khoá chỉ có tối đa len(KINDS) mục
+        while i < self.size and self._keys[i] == key:
+            if KINDS[self._kinds[i]] == kind:
+                return self._weights[i]
+            i += 1
+        return 0
+
+
+# ============ SERVICE ============
+
+class SuggestIndex:
+    """
+    Chỉ mục gợi ý của cả kho: PrefixIndex + delta cho văn bản mới
+
+    Trọng số của một mục = trọng số trong chỉ mục chính + trong delta; mục
+    có trong delta luôn được xét với trọng số đầy đủ nên top-k vẫn chính xác
+    trước khi gộp. Chỉ mục được dựng lần đầu khi có truy vấn (cần app context)
+    và dựng lại ở thread nền khi delta đầy hoặc khi văn bản bị sửa/xoá.
+
+    Chỉ mục ghi nhớ phiên bản kho đã phản ánh (version), pk lớn nhất đã đọc
+    (mọi văn bản pk <= _scanned_pk đã có) và (COUNT, MAX(updated_at)) của kho
+    lúc đó. suggest() thấy phiên bản đổi thì đồng bộ ở thread nền: đọc văn
+    bản pk > _scanned_pk chưa có vào delta; số dòng hoặc updated_at lớn nhất
+    khác dự kiến nghĩa là có văn bản bị sửa/xoá, khi đó dựng lại.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.max_entries = DEFAULT_MAX_ENTRIES
+        self.delta_max = DEFAULT_DELTA_MAX
+        self.version: Optional[int] = None
+        self._base: Optional[PrefixIndex] = None
+        self._delta: Dict[Identity, List[Any]] = {}
+        # Mục của từng văn bản trong delta (thứ tự thêm, pk, mục): lần dựng bỏ các văn bản đã đọc từ database
+        self._delta_docs: List[Tuple[int, Optional[int], Dict[Identity, List[Any]]]] = []
+        self._added = 0
+        self._frozen: Dict[Identity, List[Any]] = {}  # Delta đang được gộp ở thread nền
+        self._scanned_pk = 0
+        self._known: Set[int] = set()  # pk > _scanned_pk đã có trong chỉ mục (upload ở worker này)
+        self._signature: Optional[Tuple[int, Any]] = None
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        self._rebuild_pending = False
+
+    def init_app(self, app):
+        self.app = app
+        self.max_entries = app.config.get('SUGGEST_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+        self.delta_max = app.config.get('SUGGEST_DELTA_MAX', DEFAULT_DELTA_MAX)
+
+    @property
+    def ready(self) -> bool:
+        return self._base is not None
+
+    def __len__(self) -> int:
+        return (self._base.size if self._base else 0) + len(self._delta) + len(self._frozen)
+
+    # ============ BUILD ============
+
+    def _prune(self, entries: Dict[Identity, List[Any]]) -> Dict[Identity, List[Any]]:
+        """
+        Giữ tối đa max_entries mục trọng số cao nhất
+
+        Từ hiếm không bị bỏ ở đây: gộp delta bỏ chúng thì trọng số đã đếm bị
+        mất, văn bản sau lại đếm từ đầu. Ngưỡng MIN_TERM_WEIGHT áp dụng lúc
+        truy vấn trên tổng trọng số.
+        """
+        if len(entries) > self.max_entries:
+            kept = heapq.nlargest(self.max_entries, entries.items(), key=lambda item: item[1][1])
+            entries = dict(kept)
+        return entries
+
+    @staticmethod
+    def _read_signature() -> Tuple[int, Any]:
+        """(COUNT, MAX(updated_at)) của kho - đổi khác dự kiến khi có văn bản bị sửa/xoá"""
+        from models import db, Document
+
+        return tuple(db.session.execute(
+            db.select(db.func.count(), db.func.max(Document.updated_at)).select_from(Document)
+        ).one())
+
+    def build(self, batch_size: int = 2000) -> int:
+        """
+        Dựng lại chỉ mục từ database (cần app context)
+
+        Chỉ đọc tới pk lớn nhất lúc bắt đầu; văn bản thêm trong lúc dựng được
+        đọc vào delta ở lần đồng bộ sau (phiên bản kho đã đổi).
+
+        Returns:
+            Số mục trong chỉ mục
+        """
+        from models import db, Document
+        from cache import collection_version
+
+        version = collection_version.get()
+        with self._lock:
+            added = self._added
+        # Văn bản vào delta trước đây đã commit nên có pk <= max_pk (hoặc đã bị xoá)
+        max_pk = db.session.execute(db.select(db.func.max(Document.pk))).scalar() or 0
+        signature = self._read_signature()
+
+        entries: Dict[Identity, List[Any]] = {}
+        last_pk = 0
+        while True:
+            rows = db.session.execute(
+                db.select(Document.pk, Document.title, Document.document_number, Document.sender,
+                          db.func.substr(Document.content, 1, TERM_CONTENT_CHARS))
+                .where(Document.pk > last_pk, Document.pk <= max_pk)
+                .order_by(Document.pk)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+            for _, title, number, sender, content in rows:
+                _merge(entries, document_entries(title, number, sender, content))
+
+        base = PrefixIndex(self._prune(entries))
+        with self._lock:
+            self._base = base
+            # Chỉ giữ văn bản thêm trong lúc dựng mà lần quét chưa đọc (pk > max_pk): không cộng hai lần
+            self._delta_docs = [(seq, pk, doc) for seq, pk, doc in self._delta_docs
+                                if seq > added and pk is not None and pk > max_pk]
+            self._delta = {}
+            for _, _, doc in self._delta_docs:
+                _merge(self._delta, doc)
+            self._scanned_pk = max_pk
+            self._known = {pk for pk in self._known if pk > max_pk}
+            self._signature = signature
+            self.version = version
+        logger.info(f"Suggest index built: {base.size} entries")
+        return base.size
+
+    def _sync(self) -> None:
+        """Đọc văn bản worker khác đã thêm vào delta; dựng lại nếu có văn bản bị sửa/xoá (thread nền)"""
+        from models import db, Document
+        from cache import collection_version
+
+        version = collection_version.get()
+        with self._lock:
+            scanned_pk, known = self._scanned_pk, set(self._known)
+            count, max_updated = self._signature
+
+        # Cùng một transaction: COUNT/MAX và các dòng mới nhất quán với nhau
+        signature = self._read_signature()
+        rows = db.session.execute(
+            db.select(Document.pk, Document.updated_at, Document.title, Document.document_number,
+                      Document.sender, db.func.substr(Document.content, 1, TERM_CONTENT_CHARS))
+            .where(Document.pk > scanned_pk)
+            .order_by(Document.pk)
+        ).all()
+        for row in rows:
+            count += 1
+            if row.updated_at is not None and (max_updated is None or row.updated_at > max_updated):
+                max_updated = row.updated_at
+        if signature != (count, max_updated):
+            self.build()
+            return
+
+        docs = [(pk, document_entries(title, number, sender, content))
+                for pk, _, title, number, sender, content in rows if pk not in known]
+        with self._lock:
+            for pk, doc in docs:
+                self._append(pk, doc)
+            if rows:
+                self._scanned_pk = rows[-1].pk
+                self._known = {pk for pk in self._known if pk > self._scanned_pk}
+            self._signature = signature
+            self.version = version
+        if docs:
+            logger.info(f"Suggest index synced: {len(docs)} documents from other workers")
+
+    def ensure_built(self) -> None:
+        if self._base is None:
+            with self._lock:
+                if self._base is None:
+                    self.build()
+
+    def _merge_delta(self) -> None:
+        """Gộp delta đang đóng băng vào chỉ mục chính (thread nền)"""
+        base = self._base
+        entries: Dict[Identity, List[Any]] = {}
+        if base is not None:
+            for identity, display, weight in base.entries():
+                entries[identity] = [display, weight]
+        _merge(entries, self._frozen)
+        merged = PrefixIndex(self._prune(entries))
+        with self._lock:
+            self._base = merged
+            self._frozen = {}
+
+    def _background(self, mode: str) -> None:
+        try:
+            if mode == 'merge':
+                self._merge_delta()
+            else:
+                with self.app.app_context():
+                    from models import db
+                    try:
+                        if mode == 'rebuild':
+                            self.build()
+                        else:
+                            self._sync()
+                    finally:
+                        db.session.remove()
+        except Exception as e:
+            logger.error(f"Suggest index update failed: {str(e)}")
+        finally:
+            with self._lock:
+                self._thread = None
+                again = self._rebuild_pending
+                self._rebuild_pending = False
+            if again:
+                self.schedule_rebuild()
+
+    def _start(self, mode: str) -> None:
+        """mode: 'merge' (gộp delta), 'rebuild' (dựng lại), 'sync' (đồng bộ với worker khác)"""
+        with self._lock:
+            if self._thread is not None:
+                # sync bị bỏ qua: suggest() sau sẽ thấy phiên bản vẫn khác
+                self._rebuild_pending = self._rebuild_pending or mode == 'rebuild'
+                return
+            if mode == 'merge':
+                self._frozen, self._delta = self._delta, {}
+                self._delta_docs = []
+            self._thread = threading.Thread(target=self._background, args=(mode,),
+                                            name='suggest-index', daemon=True)
+            self._thread.start()
+
+    def schedule_rebuild(self) -> None:
+        """Dựng lại từ database ở thread nền (sau khi sửa/xoá văn bản)"""
+        if self._base is not None and self.app is not None:
+            self._start('rebuild')
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    # ============ UPDATE / QUERY ============
+
+    def add_document(self, title: Optional[str], document_number: Optional[str], sender: Optional[str],
+                     content: Optional[str], pk: Optional[int] = None) -> None:
+        """
+        Thêm mục của văn bản mới tải lên (chưa dựng thì bỏ qua - lần dựng đầu sẽ đọc)
+
+        pk (sau commit) để lần đồng bộ/dựng lại không đọc văn bản này lần nữa.
+        """
+        if self._base is None:
+            return
+        entries = document_entries(title, document_number, sender, content)
+        with self._lock:
+            if pk is not None:
+                if pk <= self._scanned_pk or pk in self._known:
+                    return  # Đã đọc từ database
+                self._known.add(pk)
+            self._append(pk, entries)
+            full = len(self._delta) >= self.delta_max
+        if full:
+            self._start('merge')
+
+    def _append(self, pk: Optional[int], entries: Dict[Identity, List[Any]]) -> None:
+        self._added += 1
+        self._delta_docs.append((self._added, pk, entries))
+        _merge(self._delta, entries)
+
+    def suggest(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Gợi ý cho tiền tố query (không phân biệt dấu, hoa thường)
+
+        Returns:
+            Danh sách {text, kind, weight} giảm dần theo trọng số
+        """
+        prefix = fold(query)
+        if not prefix:
+            return []
+        self.ensure_built()
+        limit = max(1, min(limit, MAX_SUGGESTIONS))
+        if self.app is not None and self._thread is None:
+            from cache import collection_version
+
+            if collection_version.get() != self.version:
+                self._start('sync')
+
+        with self._lock:
+            base = self._base
+            pending = [(identity, entry) for delta in (self._frozen, self._delta)
+                       for identity, entry in delta.items() if identity[0].startswith(prefix)]
+
+        # Mục trong delta: trọng số chính + delta; mục khác: top-k của chỉ mục chính
+        candidates: Dict[Identity, Tuple[str, int]] = {
+            # Lấy dư: cùng chuỗi ở nhiều loại bị gộp bên dưới
+            identity: (display, weight)
+            for identity, display, weight in base.top(prefix, limit * 2, MIN_TERM_WEIGHT)
+        }
+        for identity, (display, weight) in pending:
+            previous = candidates.get(identity)
+            base_weight = previous[1] if previous else base.weight(identity)
+            candidates[identity] = (display, base_weight + weight)
+
+        suggestions = []
+        seen = set()
+        for (key, kind), (display, weight) in sorted(candidates.items(), key=lambda item: (-item[1][1], item[0])):
+            # Cùng một chuỗi ở nhiều loại (tiêu đề và từ): giữ mục trọng số cao
+            if key in seen or (kind == 'term' and weight < MIN_TERM_WEIGHT):
+                continue
+            seen.add(key)
+            suggestions.append({'text': display, 'kind': kind, 'weight': weight})
+            if len(suggestions) >= limit:
+                break
+        return suggestions
+
+
+def _merge(target: Dict[Identity, List[Any]], entries: Dict[Identity, List[Any]]) -> None:
+    for identity, (display, weight) in entries.items():
+        entry = target.get(identity)
+        if entry is None:
+            target[identity] = [display, weight]
+        else:
+            entry[1] += weight
+
+
+suggest_index = SuggestIndex()
+
+
+# Export
+__all__ = ['SuggestIndex', 'PrefixIndex', 'suggest_index', 'fold', 'document_entries']
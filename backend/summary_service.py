@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Summary Service Module - Tóm tắt trích xuất văn bản
+Chọn các câu gần trọng tâm TF-IDF của văn bản (centroid) thay vì cắt các câu
+đầu: công văn thường mở đầu bằng quốc hiệu, số hiệu, "Kính gửi" nên các câu
+đó bị bỏ qua. Tóm tắt được tính ở luồng ingest nền hoặc theo lô
+(manage.py summarize) và lưu trong document_summaries theo hash nội dung,
+không bao giờ tính lại khi đọc.
+"""
+
+import heapq
+import math
+import re
+from collections import Counter
+from datetime import datetime
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from analysis_service import process_corpus
+
+# Đổi khi thay thuật toán để lần chạy sau tóm tắt lại toàn bộ
+SUMMARIZER_VERSION = '1'
+DEFAULT_MAX_CHARS = 300
+CENTROID_TERMS = 30  # Số từ trọng số cao nhất giữ trong centroid
+REDUNDANCY_THRESHOLD = 0.6  # Bỏ câu trùng từ (Jaccard) với câu đã chọn
+MIN_RELATIVE_SCORE = 0.5  # Không lấp chỗ trống bằng câu xa trọng tâm
+MIN_SENTENCE_CHARS = 20
+MAX_HEADER_LINE = 200  # Dòng thể thức dài hơn được xét theo từng câu
+
+_SENTENCE_RE = re.compile(r'(?<=[.!?;])\s+')
+_WORD_RE = re.compile(r'\w+')
+# Phần thể thức: quốc hiệu, tiêu ngữ, số hiệu, nơi gửi/nhận, chữ ký
+_BOILERPLATE_RE = re.compile(
+    r'^(?:kính gửi|số\s*:|v/v|cộng hòa xã hội|cộng hoà xã hội|độc lập\s*-|nơi nhận|'
+    r'tm\.|kt\.|tl\.|ký bởi|người ký|trân trọng|[^,.]{0,40},\s*ngày\s+\d+\s+tháng)',
+    re.IGNORECASE
+)
+# Từ "Nơi nhận" trở đi là danh sách nơi nhận và chữ ký
+_CLOSING_RE = re.compile(r'^nơi nhận', re.IGNORECASE)
+STOPWORDS = frozenset({
+    'và', 'của', 'các', 'có', 'được', 'cho', 'là', 'trong', 'với', 'theo', 'tại', 'đã',
+    'để', 'những', 'này', 'đó', 'về', 'không', 'từ', 'một', 'khi', 'đến', 'thì', 'sẽ',
+    'cũng', 'như', 'việc', 'số', 'ngày', 'tháng', 'năm', 'đề', 'nghị', 'trên', 'do',
+})
+
+
+# ============ SUMMARIZER ============
+
+def _is_boilerplate(sentence: str) -> bool:
+    # Dòng viết hoa toàn bộ: tên cơ quan, loại văn bản ("QUYẾT ĐỊNH")
+    return bool(_BOILERPLATE_RE.match(sentence)) or (sentence.isupper() and len(sentence) < 120)
+
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Các câu của phần nội dung chính
+
+    Bỏ các dòng thể thức (quốc hiệu, số hiệu, "Kính gửi", dòng viết hoa
+    toàn bộ) và mọi thứ từ "Nơi nhận"; các dòng còn lại được nối lại (text
+    trích từ PDF thường xuống dòng giữa câu) rồi tách câu theo dấu câu, bỏ
+    tiếp các câu thể thức nằm chung dòng với nội dung.
+    """
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if _CLOSING_RE.match(line):
+            break
+        if line and not (len(line) <= MAX_HEADER_LINE and _is_boilerplate(line)):
+            lines.append(line)
+    return [s for s in _SENTENCE_RE.split(' '.join(lines)) if s and not _is_boilerplate(s)]
+
+
+def _terms(sentence: str) -> List[str]:
+    """Âm tiết (bỏ stopword) và cặp âm tiết liền nhau - từ ghép tiếng Việt"""
+    words = [w for w in _WORD_RE.findall(sentence.lower()) if w not in STOPWORDS and not w.isdigit()]
+    return words + [f'{a} {b}' for a, b in zip(words, words[1:])]
+
+
+def summarize(text: Optional[str], max_length: int = DEFAULT_MAX_CHARS) -> str:
+    """
+    Tóm tắt trích xuất theo trọng tâm TF-IDF
+
+    Mỗi câu là một "tài liệu" để tính IDF; centroid là CENTROID_TERMS từ có
+    tổng TF-IDF cao nhất. Câu được xếp theo độ tương đồng cosine với
+    centroid, chọn lần lượt (bỏ câu trùng ý) tới khi đủ max_length ký tự và
+    trả về theo thứ tự trong văn bản.
+
+    Args:
+        text: Văn bản input
+        max_length: Độ dài tối đa của tóm tắt
+
+    Returns:
+        Tóm tắt (chính văn bản nếu đã ngắn hơn max_length)
+    """
+    if not text or len(text) <= max_length:
+        return text or ''
+
+    candidates = split_sentences(text) or _SENTENCE_RE.split(text.strip())
+    sentences = [s for s in candidates if len(s) >= MIN_SENTENCE_CHARS] or candidates
+
+    term_counts = [Counter(_terms(s)) for s in sentences]
+    df = Counter(term for counts in term_counts for term in counts)
+    n = len(sentences)
+    idf = {term: math.log((1 + n) / (1 + freq)) + 1 for term, freq in df.items()}
+
+    # Tổng TF-IDF của một từ trên mọi câu = tổng tần suất x idf
+    totals: Counter = Counter()
+    for counts in term_counts:
+        totals.update(counts)
+    centroid = {term: weight for weight, term in
+                heapq.nlargest(CENTROID_TERMS, ((tf * idf[term], term) for term, tf in totals.items()))}
+    centroid_norm = math.sqrt(sum(w * w for w in centroid.values())) or 1.0
+
+    scores = []
+    for i, counts in enumerate(term_counts):
+        norm = math.sqrt(sum((tf * idf[term]) ** 2 for term, tf in counts.items())) or 1.0
+        dot = sum(tf * idf[term] * centroid[term] for term, tf in counts.items() if term in centroid)
+        # Ưu tiên nhẹ câu đứng trước khi điểm gần bằng nhau
+        scores.append((dot / (norm * centroid_norm) + 0.05 * (1 - i / n), i))
+
+    scores.sort(reverse=True)
+    cutoff = scores[0][0] * MIN_RELATIVE_SCORE
+    chosen: List[int] = []
+    chosen_terms: List[set] = []
+    total = 0
+    for score, i in scores:
+        if score < cutoff:
+            break
+        sentence = sentences[i]
+        if total and total + len(sentence) + 1 > max_length:
+            continue
+        terms = set(term_counts[i])
+        if any(len(terms & other) / (len(terms | other) or 1) > REDUNDANCY_THRESHOLD for other in chosen_terms):
+            continue
+        chosen.append(i)
+        chosen_terms.append(terms)
+        total += len(sentence) + 1
+        if total >= max_length:
+            break
+
+    summary = ' '.join(sentences[i] for i in sorted(chosen))
+    if len(summary) > max_length:
+        summary = summary[:max_length].rsplit(' ', 1)[0] + '...'
+    return summary
+
+
+def summarize_item(item: Tuple[int, str], max_length: int = DEFAULT_MAX_CHARS) -> Tuple[int, str]:
+    """Tóm tắt một văn bản (chạy trong process con của pool)"""
+    pk, content = item
+    return pk, summarize(content, max_length)
+
+
+# ============ STORAGE ============
+
+def _version(max_length: int) -> str:
+    return f'summary-{SUMMARIZER_VERSION}-{max_length}'
+
+
+def _store_summaries(results: List[Tuple[int, str]], hashes: Dict[int, str]) -> int:
+    from models import db, DocumentSummary
+
+    pks = [pk for pk, _ in results]
+    db.session.execute(db.delete(DocumentSummary).where(DocumentSummary.document_pk.in_(pks)))
+    now = datetime.utcnow()
+    db.session.execute(DocumentSummary.__table__.insert(), [
+        {'document_pk': pk, 'content_hash': hashes[pk], 'summary': summary, 'created_at': now}
+        for pk, summary in results
+    ])
+    return len(results)
+
+
+def summarize_corpus(workers: int = 1, batch_size: int = 500, force: bool = False,
+                     pks: Optional[List[int]] = None, max_length: int = DEFAULT_MAX_CHARS) -> Dict[str, int]:
+    """
+    Tóm tắt kho văn bản, bỏ qua văn bản đã có tóm tắt cho nội dung hiện tại
+
+    Args:
+        workers: Số process (1 = tuần tự)
+        batch_size: Số văn bản mỗi lô
+        force: Tóm tắt lại cả văn bản không đổi
+        pks: Chỉ các văn bản này (luồng ingest)
+        max_length: Độ dài tóm tắt (đổi giá trị = tóm tắt lại)
+
+    Returns:
+        Dict {summarized, skipped}
+    """
+    from models import DocumentSummary
+
+    stats = process_corpus(DocumentSummary, _version(max_length), partial(summarize_item, max_length=max_length),
+                           _store_summaries, workers=workers, batch_size=batch_size, force=force, pks=pks)
+    return {'summarized': stats['processed'], 'skipped': stats['skipped']}
+
+
+def stored_summary(document_pk: int) -> Optional[Dict[str, Any]]:
+    """Tóm tắt đã lưu của một văn bản (None nếu chưa tóm tắt)"""
+    from models import db, DocumentSummary
+
+    row = db.session.execute(
+        db.select(DocumentSummary.summary, DocumentSummary.content_hash)
+        .where(DocumentSummary.document_pk == document_pk)
+    ).first()
+    return {'summary': row.summary, 'content_hash': row.content_hash} if row else None
+
+
+# Export
+__all__ = ['summarize', 'summarize_corpus', 'stored_summary', 'split_sentences']
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark: phân tích thực thể/cảm xúc toàn kho (analysis_service)
+
+    - legacy: extract_entities + analyze_document_sentiment cũ (pattern viết
+      trong hàm, mỗi từ chỉ báo quét lại cả văn bản) cho từng văn bản
+    - analyze_corpus: regex biên dịch sẵn, đọc/ghi theo lô, 1 process và
+      --workers process
+    - rerun: chạy lại khi nội dung không đổi (chỉ so hash, không phân tích)
+    - filter: "văn bản nhắc tới tổ chức X" qua index document_entities so
+      với trích xuất lại trên từng văn bản lúc tìm kiếm
+
+Chạy: python benchmarks/bench_analysis.py --docs 5000 --workers 4
+"""
+
+import argparse
+import random
+import re
+import time
+
+from common import make_app, print_table
+
+from models import db, Document
+from analysis_service import analysis_filter, analyze_corpus, extract_entities
+
+ORGANIZATIONS = ['Sở Tài chính', 'Sở Nội vụ', 'Bộ Giáo dục và Đào tạo', 'UBND tỉnh Hà Nam',
+                 'Công ty TNHH Minh Long', 'Phòng Hành chính', 'Ngân hàng Nhà nước']
+PHRASES = ['Việc triển khai cần thiết và quan trọng.', 'Kế hoạch tạm dừng do vấn đề kinh phí.',
+           'Đề nghị các đơn vị phối hợp thực hiện.', 'Báo cáo kết quả hoàn thành đúng hạn.']
+
+
+def make_content(rng, size):
+    parts = [f'Số: {rng.randint(1, 999)}/QĐ-UBND ngày {rng.randint(1, 28)} tháng {rng.randint(1, 12)} năm 2024.']
+    while sum(map(len, parts)) < size:
+        parts.append(f'{rng.choice(ORGANIZATIONS)} gửi công văn CV-2024-{rng.randint(1, 999):03d} '
+                     f'ngày {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024. {rng.choice(PHRASES)}')
+    return ' '.join(parts)
+
+
+def seed(n_docs, size):
+    rng = random.Random(7)
+    rows = [{'title': f'Văn bản {i}', 'content': make_content(rng, size)} for i in range(n_docs)]
+    for start in range(0, n_docs, 5000):
+        db.session.execute(db.insert(Document), rows[start:start + 5000])
+    db.session.commit()
+
+
+def legacy_analyze(content):
+    """extract_entities + analyze_document_sentiment trước analysis_service"""
+    entities = {
+        'dates': re.findall(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', content),
+        'numbers': re.findall(r'\d+(?:\.\d+)?', content),
+        'organizations': list(set(re.findall(r'\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\b', content)))[:10],
+    }
+    positive_words = ['quan trọng', 'khẩn', 'cần thiết', 'ưu tiên', 'thành công', 'hoàn thành']
+    negative_words = ['hủy', 'từ chối', 'tạm dừng', 'lỗi', 'vấn đề']
+    content_lower = content.lower()
+    positive = sum(1 for word in positive_words if word in content_lower)
+    negative = sum(1 for word in negative_words if word in content_lower)
+    return entities, positive, negative
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--content-size', type=int, default=3000, help='Số ký tự mỗi văn bản')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    app = make_app()
+    rows = []
+    with app.app_context():
+        seed(args.docs, args.content_size)
+        contents = db.session.execute(db.select(Document.content)).scalars().all()
+
+        start = time.perf_counter()
+        for content in contents:
+            legacy_analyze(content)
+        secs = time.perf_counter() - start
+        rows.append(('legacy (per document)', f'{secs:.2f} s', f'{args.docs / secs:,.0f}'))
+
+        for label, workers, force in (
+            ('analyze_corpus (1 process)', 1, True),
+            (f'analyze_corpus ({args.workers} processes)', args.workers, True),
+            ('rerun, content unchanged', args.workers, False),
+        ):
+            start = time.perf_counter()
+            analyze_corpus(workers=workers, batch_size=args.batch_size, force=force)
+            secs = time.perf_counter() - start
+            rows.append((label, f'{secs:.2f} s', f'{args.docs / secs:,.0f}'))
+
+        print_table(f'Corpus analysis ({args.docs:,} documents, {args.content_size} chars)', rows,
+                    ('method', 'time', 'docs/sec'))
+
+        target = 'sở tài chính'
+        start = time.perf_counter()
+        scanned = sum(
+            1 for content in db.session.execute(db.select(Document.content)).scalars()
+            if any(org.lower().startswith(target) for org in extract_entities(content)['organizations'])
+        )
+        scan_secs = time.perf_counter() - start
+
+        stmt = analysis_filter({'organization': 'Sở Tài chính'})
+        start = time.perf_counter()
+        indexed = db.session.execute(db.select(db.func.count()).select_from(stmt.subquery())).scalar()
+        index_secs = time.perf_counter() - start
+        assert indexed == scanned, (indexed, scanned)
+
+        filter_rows = [
+            ('extract at query time', f'{scan_secs * 1000:,.1f} ms', scanned),
+            ('document_entities index', f'{index_secs * 1000:,.2f} ms', indexed),
+        ]
+        print_table('Filter: organization = "Sở Tài chính"', filter_rows, ('method', 'time', 'documents'))
+
+
+if __name__ == '__main__':
+    main()
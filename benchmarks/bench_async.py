@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nhiều client chậm đồng thời - gunicorn gthread và ASGI (uvicorn)
+
+Khởi động backend thật bằng backend/gunicorn.conf.py ở hai chế độ trên cùng
+một CSDL tạm:
+    - production: app:app trên worker gthread (mỗi request giữ một thread)
+    - async:      asgi:application trên worker uvicorn (tải file, chat
+                  stream là coroutine)
+rồi mở --clients kết nối cùng lúc cho từng kịch bản:
+    - download: tải file --size-mb MB, client đọc với tốc độ --rate-kb KB/s
+                (bộ đệm nhận nhỏ, như mạng chậm)
+    - chat:     /api/chat/stream, backend 'openai' là mock server với độ
+                trễ sinh --latency-ms
+Trong lúc tải, một client khác gọi /api/health mỗi 100 ms: độ trễ của nó
+cho biết server còn nhận request mới hay đã hết thread.
+
+Chạy: python benchmarks/bench_async.py --clients 50 500 --latency-ms 1000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from common import BACKEND_DIR, make_app, seed_documents, print_table
+from bench_downloads import HOST, free_port, wait_ready
+from bench_rag import QUESTIONS, seed_topics
+from downloads import file_sha256
+from mock_llm_server import start_server as start_mock
+
+from models import db, Document
+
+RECV_BUFFER = 32 * 1024  # Bộ đệm nhận của client chậm
+PROBE_INTERVAL = 0.1
+
+
+def prepare(n_docs, size_mb):
+    tmp = tempfile.mkdtemp(prefix='bench_async_')
+    db_path = os.path.join(tmp, 'bench.db')
+    file_path = os.path.join(tmp, 'sample.pdf')
+    with open(file_path, 'wb') as f:
+        f.write(os.urandom(size_mb * 1024 * 1024))
+
+    app = make_app(db_path)
+    with app.app_context():
+        seed_documents(n_docs, attachments_per_doc=0)
+        seed_topics()
+        doc = Document(title='Tài liệu lớn', content='Tài liệu lớn', file_path=file_path, file_name='sample.pdf',
+                       file_size=os.path.getsize(file_path), file_hash=file_sha256(file_path),
+                       created_at=datetime.utcnow())
+        db.session.add(doc)
+        db.session.commit()
+        doc_id = doc.id
+    return tmp, db_path, doc_id
+
+
+def start_server(mode, port, tmp, db_path, llm_base, workers):
+    env = dict(os.environ, FLASK_ENV='production', BACKEND_MODE=mode, DATABASE_URL=f'sqlite:///{db_path}',
+               UPLOAD_FOLDER=tmp, AI_BACKEND='openai', OPENAI_API_BASE=llm_base)
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'{HOST}:{port}']
+    if workers:
+        cmd += ['-w', str(workers)]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def request(port, method, path, body=None, rate=0, timeout=300):
+    """
+    Một request HTTP/1.1 (Connection: close), đọc tới hết; rate > 0 thì đọc
+    chậm rate byte/giây với bộ đệm nhận RECV_BUFFER
+
+    Returns:
+        Tuple[status, số byte nhận]
+    """
+    sock = socket.socket()
+    if rate:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUFFER)
+    sock.setblocking(False)
+    await asyncio.get_running_loop().sock_connect(sock, (HOST, port))
+    reader, writer = await asyncio.open_connection(sock=sock, limit=RECV_BUFFER)
+    try:
+        head = f'{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nConnection: close\r\n'
+        if body is not None:
+            head += f'Content-Type: application/json\r\nContent-Length: {len(body)}\r\n'
+        writer.write(head.encode('ascii') + b'\r\n' + (body or b''))
+        status = int((await asyncio.wait_for(reader.readline(), timeout)).split()[1])
+        received = 0
+        step = max(rate // 10, 1) if rate else 64 * 1024
+        while True:
+            data = await asyncio.wait_for(reader.read(step), timeout)
+            if not data:
+                return status, received
+            received += len(data)
+            if rate:
+                await asyncio.sleep(len(data) / rate)
+    finally:
+        writer.close()
+
+
+async def probe(port, stop, latencies):
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            await request(port, 'GET', '/api/health', timeout=60)
+            latencies.append(time.perf_counter() - started)
+        except (OSError, asyncio.TimeoutError):
+            latencies.append(float('inf'))
+        await asyncio.sleep(PROBE_INTERVAL)
+
+
+async def run_scenario(port, scenario, clients, doc_id, rate):
+    stop = asyncio.Event()
+    latencies = []
+    prober = asyncio.create_task(probe(port, stop, latencies))
+
+    async def client(i):
+        if scenario == 'download':
+            return await request(port, 'GET', f'/api/download/{doc_id}', rate=rate)
+        # Câu hỏi khác nhau (thêm '?') để không trúng cache câu trả lời
+        question = QUESTIONS[i % len(QUESTIONS)] + '?' * (i // len(QUESTIONS))
+        body = json.dumps({'message': question}).encode('utf-8')
+        return await request(port, 'POST', '/api/chat/stream', body=body)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(i) for i in range(clients)), return_exceptions=True)
+    secs = time.perf_counter() - started
+    stop.set()
+    await prober
+
+    ok = sum(1 for r in results if not isinstance(r, BaseException) and r[0] == 200)
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2] if latencies else float('nan')
+    worst = latencies[-1] if latencies else float('nan')
+    return ok, secs, p50, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=200)
+    parser.add_argument('--clients', type=int, nargs='+', default=[50, 500])
+    parser.add_argument('--size-mb', type=int, default=16)
+    parser.add_argument('--rate-kb', type=int, default=4096, help='Tốc độ đọc của mỗi client tải file')
+    parser.add_argument('--latency-ms', type=int, default=1000, help='Độ trễ sinh câu trả lời của mock server')
+    parser.add_argument('--workers', type=int, default=0, help='gunicorn workers (0: theo gunicorn.conf.py)')
+    parser.add_argument('--scenarios', nargs='+', default=['download', 'chat'], choices=['download', 'chat'])
+    args = parser.parse_args()
+
+    tmp, db_path, doc_id = prepare(args.docs, args.size_mb)
+    mock, llm_base = start_mock(latency=args.latency_ms / 1000)
+
+    rows = []
+    for mode in ('production', 'async'):
+        port = free_port()
+        server = start_server(mode, port, tmp, db_path, llm_base, args.workers)
+        try:
+            wait_ready(port)
+            for scenario in args.scenarios:
+                asyncio.run(run_scenario(port, scenario, 4, doc_id, 0))  # warm-up
+                for clients in args.clients:
+                    ok, secs, p50, worst = asyncio.run(
+                        run_scenario(port, scenario, clients, doc_id, args.rate_kb * 1024))
+                    rows.append((mode, scenario, clients, f'{ok}/{clients}', f'{secs:.1f} s',
+                                 f'{p50 * 1000:.0f} ms', f'{worst * 1000:.0f} ms'))
+        finally:
+            server.terminate()
+            server.wait()
+
+    mock.shutdown()
+    print_table(f'{args.size_mb} MB at {args.rate_kb} KB/s, mock LLM {args.latency_ms} ms, {os.cpu_count()} CPU',
+                rows, ('server', 'scenario', 'clients', 'ok', 'time', 'health p50', 'health max'))
+
+
+if __name__ == '__main__':
+    main()
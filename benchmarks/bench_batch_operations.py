@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Benchmark: thao tác batch trên N văn bản (mặc định 10.000)
+
+Đo thời gian của BatchService.update_documents, retag_documents và
+delete_documents (một transaction, SQL hàng loạt).
+
+Chạy: python benchmarks/bench_batch_operations.py --docs 10000
+"""
+
+import argparse
+import logging
+
+from common import make_app, seed_documents, timer, print_table
+
+from models import db, Document
+from batch_service import BatchService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=10000)
+    parser.add_argument('--attachments', type=int, default=2)
+    args = parser.parse_args()
+
+    # file_path trong dữ liệu mẫu nằm ngoài UPLOAD_FOLDER nên sweeper chỉ ghi cảnh báo
+    logging.getLogger('background').setLevel(logging.ERROR)
+
+    app = make_app()
+    with app.app_context():
+        seed_documents(args.docs, args.attachments)
+        ids = list(db.session.execute(db.select(Document.id)).scalars())
+
+        results = {}
+        with timer(results, 'update'):
+            BatchService.update_documents(ids, {'document_type': 'Công văn', 'sender': 'Văn phòng'})
+        with timer(results, 'retag'):
+            BatchService.retag_documents(ids, add=['2024'], remove=['nhân sự'])
+        with timer(results, 'delete'):
+            BatchService.delete_documents(ids)
+
+        rows = [(op, f'{secs * 1000:.0f} ms', f'{len(ids) / secs:,.0f}') for op, secs in results.items()]
+        print_table(f'{len(ids):,} ids x {args.attachments} attachments', rows, ('operation', 'time', 'ids/sec'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bundle ZIP dạng stream (/api/download/<doc_id>/bundle)
+
+Dựng một văn bản với nhiều file đính kèm (hard link tới cùng một file mẫu
+nên không tốn đĩa) và đo thời gian, MB/s, đỉnh bộ nhớ Python (tracemalloc)
+khi sinh ZIP. So sánh PDF (ZIP_STORED) với cùng dữ liệu dưới đuôi .txt
+(ZIP_DEFLATED). Đỉnh bộ nhớ phải gần như không đổi khi bundle lớn dần.
+
+Chạy: python benchmarks/bench_bundle.py --file-mb 16 --counts 4 16 64
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+
+from common import make_app, print_table
+
+from models import db, Document, Attachment
+from downloads import bundle_entries, iter_zip_bundle
+
+
+def make_bundle(tmp, count, ext):
+    """Một văn bản + (count - 1) attachment, tất cả trỏ tới file mẫu"""
+    sample = os.path.join(tmp, 'sample.bin')
+    paths = []
+    for i in range(count):
+        path = os.path.join(tmp, f'{uuid.uuid4().hex}.{ext}')
+        os.link(sample, path)
+        paths.append(path)
+
+    doc = Document(title=f'bundle {count} {ext}', file_path=paths[0], file_name=f'main.{ext}')
+    db.session.add(doc)
+    for i, path in enumerate(paths[1:]):
+        db.session.add(Attachment(document=doc, filename=f'att_{i}.{ext}', file_path=path))
+    db.session.commit()
+    return doc.id
+
+
+def run_bundle(doc_id):
+    entries, _ = bundle_entries([doc_id])
+    return sum(len(chunk) for chunk in iter_zip_bundle(entries))
+
+
+def measure(doc_id):
+    start = time.perf_counter()
+    total = run_bundle(doc_id)
+    secs = time.perf_counter() - start
+
+    tracemalloc.start()
+    run_bundle(doc_id)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, total, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-mb', type=int, default=16, help='Kích thước mỗi file')
+    parser.add_argument('--counts', type=int, nargs='+', default=[4, 16, 64], help='Số file trong bundle')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_bundle_')
+    with open(os.path.join(tmp, 'sample.bin'), 'wb') as f:
+        for _ in range(args.file_mb):
+            f.write(os.urandom(1024 * 1024))
+
+    app = make_app(os.path.join(tmp, 'bench.db'))
+    rows = []
+    with app.app_context():
+        for count in args.counts:
+            for ext, mode in (('pdf', 'stored'), ('txt', 'deflated')):
+                doc_id = make_bundle(tmp, count, ext)
+                secs, total, peak = measure(doc_id)
+                input_mb = count * args.file_mb
+                rows.append((count, mode, f'{input_mb:,} MB', f'{total / 1024 / 1024:,.1f} MB',
+                             f'{secs:.2f} s', f'{input_mb / secs:,.0f}', f'{peak / 1024 / 1024:.2f} MB'))
+
+    print_table(f'ZIP bundle ({args.file_mb} MB per file)', rows,
+                ('files', 'mode', 'input', 'zip', 'time', 'MB/sec', 'peak mem'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bộ nhớ hội thoại theo session
+
+So sánh đọc lịch sử một session cho mỗi lượt chat:
+    - db: truy vấn chat_messages (index session_id, created_at) mỗi lượt
+    - memory miss: ConversationStore nạp lại session từ CSDL
+    - memory hit: session đã có trong bộ nhớ
+    - resolve: giải "cái thứ hai" theo kết quả lượt trước (memory hit)
+
+Chạy: python benchmarks/bench_chat_memory.py --sessions 5000 --turns 40
+"""
+
+import argparse
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from common import make_app, print_table
+
+from models import db, ChatMessage
+from chat_memory import ConversationStore
+
+
+def seed_chat(n_sessions, turns):
+    now = datetime.utcnow()
+    session_ids = [str(uuid.uuid4()) for _ in range(n_sessions)]
+    rows = []
+    for s, session_id in enumerate(session_ids):
+        for t in range(turns):
+            rows.append({
+                'id': str(uuid.uuid4()),
+                'session_id': session_id,
+                'user_message': f'tìm công văn về chủ đề {t}',
+                'ai_response': 'Tôi tìm thấy 5 kết quả liên quan. ' * 5,
+                'related_documents': [str(uuid.uuid4()) for _ in range(5)],
+                'created_at': now - timedelta(seconds=(n_sessions - s) * turns + (turns - t)),
+            })
+        if len(rows) >= 20000:
+            db.session.execute(db.insert(ChatMessage), rows)
+            rows = []
+    if rows:
+        db.session.execute(db.insert(ChatMessage), rows)
+    db.session.commit()
+    return session_ids
+
+
+def measure(func, session_ids, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        func(session_ids[i % len(session_ids)])
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=5000)
+    parser.add_argument('--turns', type=int, default=40, help='Số tin nhắn mỗi session trong CSDL')
+    parser.add_argument('--max-history', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = make_app()
+    rows = []
+    with app.app_context():
+        session_ids = seed_chat(args.sessions, args.turns)
+        sample = random.Random(1).sample(session_ids, min(len(session_ids), args.repeat))
+
+        store = ConversationStore(max_sessions=len(sample), max_history=args.max_history)
+        cases = (
+            ('db per turn', store._load),
+            ('memory miss (rehydrate)', store.history),
+            ('memory hit', store.history),
+            ('resolve "cái thứ hai"', lambda sid: store.resolve_reference(sid, 'cái thứ hai')),
+        )
+        for label, func in cases:
+            secs = measure(func, sample, len(sample))
+            rows.append((label, f'{secs * 1e6:,.1f} us', f'{1 / secs:,.0f}'))
+        db.session.remove()
+
+    print_table(f'Chat memory ({args.sessions:,} sessions x {args.turns} messages)', rows,
+                ('read', 'per turn', 'turns/sec'))
+
+
+if __name__ == '__main__':
+    main()
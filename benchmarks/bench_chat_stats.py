@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: intent statistics/list của chat theo kích thước kho
+
+So sánh cách cũ (chat: 4 truy vấn COUNT riêng; /statistics: nạp mọi văn bản
+hai lần; danh sách nạp ORM đầy đủ) với stats_service: một truy vấn GROUP BY
+trên index phủ (lần đầu), kết quả đã ghi nhớ (TTL) và danh sách chỉ đọc cột
+cần hiển thị. Lưu ý cách cũ ở đây đã được hưởng các index mới.
+
+Chạy: python benchmarks/bench_chat_stats.py --sizes 1000 10000 100000
+"""
+
+import argparse
+import time
+from datetime import datetime
+
+from common import make_app, seed_documents, print_table
+
+from models import db, Document
+from stats_service import document_statistics, recent_documents, stats_memo
+
+
+def old_statistics():
+    total_docs = Document.query.count()
+    today = datetime.utcnow().date()
+    today_docs = Document.query.filter(
+        Document.created_at >= datetime(today.year, today.month, today.day)
+    ).count()
+    return (total_docs, today_docs,
+            Document.query.filter_by(document_type='Công văn').count(),
+            Document.query.filter_by(document_type='Quyết định').count())
+
+
+def old_statistics_route():
+    total_size = sum([d.file_size or 0 for d in Document.query.all()])
+    doc_types = {}
+    for doc in Document.query.all():
+        dtype = doc.document_type or 'Unknown'
+        doc_types[dtype] = doc_types.get(dtype, 0) + 1
+    return Document.query.count(), total_size, doc_types
+
+
+def old_list():
+    return [doc.title for doc in Document.query.order_by(Document.created_at.desc()).limit(5).all()]
+
+
+def new_statistics_cold():
+    stats_memo.clear()
+    return document_statistics()
+
+
+def new_list():
+    return [row.title for row in recent_documents(5)]
+
+
+def measure(func, repeat):
+    func()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+        db.session.expunge_all()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    cases = (
+        ('statistics', 'old: 4 x COUNT', old_statistics),
+        ('statistics', 'old: route ORM scan', old_statistics_route),
+        ('statistics', 'new: GROUP BY', new_statistics_cold),
+        ('statistics', 'new: memo hit', document_statistics),
+        ('list', 'old: ORM rows', old_list),
+        ('list', 'new: projection', new_list),
+    )
+
+    rows = []
+    for n_docs in args.sizes:
+        app = make_app()
+        with app.app_context():
+            seed_documents(n_docs, attachments_per_doc=0)
+            for intent, label, func in cases:
+                secs = measure(func, args.repeat)
+                rows.append((f'{n_docs:,}', intent, label, f'{secs * 1000:.3f} ms'))
+            db.session.remove()
+
+    print_table('Chat statistics / list intents', rows, ('docs', 'intent', 'method', 'time'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: thời gian tới byte đầu tiên (TTFB) của chat
+
+Khởi động backend thật (werkzeug threaded) trong tiến trình con, backend
+sinh câu trả lời là mock server tương thích OpenAI (độ trễ --latency-ms),
+rồi so sánh cho cùng các câu hỏi:
+    - /api/chat:        trả về khi đã có toàn bộ câu trả lời và đã commit
+                        ChatMessage
+    - /api/chat/stream: SSE - kết quả tìm kiếm ngay sau bước truy xuất,
+                        câu trả lời tới dần, ChatMessage ghi nền sau stream
+Mỗi endpoint chạy trên một tiến trình mới để cache RAG không ảnh hưởng.
+
+Chạy: python benchmarks/bench_chat_stream.py --docs 2000 --latency-ms 500
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import BACKEND_DIR, make_app, seed_documents, print_table
+from bench_downloads import HOST, free_port, wait_ready
+from bench_rag import QUESTIONS, seed_topics
+from mock_llm_server import start_server as start_mock
+
+from models import db
+
+
+def prepare(n_docs):
+    tmp = tempfile.mkdtemp(prefix='bench_chat_')
+    db_path = os.path.join(tmp, 'bench.db')
+    app = make_app(db_path)
+    with app.app_context():
+        seed_documents(n_docs, attachments_per_doc=0)
+        seed_topics()
+    return tmp, db_path
+
+
+def start_server(port, tmp, db_path, llm_base):
+    env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=f'sqlite:///{db_path}', UPLOAD_FOLDER=tmp,
+               AI_BACKEND='openai', OPENAI_API_BASE=llm_base)
+    cmd = [sys.executable, '-c',
+           'from werkzeug.serving import run_simple; from app import app; '
+           f'run_simple("{HOST}", {port}, app, threaded=True)']
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def ask(port, path, question):
+    """Gửi một câu hỏi; trả về (giây tới byte đầu của body, tổng số giây)"""
+    conn = http.client.HTTPConnection(HOST, port, timeout=60)
+    body = json.dumps({'message': question, 'session_id': 'bench'})
+    start = time.perf_counter()
+    conn.request('POST', path, body=body, headers={'Content-Type': 'application/json'})
+    resp = conn.getresponse()
+    resp.read(1)
+    first_byte = time.perf_counter() - start
+    resp.read()
+    total = time.perf_counter() - start
+    conn.close()
+    if resp.status != 200:
+        raise RuntimeError(f'Unexpected status {resp.status}')
+    return first_byte, total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=2000)
+    parser.add_argument('--latency-ms', type=int, default=500, help='Độ trễ sinh câu trả lời của mock server')
+    args = parser.parse_args()
+
+    tmp, db_path = prepare(args.docs)
+    mock, llm_base = start_mock(latency=args.latency_ms / 1000)
+
+    rows = []
+    for path in ('/api/chat', '/api/chat/stream'):
+        port = free_port()
+        server = start_server(port, tmp, db_path, llm_base)
+        try:
+            wait_ready(port)
+            ask(port, path, 'khởi động')  # warm-up
+            samples = [ask(port, path, question) for question in QUESTIONS]
+        finally:
+            server.terminate()
+            server.wait()
+
+        ttfb = sorted(s[0] for s in samples)
+        total = sorted(s[1] for s in samples)
+        rows.append((path, f'{sum(ttfb) / len(ttfb) * 1000:.1f} ms', f'{ttfb[len(ttfb) // 2] * 1000:.1f} ms',
+                     f'{sum(total) / len(total) * 1000:.1f} ms'))
+
+    mock.shutdown()
+    print_table(f'Chat TTFB ({args.docs:,} docs, mock LLM {args.latency_ms} ms, {len(QUESTIONS)} questions)', rows,
+                ('endpoint', 'TTFB avg', 'TTFB p50', 'total avg'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ghi ChatMessage và đọc lịch sử chat
+
+Ghi (SQLite file, nhiều thread như các request đồng thời):
+    - commit/msg:   mỗi tin nhắn một add() + commit() (như /api/chat cũ)
+    - write-behind: ChatLogWriter gom lô (INSERT nhiều dòng, một commit)
+Đo thời gian request phải chờ (p50/p99) và thông lượng tới khi đã ghi hết.
+
+Đọc lịch sử một session dài ở trang sâu: OFFSET so với keyset
+(chat_service.chat_history với con trỏ).
+
+Chạy: python benchmarks/bench_chat_writes.py --threads 8 --messages 500
+"""
+
+import argparse
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from common import make_app, print_table
+
+from models import db, ChatMessage
+from background import ChatLogWriter
+from chat_service import chat_history, encode_cursor
+
+
+def message_fields(i):
+    return {
+        'session_id': f'session-{i % 50}',
+        'user_message': f'tìm công văn về chủ đề {i}',
+        'ai_response': 'Tôi tìm thấy 5 kết quả liên quan. ' * 5,
+        'related_documents': [str(uuid.uuid4()) for _ in range(5)],
+    }
+
+
+def run_writers(app, write, threads, messages):
+    """threads thread, mỗi thread ghi messages tin nhắn; trả về danh sách độ trễ"""
+    def worker(t):
+        latencies = []
+        with app.app_context():
+            for j in range(messages):
+                start = time.perf_counter()
+                write(message_fields(t * messages + j))
+                latencies.append(time.perf_counter() - start)
+            db.session.remove()
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        return [lat for result in pool.map(worker, range(threads)) for lat in result]
+
+
+def sync_write(fields):
+    db.session.add(ChatMessage(**fields))
+    db.session.commit()
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def seed_session(session_id, n):
+    now = datetime.utcnow()
+    db.session.execute(db.insert(ChatMessage), [
+        {'id': str(uuid.uuid4()), 'session_id': session_id, 'user_message': f'câu hỏi {i}',
+         'ai_response': 'trả lời', 'created_at': now - timedelta(seconds=n - i)}
+        for i in range(n)
+    ])
+    db.session.commit()
+
+
+def offset_page(session_id, page, limit):
+    return db.session.execute(
+        db.select(ChatMessage).where(ChatMessage.session_id == session_id)
+        .order_by(ChatMessage.created_at.desc(), ChatMessage.pk.desc())
+        .limit(limit).offset(page * limit)
+    ).scalars().all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--messages', type=int, default=500, help='Số tin nhắn mỗi thread')
+    parser.add_argument('--batch-size', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=0.2)
+    parser.add_argument('--history', type=int, default=100000, help='Số tin nhắn của session dài')
+    parser.add_argument('--page-size', type=int, default=50)
+    args = parser.parse_args()
+    total = args.threads * args.messages
+
+    rows = []
+    app = make_app()
+    start = time.perf_counter()
+    latencies = run_writers(app, sync_write, args.threads, args.messages)
+    secs = time.perf_counter() - start
+    rows.append(('commit/msg', f'{percentile(latencies, 0.5) * 1000:.3f} ms',
+                 f'{percentile(latencies, 0.99) * 1000:.3f} ms', f'{total / secs:,.0f}'))
+
+    app = make_app()
+    writer = ChatLogWriter(batch_size=args.batch_size, interval=args.interval, max_pending=10 * args.batch_size)
+    writer.app = app
+    start = time.perf_counter()
+    latencies = run_writers(app, lambda fields: writer.schedule(**fields), args.threads, args.messages)
+    writer.join()
+    secs = time.perf_counter() - start
+    assert writer.written == total, writer.written
+    rows.append((f'write-behind (batch {args.batch_size})', f'{percentile(latencies, 0.5) * 1000:.3f} ms',
+                 f'{percentile(latencies, 0.99) * 1000:.3f} ms', f'{total / secs:,.0f}'))
+
+    print_table(f'ChatMessage writes ({args.threads} threads x {args.messages})', rows,
+                ('method', 'request p50', 'request p99', 'msgs/sec'))
+
+    rows = []
+    with app.app_context():
+        seed_session('long', args.history)
+        deep_page = args.history // args.page_size - 1
+        # Con trỏ của trang ngay trước trang sâu nhất
+        anchor = offset_page('long', deep_page - 1, args.page_size)[-1]
+        cursor = encode_cursor(anchor.created_at, anchor.pk)
+
+        for label, func in (
+            ('offset', lambda: offset_page('long', deep_page, args.page_size)),
+            ('keyset', lambda: chat_history('long', limit=args.page_size, before=cursor)),
+        ):
+            func()
+            start = time.perf_counter()
+            for _ in range(20):
+                func()
+                db.session.expunge_all()
+            rows.append((label, f'page {deep_page + 1:,}', f'{(time.perf_counter() - start) / 20 * 1000:.3f} ms'))
+
+    print_table(f'Chat history ({args.history:,} messages, {args.page_size}/page)', rows, ('method', 'page', 'time'))
+
+
+if __name__ == '__main__':
+    main()
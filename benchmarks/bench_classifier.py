@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tự động phân loại document_type (classifier_service)
+
+    - fit: huấn luyện từ các văn bản có nhãn trong database
+    - predict: độ trễ một lần dự đoán (luồng upload), p50/p99
+    - partial_fit: học thêm một nhãn người dùng sửa
+    - classify_corpus: gán nhãn cho phần kho chưa phân loại
+
+Độ chính xác đo trên các văn bản chưa gán nhãn (nhãn thật được giữ lại để
+so sánh). Nội dung mô phỏng phần đầu công văn: loại văn bản chỉ thể hiện qua
+vài từ trong tiêu đề/trích yếu, phần còn lại là từ chung giữa các loại.
+
+Chạy: python benchmarks/bench_classifier.py --docs 10000 --labeled 0.5
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from common import make_app, print_table
+
+from models import db, Document
+from classifier_service import classify_corpus, document_classifier, ensure_trained
+
+TYPES = {
+    'Quyết định': ['QUYẾT ĐỊNH', 'Về việc bổ nhiệm', 'Điều 1.', 'Quyết định này có hiệu lực', 'ban hành kèm theo'],
+    'Công văn': ['V/v', 'Kính gửi', 'đề nghị các đơn vị', 'trả lời công văn', 'phúc đáp'],
+    'Tờ trình': ['TỜ TRÌNH', 'Kính trình', 'xem xét phê duyệt', 'đề xuất chủ trương', 'trình UBND tỉnh'],
+    'Thông báo': ['THÔNG BÁO', 'Kết luận cuộc họp', 'thông báo tới', 'lịch làm việc', 'thông báo kết quả'],
+    'Báo cáo': ['BÁO CÁO', 'Kết quả thực hiện', 'tình hình', 'số liệu tổng hợp', 'đánh giá chung'],
+    'Kế hoạch': ['KẾ HOẠCH', 'Mục đích, yêu cầu', 'nhiệm vụ trọng tâm', 'tổ chức thực hiện', 'lộ trình'],
+}
+COMMON = ['ngân sách', 'cán bộ', 'dự án', 'năm 2024', 'UBND tỉnh', 'các sở', 'huyện', 'kinh phí',
+          'chuyển đổi số', 'thực hiện', 'đơn vị', 'quy định', 'hướng dẫn', 'triển khai']
+
+
+def make_document(rng, label):
+    markers = TYPES[label]
+    words = [rng.choice(COMMON) for _ in range(120)]
+    for marker in rng.sample(markers, 2):
+        words.insert(rng.randrange(len(words)), marker)
+    title = f'{rng.choice(markers)} {rng.choice(COMMON)}' if rng.random() < 0.7 else f'Văn bản {rng.choice(COMMON)}'
+    return title, ' '.join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=10000)
+    parser.add_argument('--labeled', type=float, default=0.5, help='Tỉ lệ văn bản đã có nhãn')
+    parser.add_argument('--predictions', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    truth = {}
+    rows = []
+    for i in range(args.docs):
+        label = rng.choice(list(TYPES))
+        title, content = make_document(rng, label)
+        truth[f'doc-{i}'] = label
+        rows.append({'id': f'doc-{i}', 'title': title, 'content': content,
+                     'document_type': label if rng.random() < args.labeled else None})
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(db.insert(Document), rows)
+        db.session.commit()
+
+        start = time.perf_counter()
+        ensure_trained()
+        fit_secs = time.perf_counter() - start
+
+        sample = rng.sample(rows, min(args.predictions, len(rows)))
+        latencies = []
+        for row in sample:
+            start = time.perf_counter()
+            document_classifier.predict(row['title'], row['content'])
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+
+        corrections = sample[:200]
+        start = time.perf_counter()
+        for row in corrections:
+            document_classifier.partial_fit([(truth[row['id']], row['title'], row['content'])])
+        partial_secs = (time.perf_counter() - start) / len(corrections)
+
+        start = time.perf_counter()
+        stats = classify_corpus()
+        classify_secs = time.perf_counter() - start
+
+        predicted = dict(db.session.execute(
+            db.select(Document.id, Document.document_type).where(Document.document_type_confidence.isnot(None))
+        ).all())
+        correct = sum(label == truth[doc_id] for doc_id, label in predicted.items())
+        unlabeled = sum(1 for row in rows if row['document_type'] is None)
+
+    print_table(f'Document type classifier ({args.docs:,} documents, {args.labeled:.0%} labeled, '
+                f'{len(TYPES)} types)', [
+        ('fit from database', f'{fit_secs:.2f} s', f'{document_classifier.sample_count:,} samples'),
+        ('predict p50', f'{statistics.median(latencies) * 1000:.3f} ms', ''),
+        ('predict p99', f'{latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f} ms', ''),
+        ('partial_fit (1 correction)', f'{partial_secs * 1000:.3f} ms', ''),
+        ('classify_corpus', f'{classify_secs:.2f} s', f"{stats['classified']:,} labeled"),
+    ], ('step', 'time', ''))
+    print(f"\nAccuracy on {len(predicted):,} predicted labels: {correct / max(len(predicted), 1):.1%} "
+          f"({stats['uncertain']:,} of {unlabeled:,} unlabeled left below confidence)")
+
+
+if __name__ == '__main__':
+    main()
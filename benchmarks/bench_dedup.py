@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: phát hiện văn bản gần trùng (dedup_service)
+
+    - signatures: build_signatures cho cả kho (MinHash NUM_PERM hoán vị)
+    - lookup: tìm bản gần trùng của một văn bản qua index LSH
+      (document_lsh_bands) so với so chữ ký với toàn bộ kho
+    - recall: tỉ lệ cặp (gốc, bản sao đã sửa nhẹ) LSH tìm được, so với quét
+      toàn bộ ở cùng ngưỡng
+
+Kho gồm --docs văn bản độc lập, --dup-rate trong số đó có một bản sao
+(đổi vài từ, thêm dòng "Sao y bản chính") như bản scan/DOCX/chuyển tiếp.
+
+Chạy: python benchmarks/bench_dedup.py --docs 5000 --dup-rate 0.2
+"""
+
+import argparse
+import random
+import time
+
+from common import make_app, print_table
+
+from models import db, Document, DocumentSignature
+from dedup_service import (
+    DUPLICATE_THRESHOLD, _from_bytes, build_signatures, find_similar, similar_documents, similarity,
+)
+
+VOCABULARY = [f'{w}{i}' for w in ('quyết', 'định', 'kế', 'hoạch', 'ngân', 'sách', 'báo', 'cáo', 'đơn', 'vị')
+              for i in range(60)]
+
+
+def make_content(rng, words):
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(words))
+
+
+def make_copy(rng, content, edits):
+    words = content.split()
+    for _ in range(edits):
+        words[rng.randrange(len(words))] = rng.choice(VOCABULARY)
+    return 'SAO Y BẢN CHÍNH\n' + ' '.join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--words', type=int, default=500, help='Số từ mỗi văn bản')
+    parser.add_argument('--dup-rate', type=float, default=0.2)
+    parser.add_argument('--edits', type=int, default=3, help='Số từ bị đổi trong bản sao')
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    originals = [make_content(rng, args.words) for _ in range(args.docs)]
+    copies = {i: make_copy(rng, originals[i], args.edits)
+              for i in rng.sample(range(args.docs), int(args.docs * args.dup_rate))}
+
+    app = make_app()
+    with app.app_context():
+        rows = [{'title': f'Gốc {i}', 'content': c} for i, c in enumerate(originals)]
+        rows += [{'title': f'Bản sao {i}', 'content': c} for i, c in copies.items()]
+        db.session.execute(db.insert(Document), rows)
+        db.session.commit()
+        pk_of = {title: pk for pk, title in db.session.execute(db.select(Document.pk, Document.title))}
+
+        start = time.perf_counter()
+        stats = build_signatures(workers=1)
+        secs = time.perf_counter() - start
+        print_table(f'Signatures ({len(rows):,} documents, {args.words} words)', [
+            ('build_signatures', f'{secs:.2f} s', f'{len(rows) / secs:,.0f}', f"{stats['buckets']:,}"),
+        ], ('method', 'time', 'docs/sec', 'buckets'))
+
+        all_signatures = {
+            pk: _from_bytes(raw) for pk, raw in
+            db.session.execute(db.select(DocumentSignature.document_pk, DocumentSignature.signature))
+        }
+
+        def linear_scan(pk):
+            signature = all_signatures[pk]
+            return [other for other, sig in all_signatures.items()
+                    if other != pk and similarity(signature, sig) >= DUPLICATE_THRESHOLD]
+
+        sample = rng.sample(list(copies), min(args.queries, len(copies)))
+        lookup_rows = []
+        found_lsh = found_scan = 0
+        start = time.perf_counter()
+        for i in sample:
+            matches = [pk for pk, _ in similar_documents(pk_of[f'Gốc {i}'])]
+            found_lsh += pk_of[f'Bản sao {i}'] in matches
+        secs = (time.perf_counter() - start) / len(sample)
+        lookup_rows.append(('LSH buckets (index)', f'{secs * 1000:,.2f} ms', f'{found_lsh / len(sample):.0%}'))
+
+        start = time.perf_counter()
+        for i in sample:
+            found_scan += pk_of[f'Bản sao {i}'] in linear_scan(pk_of[f'Gốc {i}'])
+        secs = (time.perf_counter() - start) / len(sample)
+        lookup_rows.append(('linear scan (signatures in memory)', f'{secs * 1000:,.2f} ms',
+                            f'{found_scan / len(sample):.0%}'))
+
+        false_hits = sum(len(find_similar(all_signatures[pk_of[f'Gốc {i}']], exclude_pk=pk_of[f'Gốc {i}']))
+                         for i in range(args.docs) if i not in copies and i < args.queries)
+        print_table(f'Near-duplicate lookup (threshold {DUPLICATE_THRESHOLD}, {args.edits} edits per copy)',
+                    lookup_rows, ('method', 'latency', 'recall'))
+        print(f'\nFalse matches for {min(args.queries, args.docs)} originals without copy: {false_hits}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Benchmark: thông lượng tải file đồng thời
+
+Khởi động backend thật trong tiến trình con với CSDL/thư mục upload tạm và
+đo MB/s, req/s khi nhiều client tải cùng lúc:
+    - werkzeug: dev server (threaded) - mọi byte đi qua Python
+    - gunicorn: worker gthread - wsgi.file_wrapper gửi bằng os.sendfile
+Mỗi server chạy hai kịch bản: tải toàn bộ file và tải từng đoạn Range
+(giống trình xem PDF).
+
+Chạy: python benchmarks/bench_downloads.py --size-mb 20 --clients 8
+"""
+
+import argparse
+import http.client
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BACKEND_DIR, make_app, print_table
+
+from models import db, Document
+from downloads import file_sha256
+
+HOST = '127.0.0.1'
+
+
+def prepare(size_mb):
+    """Tạo file mẫu và một văn bản trỏ tới nó trong CSDL tạm"""
+    tmp = tempfile.mkdtemp(prefix='bench_dl_')
+    db_path = os.path.join(tmp, 'bench.db')
+    file_path = os.path.join(tmp, 'sample.pdf')
+    with open(file_path, 'wb') as f:
+        for _ in range(size_mb):
+            f.write(os.urandom(1024 * 1024))
+
+    app = make_app(db_path)
+    with app.app_context():
+        doc = Document(title='sample', file_path=file_path, file_name='sample.pdf',
+                       file_size=os.path.getsize(file_path), file_type='pdf',
+                       file_hash=file_sha256(file_path))
+        db.session.add(doc)
+        db.session.commit()
+        doc_id = doc.id
+    return tmp, db_path, doc_id
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind((HOST, 0))
+        return s.getsockname()[1]
+
+
+def start_server(kind, port, tmp, db_path, workers, threads):
+    env = dict(os.environ, FLASK_ENV='production', DATABASE_URL=f'sqlite:///{db_path}', UPLOAD_FOLDER=tmp)
+    if kind == 'werkzeug':
+        cmd = [sys.executable, '-c',
+               'from werkzeug.serving import run_simple; from app import app; '
+               f'run_simple("{HOST}", {port}, app, threaded=True)']
+    else:
+        cmd = [sys.executable, '-m', 'gunicorn', '-b', f'{HOST}:{port}', '-w', str(workers),
+               '-k', 'gthread', '--threads', str(threads), 'app:app']
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(HOST, port, timeout=2)
+            conn.request('GET', '/api/health')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not start')
+
+
+def client_loop(port, path, requests, file_size, range_size):
+    """Một client (kết nối keep-alive) gửi lần lượt các request; trả về số byte nhận"""
+    conn = http.client.HTTPConnection(HOST, port, timeout=60)
+    received = 0
+    for _ in range(requests):
+        headers = {}
+        if range_size:
+            start = random.randrange(0, file_size - range_size)
+            headers['Range'] = f'bytes={start}-{start + range_size - 1}'
+        conn.request('GET', path, headers=headers)
+        resp = conn.getresponse()
+        while True:
+            chunk = resp.read(256 * 1024)
+            if not chunk:
+                break
+            received += len(chunk)
+        expected = 206 if range_size else 200
+        if resp.status != expected:
+            raise RuntimeError(f'Unexpected status {resp.status}')
+        if resp.will_close:
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=60)
+    conn.close()
+    return received
+
+
+def run_load(port, path, clients, requests, file_size, range_size=0):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(client_loop, port, path, requests, file_size, range_size)
+                   for _ in range(clients)]
+        total = sum(f.result() for f in futures)
+    secs = time.perf_counter() - start
+    return secs, total, clients * requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=20)
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=10, help='Số request mỗi client')
+    parser.add_argument('--range-kb', type=int, default=256)
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn workers')
+    parser.add_argument('--threads', type=int, default=4, help='gunicorn threads mỗi worker')
+    args = parser.parse_args()
+
+    tmp, db_path, doc_id = prepare(args.size_mb)
+    file_size = args.size_mb * 1024 * 1024
+    path = f'/api/download/{doc_id}'
+
+    rows = []
+    for kind in ('werkzeug', 'gunicorn'):
+        port = free_port()
+        server = start_server(kind, port, tmp, db_path, args.workers, args.threads)
+        try:
+            wait_ready(port)
+            run_load(port, path, 1, 1, file_size)  # warm-up
+            for label, range_size in (('full', 0), (f'range {args.range_kb} KB', args.range_kb * 1024)):
+                secs, total, count = run_load(port, path, args.clients, args.requests, file_size, range_size)
+                rows.append((kind, label, f'{count / secs:,.1f}', f'{total / 1024 / 1024 / secs:,.1f}',
+                             f'{secs:.2f} s'))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_table(f'{args.clients} clients x {args.requests} requests, file {args.size_mb} MB', rows,
+                ('server', 'request', 'req/sec', 'MB/sec', 'time'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: khoá chính UUID text vs INTEGER rowid (+ UUID unique)
+
+Đo trên SQLite thuần (sqlite3) với hai schema:
+  - uuid:    documents.id TEXT PK, attachments.document_id TEXT (có index)
+  - integer: documents.pk INTEGER PK + id TEXT UNIQUE, attachments.document_pk INTEGER (có index)
+
+Chỉ số: tốc độ insert (rows/sec), độ trễ join (lấy attachments của K văn bản
+ngẫu nhiên, và join toàn bảng), kích thước file CSDL.
+
+Chạy: python benchmarks/bench_integer_keys.py --rows 1000000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from common import print_table
+
+SCHEMAS = {
+    'uuid': [
+        'CREATE TABLE documents (id VARCHAR(36) NOT NULL PRIMARY KEY, title VARCHAR(255) NOT NULL, created_at DATETIME)',
+        'CREATE TABLE attachments (id VARCHAR(36) NOT NULL PRIMARY KEY, document_id VARCHAR(36) NOT NULL '
+        'REFERENCES documents (id), filename VARCHAR(255) NOT NULL)',
+        'CREATE INDEX ix_attachments_document_id ON attachments (document_id)',
+    ],
+    'integer': [
+        'CREATE TABLE documents (pk INTEGER NOT NULL PRIMARY KEY, id VARCHAR(36) NOT NULL UNIQUE, '
+        'title VARCHAR(255) NOT NULL, created_at DATETIME)',
+        'CREATE TABLE attachments (pk INTEGER NOT NULL PRIMARY KEY, id VARCHAR(36) NOT NULL UNIQUE, '
+        'document_pk INTEGER NOT NULL REFERENCES documents (pk), filename VARCHAR(255) NOT NULL)',
+        'CREATE INDEX ix_attachments_document_pk ON attachments (document_pk)',
+    ],
+}
+
+JOIN_BY_DOC = {
+    'uuid': 'SELECT a.filename FROM attachments a WHERE a.document_id = ?',
+    'integer': 'SELECT a.filename FROM attachments a WHERE a.document_pk = ?',
+}
+
+FULL_JOIN = {
+    'uuid': 'SELECT COUNT(*) FROM documents d JOIN attachments a ON a.document_id = d.id',
+    'integer': 'SELECT COUNT(*) FROM documents d JOIN attachments a ON a.document_pk = d.pk',
+}
+
+
+def run(kind, n_rows, batch, lookups):
+    path = os.path.join(tempfile.mkdtemp(prefix='bench_keys_'), f'{kind}.db')
+    conn = sqlite3.connect(path)
+    for ddl in SCHEMAS[kind]:
+        conn.execute(ddl)
+
+    # Insert: mỗi văn bản một attachment, commit theo lô
+    start = time.perf_counter()
+    keys = []
+    for offset in range(0, n_rows, batch):
+        docs, atts = [], []
+        for i in range(offset, min(offset + batch, n_rows)):
+            doc_uuid = str(uuid.uuid4())
+            if kind == 'uuid':
+                docs.append((doc_uuid, f'Công văn {i}', '2024-01-01'))
+                atts.append((str(uuid.uuid4()), doc_uuid, f'att_{i}.pdf'))
+                keys.append(doc_uuid)
+            else:
+                docs.append((i + 1, doc_uuid, f'Công văn {i}', '2024-01-01'))
+                atts.append((i + 1, str(uuid.uuid4()), i + 1, f'att_{i}.pdf'))
+                keys.append(i + 1)
+        placeholders = ', '.join('?' * len(docs[0]))
+        conn.executemany(f'INSERT INTO documents VALUES ({placeholders})', docs)
+        placeholders = ', '.join('?' * len(atts[0]))
+        conn.executemany(f'INSERT INTO attachments VALUES ({placeholders})', atts)
+        conn.commit()
+    insert_secs = time.perf_counter() - start
+
+    sample = random.Random(42).sample(keys, min(lookups, len(keys)))
+    start = time.perf_counter()
+    for key in sample:
+        conn.execute(JOIN_BY_DOC[kind], (key,)).fetchall()
+    lookup_us = (time.perf_counter() - start) / len(sample) * 1e6
+
+    start = time.perf_counter()
+    conn.execute(FULL_JOIN[kind]).fetchone()
+    full_join_ms = (time.perf_counter() - start) * 1000
+
+    conn.close()
+    size_mb = os.path.getsize(path) / (1024 * 1024)
+    return (kind, f'{2 * n_rows / insert_secs:,.0f}', f'{lookup_us:.1f} us', f'{full_join_ms:.0f} ms', f'{size_mb:.1f} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='Số văn bản (mỗi văn bản 1 attachment)')
+    parser.add_argument('--batch', type=int, default=10_000)
+    parser.add_argument('--lookups', type=int, default=10_000)
+    args = parser.parse_args()
+
+    rows = [run(kind, args.rows, args.batch, args.lookups) for kind in ('uuid', 'integer')]
+    print_table(f'{args.rows:,} documents + {args.rows:,} attachments', rows,
+                ('keys', 'insert rows/sec', 'join by doc', 'full join', 'db size'))
+
+
+if __name__ == '__main__':
+    main()
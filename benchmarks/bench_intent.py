@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: nhận diện intent của chat
+
+So sánh heuristic cũ (chuỗi any(kw in message) theo thứ tự search ->
+statistics -> list -> help) với intent_service.IntentClassifier trên tập
+câu mẫu backend/data/intent_corpus.tsv:
+    - accuracy: heuristic trên toàn bộ tập; classifier đánh giá chéo k-fold
+      (mỗi câu được dự đoán bởi model không huấn luyện trên câu đó)
+    - msgs/sec: số tin nhắn phân loại mỗi giây
+
+Chạy: python benchmarks/bench_intent.py --folds 5 --repeat 200
+"""
+
+import argparse
+import random
+import time
+from collections import Counter
+
+from common import print_table
+
+from intent_service import IntentClassifier, INTENTS, load_corpus
+
+
+def heuristic_intent(message):
+    message = message.lower()
+    search_keywords = ['tìm', 'tìm kiếm', 'search', 'liên quan']
+    stats_keywords = ['thống kê', 'statistics', 'số lượng', 'tổng', 'bao nhiêu']
+    list_keywords = ['danh sách', 'list', 'xem', 'gần đây', 'mới nhất']
+    help_keywords = ['giúp', 'help', 'làm gì', 'có thể gì', 'hỏi']
+
+    if any(kw in message for kw in search_keywords):
+        return 'search'
+    elif any(kw in message for kw in stats_keywords):
+        return 'statistics'
+    elif any(kw in message for kw in list_keywords):
+        return 'list'
+    elif any(kw in message for kw in help_keywords):
+        return 'help'
+    return 'general'
+
+
+def cross_validate(samples, folds, seed):
+    """Dự đoán mỗi câu bằng model huấn luyện trên các fold còn lại"""
+    shuffled = samples[:]
+    random.Random(seed).shuffle(shuffled)
+    predictions = []
+    for k in range(folds):
+        test = shuffled[k::folds]
+        train = [s for i, s in enumerate(shuffled) if i % folds != k]
+        model = IntentClassifier().fit(train)
+        predictions.extend((label, text, model.predict(text)[0]) for label, text in test)
+    return predictions
+
+
+def accuracy_rows(name, predictions):
+    correct = Counter(label for label, _, predicted in predictions if label == predicted)
+    total = Counter(label for label, _, _ in predictions)
+    rows = [(name, intent, f'{correct[intent]}/{total[intent]}', f'{correct[intent] / total[intent]:.1%}')
+            for intent in INTENTS if total[intent]]
+    overall = sum(correct.values()) / len(predictions)
+    rows.append((name, 'overall', f'{sum(correct.values())}/{len(predictions)}', f'{overall:.1%}'))
+    return rows
+
+
+def throughput(func, messages, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            func(message)
+    return len(messages) * repeat / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--folds', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200, help='Số lượt phân loại toàn bộ tập khi đo tốc độ')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--errors', action='store_true', help='In các câu bị phân loại sai')
+    args = parser.parse_args()
+
+    samples = load_corpus()
+    messages = [text for _, text in samples]
+
+    heuristic = [(label, text, heuristic_intent(text)) for label, text in samples]
+    classifier = cross_validate(samples, args.folds, args.seed)
+
+    rows = accuracy_rows('heuristic', heuristic) + accuracy_rows(f'classifier ({args.folds}-fold)', classifier)
+    print_table(f'Intent accuracy ({len(samples)} labeled messages)', rows, ('method', 'intent', 'correct', 'accuracy'))
+
+    model = IntentClassifier().fit(samples)
+    speed_rows = [
+        ('heuristic', f'{throughput(heuristic_intent, messages, args.repeat):,.0f}'),
+        ('classifier', f'{throughput(model.predict, messages, args.repeat):,.0f}'),
+    ]
+    print_table('Intent throughput', speed_rows, ('method', 'msgs/sec'))
+
+    if args.errors:
+        for name, predictions in (('heuristic', heuristic), ('classifier', classifier)):
+            print(f'\n{name} errors:')
+            for label, text, predicted in predictions:
+                if label != predicted:
+                    print(f'  {label:>10} -> {predicted:<10} {text}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tra cứu chính xác theo số hiệu (lookup_service)
+
+    - full scan: nạp và so số hiệu của từng văn bản như đường tìm kiếm cũ
+      (vẫn là đường fallback khi không có số hiệu khớp)
+    - exact: truy vấn dạng số hiệu tra index document_number_key, với các
+      biến thể viết khác nhau (chữ thường, '/' thay '-', bỏ dấu)
+
+Chạy: python benchmarks/bench_lookup.py --docs 20000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from common import make_app, print_table
+
+from models import db, Document
+from ai_service import AIService
+from lookup_service import find_by_document_number, normalize_document_number
+
+PREFIXES = ['HĐLĐ', 'QĐ', 'CV', 'TTr', 'TB']
+
+
+def variants(number):
+    """Các cách người dùng gõ cùng một số hiệu"""
+    return [number, number.lower(), number.replace('-', '/'), normalize_document_number(number)]
+
+
+def timed(func, queries):
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        hits = func(query)
+        latencies.append(time.perf_counter() - start)
+        assert hits, query
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--content-size', type=int, default=2000)
+    parser.add_argument('--queries', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(4)
+    numbers = [f'{rng.choice(PREFIXES)}-2024-{i:05d}' for i in range(args.docs)]
+    filler = 'Nội dung công văn về việc triển khai kế hoạch năm 2024. ' * (args.content_size // 56)
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(db.insert(Document), [
+            {'title': f'Văn bản {i}', 'content': filler, 'document_number': number,
+             'document_number_key': normalize_document_number(number)}
+            for i, number in enumerate(numbers)
+        ])
+        db.session.commit()
+
+        queries = [rng.choice(variants(number)) for number in rng.sample(numbers, args.queries)]
+        scan_queries = queries[:10]
+
+        def full_scan(query):
+            documents = Document.query.all()
+            hits = [doc for doc in documents if doc.document_number and
+                    normalize_document_number(doc.document_number) == normalize_document_number(query)]
+            db.session.expunge_all()
+            return hits
+
+        rows = []
+        p50, worst = timed(full_scan, scan_queries)
+        rows.append(('full scan (load + compare every document)', f'{p50 * 1000:,.1f} ms', f'{worst * 1000:,.1f} ms'))
+        p50, worst = timed(find_by_document_number, queries)
+        rows.append(('find_by_document_number (index)', f'{p50 * 1e6:,.0f} us', f'{worst * 1e6:,.0f} us'))
+        p50, worst = timed(lambda q: AIService.search_documents(q, limit=10), queries)
+        rows.append(('AIService.search_documents (fast path)', f'{p50 * 1e6:,.0f} us', f'{worst * 1e6:,.0f} us'))
+
+        print_table(f'Exact lookup by số hiệu ({args.docs:,} documents)', rows, ('method', 'p50', 'max'))
+
+
+if __name__ == '__main__':
+    main()
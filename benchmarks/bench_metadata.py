@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark: trích xuất thể thức văn bản (metadata_service)
+
+    - extract: extract_metadata một văn bản (luồng upload, chỉ đọc
+      HEADER_CHARS ký tự đầu nên không phụ thuộc độ dài văn bản)
+    - extract_corpus: backfill các văn bản cũ chưa có số hiệu/ngày/nơi gửi
+    - lookup: "tìm QĐ 15/2024" bằng so khớp bằng trên cột document_number
+      có index so với LIKE trên nội dung (quét toàn bảng)
+
+Chạy: python benchmarks/bench_metadata.py --docs 20000
+"""
+
+import argparse
+import random
+import time
+
+from common import make_app, print_table
+
+from models import db, Document
+from metadata_service import HEADER_CHARS, extract_corpus, extract_metadata
+
+ISSUERS = [('ỦY BAN NHÂN DÂN', 'TỈNH HÀ NAM', 'UBND'), ('UBND TỈNH HÀ NAM', 'SỞ TÀI CHÍNH', 'STC'),
+           ('BỘ NỘI VỤ', '', 'BNV')]
+KINDS = ['QĐ', 'CV', 'TTr', 'TB', 'KH']
+RECIPIENTS = ['Sở Nội vụ', 'Các sở, ban, ngành', 'UBND các huyện, thành phố', 'Văn phòng Chính phủ']
+BODY = ('Thực hiện chỉ đạo của cấp trên về việc triển khai nhiệm vụ năm 2024, đề nghị các đơn vị '
+        'rà soát, tổng hợp và báo cáo kết quả thực hiện theo đúng thời hạn quy định. ')
+
+
+def make_content(rng, i, body_chars):
+    upper, lower, code = rng.choice(ISSUERS)
+    number = f'{i}/{2020 + i % 5}/{rng.choice(KINDS)}-{code}'
+    header = (f'{upper}          CỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM\n'
+              f'{lower}          Độc lập - Tự do - Hạnh phúc\n'
+              f'Số: {number}          Hà Nam, ngày {rng.randint(1, 28)} tháng {rng.randint(1, 12)} năm 2024\n'
+              f'Kính gửi: {rng.choice(RECIPIENTS)}.\n')
+    return number, header + BODY * (body_chars // len(BODY))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--body-chars', type=int, default=8000, help='Số ký tự phần nội dung mỗi văn bản')
+    parser.add_argument('--lookups', type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(9)
+    documents = [make_content(rng, i, args.body_chars) for i in range(args.docs)]
+    contents = [content for _, content in documents]
+
+    sample = contents[:2000]
+    start = time.perf_counter()
+    for content in sample:
+        extract_metadata(content)
+    secs = time.perf_counter() - start
+    rows = [(f'extract_metadata (first {HEADER_CHARS} chars)', f'{secs / len(sample) * 1e6:,.1f} us', '')]
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(db.insert(Document), [{'title': f'Văn bản {i}', 'content': c} for i, c in enumerate(contents)])
+        db.session.commit()
+
+        start = time.perf_counter()
+        stats = extract_corpus()
+        secs = time.perf_counter() - start
+        rows.append(('extract_corpus (backfill)', f'{secs:.2f} s', f"{stats['updated']:,} documents"))
+        print_table(f'Metadata extraction ({args.docs:,} documents, ~{args.body_chars} chars)', rows,
+                    ('step', 'time', ''))
+
+        targets = [number for number, _ in rng.sample(documents, args.lookups)]
+        lookup_rows = []
+        for label, make_stmt, queries in (
+            ('LIKE on content (full scan)',
+             lambda n: db.select(Document.pk).where(Document.content.like(f'%Số: {n} %')), targets[:20]),
+            ('document_number index',
+             lambda n: db.select(Document.pk).where(Document.document_number == n), targets),
+        ):
+            found = 0
+            start = time.perf_counter()
+            for number in queries:
+                found += len(db.session.execute(make_stmt(number)).all())
+            secs = (time.perf_counter() - start) / len(queries)
+            lookup_rows.append((label, f'{secs * 1000:,.3f} ms', f'{found / len(queries):.2f}'))
+        print_table('Lookup by số hiệu', lookup_rows, ('method', 'latency', 'hits/query'))
+
+
+if __name__ == '__main__':
+    main()
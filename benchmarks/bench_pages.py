@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: đọc nội dung theo trang (page store) so với content đầy đủ
+
+Với mỗi kích thước văn bản (số trang), so sánh:
+    - full:  get_document_payload() + encode_json (như GET /documents/<id>)
+    - pages: page_store.read_pages() một đoạn giữa văn bản + encode_json
+             (như GET /documents/<id>/pages?from=&to=)
+    - page_of: tra số trang cho một vị trí ký tự (dùng cho kết quả tìm kiếm)
+Đo thời gian trung bình, kích thước response và đỉnh bộ nhớ Python.
+
+Chạy: python benchmarks/bench_pages.py --pages 100 1000 5000
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from common import make_app, print_table
+
+from models import db, Document
+from page_store import page_store, PAGE_SEPARATOR
+from serializers import encode_json, get_document_payload
+
+PAGE_TEXT = 'Căn cứ Luật Tổ chức chính quyền địa phương, Ủy ban nhân dân tỉnh quyết định điều chỉnh kế hoạch. '
+
+
+def make_document(n_pages, page_chars):
+    pages = [(f'Trang {i + 1}. ' + PAGE_TEXT * (page_chars // len(PAGE_TEXT) + 1))[:page_chars]
+             for i in range(n_pages)]
+    doc = Document(title=f'{n_pages} trang', content=PAGE_SEPARATOR.join(pages))
+    db.session.add(doc)
+    db.session.commit()
+    page_store.write(doc.id, pages)
+    doc_id, content_len = doc.id, len(doc.content)
+    db.session.expunge_all()
+    return doc_id, content_len
+
+
+def timed(func, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    secs = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, result, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pages', type=int, nargs='+', default=[100, 1000, 5000])
+    parser.add_argument('--page-chars', type=int, default=3000)
+    parser.add_argument('--slice', type=int, default=5, help='Số trang mỗi lần đọc')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    app = make_app()
+    app.config['PAGE_STORE_FOLDER'] = os.path.join(app.config['UPLOAD_FOLDER'], 'pages')
+    page_store.init_app(app)
+
+    rows = []
+    with app.app_context():
+        for n_pages in args.pages:
+            doc_id, content_len = make_document(n_pages, args.page_chars)
+            first = max(1, n_pages // 2)
+            last = first + args.slice - 1
+
+            def full():
+                return encode_json({'success': True, 'document': get_document_payload(doc_id)})
+
+            def pages():
+                texts = page_store.read_pages(doc_id, first, last)
+                return encode_json({'success': True, 'pages': [
+                    {'number': first + i, 'text': text} for i, text in enumerate(texts)
+                ]})
+
+            def page_of():
+                return encode_json(page_store.page_of(doc_id, content_len // 2))
+
+            for label, func in (('full', full), (f'pages x{args.slice}', pages), ('page_of', page_of)):
+                secs, body, peak = timed(func, args.repeat)
+                rows.append((f'{n_pages:,}', label, f'{secs * 1000:.3f} ms', f'{len(body) / 1024:,.1f} KB',
+                             f'{peak / 1024 / 1024:.2f} MB'))
+            db.session.remove()
+
+    print_table(f'Page store ({args.page_chars} chars/page)', rows,
+                ('pages', 'request', 'time', 'response', 'peak mem'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: truy vấn có cấu trúc (query_service)
+
+    - build_postings: dựng posting list (từ, vị trí) cho cả kho
+    - scan: AIService.search_documents với truy vấn thường (nạp và đếm từ
+      khoá trên nội dung từng văn bản)
+    - plan: cùng nhu cầu viết bằng cú pháp có cấu trúc, chạy theo kế hoạch
+      (bộ lọc SQL, giao posting list, cụm từ, phủ định)
+
+Chạy: python benchmarks/bench_query.py --docs 20000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime
+
+from common import make_app, print_table
+
+from models import db, Document
+from ai_service import AIService
+from query_service import build_postings, compile_query
+
+SENDERS = ['Ban Nhân Sự', 'Phòng Hành chính', 'Sở Tài chính', 'Văn phòng UBND', 'Phòng Kế toán']
+TYPES = ['Quyết định', 'Công văn', 'Thông báo', 'Tờ trình']
+WORDS = ('kế hoạch triển khai nhiệm vụ báo cáo tổng hợp kết quả thực hiện đề nghị các đơn vị rà soát '
+         'ngân sách tài chính nhân sự tuyển dụng đào tạo hội nghị lịch công tác văn phòng hành chính').split()
+TOPICS = ['nghỉ hè', 'khen thưởng', 'bổ nhiệm cán bộ', 'quyết toán ngân sách', 'hội thao']
+
+QUERIES = [
+    ('nghỉ hè 2024', 'sender:"Ban Nhân Sự" type:"Quyết định" "nghỉ hè" -2023 after:2024-01-01'),
+    ('khen thưởng', '"khen thưởng" -"bổ nhiệm" type:"Công văn"'),
+    ('quyết toán ngân sách', '"quyết toán ngân sách" before:2023'),
+    ('hội thao', 'hội thao -sender:"Phòng Kế toán"'),
+]
+
+
+def make_document(rng, i, words):
+    topic = rng.choice(TOPICS)
+    year = rng.choice([2022, 2023, 2024])
+    body = ' '.join(rng.choice(WORDS) for _ in range(words))
+    return {
+        'title': f'Văn bản {i} về {topic}',
+        'content': f'Về việc {topic} năm {year}. {body}',
+        'sender': rng.choice(SENDERS),
+        'document_type': rng.choice(TYPES),
+        'date_issued': datetime(year, rng.randint(1, 12), rng.randint(1, 28)),
+    }
+
+
+def timed(func, repeat):
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=20000)
+    parser.add_argument('--words', type=int, default=300, help='Số từ mỗi văn bản')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(47)
+    app = make_app()
+    with app.app_context():
+        db.session.execute(db.insert(Document), [make_document(rng, i, args.words) for i in range(args.docs)])
+        db.session.commit()
+
+        start = time.perf_counter()
+        stats = build_postings()
+        secs = time.perf_counter() - start
+        print_table(f'Posting index ({args.docs:,} documents, {args.words} words)', [
+            ('build_postings', f'{secs:.1f} s', f"{stats['postings']:,} postings"),
+        ], ('step', 'time', ''))
+
+        rows = []
+        stage_rows = []
+        for plain, structured in QUERIES:
+            scan_secs, _ = timed(lambda: (AIService.search_documents(plain, limit=10), db.session.expunge_all()),
+                                 max(1, args.repeat // 5))
+            plan_secs, (results, explain) = timed(lambda: compile_query(structured).execute(10), args.repeat)
+            db.session.expunge_all()
+            rows.append((structured, f'{scan_secs * 1000:,.0f} ms', f'{plan_secs * 1000:,.2f} ms', len(results)))
+            for stage in explain['stages']:
+                stage_rows.append((structured[:40], stage['stage'], stage['detail'][:40],
+                                   stage['estimate'] if stage['estimate'] is not None else '',
+                                   stage['rows'], f"{stage['ms']:.2f}"))
+
+        print_table('Plain scan vs structured plan (p50)', rows, ('structured query', 'scan', 'plan', 'hits'))
+        print_table('Plan stages (last run)', stage_rows, ('query', 'stage', 'detail', 'estimate', 'rows', 'ms'))
+
+
+if __name__ == '__main__':
+    main()
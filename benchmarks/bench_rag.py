@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pipeline RAG (truy xuất -> đóng gói context -> sinh câu trả lời)
+
+Đo thời gian từng bước (retrieve/pack/generate/total) với:
+    - extractive: backend offline mặc định
+    - openai:     mock server tương thích OpenAI (độ trễ --latency-ms)
+Mỗi backend chạy: cold (xoá cache) từng câu hỏi tuần tự, answer_many()
+(truy xuất câu sau chồng lên bước sinh câu trước) và warm (cache trúng).
+
+Chạy: python benchmarks/bench_rag.py --docs 2000 --questions 8 --latency-ms 300
+"""
+
+import argparse
+import time
+
+from common import make_app, seed_documents, print_table
+from mock_llm_server import start_server
+
+from models import db, Document
+from rag_service import RAGPipeline, ExtractiveBackend, OpenAICompatibleBackend
+
+TOPICS = (
+    ('bảo hiểm', 'Mức đóng bảo hiểm xã hội năm nay là 8% lương cơ bản của người lao động.'),
+    ('phép năm', 'Nhân viên được nghỉ phép năm 12 ngày, thâm niên 5 năm được cộng thêm 1 ngày.'),
+    ('công tác phí', 'Công tác phí được thanh toán theo hoá đơn, tối đa 500.000 đồng mỗi ngày.'),
+    ('tuyển dụng', 'Đợt tuyển dụng quý III tuyển 15 kỹ sư phần mềm, hạn nộp hồ sơ ngày 30/9.'),
+    ('đào tạo', 'Khoá đào tạo an toàn lao động bắt buộc với toàn bộ nhân viên mới.'),
+    ('khen thưởng', 'Mức khen thưởng cuối năm tương đương một tháng lương cho cá nhân xuất sắc.'),
+    ('làm thêm giờ', 'Làm thêm giờ ngày thường được trả 150% tiền lương theo giờ.'),
+    ('an ninh', 'Mọi khách ra vào toà nhà phải đăng ký tại quầy lễ tân và đeo thẻ.'),
+)
+
+QUESTIONS = [f'Quy định về {topic} như thế nào?' for topic, _ in TOPICS]
+
+
+def seed_topics():
+    filler = 'Căn cứ quy chế nội bộ của công ty và đề nghị của các phòng ban liên quan. ' * 20
+    for i, (topic, fact) in enumerate(TOPICS):
+        db.session.add(Document(
+            title=f'Quy định {topic}',
+            document_number=f'QĐ-{i + 1:03d}',
+            content=f'{filler}\n{fact}\n{filler}',
+            document_type='Quyết định',
+        ))
+    db.session.commit()
+
+
+def make_pipeline(backend):
+    pipeline = RAGPipeline()
+    pipeline.backend = backend
+    return pipeline
+
+
+def run_sequential(pipeline, questions):
+    return [pipeline.answer(question) for question in questions]
+
+
+def average(results, key):
+    values = [r['timings'].get(key, 0.0) for r in results]
+    return sum(values) / len(values)
+
+
+def measure(pipeline, questions, mode):
+    if mode != 'warm':
+        pipeline.context_cache.clear()
+        pipeline.answer_cache.clear()
+    start = time.perf_counter()
+    if mode == 'answer_many':
+        results = pipeline.answer_many(questions)
+    else:
+        results = run_sequential(pipeline, questions)
+    wall = time.perf_counter() - start
+    db.session.expunge_all()
+    return wall, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=2000, help='Số văn bản nền (không liên quan câu hỏi)')
+    parser.add_argument('--questions', type=int, default=8)
+    parser.add_argument('--latency-ms', type=int, default=300, help='Độ trễ của mock server')
+    args = parser.parse_args()
+
+    questions = (QUESTIONS * (args.questions // len(QUESTIONS) + 1))[:args.questions]
+    server, base_url = start_server(latency=args.latency_ms / 1000)
+
+    backends = (
+        ('extractive', ExtractiveBackend()),
+        (f'openai mock ({args.latency_ms} ms)', OpenAICompatibleBackend(base_url, None, 'mock', timeout=15)),
+    )
+
+    rows = []
+    app = make_app()
+    with app.app_context():
+        seed_documents(args.docs, attachments_per_doc=0)
+        seed_topics()
+
+        for label, backend in backends:
+            pipeline = make_pipeline(backend)
+            for mode in ('cold', 'answer_many', 'warm'):
+                wall, results = measure(pipeline, questions, mode)
+                rows.append((
+                    label, mode,
+                    f"{average(results, 'retrieve_ms'):.2f}",
+                    f"{average(results, 'pack_ms'):.3f}",
+                    f"{average(results, 'generate_ms'):.2f}",
+                    f'{wall * 1000:.1f} ms',
+                    sum(r['cached'] for r in results),
+                ))
+        db.session.remove()
+
+    server.shutdown()
+    print_table(f'RAG pipeline ({args.docs:,} docs, {len(questions)} questions, avg ms per question)', rows,
+                ('backend', 'mode', 'retrieve', 'pack', 'generate', 'wall total', 'cached'))
+
+
+if __name__ == '__main__':
+    main()
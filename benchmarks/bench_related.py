@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark: văn bản liên quan (related_service)
+
+    - build: build_postings + build_term_vectors cho cả kho
+    - enhanced: cách cũ - tìm kiếm search_documents_enhanced với các từ của
+      văn bản làm truy vấn (quét toàn kho)
+    - related: chấm điểm trên posting list của VECTOR_TERMS từ + xếp lại
+      theo cosine; cached: cùng truy vấn khi kho không đổi
+    - precision: tỉ lệ kết quả cùng chủ đề với văn bản gốc
+
+Chạy: python benchmarks/bench_related.py --docs 10000
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from common import make_app, print_table
+
+from models import db, Document
+from ai_service import AIService
+from query_service import build_postings
+from related_service import build_term_vectors, cached_related_documents, related_documents, VECTOR_TERMS
+
+COMMON = ('về việc thực hiện các đơn vị báo cáo kết quả theo quy định đề nghị triển khai nội dung '
+          'trong năm tổ chức phối hợp liên quan').split()
+
+
+def make_topics(rng, count, size=25):
+    """Mỗi chủ đề có bộ từ riêng (ghép âm tiết ngẫu nhiên)"""
+    syllables = ('an bình cao dân hải khánh lâm minh ngọc phúc quang sơn tâm thành uyên vinh xuân '
+                 'hợp đồng quyết định lương thưởng đất đai thuế xây dựng giáo dục y tế').split()
+    return [[f'{rng.choice(syllables)}{rng.choice(syllables)}{t}' for _ in range(size)] for t in range(count)]
+
+
+def timed(func, items):
+    latencies = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies), max(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=10000)
+    parser.add_argument('--topics', type=int, default=200)
+    parser.add_argument('--words', type=int, default=300)
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(48)
+    topics = make_topics(rng, args.topics)
+    labels = [rng.randrange(args.topics) for _ in range(args.docs)]
+    rows = []
+    for i, label in enumerate(labels):
+        # Khoảng 1/4 từ thuộc chủ đề, còn lại là từ chung của văn bản hành chính
+        words = [rng.choice(topics[label]) if rng.random() < 0.25 else rng.choice(COMMON) for _ in range(args.words)]
+        rows.append({'title': f'Văn bản {i}', 'content': ' '.join(words)})
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(db.insert(Document), rows)
+        db.session.commit()
+        topic_of = {pk: labels[i] for i, pk in enumerate(db.session.execute(
+            db.select(Document.pk).order_by(Document.pk)).scalars())}
+
+        start = time.perf_counter()
+        build_postings()
+        build_term_vectors()
+        build_secs = time.perf_counter() - start
+
+        pks = rng.sample(list(topic_of), args.queries)
+        precision = []
+        for pk in pks:
+            matches = related_documents(pk, limit=10)
+            precision.extend(topic_of[other] == topic_of[pk] for other, _ in matches)
+
+        results = [('build_postings + build_term_vectors', f'{build_secs:.1f} s', '', '')]
+        contents = {pk: content for pk, content in db.session.execute(
+            db.select(Document.pk, Document.content).where(Document.pk.in_(pks[:5])))}
+        p50, worst = timed(lambda pk: (AIService.search_documents_enhanced(' '.join(set(contents[pk].split())), 10),
+                                       db.session.expunge_all()), pks[:5])
+        results.append(('search_documents_enhanced (document words)', f'{p50 * 1000:,.0f} ms',
+                        f'{worst * 1000:,.0f} ms', ''))
+        p50, worst = timed(lambda pk: related_documents(pk, limit=10), pks)
+        results.append((f'related_documents ({VECTOR_TERMS} terms)', f'{p50 * 1000:,.2f} ms',
+                        f'{worst * 1000:,.2f} ms', f'{sum(precision) / len(precision):.1%}'))
+        for pk in pks:
+            cached_related_documents(pk, limit=10)
+        p50, worst = timed(lambda pk: cached_related_documents(pk, limit=10), pks)
+        results.append(('cached_related_documents (warm)', f'{p50 * 1e6:,.1f} us', f'{worst * 1e6:,.1f} us', ''))
+
+        print_table(f'Related documents ({args.docs:,} documents, {args.topics} topics)', results,
+                    ('method', 'p50', 'max', 'same topic'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tốc độ serialize GET /api/documents (rows/sec)
+
+So sánh:
+  - legacy: Document.query.all() + to_dict() (lazy attachments, 1 + N truy vấn) + json
+  - fast:   serializers.list_documents() (row tuple + IN theo lô) + orjson
+
+Chạy: python benchmarks/bench_serialization.py --docs 5000
+"""
+
+import argparse
+import json
+
+from common import make_app, seed_documents, timer, print_table
+
+from models import db, Document
+from serializers import list_documents, encode_json
+
+
+def legacy_payload():
+    docs = Document.query.order_by(Document.created_at.desc()).all()
+    return json.dumps({'success': True, 'documents': [d.to_dict() for d in docs]}, ensure_ascii=False).encode('utf-8')
+
+
+def fast_payload():
+    documents, _ = list_documents()
+    return encode_json({'success': True, 'documents': documents})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--attachments', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    app = make_app()
+    with app.app_context():
+        seed_documents(args.docs, args.attachments)
+
+        rows = []
+        for label, fn in (('legacy (ORM + to_dict + json)', legacy_payload), ('fast (rows + IN + orjson)', fast_payload)):
+            best = float('inf')
+            size = 0
+            for _ in range(args.repeat):
+                db.session.expunge_all()  # không dùng lại identity map giữa các lần
+                results = {}
+                with timer(results, label):
+                    size = len(fn())
+                best = min(best, results[label])
+            rows.append((label, f'{best * 1000:.1f} ms', f'{args.docs / best:,.0f}', f'{size / 1024:.0f} KB'))
+
+        print_table(f'{args.docs} documents x {args.attachments} attachments', rows,
+                    ('path', 'best', 'rows/sec', 'payload'))
+
+
+if __name__ == '__main__':
+    main()
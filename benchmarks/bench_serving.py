@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: số request/giây của launcher hiện tại và chế độ production
+
+Khởi động backend thật trong tiến trình con trên cùng một CSDL tạm:
+    - dev:        như `python app.py` (main.py mặc định) - FLASK_ENV=development,
+                  app.run(debug=True, use_debugger=True), một tiến trình
+    - production: như `python main.py --production` - gunicorn với
+                  backend/gunicorn.conf.py (workers/threads theo số CPU,
+                  preload, max_requests)
+rồi cho --clients client (kết nối keep-alive) gửi lần lượt các request tới
+các endpoint đọc thường dùng.
+
+Chạy: python benchmarks/bench_serving.py --docs 5000 --clients 1 8 32
+"""
+
+import argparse
+import http.client
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import BACKEND_DIR, make_app, seed_documents, print_table
+from bench_downloads import HOST, free_port, wait_ready
+
+from models import db, Document
+
+
+def prepare(n_docs):
+    tmp = tempfile.mkdtemp(prefix='bench_serving_')
+    db_path = os.path.join(tmp, 'bench.db')
+    app = make_app(db_path)
+    with app.app_context():
+        seed_documents(n_docs, attachments_per_doc=1)
+        doc_ids = db.session.execute(db.select(Document.id).limit(500)).scalars().all()
+    return tmp, db_path, doc_ids
+
+
+def start_server(mode, port, tmp, db_path, workers):
+    env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', UPLOAD_FOLDER=tmp)
+    if mode == 'dev':
+        env['FLASK_ENV'] = 'development'
+        cmd = [sys.executable, '-c',
+               'from app import app; '
+               f'app.run(host="{HOST}", port={port}, debug=True, use_reloader=False, use_debugger=True)']
+    else:
+        env['FLASK_ENV'] = 'production'
+        cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '-b', f'{HOST}:{port}', 'app:app']
+        if workers:
+            cmd[-1:-1] = ['-w', str(workers)]
+    return subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def client_loop(port, paths, requests, seed):
+    """Một client keep-alive; trả về danh sách độ trễ (giây)"""
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(HOST, port, timeout=60)
+    latencies = []
+    for _ in range(requests):
+        path = rng.choice(paths)
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path)
+            resp = conn.getresponse()
+        except (http.client.RemoteDisconnected, ConnectionResetError):
+            # Worker được thay (max_requests) đóng các kết nối keep-alive đang rảnh;
+            # client HTTP gửi lại request GET trên kết nối mới như trình duyệt
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=60)
+            conn.request('GET', path)
+            resp = conn.getresponse()
+        resp.read()
+        latencies.append(time.perf_counter() - start)
+        if resp.status != 200:
+            raise RuntimeError(f'Unexpected status {resp.status} for {path}')
+        if resp.will_close:
+            conn.close()
+            conn = http.client.HTTPConnection(HOST, port, timeout=60)
+    conn.close()
+    return latencies
+
+
+def run_load(port, paths, clients, requests):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        futures = [pool.submit(client_loop, port, paths, requests, seed) for seed in range(clients)]
+        latencies = sorted(latency for f in futures for latency in f.result())
+    secs = time.perf_counter() - start
+    return secs, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=5000)
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--requests', type=int, default=50, help='Số request mỗi client')
+    parser.add_argument('--workers', type=int, default=0, help='gunicorn workers (0: theo gunicorn.conf.py)')
+    args = parser.parse_args()
+
+    tmp, db_path, doc_ids = prepare(args.docs)
+    paths = ['/api/health', '/api/documents?page=1&per_page=20', '/api/suggest?q=c%C3%B4ng']
+    paths += [f'/api/documents/{doc_id}' for doc_id in doc_ids]
+
+    rows = []
+    for mode in ('dev', 'production'):
+        port = free_port()
+        server = start_server(mode, port, tmp, db_path, args.workers)
+        try:
+            wait_ready(port)
+            run_load(port, paths, 4, 20)  # warm-up (mọi worker)
+            for clients in args.clients:
+                secs, latencies = run_load(port, paths, clients, args.requests)
+                p50 = latencies[len(latencies) // 2]
+                p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+                rows.append((mode, clients, f'{len(latencies) / secs:,.1f}',
+                             f'{p50 * 1000:.1f} ms', f'{p99 * 1000:.1f} ms'))
+        finally:
+            server.terminate()
+            server.wait()
+
+    print_table(f'{args.docs} documents, {args.requests} requests/client, {os.cpu_count()} CPU', rows,
+                ('server', 'clients', 'req/sec', 'p50', 'p99'))
+
+
+if __name__ == '__main__':
+    main()
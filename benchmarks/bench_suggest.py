@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark: gợi ý khi gõ (suggest_service)
+
+    - build: dựng PrefixIndex từ N mục (tiêu đề, số hiệu, nơi gửi, từ)
+    - memory: bộ nhớ của chỉ mục (tracemalloc) so với dict Python đầu vào
+    - top-k: p50/p99 của suggest với tiền tố ngẫu nhiên 1-6 ký tự, so với
+      quét tuyến tính trên một phần kho
+    - add_document: chi phí cập nhật tăng dần khi upload (delta trong bộ nhớ)
+
+Chạy: python benchmarks/bench_suggest.py --entries 1000000
+"""
+
+import argparse
+import heapq
+import random
+import statistics
+import time
+import tracemalloc
+
+from common import print_table
+
+from suggest_service import PrefixIndex, SuggestIndex, fold
+
+SYLLABLES = ['quyết', 'định', 'công', 'văn', 'hợp', 'đồng', 'lao', 'động', 'báo', 'cáo', 'kế', 'hoạch',
+             'tài', 'chính', 'nội', 'vụ', 'ngân', 'sách', 'bổ', 'nhiệm', 'khen', 'thưởng', 'sở', 'ban']
+KINDS = ['title', 'document_number', 'sender', 'term']
+
+
+def make_entries(rng, count):
+    entries = {}
+    while len(entries) < count:
+        kind = rng.choice(KINDS)
+        if kind == 'document_number':
+            display = f'{rng.randint(1, 999)}/{rng.randint(2015, 2025)}/QĐ-{rng.randint(1, 99999)}'
+        else:
+            display = ' '.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 6)))
+            display = f'{display} {rng.randint(1, 99999)}'
+        # Zipf-ish: phần lớn mục hiếm, một ít mục rất hay gặp
+        entries[(fold(display), kind)] = [display, int(rng.paretovariate(1.2))]
+    return entries
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.99)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--entries', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--scan-entries', type=int, default=100_000, help='Kích thước kho cho quét tuyến tính')
+    parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(46)
+    entries = make_entries(rng, args.entries)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = PrefixIndex(entries)
+    build_secs = time.perf_counter() - start
+    index_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    suggester = SuggestIndex()
+    suggester._base = index
+
+    keys = [key for key, _ in entries]
+    prefixes = []
+    for _ in range(args.queries):
+        key = rng.choice(keys)
+        prefixes.append(key[:rng.randint(1, min(6, len(key)))])
+
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        suggester.suggest(prefix, limit=args.limit)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = percentiles(latencies)
+
+    rows = [
+        ('build PrefixIndex', f'{build_secs:.2f} s', ''),
+        ('index memory', f'{index_bytes / 2 ** 20:,.1f} MiB', f'{index_bytes / len(entries):.0f} B/entry'),
+        (f'suggest top-{args.limit} (prefix)', f'{p50 * 1000:.3f} ms p50', f'{p99 * 1000:.3f} ms p99'),
+    ]
+
+    sample = dict(list(entries.items())[:args.scan_entries])
+    scan_latencies = []
+    for prefix in prefixes[:50]:
+        start = time.perf_counter()
+        heapq.nlargest(args.limit, ((weight, display) for (key, _), (display, weight) in sample.items()
+                                    if key.startswith(prefix)))
+        scan_latencies.append(time.perf_counter() - start)
+    p50, p99 = percentiles(scan_latencies)
+    rows.append((f'linear scan ({len(sample):,} entries)', f'{p50 * 1000:.3f} ms p50', f'{p99 * 1000:.3f} ms p99'))
+
+    # Delta: upload thêm văn bản, gợi ý gộp chỉ mục chính + delta
+    suggester.delta_max = 10 ** 9
+    titles = [' '.join(rng.choice(SYLLABLES) for _ in range(5)) for _ in range(2000)]
+    start = time.perf_counter()
+    for title in titles:
+        suggester.add_document(title, None, 'Sở Nội vụ', title)
+    add_secs = (time.perf_counter() - start) / len(titles)
+    latencies = []
+    for prefix in prefixes:
+        start = time.perf_counter()
+        suggester.suggest(prefix, limit=args.limit)
+        latencies.append(time.perf_counter() - start)
+    p50, p99 = percentiles(latencies)
+    rows.append(('add_document (delta)', f'{add_secs * 1e6:,.1f} us', ''))
+    rows.append((f'suggest with {len(suggester._delta):,} delta entries', f'{p50 * 1000:.3f} ms p50',
+                 f'{p99 * 1000:.3f} ms p99'))
+
+    print_table(f'Suggestions ({len(entries):,} entries)', rows, ('step', 'time / size', ''))
+
+
+if __name__ == '__main__':
+    main()
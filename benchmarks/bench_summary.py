@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tóm tắt trích xuất (summary_service)
+
+    - legacy: generate_summary cũ (cắt các câu đầu theo split('.'))
+    - centroid: summarize() TF-IDF centroid, tuần tự trong process
+    - summarize_corpus: cả kho, lưu document_summaries, 1 và --workers process
+    - rerun: chạy lại khi nội dung không đổi (chỉ so hash)
+    - read: đọc tóm tắt đã lưu so với tính lại mỗi lần đọc
+
+Cột boilerplate: tỉ lệ tóm tắt chứa phần thể thức (quốc hiệu, "Kính gửi",
+"Số:") thay vì nội dung.
+
+Chạy: python benchmarks/bench_summary.py --docs 3000 --workers 4
+"""
+
+import argparse
+import random
+import time
+
+from common import make_app, print_table
+
+from models import db, Document
+from summary_service import stored_summary, summarize, summarize_corpus
+
+HEADER = ('ỦY BAN NHÂN DÂN TỈNH {province}\nCỘNG HÒA XÃ HỘI CHỦ NGHĨA VIỆT NAM\n'
+          'Độc lập - Tự do - Hạnh phúc\nSố: {number}/UBND-KT\n{province}, ngày {day} tháng {month} năm 2024\n'
+          'Kính gửi: Các sở, ban, ngành; UBND các huyện, thành phố.\n')
+FOOTER = '\nNơi nhận:\n- Như trên;\n- Lưu: VT.\nTM. ỦY BAN NHÂN DÂN\nCHỦ TỊCH\n'
+TOPICS = {
+    'chuyển đổi số': ['hạ tầng công nghệ thông tin', 'dịch vụ công trực tuyến', 'cơ sở dữ liệu dùng chung'],
+    'phòng chống thiên tai': ['phương án sơ tán dân', 'lực lượng cứu hộ', 'vật tư dự phòng'],
+    'quyết toán ngân sách': ['báo cáo quyết toán', 'kinh phí chi thường xuyên', 'số liệu thu chi'],
+}
+FILLER = ['Thời tiết trong tháng tương đối thuận lợi.', 'Các nội dung khác thực hiện theo quy định hiện hành.',
+          'Trong quá trình thực hiện nếu có vướng mắc, các đơn vị phản ánh kịp thời.']
+BOILERPLATE = ('ỦY BAN', 'CỘNG HÒA', 'Kính gửi', 'Số:', 'Độc lập')
+
+
+def make_content(rng, size):
+    topic, details = rng.choice(list(TOPICS.items()))
+    body = [f'Thực hiện kế hoạch của UBND tỉnh về {topic} năm 2024.']
+    while sum(map(len, body)) < size:
+        detail = rng.choice(details)
+        body.append(rng.choice([
+            f'Các đơn vị rà soát {detail} phục vụ công tác {topic}.',
+            f'Đề nghị báo cáo kết quả {topic} và {detail} trước ngày {rng.randint(1, 28)}/{rng.randint(1, 12)}/2024.',
+            rng.choice(FILLER),
+        ]))
+    header = HEADER.format(province=rng.choice(['HÀ NAM', 'NAM ĐỊNH']), number=rng.randint(1, 999),
+                           day=rng.randint(1, 28), month=rng.randint(1, 12))
+    return header + ' '.join(body) + FOOTER
+
+
+def legacy_summary(text, max_length=300):
+    if not text or len(text) < max_length:
+        return text
+    summary_sentences = []
+    total_length = 0
+    for sentence in text.split('.'):
+        if total_length < max_length:
+            summary_sentences.append(sentence.strip())
+            total_length += len(sentence)
+        else:
+            break
+    return '. '.join(summary_sentences) + '...'
+
+
+def boilerplate_rate(summaries):
+    return sum(any(marker in s for marker in BOILERPLATE) for s in summaries) / len(summaries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--docs', type=int, default=3000)
+    parser.add_argument('--content-size', type=int, default=3000, help='Số ký tự phần nội dung mỗi văn bản')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--max-length', type=int, default=300)
+    parser.add_argument('--reads', type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    contents = [make_content(rng, args.content_size) for _ in range(args.docs)]
+
+    rows = []
+    for label, func in (('legacy first sentences', legacy_summary), ('centroid (in process)', summarize)):
+        start = time.perf_counter()
+        summaries = [func(content, args.max_length) for content in contents]
+        secs = time.perf_counter() - start
+        rows.append((label, f'{secs:.2f} s', f'{args.docs / secs:,.0f}', f'{boilerplate_rate(summaries):.0%}'))
+
+    app = make_app()
+    with app.app_context():
+        db.session.execute(db.insert(Document), [{'title': f'CV {i}', 'content': c} for i, c in enumerate(contents)])
+        db.session.commit()
+
+        for label, workers, force in (
+            ('summarize_corpus (1 process)', 1, True),
+            (f'summarize_corpus ({args.workers} processes)', args.workers, True),
+            ('rerun, content unchanged', args.workers, False),
+        ):
+            start = time.perf_counter()
+            summarize_corpus(workers=workers, force=force, max_length=args.max_length)
+            secs = time.perf_counter() - start
+            rows.append((label, f'{secs:.2f} s', f'{args.docs / secs:,.0f}', ''))
+
+        print_table(f'Summarization ({args.docs:,} documents, ~{args.content_size} chars)', rows,
+                    ('method', 'time', 'docs/sec', 'boilerplate'))
+
+        pks = db.session.execute(db.select(Document.pk)).scalars().all()
+        sample = [pks[i % len(pks)] for i in range(args.reads)]
+        read_rows = []
+        start = time.perf_counter()
+        for pk in sample:
+            stored_summary(pk)
+        secs = (time.perf_counter() - start) / args.reads
+        read_rows.append(('stored (document_summaries)', f'{secs * 1e6:,.0f} us'))
+        start = time.perf_counter()
+        for pk in sample:
+            summarize(db.session.get(Document, pk).content, args.max_length)
+            db.session.expunge_all()
+        secs = (time.perf_counter() - start) / args.reads
+        read_rows.append(('summarize on read', f'{secs * 1e6:,.0f} us'))
+        print_table('Summary read per request', read_rows, ('method', 'latency'))
+
+    print('\nExample:')
+    print('  legacy  :', legacy_summary(contents[0], args.max_length))
+    print('  centroid:', summarize(contents[0], args.max_length))
+
+
+if __name__ == '__main__':
+    main()
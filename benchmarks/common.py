@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark helpers - Dựng Flask app với CSDL SQLite tạm để đo hiệu năng
+Không đụng tới backend/database/documents.db
+"""
+
+import os
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from flask import Flask
+
+from models import db, Document, Attachment
+
+
+def make_app(db_path=None):
+    """Tạo Flask app trỏ vào file SQLite tạm"""
+    if db_path is None:
+        db_path = os.path.join(tempfile.mkdtemp(prefix='bench_'), 'bench.db')
+
+    app = Flask('benchmark')
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['UPLOAD_FOLDER'] = os.path.dirname(db_path)
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+    return app
+
+
+def seed_documents(n_docs, attachments_per_doc=2, content_size=2000, chunk_size=10000):
+    """Chèn n_docs văn bản mẫu (mỗi văn bản kèm attachments_per_doc file), theo lô chunk_size"""
+    now = datetime.utcnow()
+    body = ('Kính gửi: Toàn bộ cán bộ nhân viên. Công ty quyết định điều chỉnh lương cơ bản. ' * 40)[:content_size]
+
+    for offset in range(0, n_docs, chunk_size):
+        doc_rows, att_rows = [], []
+        for i in range(offset, min(offset + chunk_size, n_docs)):
+            doc_pk = i + 1
+            doc_rows.append({
+                'pk': doc_pk,
+                'id': str(uuid.uuid4()),
+                'title': f'Công văn số {i}',
+                'content': body,
+                'document_type': ('Công văn', 'Quyết định', 'Hợp đồng')[i % 3],
+                'document_number': f'CV-2024-{i:06d}',
+                'sender': 'Ban Nhân Sự',
+                'receiver': 'Toàn bộ nhân viên',
+                'date_issued': now - timedelta(days=i % 365),
+                'file_name': f'doc_{i}.pdf',
+                'file_size': 1024 + i,
+                'file_type': 'pdf',
+                'json_data': {'tags': ['lương', 'nhân sự'], 'priority': 'Normal'},
+                'created_at': now - timedelta(seconds=i),
+                'updated_at': now - timedelta(seconds=i),
+            })
+            for j in range(attachments_per_doc):
+                att_rows.append({
+                    'id': str(uuid.uuid4()),
+                    'document_pk': doc_pk,
+                    'filename': f'att_{i}_{j}.pdf',
+                    'file_path': f'/tmp/att_{i}_{j}.pdf',
+                    'file_size': 2048,
+                    'file_type': 'pdf',
+                    'created_at': now,
+                })
+
+        db.session.execute(db.insert(Document), doc_rows)
+        if att_rows:
+            db.session.execute(db.insert(Attachment), att_rows)
+        db.session.commit()
+
+
+@contextmanager
+def timer(results, label):
+    """Đo thời gian một khối lệnh, lưu vào results[label] (giây)"""
+    start = time.perf_counter()
+    yield
+    results[label] = time.perf_counter() - start
+
+
+def print_table(title, rows, headers):
+    """In bảng kết quả đơn giản"""
+    print(f'\n=== {title} ===')
+    widths = [max(len(str(h)), *(len(str(r[i])) for r in rows)) for i, h in enumerate(headers)]
+    print('  '.join(str(h).ljust(w) for h, w in zip(headers, widths)))
+    for row in rows:
+        print('  '.join(str(c).ljust(w) for c, w in zip(row, widths)))
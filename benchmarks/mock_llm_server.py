@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Mock server API tương thích OpenAI (POST /v1/chat/completions)
+
+Dùng để chạy backend 'openai' của RAG không cần mạng/API key: trả về dòng
+đầu tiên của từng đoạn trích trong prompt sau một độ trễ cố định (mô phỏng
+thời gian sinh của model). Với "stream": true, độ trễ chia đều cho từng từ.
+
+Chạy: python benchmarks/mock_llm_server.py --port 8765 --latency-ms 300
+      OPENAI_API_BASE=http://127.0.0.1:8765/v1 AI_BACKEND=openai python main.py
+"""
+
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CITATION_RE = re.compile(r'^\[(\d+)\] (.+)$', re.MULTILINE)
+
+
+def make_handler(latency):
+    class MockLLMHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_POST(self):
+            if not self.path.endswith('/chat/completions'):
+                self.send_error(404)
+                return
+            request = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+            prompt = request['messages'][-1]['content']
+
+            citations = CITATION_RE.findall(prompt)
+            content = '\n'.join(f'{title} [{index}]' for index, title in citations) or 'Không tìm thấy.'
+            if request.get('stream'):
+                self._stream(content)
+                return
+
+            time.sleep(latency)
+            body = json.dumps({
+                'id': 'mock',
+                'object': 'chat.completion',
+                'model': request.get('model'),
+                'choices': [{'index': 0, 'finish_reason': 'stop',
+                             'message': {'role': 'assistant', 'content': content}}],
+                'usage': {'prompt_tokens': len(prompt) // 3, 'completion_tokens': len(content) // 3},
+            }).encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, content):
+            # Độ trễ chia đều cho các từ, gửi từng từ một như SSE của OpenAI
+            words = content.split(' ')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/event-stream')
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for i, word in enumerate(words):
+                time.sleep(latency / len(words))
+                chunk = {'choices': [{'index': 0, 'delta': {'content': word if i == 0 else ' ' + word}}]}
+                self._write_chunk(b'data: ' + json.dumps(chunk).encode('utf-8') + b'\n\n')
+            self._write_chunk(b'data: [DONE]\n\n')
+            self._write_chunk(b'')
+
+        def _write_chunk(self, data):
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(data), data))
+            self.wfile.flush()
+
+        def log_message(self, format, *args):
+            pass
+
+    return MockLLMHandler
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # Hàng trăm request sinh đồng thời (bench_async.py)
+
+
+def start_server(port=0, latency=0.3):
+    """Chạy server trên thread nền; trả về (server, base_url)"""
+    server = MockLLMServer(('127.0.0.1', port), make_handler(latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}/v1'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=int, default=300)
+    args = parser.parse_args()
+
+    server = MockLLMServer(('127.0.0.1', args.port), make_handler(args.latency_ms / 1000))
+    print(f'Mock LLM: http://127.0.0.1:{args.port}/v1 (latency {args.latency_ms} ms)')
+    server.serve_forever()
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ const cancelUploadBtn = document.getElementById('cancelUploadBtn');
 const searchInput = document.getElementById('searchInput');
 const searchBtn = document.getElementById('searchBtn');
 const searchResults = document.getElementById('searchResults');
+const searchSuggestions = document.getElementById('searchSuggestions');
 
 const documentsList = document.getElementById('documentsList');
 const docCount = document.getElementById('docCount');
@@ -27,6 +28,10 @@ const notification = document.getElementById('notification');
 // State
 let documents = [];
 let isLoading = false;
+let suggestTimer = null;
+let suggestController = null;
+
+const SUGGEST_DELAY_MS = 150;
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -45,6 +50,7 @@ function setupEventListeners() {
     uploadForm.addEventListener('submit', handleUpload);
     searchBtn.addEventListener('click', handleSearch);
     searchInput.addEventListener('keypress', (e) => e.key === 'Enter' && handleSearch());
+    searchInput.addEventListener('input', scheduleSuggest);
     sendChatBtn.addEventListener('click', handleChatSubmit);
     chatInput.addEventListener('keypress', (e) => e.key === 'Enter' && handleChatSubmit());
 
@@ -122,7 +128,7 @@ function renderDocuments(docs = documents) {
 
             <div class="doc-actions">
                 <button class="btn btn-primary" onclick="viewDocument('${doc.id}')">Xem Chi Tiết</button>
-                <button class="btn btn-secondary" onclick="downloadDocument('${doc.id}')">
+                <button class="btn btn-secondary" onclick="downloadDocument('${doc.id}', '${doc.file_hash || ''}')">
                     <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" class="icon">
                         <path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"></path>
                         <polyline points="7 10 12 15 17 10"></polyline>
@@ -190,7 +196,11 @@ async function handleUpload(e) {
         const data = await response.json();
 
         if (response.ok) {
-            showNotification('Tải văn bản thành công!', 'success');
+            if (data.duplicates && data.duplicates.length > 0) {
+                showNotification(`Đã tải lên - có thể trùng với: ${data.duplicates.map(d => d.title).join(', ')}`, 'error');
+            } else {
+                showNotification('Tải văn bản thành công!', 'success');
+            }
             uploadForm.reset();
             uploadModal.classList.remove('show');
             loadDocuments();
@@ -205,6 +215,35 @@ async function handleUpload(e) {
     }
 }
 
+// Suggestions (debounced, stale requests cancelled)
+function scheduleSuggest() {
+    clearTimeout(suggestTimer);
+    suggestTimer = setTimeout(loadSuggestions, SUGGEST_DELAY_MS);
+}
+
+async function loadSuggestions() {
+    const query = searchInput.value.trim();
+    if (suggestController) suggestController.abort();
+
+    if (!query) {
+        searchSuggestions.innerHTML = '';
+        return;
+    }
+
+    suggestController = new AbortController();
+    try {
+        const response = await fetch(`${API_URL}/suggest?q=${encodeURIComponent(query)}&limit=8`, {
+            signal: suggestController.signal
+        });
+        const data = await response.json();
+        searchSuggestions.innerHTML = (data.suggestions || [])
+            .map(item => `<option value="${escapeHtml(item.text)}"></option>`)
+            .join('');
+    } catch (error) {
+        if (error.name !== 'AbortError') console.error('Suggest error:', error);
+    }
+}
+
 // Search
 async function handleSearch() {
     const query = searchInput.value.trim();
@@ -250,6 +289,7 @@ function renderSearchResults(results) {
                         ${result.document.document_number ? `<span>Số: ${escapeHtml(result.document.document_number)}</span>` : ''}
                         ${result.document.document_type ? `<span>${escapeHtml(result.document.document_type)}</span>` : ''}
                         ${result.document.sender ? `<span>Từ: ${escapeHtml(result.document.sender)}</span>` : ''}
+                        ${result.duplicates && result.duplicates.length > 0 ? `<span>+${result.duplicates.length} bản gần trùng</span>` : ''}
                     </div>
                 </div>
                 <button class="btn btn-primary" onclick="viewDocument('${result.document.id}')" style="font-size: 12px; padding: 6px 12px;">Xem</button>
@@ -260,7 +300,7 @@ function renderSearchResults(results) {
                     <p><strong>Tìm thấy ${result.matches.length} đoạn khớp:</strong></p>
                     ${result.matches.slice(0, 2).map(match => `
                         <div class="match-snippet">
-                            ${highlightText(match.snippet, searchInput.value)}
+                            ${match.page ? `<span class="page-number">Trang ${match.page}</span> ` : ''}${highlightText(match.snippet, searchInput.value)}
                         </div>
                     `).join('')}
                 </div>
@@ -280,7 +320,8 @@ function highlightText(text, query) {
 // View Document
 async function viewDocument(docId) {
     try {
-        const response = await fetch(`${API_URL}/documents/${docId}`);
+        // Không lấy toàn bộ content; nội dung được tải theo trang
+        const response = await fetch(`${API_URL}/documents/${docId}?content=0`);
         const data = await response.json();
         const doc = data.document;
 
@@ -319,12 +360,25 @@ async function viewDocument(docId) {
                 </div>
             </div>
 
-            ${doc.content ? `
+            ${doc.summary ? `
+                <div class="detail-section">
+                    <h3>Tóm Tắt</h3>
+                    <div class="detail-content-text">${escapeHtml(doc.summary)}</div>
+                </div>
+            ` : ''}
+
+            ${doc.page_count === 0 ? `
                 <div class="detail-section">
                     <h3>Nội Dung</h3>
                     <div class="detail-content-text">${escapeHtml(doc.content)}</div>
                 </div>
-            ` : ''}
+            ` : `
+                <div class="detail-section">
+                    <h3>Nội Dung${doc.page_count > 1 ? ` (${doc.page_count} trang)` : ''}</h3>
+                    <div class="detail-content-text" id="detailPages" data-doc-id="${doc.id}"></div>
+                    <button class="btn btn-secondary" id="loadMorePages" style="display: none; margin-top: 8px;">Tải thêm trang</button>
+                </div>
+            `}
 
             ${doc.attachments && doc.attachments.length > 0 ? `
                 <div class="detail-section">
@@ -342,15 +396,20 @@ async function viewDocument(docId) {
                                         <div class="attachment-size">${formatFileSize(att.file_size)}</div>
                                     </div>
                                 </div>
-                                <button class="btn btn-secondary" onclick="downloadAttachment('${att.id}')" style="font-size: 11px; padding: 4px 8px;">Tải</button>
+                                <button class="btn btn-secondary" onclick="downloadAttachment('${att.id}', '${att.file_hash || ''}')" style="font-size: 11px; padding: 4px 8px;">Tải</button>
                             </div>
                         `).join('')}
                     </div>
                 </div>
             ` : ''}
 
+            <div class="detail-section" id="detailRelated" data-doc-id="${doc.id}" style="display: none;">
+                <h3>Văn Bản Liên Quan</h3>
+                <div class="attachment-list" id="detailRelatedList"></div>
+            </div>
+
             <div style="display: flex; gap: 8px; margin-top: 20px;">
-                <button class="btn btn-primary" onclick="downloadDocument('${doc.id}')" style="flex: 1;">
+                <button class="btn btn-primary" onclick="downloadDocument('${doc.id}', '${doc.file_hash || ''}')" style="flex: 1;">
                     <svg viewBox="0 0 24 24" fill="none" stroke="currentColor" class="icon">
                         <path d="M21 15v4a2 2 0 0 1-2 2H5a2 2 0 0 1-2-2v-4"></path>
                         <polyline points="7 10 12 15 17 10"></polyline>
@@ -358,6 +417,9 @@ async function viewDocument(docId) {
                     </svg>
                     Tải Văn Bản Gốc
                 </button>
+                ${doc.attachments && doc.attachments.length > 0 ? `
+                    <button class="btn btn-secondary" onclick="downloadBundle('${doc.id}')" style="flex: 1;">Tải Tất Cả (ZIP)</button>
+                ` : ''}
                 <button class="btn btn-secondary" onclick="detailModal.classList.remove('show')" style="flex: 1;">Đóng</button>
             </div>
         `;
@@ -365,22 +427,104 @@ async function viewDocument(docId) {
         detailContent.innerHTML = html;
         document.getElementById('detailTitle').textContent = doc.title;
         detailModal.classList.add('show');
+
+        if (doc.page_count !== 0) {
+            loadDocumentPages(doc.id, 1);
+        }
+        loadRelatedDocuments(doc.id);
     } catch (error) {
         console.error('Error loading document:', error);
         showNotification('Không thể tải chi tiết văn bản', 'error');
     }
 }
 
-// Download
-function downloadDocument(docId) {
-    window.open(`${API_URL}/download/${docId}`, '_blank');
+// Tải nội dung văn bản theo trang (lazy)
+const PAGES_PER_LOAD = 5;
+
+async function loadRelatedDocuments(docId) {
+    try {
+        const response = await fetch(`${API_URL}/documents/${docId}/related?limit=5`);
+        const data = await response.json();
+        const related = data.related || [];
+        const section = document.getElementById('detailRelated');
+        // Modal có thể đã chuyển sang văn bản khác trong lúc chờ
+        if (!section || section.dataset.docId !== docId || !related.length) return;
+
+        document.getElementById('detailRelatedList').innerHTML = related.map(item => `
+            <div class="attachment-item">
+                <div>
+                    <div class="attachment-name">${escapeHtml(item.title)}</div>
+                    <div class="attachment-size">${[item.document_type, item.document_number].filter(Boolean).map(escapeHtml).join(' · ')}</div>
+                </div>
+                <button class="btn btn-secondary" onclick="viewDocument('${item.id}')" style="font-size: 11px; padding: 4px 8px;">Xem</button>
+            </div>
+        `).join('');
+        section.style.display = '';
+    } catch (error) {
+        console.error('Error loading related documents:', error);
+    }
 }
 
-function downloadAttachment(attId) {
-    window.open(`${API_URL}/download/attachment/${attId}`, '_blank');
+async function loadDocumentPages(docId, fromPage) {
+    const container = document.getElementById('detailPages');
+    const moreButton = document.getElementById('loadMorePages');
+    if (!container || container.dataset.docId !== docId) return;
+
+    try {
+        const toPage = fromPage + PAGES_PER_LOAD - 1;
+        const response = await fetch(`${API_URL}/documents/${docId}/pages?from=${fromPage}&to=${toPage}`);
+        const data = await response.json();
+        if (!data.success) throw new Error(data.error);
+
+        // Modal có thể đã chuyển sang văn bản khác trong lúc chờ
+        if (container.dataset.docId !== docId) return;
+
+        container.insertAdjacentHTML('beforeend', data.pages.map(page =>
+            `<div class="page-text" data-page="${page.number}">${data.page_count > 1 ? `<div class="page-number">Trang ${page.number}</div>` : ''}${escapeHtml(page.text)}</div>`
+        ).join(''));
+
+        if (data.to < data.page_count) {
+            moreButton.style.display = 'block';
+            moreButton.onclick = () => {
+                moreButton.style.display = 'none';
+                loadDocumentPages(docId, data.to + 1);
+            };
+        } else {
+            moreButton.style.display = 'none';
+        }
+    } catch (error) {
+        console.error('Error loading pages:', error);
+        showNotification('Không thể tải nội dung văn bản', 'error');
+    }
+}
+
+// Download - URL kèm ?v=<file_hash> để trình duyệt cache lâu dài
+function versionedUrl(url, fileHash) {
+    return fileHash ? `${url}?v=${fileHash}` : url;
+}
+
+function downloadDocument(docId, fileHash) {
+    window.open(versionedUrl(`${API_URL}/download/${docId}`, fileHash), '_blank');
+}
+
+function downloadAttachment(attId, fileHash) {
+    window.open(versionedUrl(`${API_URL}/download/attachment/${attId}`, fileHash), '_blank');
+}
+
+// Văn bản gốc + toàn bộ đính kèm trong một file ZIP
+function downloadBundle(docId) {
+    window.open(`${API_URL}/download/${docId}/bundle`, '_blank');
 }
 
 // Chat AI
+// Mỗi tab một session để AI hiểu câu tiếp nối như "cái thứ hai"
+const chatSessionId = sessionStorage.getItem('chatSessionId') || (
+    window.crypto && crypto.randomUUID ? crypto.randomUUID() : `s-${Date.now()}-${Math.random().toString(36).slice(2, 10)}`
+);
+sessionStorage.setItem('chatSessionId', chatSessionId);
+// id kết quả của lượt trước: gửi kèm để "cái thứ hai" được giải đúng ở mọi worker
+let chatPreviousResults = [];
+
 function initializeChatAI() {
     addChatMessage('ai', '👋 Xin chào! Tôi là AI trợ lý quản lý công văn.\n\nTôi có thể giúp bạn:\n• Tìm kiếm văn bản theo nội dung, số văn bản\n• Thống kê văn bản trong hệ thống\n• Trả lời câu hỏi về các văn bản đã lưu\n\nHãy hỏi tôi bất cứ điều gì!');
 }
@@ -395,43 +539,88 @@ async function handleChatSubmit() {
     addChatMessage('ai', '', true); // Typing indicator
 
     try {
-        const response = await fetch(`${API_URL}/chat`, {
+        const response = await fetch(`${API_URL}/chat/stream`, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ message })
+            body: JSON.stringify({ message, session_id: chatSessionId, previous_results: chatPreviousResults })
         });
 
-        const data = await response.json();
-
-        // Remove typing indicator
-        const messages = chatMessages.querySelectorAll('.message');
-        const lastMessage = messages[messages.length - 1];
-        if (lastMessage && lastMessage.querySelector('.typing-indicator')) {
-            lastMessage.remove();
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP ${response.status}`);
         }
 
-        addChatMessage('ai', data.response || 'Xin lỗi, đã có lỗi xảy ra.');
+        // Kết quả liên quan tới trước, câu trả lời hiện dần theo từng phần
+        let answerEl = null;
+        let resultIds = [];
+        await readEventStream(response, (event, data) => {
+            if (event === 'results') {
+                resultIds = (data.results || []).map(doc => doc.id);
+                removeTypingIndicator();
+                if (data.results && data.results.length > 0) {
+                    let resultsText = '📋 Kết quả liên quan:\n';
+                    data.results.forEach((doc, idx) => {
+                        resultsText += `${idx + 1}. ${doc.title}\n`;
+                    });
+                    addChatMessage('ai', resultsText);
+                    addChatMessage('ai', '', true); // Chờ câu trả lời
+                }
+            } else if (event === 'delta') {
+                removeTypingIndicator();
+                if (!answerEl) answerEl = addChatMessage('ai', '');
+                answerEl.textContent += data.text;
+                chatMessages.scrollTop = chatMessages.scrollHeight;
+            } else if (event === 'done') {
+                // Câu tham chiếu ("cái thứ hai") giữ nguyên danh sách đang xem
+                if (!data.reference && resultIds.length > 0) chatPreviousResults = resultIds;
+            } else if (event === 'error') {
+                throw new Error(data.error);
+            }
+        });
 
-        if (data.results && data.results.length > 0) {
-            // Show results in next message
-            let resultsText = '\n\n📋 Kết quả liên quan:\n';
-            data.results.forEach((doc, idx) => {
-                resultsText += `${idx + 1}. ${doc.title}\n`;
-            });
-            addChatMessage('ai', resultsText);
-        }
+        removeTypingIndicator();
+        if (!answerEl) addChatMessage('ai', 'Xin lỗi, đã có lỗi xảy ra.');
     } catch (error) {
         console.error('Chat error:', error);
-        // Remove typing indicator
-        const messages = chatMessages.querySelectorAll('.message');
-        const lastMessage = messages[messages.length - 1];
-        if (lastMessage && lastMessage.querySelector('.typing-indicator')) {
-            lastMessage.remove();
-        }
+        removeTypingIndicator();
         addChatMessage('ai', 'Xin lỗi, đã có lỗi xảy ra. Vui lòng thử lại.');
     }
 }
 
+// Đọc response text/event-stream, gọi onEvent(event, data) cho từng sự kiện
+async function readEventStream(response, onEvent) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const block = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            block.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            if (data) onEvent(event, JSON.parse(data));
+        }
+    }
+}
+
+function removeTypingIndicator() {
+    const messages = chatMessages.querySelectorAll('.message');
+    const lastMessage = messages[messages.length - 1];
+    if (lastMessage && lastMessage.querySelector('.typing-indicator')) {
+        lastMessage.remove();
+    }
+}
+
 function addChatMessage(type, content, isTyping = false) {
     const messageEl = document.createElement('div');
     messageEl.className = `message ${type}`;
@@ -455,6 +644,7 @@ function addChatMessage(type, content, isTyping = false) {
     messageEl.appendChild(contentEl);
     chatMessages.appendChild(messageEl);
     chatMessages.scrollTop = chatMessages.scrollHeight;
+    return contentEl;
 }
 
 // Utilities
@@ -4,7 +4,7 @@
 ║     HỆ THỐNG QUẢN LÝ CÔNG VĂN - DOCUMENT MANAGEMENT SYSTEM    ║
 ║                       Version 1.0.0                            ║
 ║                                                                ║
-║  Chạy từ: python main.py                                     ║
+║  Chạy từ: python main.py [--production | --async | --dev]    ║
 ║  Frontend: http://localhost:5500                             ║
 ║  Backend:  http://localhost:5000                             ║
 ╚════════════════════════════════════════════════════════════════╝
@@ -15,6 +15,8 @@ import sys
 import signal
 import subprocess
 import time
+import json
+import argparse
 import webbrowser
 import urllib.request  # FIX: Di chuyển import lên đầu
 from pathlib import Path
@@ -43,12 +45,28 @@ class DocumentManagementSystem:
             self.python_executable = self.venv_dir / 'bin' / 'python'
 
     def _load_config(self):
-        """Load configuration"""
-        return {
-            'backend': {'host': '0.0.0.0', 'port': 5000, 'debug': True, 'url': 'http://localhost:5000'},
-            'frontend': {'port': 5500, 'url': 'http://localhost:5500'},
+        """Load configuration (config.json: server.backend / server.frontend)"""
+        config = {
+            'backend': {'host': '0.0.0.0', 'port': 5000, 'debug': True, 'mode': 'development'},
+            'frontend': {'port': 5500},
             'database': {'path': str(self.backend_dir / 'database' / 'documents.db')}
         }
+        config_file = self.root_dir / 'config.json'
+        if config_file.exists():
+            try:
+                server = json.loads(config_file.read_text(encoding='utf-8')).get('server', {})
+                config['backend'].update(server.get('backend', {}))
+                config['frontend'].update(server.get('frontend', {}))
+            except (ValueError, OSError) as e:
+                print(f"{Fore.YELLOW}[!] Không đọc được config.json, dùng cấu hình mặc định: {e}{Style.RESET_ALL}")
+        config['backend']['url'] = f"http://localhost:{config['backend']['port']}"
+        config['frontend']['url'] = f"http://localhost:{config['frontend']['port']}"
+        return config
+
+    @property
+    def production(self):
+        """Backend chạy bằng gunicorn (mode 'production' hoặc 'async')"""
+        return self.config['backend'].get('mode') in ('production', 'async')
 
     def print_banner(self):
         """Print welcome banner"""
@@ -137,22 +155,46 @@ class DocumentManagementSystem:
             print(f"{Fore.RED}[!] Lỗi không xác định: {e}{Style.RESET_ALL}")
             return False
 
+    def _backend_command(self):
+        """Lệnh chạy backend: gunicorn (production / async) hoặc server phát triển của Flask"""
+        backend = self.config['backend']
+        if self.production:
+            if sys.platform == "win32":
+                # gunicorn cần fork(), không chạy được trên Windows; uvicorn thì được (một process)
+                if backend['mode'] == 'async':
+                    return [str(self.python_executable), '-m', 'uvicorn', 'asgi:application',
+                            '--host', str(backend['host']), '--port', str(backend['port'])]
+                print(f"{Fore.YELLOW}[!] Gunicorn không hỗ trợ Windows, dùng server phát triển.{Style.RESET_ALL}")
+                backend['mode'] = 'development'
+            else:
+                # gunicorn.conf.py chọn app:app (gthread) hay asgi:application (uvicorn) theo mode
+                return [str(self.python_executable), '-m', 'gunicorn', '-c', 'gunicorn.conf.py']
+        return [str(self.python_executable), 'app.py']
+
     def start_backend(self):
         """Start Flask backend server using venv's python"""
         print(f"{Fore.YELLOW}[*] Khởi động Backend Server...{Style.RESET_ALL}")
         try:
             # FIX: Chạy app.py bằng python từ venv
+            command = self._backend_command()
+            env = dict(os.environ)
+            if self.production:
+                env['FLASK_ENV'] = 'production'
+                env['BACKEND_MODE'] = self.config['backend']['mode']
+            # Log gunicorn ghi ra file: pipe không ai đọc sẽ đầy và chặn các worker
+            log_file = self.backend_dir / 'gunicorn.log'
+            stderr = open(log_file, 'a', encoding='utf-8') if self.production else subprocess.PIPE
             process = subprocess.Popen(
-                [str(self.python_executable), 'app.py'],
-                cwd=str(self.backend_dir),
-                stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True,
+                command,
+                cwd=str(self.backend_dir), env=env,
+                stdout=subprocess.DEVNULL if self.production else subprocess.PIPE, stderr=stderr, text=True,
                 creationflags=subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
             )
             self.processes.append(process)
             time.sleep(2)
             if process.poll() is not None:
                 print(f"{Fore.RED}[!] Backend không thể khởi động. Lỗi:{Style.RESET_ALL}")
-                print(process.stderr.read())
+                print(log_file.read_text(encoding='utf-8')[-4000:] if self.production else process.stderr.read())
                 return False
             print(f"{Fore.GREEN}[+] Backend Server: {self.config['backend']['url']}{Style.RESET_ALL}")
             return True
@@ -160,6 +202,16 @@ class DocumentManagementSystem:
             print(f"{Fore.RED}[!] Lỗi khởi động Backend: {e}{Style.RESET_ALL}\n")
             return False
 
+    def reload_backend(self, sig=None, frame=None):
+        """
+        Thay êm các worker gunicorn (SIGHUP): request đang chạy được xử lý xong
+
+        App được preload trong master nên mã nguồn mới cần khởi động lại hẳn.
+        """
+        if self.production and self.processes and self.processes[0].poll() is None:
+            print(f"{Fore.YELLOW}[*] Đang nạp lại Backend...{Style.RESET_ALL}")
+            self.processes[0].send_signal(signal.SIGHUP)
+
     def start_frontend(self):
         """Start Frontend with Python's http.server"""
         print(f"{Fore.YELLOW}[*] Khởi động Frontend Server...{Style.RESET_ALL}")
@@ -204,6 +256,8 @@ class DocumentManagementSystem:
     def print_status(self):
         """Print system status"""
         # FIX: Sửa lỗi f-string và căn lề
+        mode = {'production': 'Production (gunicorn)', 'async': 'Async (gunicorn + uvicorn)'}.get(
+            self.config['backend'].get('mode'), 'Development')
         print(f"{Fore.CYAN}╔{'═' * 62}╗{Style.RESET_ALL}")
         print(f"{Fore.CYAN}║{Style.RESET_ALL}{Fore.GREEN}{'SYSTEM STATUS':^62}{Fore.CYAN}║{Style.RESET_ALL}")
         print(f"{Fore.CYAN}╠{'═' * 62}╣{Style.RESET_ALL}")
@@ -211,6 +265,8 @@ class DocumentManagementSystem:
             f"{Fore.CYAN}║{Style.RESET_ALL} {Fore.GREEN}{'✓ Backend Server:':<22}{Style.RESET_ALL} {self.config['backend']['url']:<38} {Fore.CYAN}║{Style.RESET_ALL}")
         print(
             f"{Fore.CYAN}║{Style.RESET_ALL} {Fore.GREEN}{'✓ Frontend Server:':<22}{Style.RESET_ALL} {self.config['frontend']['url']:<38} {Fore.CYAN}║{Style.RESET_ALL}")
+        print(
+            f"{Fore.CYAN}║{Style.RESET_ALL} {Fore.GREEN}{'✓ Chế độ:':<22}{Style.RESET_ALL} {mode:<38} {Fore.CYAN}║{Style.RESET_ALL}")
         print(
             f"{Fore.CYAN}║{Style.RESET_ALL} {Fore.GREEN}{'✓ Database:':<22}{Style.RESET_ALL} {'SQLite (documents.db)':<38} {Fore.CYAN}║{Style.RESET_ALL}")
         print(f"{Fore.CYAN}╠{'═' * 62}╣{Style.RESET_ALL}")
@@ -225,16 +281,20 @@ class DocumentManagementSystem:
         sys.exit(0)
 
     def cleanup(self):
+        # SIGTERM: gunicorn chờ request đang chạy tối đa graceful_timeout giây
+        timeout = self.config['backend'].get('graceful_timeout', 30) + 5 if self.production else 5
         for process in self.processes:
             try:
                 process.terminate()
-                process.wait(timeout=5)
+                process.wait(timeout=timeout)
             except Exception:
                 process.kill()
 
     def run(self):
         """Main entry point"""
         signal.signal(signal.SIGINT, self.handle_signal)
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, self.reload_backend)
         try:
             self.print_banner()
             if not self.check_requirements(): sys.exit(1)
@@ -257,5 +317,17 @@ class DocumentManagementSystem:
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hệ thống quản lý công văn')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--production', action='store_const', const='production', dest='mode',
+                      help='Chạy backend bằng gunicorn (nhiều worker, preload, tự thay worker)')
+    mode.add_argument('--async', action='store_const', const='async', dest='mode',
+                      help='Chạy backend ASGI (asgi.py): tải file, chat stream bất đồng bộ trên worker uvicorn')
+    mode.add_argument('--dev', action='store_const', const='development', dest='mode',
+                      help='Chạy backend bằng server phát triển của Flask (app.py)')
+    args = parser.parse_args()
+
     app = DocumentManagementSystem()
+    if args.mode:
+        app.config['backend']['mode'] = args.mode
     app.run()
\ No newline at end of file
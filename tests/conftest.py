@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Fixture dùng chung cho tests: backend trên CSDL SQLite và thư mục upload tạm
+Không đụng tới backend/database/documents.db và thư mục uploads/ của dự án
+
+Chạy: python -m pytest -q tests
+"""
+
+import io
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+TMP_DIR = tempfile.mkdtemp(prefix='tests_')
+# config.py đọc các biến này khi được import lần đầu
+os.environ['FLASK_ENV'] = 'testing'
+os.environ['UPLOAD_FOLDER'] = TMP_DIR
+
+
+@pytest.fixture(scope='session')
+def app():
+    import config
+
+    config.TestingConfig.SQLALCHEMY_DATABASE_URI = f'sqlite:///{TMP_DIR}/tests.db'
+    config.TestingConfig.UPLOAD_FOLDER = TMP_DIR
+    config.TestingConfig.PAGE_STORE_FOLDER = os.path.join(TMP_DIR, 'pages')
+
+    from app import app as flask_app
+
+    return flask_app
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def upload(client):
+    """Tải lên một văn bản .txt, trả về JSON của văn bản vừa tạo"""
+    def _upload(text, name='document.txt', **fields):
+        response = client.post('/api/upload', data={'file': (io.BytesIO(text.encode('utf-8')), name), **fields},
+                               content_type='multipart/form-data')
+        assert response.status_code in (200, 201), response.get_json()
+        return response.get_json()['document']
+    return _upload
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra thao tác hàng loạt: cập nhật metadata, gắn lại tags, xoá văn bản
+(kèm attachments, file xoá ở nền) và kiểm tra dữ liệu đầu vào
+
+Chạy: python -m pytest -q tests
+"""
+
+import os
+
+import pytest
+
+from background import file_sweeper
+from models import db, Document, Attachment
+
+
+def _document(app, doc_id):
+    with app.app_context():
+        return Document.query.filter_by(id=doc_id).one_or_none()
+
+
+def test_update(app, client, upload):
+    ids = [upload(f'Công văn số {i} về công tác phòng cháy.', title=f'PCCC {i}')['id'] for i in range(2)]
+    response = client.post('/api/documents/batch/update', json={
+        'ids': ids + ['missing-id'],
+        'updates': {'sender': 'Phòng Hành chính', 'date_issued': '2024-03-05', 'document_number': '12/CV-HC'},
+    })
+    assert response.get_json() == {'success': True, 'requested': 3, 'updated': 2}
+
+    for doc_id in ids:
+        document = _document(app, doc_id)
+        assert document.sender == 'Phòng Hành chính'
+        assert document.date_issued.isoformat() == '2024-03-05T00:00:00'
+        # UPDATE hàng loạt không qua sự kiện ORM: khoá tra cứu vẫn được đồng bộ
+        assert document.document_number_key == '12CVHC'
+
+
+@pytest.mark.parametrize('body', [
+    {'ids': [], 'updates': {'sender': 'x'}},
+    {'ids': 'abc', 'updates': {'sender': 'x'}},
+    {'ids': ['abc'], 'updates': {}},
+    {'ids': ['abc'], 'updates': {'file_path': '/etc/passwd'}},
+    {'ids': ['abc'], 'updates': {'title': ''}},
+    {'ids': ['abc'], 'updates': {'date_issued': 'hôm qua'}},
+])
+def test_update_rejects_invalid_requests(client, body):
+    response = client.post('/api/documents/batch/update', json=body)
+    assert response.status_code == 400
+    assert not response.get_json()['success']
+
+
+def test_retag(app, client, upload):
+    doc_id = upload('Thông báo nghỉ lễ.', title='Nghỉ lễ', tags='cũ,giữ')['id']
+
+    response = client.post('/api/documents/batch/tags', json={'ids': [doc_id], 'add': ['mới', 'giữ'], 'remove': 'cũ'})
+    assert response.get_json()['updated'] == 1
+    assert _document(app, doc_id).json_data['tags'] == ['giữ', 'mới']
+
+    client.post('/api/documents/batch/tags', json={'ids': [doc_id], 'tags': ['thay']})
+    assert _document(app, doc_id).json_data['tags'] == ['thay']
+
+    assert client.post('/api/documents/batch/tags', json={'ids': [doc_id]}).status_code == 400
+
+
+def test_delete(app, client, upload):
+    # Tên file khác nhau: upload cùng tên trong cùng một giây dùng chung file
+    ids = [upload(f'Biên bản họp số {i}.', name=f'bien-ban-{i}.txt', title=f'Biên bản {i}')['id']
+           for i in range(2)]
+    kept = upload('Biên bản họp được giữ lại.', name='bien-ban-giu.txt', title='Biên bản giữ')['id']
+    with app.app_context():
+        first = Document.query.filter_by(id=ids[0]).one()
+        attachment_path = os.path.join(os.path.dirname(first.file_path), 'phu-luc-xoa.txt')
+        with open(attachment_path, 'w', encoding='utf-8') as f:
+            f.write('Phụ lục')
+        db.session.add(Attachment(document_pk=first.pk, filename='phu-luc-xoa.txt', file_path=attachment_path))
+        db.session.commit()
+        paths = [Document.query.filter_by(id=doc_id).one().file_path for doc_id in ids] + [attachment_path]
+
+    response = client.post('/api/documents/batch/delete', json={'ids': ids})
+    assert response.get_json() == {'success': True, 'requested': 2, 'deleted': 2, 'deleted_attachments': 1,
+                                   'files_scheduled': 3}
+    for doc_id in ids:
+        assert client.get(f'/api/documents/{doc_id}').status_code == 404
+    assert client.get(f'/api/documents/{kept}').status_code == 200
+
+    file_sweeper._queue.join()
+    assert not any(os.path.exists(path) for path in paths)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra classifier_service: mô hình một nhãn (hoặc ít mẫu) không dự đoán,
+đủ hai nhãn thì phân loại đúng
+
+Chạy: python -m pytest -q tests
+"""
+
+from classifier_service import DocumentTypeClassifier, MIN_SAMPLES_PER_LABEL
+
+DECISIONS = [('Quyết định', f'Quyết định số {i}', 'Quyết định bổ nhiệm cán bộ, điều động nhân sự')
+             for i in range(MIN_SAMPLES_PER_LABEL)]
+CONTRACTS = [('Hợp đồng', f'Hợp đồng lao động {i}', 'Hợp đồng lao động giữa công ty và người lao động')
+             for i in range(MIN_SAMPLES_PER_LABEL)]
+CONTRACT = ('HĐLĐ-2024-0001', 'Hợp đồng lao động giữa công ty và người lao động, thời hạn 12 tháng')
+
+
+def test_single_label_does_not_predict():
+    classifier = DocumentTypeClassifier().fit(DECISIONS)
+    assert classifier.trained
+    assert not classifier.ready
+    assert classifier.predict(*CONTRACT) == (None, 0.0)
+
+
+def test_label_with_too_few_samples_does_not_predict():
+    classifier = DocumentTypeClassifier().fit(DECISIONS + CONTRACTS[:MIN_SAMPLES_PER_LABEL - 1])
+    assert not classifier.ready
+    assert classifier.predict(*CONTRACT) == (None, 0.0)
+
+
+def test_two_labels_predict():
+    classifier = DocumentTypeClassifier().fit(DECISIONS + CONTRACTS)
+    assert classifier.ready
+    label, confidence = classifier.predict(*CONTRACT)
+    assert label == 'Hợp đồng'
+    assert 0.5 < confidence <= 1.0
+
+
+def test_upload_with_one_known_label_is_not_classified(app, upload):
+    for _, title, content in DECISIONS:
+        upload(content, title=title, document_type='Quyết định')
+    document = upload(CONTRACT[1], name='hdld.txt', title=CONTRACT[0])
+    assert document['document_type'] is None
+
+
+def test_batch_relabel_moves_counts(app, client, upload, monkeypatch):
+    import classifier_service
+    from models import db, Document
+
+    confirmed = [upload(content, title=title, document_type=label) for label, title, content in DECISIONS[:2]]
+    guessed = upload(CONTRACTS[0][2], title=CONTRACTS[0][1])
+    with app.app_context():
+        # Nhãn do mô hình gán: không được học khi huấn luyện
+        db.session.execute(db.update(Document).where(Document.id == guessed['id'])
+                           .values(document_type='Hợp đồng', document_type_confidence=0.9))
+        db.session.commit()
+
+    classifier = DocumentTypeClassifier().fit(DECISIONS[:2])
+    classifier.loaded = True
+    monkeypatch.setattr(classifier_service, 'document_classifier', classifier)
+
+    ids = [document['id'] for document in confirmed] + [guessed['id']]
+    response = client.post('/api/documents/batch/update', json={'ids': ids, 'updates': {'document_type': 'Báo cáo'}})
+    assert response.get_json()['updated'] == 3
+    assert classifier.label_counts() == {'Quyết định': 0, 'Báo cáo': 3}
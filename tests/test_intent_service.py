@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra intent_service: lời chào là general (không phải help), "tổng hợp
+... <chủ đề>" là tìm kiếm nội dung (không phải thống kê)
+
+Chạy: python -m pytest -q tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / 'backend'
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from intent_service import intent_classifier
+
+
+@pytest.mark.parametrize('message, intent', [
+    ('xin chào', 'general'),
+    ('hello', 'general'),
+    ('chào bạn', 'general'),
+    ('tổng hợp báo cáo tài chính', 'search'),
+    ('tổng hợp văn bản về an toàn lao động', 'search'),
+    ('thống kê', 'statistics'),
+    ('tổng số công văn là bao nhiêu', 'statistics'),
+    ('bạn làm được gì', 'help'),
+])
+def test_routing(message, intent):
+    assert intent_classifier.predict(message)[0] == intent
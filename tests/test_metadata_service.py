@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra metadata_service: số hiệu có '/' và chỉ có '-', số hiệu được viện
+dẫn giữa câu không bị nhận nhầm, ngày ban hành và nơi nhận
+
+Chạy: python -m pytest -q tests
+"""
+
+from datetime import datetime
+
+import pytest
+
+from lookup_service import normalize_document_number
+from metadata_service import extract_metadata
+
+
+@pytest.mark.parametrize('text, number', [
+    ('Số: 123/QĐ-UBND\nV/v nghỉ hè', '123/QĐ-UBND'),
+    ('Số 45/2024/NĐ-CP', '45/2024/NĐ-CP'),
+    ('Số: 12/2024/QĐ-UBND.', '12/2024/QĐ-UBND'),
+    ('Số: HĐLĐ-2024-0001\nHỢP ĐỒNG LAO ĐỘNG', 'HĐLĐ-2024-0001'),
+    ('Số: 01-CV', '01-CV'),
+    ('Căn cứ Quyết định số 12/2020/QĐ-UBND', None),
+    ('Số lượng-dự kiến: nhiều', None),
+    ('Số: 15', None),
+])
+def test_document_number(text, number):
+    assert extract_metadata(text).get('document_number') == number
+
+
+def test_hyphenated_number_has_lookup_key():
+    number = extract_metadata('Số: HĐLĐ-2024-0001')['document_number']
+    assert normalize_document_number(number) == 'HDLD20240001'
+
+
+def test_header_fields():
+    metadata = extract_metadata(
+        'UBND TỈNH ĐÀ NẴNG\nSỞ NỘI VỤ\nSố: 01-CV\n'
+        'Đà Nẵng, ngày 5 tháng 3 năm 2024\nKính gửi: Phòng Hành chính\n'
+    )
+    assert metadata == {
+        'document_number': '01-CV',
+        'date_issued': datetime(2024, 3, 5),
+        'sender': 'UBND TỈNH ĐÀ NẴNG SỞ NỘI VỤ',
+        'receiver': 'Phòng Hành chính',
+    }
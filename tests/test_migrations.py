@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra migrations: CSDL cũ khoá UUID chuyển sang khoá INTEGER (giữ UUID làm
+id công khai), khoá số hiệu được điền một lần, số hiệu người dùng nhập giữ
+nguyên kể cả khi không có khoá
+
+Chạy: python -m pytest -q tests
+"""
+
+from sqlalchemy import create_engine, text
+
+from migrations import run_migrations
+from models import db
+
+
+def _engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/migrate.db')
+    db.metadata.create_all(engine)
+    return engine
+
+
+def test_document_number_keys_run_once(tmp_path):
+    engine = _engine(tmp_path)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO documents (id, title, document_number) VALUES (:id, :title, :number)"
+        ), [
+            {'id': 'a', 'title': 'A', 'number': 'HĐLĐ-2024-0001'},
+            {'id': 'b', 'title': 'B', 'number': ''},
+            {'id': 'c', 'title': 'C', 'number': '---'},
+            {'id': 'd', 'title': 'D', 'number': None},
+        ])
+
+    assert run_migrations(engine) == ['document_number_keys']
+    assert run_migrations(engine) == []
+
+    with engine.connect() as conn:
+        rows = dict((row[0], row[1:]) for row in conn.execute(text(
+            'SELECT id, document_number, document_number_key FROM documents'
+        )))
+    assert rows == {
+        'a': ('HĐLĐ-2024-0001', 'HDLD20240001'),
+        'b': ('', ''),
+        'c': ('---', ''),
+        'd': (None, None),
+    }
+
+
+LEGACY_SCHEMA = (
+    'CREATE TABLE documents (id VARCHAR(36) PRIMARY KEY, title VARCHAR(255) NOT NULL, content TEXT, '
+    'document_type VARCHAR(100), document_number VARCHAR(100), sender VARCHAR(255), receiver VARCHAR(255), '
+    'date_received DATETIME, date_issued DATETIME, file_path VARCHAR(500), file_name VARCHAR(255), '
+    'file_size INTEGER, file_type VARCHAR(50), json_data JSON, created_at DATETIME, updated_at DATETIME)',
+    'CREATE TABLE attachments (id VARCHAR(36) PRIMARY KEY, document_id VARCHAR(36) NOT NULL '
+    'REFERENCES documents (id), filename VARCHAR(255) NOT NULL, file_path VARCHAR(500) NOT NULL, '
+    'file_size INTEGER, file_type VARCHAR(50), json_data JSON, created_at DATETIME)',
+    'CREATE TABLE chat_messages (id VARCHAR(36) PRIMARY KEY, session_id VARCHAR(36) NOT NULL, '
+    'user_message TEXT NOT NULL, ai_response TEXT NOT NULL, related_documents JSON, created_at DATETIME)',
+)
+
+
+def test_legacy_uuid_keys_become_integer_keys(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/legacy.db')
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.execute(text(statement))
+        # UUID ngẫu nhiên: thứ tự pk mới theo created_at, không theo id
+        conn.execute(text(
+            'INSERT INTO documents (id, title, document_number, created_at) VALUES (:id, :title, :number, :created)'
+        ), [
+            {'id': 'f0-newer', 'title': 'Mới', 'number': '15/2024/QĐ-UBND', 'created': '2024-02-01 00:00:00'},
+            {'id': '0a-older', 'title': 'Cũ', 'number': None, 'created': '2024-01-01 00:00:00'},
+        ])
+        conn.execute(text(
+            "INSERT INTO attachments (id, document_id, filename, file_path, created_at) "
+            "VALUES ('att-1', 'f0-newer', 'phu-luc.pdf', '/tmp/phu-luc.pdf', '2024-02-01 00:00:01')"
+        ))
+        conn.execute(text(
+            "INSERT INTO chat_messages (id, session_id, user_message, ai_response, created_at) "
+            "VALUES ('msg-1', 's', 'xin chào', 'chào bạn', '2024-02-02 00:00:00')"
+        ))
+
+    assert run_migrations(engine) == ['integer_surrogate_keys', 'document_number_keys']
+    assert run_migrations(engine) == []
+
+    with engine.connect() as conn:
+        documents = conn.execute(text('SELECT pk, id, document_number_key FROM documents ORDER BY pk')).all()
+        attachment = conn.execute(text(
+            'SELECT a.id, d.id FROM attachments a JOIN documents d ON d.pk = a.document_pk'
+        )).one()
+        message = conn.execute(text('SELECT pk, id FROM chat_messages')).one()
+        tables = {row[0] for row in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'"))}
+    assert [tuple(row) for row in documents] == [(1, '0a-older', None), (2, 'f0-newer', '152024QDUBND')]
+    assert tuple(attachment) == ('att-1', 'f0-newer')
+    assert tuple(message) == (1, 'msg-1')
+    assert not any(name.startswith('_legacy_') for name in tables)
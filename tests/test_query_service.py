@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra query_service: cú pháp truy vấn, number: tra theo khoá số hiệu,
+thứ tự các bước của kế hoạch theo số văn bản ước lượng
+
+Chạy: python -m pytest -q tests
+"""
+
+import io
+from datetime import datetime
+
+import pytest
+
+from models import db, Document
+from query_service import QuerySyntaxError, compile_query, parse_query
+
+
+@pytest.fixture(scope='module')
+def documents(app):
+    client = app.test_client()
+    ids = {}
+    for name, text, fields in (
+        ('rare', 'Biên bản nghiệm thu đàn xylophone cho nhà văn hoá.', {'title': 'Biên bản nghiệm thu'}),
+        ('contract', 'Hợp đồng lao động xylophone thời hạn 12 tháng.',
+         {'title': 'Hợp đồng lao động', 'document_number': 'HĐLĐ-2024-0001', 'sender': 'Ban Nhân Sự'}),
+        ('plain', 'Thông báo xylophone lịch nghỉ hè năm 2023.', {'title': 'Thông báo nghỉ hè'}),
+        # Không chứa từ hiếm: after:2000-01-01 thoả nhiều văn bản hơn xylophone
+        ('filler-1', 'Công văn về kế hoạch công tác quý I.', {'title': 'Kế hoạch quý I'}),
+        ('filler-2', 'Công văn về kế hoạch công tác quý II.', {'title': 'Kế hoạch quý II'}),
+    ):
+        response = client.post('/api/upload', data={'file': (io.BytesIO(text.encode('utf-8')), f'{name}.txt'),
+                                                     **fields}, content_type='multipart/form-data')
+        ids[name] = response.get_json()['document']['id']
+    with app.app_context():
+        db.session.execute(db.update(Document).values(date_issued=datetime(2024, 1, 1)))
+        db.session.commit()
+    return ids
+
+
+def _search(client, query):
+    response = client.post('/api/search', json={'query': query, 'explain': True, 'collapse': False})
+    return response.status_code, response.get_json()
+
+
+def test_parse_query():
+    clauses = parse_query('sender:"Ban Nhân Sự" nghỉ -2023 after:2024-01-01')
+    assert [(c['field'], c['value'], c['negated']) for c in clauses] == [
+        ('sender', 'Ban Nhân Sự', False), (None, 'nghỉ', False), (None, '2023', True), ('after', '2024-01-01', False),
+    ]
+
+
+@pytest.mark.parametrize('query', ['after:2024-13-01 x', 'before:soon x', 'number:--- x', 'number:"/" x'])
+def test_invalid_field_values(app, query):
+    with app.app_context(), pytest.raises(QuerySyntaxError):
+        compile_query(query)
+
+
+def test_number_without_key_is_bad_request(client, documents):
+    status, body = _search(client, 'number:--- xylophone')
+    assert status == 400
+    assert not body['success']
+
+
+def test_number_matches_normalized_key(client, documents):
+    status, body = _search(client, 'number:hdld/2024/0001 xylophone')
+    assert status == 200
+    assert [result['document']['id'] for result in body['results']] == [documents['contract']]
+
+
+def test_rare_term_runs_before_broad_filter(client, documents):
+    status, body = _search(client, 'after:2000-01-01 xylophone')
+    assert status == 200
+    stages = [stage['stage'] for stage in body['plan']['stages']]
+    assert stages == ['term', 'sql', 'rank']
+    assert {result['document']['id'] for result in body['results']} == {
+        documents['rare'], documents['contract'], documents['plain'],
+    }
+
+
+def test_selective_filter_runs_first(client, documents):
+    status, body = _search(client, 'sender:"Ban Nhân Sự" xylophone')
+    stages = body['plan']['stages']
+    assert [stage['stage'] for stage in stages] == ['sql', 'term', 'rank']
+    assert stages[0]['estimate'] <= stages[1]['estimate']
+    assert [result['document']['id'] for result in body['results']] == [documents['contract']]
+
+
+def test_phrase_and_negation(client, documents):
+    status, body = _search(client, '"nghỉ hè" xylophone')
+    assert [result['document']['id'] for result in body['results']] == [documents['plain']]
+    status, body = _search(client, 'xylophone -2023 -"lao động"')
+    assert [result['document']['id'] for result in body['results']] == [documents['rare']]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra serializers: danh sách văn bản giống Document.to_dict(), attachments
+của cả trang nạp bằng một truy vấn IN (không 1 + N)
+
+Chạy: python -m pytest -q tests
+"""
+
+import json
+import threading
+
+from sqlalchemy import event
+
+from models import db, Document, Attachment
+from serializers import encode_json, list_documents
+
+
+def _add_attachments(app, document_ids, count=2):
+    with app.app_context():
+        for doc in Document.query.filter(Document.id.in_(document_ids)):
+            for i in range(count):
+                db.session.add(Attachment(document_pk=doc.pk, filename=f'phu-luc-{i}.pdf',
+                                          file_path=f'/tmp/phu-luc-{i}.pdf', file_size=100 + i,
+                                          file_type='pdf'))
+        db.session.commit()
+
+
+def _statements(app, func):
+    """Các câu SQL func() gửi tới CSDL (bỏ qua thread nền ghi kết quả phân tích)"""
+    statements = []
+    thread = threading.get_ident()
+
+    def count(conn, cursor, statement, *args):
+        if threading.get_ident() == thread:
+            statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', count)
+        try:
+            func()
+        finally:
+            event.remove(engine, 'before_cursor_execute', count)
+    return statements
+
+
+def test_payload_matches_to_dict(app, client, upload):
+    document = upload('Công văn về lịch trực Tết.', title='Lịch trực Tết', sender='Văn phòng')
+    _add_attachments(app, [document['id']])
+
+    listed = {d['id']: d for d in client.get('/api/documents').get_json()['documents']}[document['id']]
+    with app.app_context():
+        expected = json.loads(encode_json(Document.query.filter_by(id=document['id']).one().to_dict()))
+    assert listed == expected
+    assert len(listed['attachments']) == 2
+
+
+def test_page_query_count_does_not_grow(app, upload):
+    ids = [upload(f'Văn bản kiểm tra số {i}.', title=f'Kiểm tra {i}')['id'] for i in range(6)]
+    _add_attachments(app, ids, count=1)
+
+    small = _statements(app, lambda: list_documents(page=1, per_page=2))
+    large = _statements(app, lambda: list_documents(page=1, per_page=6))
+    assert len(small) == len(large) == 3  # COUNT, trang văn bản, attachments (IN)
@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra ETag của /api/statistics: 304 khi kho không đổi, đổi khi có văn
+bản mới và khi sang ngày mới (today_documents)
+
+Chạy: python -m pytest -q tests
+"""
+
+from datetime import datetime, timedelta
+
+import routes
+
+
+def test_not_modified_until_collection_changes(client, upload):
+    first = client.get('/api/statistics')
+    assert first.status_code == 200
+    etag = first.headers['ETag']
+
+    again = client.get('/api/statistics', headers={'If-None-Match': etag})
+    assert again.status_code == 304
+
+    upload('Thông báo lịch họp giao ban tuần.', title='Thông báo họp')
+    changed = client.get('/api/statistics', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['statistics']['total_documents'] == first.get_json()['statistics']['total_documents'] + 1
+
+
+def test_etag_changes_at_midnight(client, monkeypatch):
+    etag = client.get('/api/statistics').headers['ETag']
+
+    class Tomorrow(datetime):
+        @classmethod
+        def utcnow(cls):
+            return datetime.utcnow() + timedelta(days=1)
+
+    monkeypatch.setattr(routes, 'datetime', Tomorrow)
+    response = client.get('/api/statistics', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Kiểm tra suggest_service: từ chỉ gợi ý khi gặp trong đủ MIN_TERM_DF văn
+bản, kết quả không phụ thuộc lúc delta được gộp vào chỉ mục chính
+
+Chạy: python -m pytest -q tests
+"""
+
+from suggest_service import MIN_TERM_DF, PrefixIndex, SuggestIndex
+
+DOCUMENTS = [
+    ('Biên bản nghiệm thu', None, 'Ban Quản lý', 'Nghiệm thu đàn xylophone cho nhà văn hoá'),
+    ('Thông báo lịch diễn', None, 'Nhà văn hoá', 'Buổi diễn xylophone cuối tuần'),
+]
+
+
+def _index():
+    index = SuggestIndex()
+    index._base = PrefixIndex({})  # Như đã dựng từ kho rỗng
+    return index
+
+
+def _terms(index, prefix):
+    return [(s['text'], s['weight']) for s in index.suggest(prefix) if s['kind'] == 'term']
+
+
+def test_rare_term_is_not_suggested():
+    index = _index()
+    index.add_document(*DOCUMENTS[0])
+    assert _terms(index, 'xylo') == []
+    index.add_document(*DOCUMENTS[1])
+    assert _terms(index, 'xylo') == [('xylophone', MIN_TERM_DF)]
+
+
+def test_merge_keeps_rare_term_weight():
+    merged = _index()
+    merged.add_document(*DOCUMENTS[0])
+    merged._start('merge')
+    merged.join()
+    assert merged.ready and not merged._delta
+    assert _terms(merged, 'xylo') == []
+    merged.add_document(*DOCUMENTS[1])
+
+    pending = _index()
+    for document in DOCUMENTS:
+        pending.add_document(*document)
+
+    assert _terms(merged, 'xylo') == _terms(pending, 'xylo') == [('xylophone', MIN_TERM_DF)]
+    assert merged.suggest('nha') == pending.suggest('nha')